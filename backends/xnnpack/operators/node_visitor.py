@@ -4,8 +4,6 @@
 # This source code is licensed under the BSD-style license found in the
 # LICENSE file in the root directory of this source tree.
 
-import ctypes
-
 from typing import cast, Dict, List, Optional, Tuple
 
 import torch
@@ -39,6 +37,7 @@ from executorch.backends.xnnpack.utils.utils import (
 )
 
 from executorch.backends.xnnpack.utils.xnnpack_constants import XNN_INVALID_VALUE_ID
+from executorch.exir._serialize._cord import Cord
 from torch.export import ExportedProgram
 
 XNN_TYPE_MAP = {
@@ -46,12 +45,25 @@ XNN_TYPE_MAP = {
 }
 
 from executorch.backends.xnnpack.serialization.xnnpack_graph_serialize import (
-    _aligned_size,
-    _pad_to,
+    _padding_required,
     CONSTANT_TENSOR_ALIGNMENT,
 )
 
 
+def _tensor_bytes(tensor: torch.Tensor) -> memoryview:
+    """
+    Returns the memory of a dense tensor, in its memory format, as a byte view
+    that keeps the tensor alive.
+    """
+    nbytes = tensor.numel() * tensor.element_size()
+    storage_bytes = torch.empty(0, dtype=torch.uint8).set_(
+        tensor.untyped_storage(),
+        tensor.storage_offset() * tensor.element_size(),
+        (nbytes,),
+    )
+    return memoryview(storage_bytes.numpy())
+
+
 class InputTypeToIndex:
     """
     Mapping from input type to the arg index of a node
@@ -86,7 +98,7 @@ class NodeVisitor:
         self,
         exported_program: ExportedProgram,
         external_ids: Dict,
-        constant_data_bytes: bytearray,
+        constant_data_bytes: Cord,
     ) -> None:
         self._external_ids = external_ids or {}
         self._exported_program = exported_program or None
@@ -549,18 +561,17 @@ class NodeVisitor:
         if quant_params is not None and quant_params.is_qc4w:
             const_val = self.convert_to_qc4w(const_val)
 
-        array_type = ctypes.c_char * const_val.untyped_storage().nbytes()
-        array = ctypes.cast(
-            const_val.untyped_storage().data_ptr(),
-            ctypes.POINTER(array_type),
-        ).contents
-
+        # The constant data refers to the tensor's memory instead of copying
+        # it; the payload is assembled with a single copy once all nodes are
+        # serialized.
+        data = _tensor_bytes(const_val)
         offset = len(self._constant_data_bytes)
-        size = const_val.untyped_storage().nbytes()
+        size = len(data)
         xnn_graph.constant_data.append(ConstantDataOffset(offset=offset, size=size))
-        self._constant_data_bytes.extend(
-            _pad_to(bytes(array), _aligned_size(size, CONSTANT_TENSOR_ALIGNMENT))
-        )
+        self._constant_data_bytes.append(data)
+        padding = _padding_required(size, CONSTANT_TENSOR_ALIGNMENT)
+        if padding > 0:
+            self._constant_data_bytes.append(b"\x00" * padding)
 
         return buffer_idx
 
@@ -9,10 +9,11 @@ import os
 import tempfile
 
 from dataclasses import dataclass, fields, is_dataclass
-from typing import ClassVar, Literal
+from typing import ClassVar, Literal, Union
 
 import pkg_resources
 from executorch.backends.xnnpack.serialization.xnnpack_graph_schema import XNNGraph
+from executorch.exir._serialize._cord import Cord
 from executorch.exir._serialize._dataclass import _DataclassEncoder
 
 from executorch.exir._serialize._flatbuffer import _flatc_compile
@@ -301,12 +302,15 @@ def convert_to_flatbuffer(xnnpack_graph: XNNGraph) -> bytes:
 
 
 def serialize_xnnpack_binary(
-    xnnpack_graph: XNNGraph, constant_data_bytes: bytearray
+    xnnpack_graph: XNNGraph, constant_data_bytes: Union[bytearray, Cord]
 ) -> bytes:
     """Returns the runtime binary representation of the given XNNGraph.
 
     Args:
         xnnpack_graph: XNNGraph object to serialize.
+        constant_data_bytes: The constant data that the XNNGraph's
+            constant_data offsets refer to. A Cord of references to the
+            constant tensors is copied only once, into the returned bytes.
 
     Returns:
         The serialized form of the XNNGraph, ready for execution by XNNPACK Backend
@@ -333,10 +337,7 @@ def serialize_xnnpack_binary(
         constant_data_size=len(constant_data_bytes),
     ).to_bytes()
 
-    return b"".join(
-        [
-            _pad_to(header, padded_header_length),
-            _pad_to(flatbuffer_payload, padded_flatbuffer_length),
-            constant_data_bytes,
-        ]
-    )
+    payload = Cord(_pad_to(header, padded_header_length))
+    payload.append(_pad_to(flatbuffer_payload, padded_flatbuffer_length))
+    payload.append(constant_data_bytes)
+    return bytes(payload)
@@ -0,0 +1,96 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+# All rights reserved.
+#
+# This source code is licensed under the BSD-style license found in the
+# LICENSE file in the root directory of this source tree.
+
+"""Times lowering a model with many XNNPACK partitions with concurrent_lowering().
+
+Example:
+    python -m executorch.backends.xnnpack.test.concurrent_lowering_benchmark \\
+        --num-partitions 200 --workers 1 2 4 8
+"""
+
+import argparse
+import time
+
+import torch
+from executorch.backends.xnnpack.partition.xnnpack_partitioner import XnnpackPartitioner
+from executorch.exir import EdgeProgramManager, to_edge
+from executorch.exir.backend.backend_api import concurrent_lowering
+from executorch.exir.lowered_backend_module import get_lowered_backend_modules
+from torch.export import export
+
+
+class ManyPartitions(torch.nn.Module):
+    """Linear layers separated by an op XNNPACK does not support, so that each
+    layer is lowered as its own partition.
+    """
+
+    def __init__(self, num_partitions: int, features: int) -> None:
+        super().__init__()
+        self.layers = torch.nn.ModuleList(
+            [torch.nn.Linear(features, features) for _ in range(num_partitions)]
+        )
+
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        for layer in self.layers:
+            x = torch.sin(layer(x))
+        return x
+
+
+def lower(edge: EdgeProgramManager, max_workers: int) -> EdgeProgramManager:
+    if max_workers == 1:
+        return edge.to_backend(XnnpackPartitioner())
+    with concurrent_lowering(max_workers):
+        return edge.to_backend(XnnpackPartitioner())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--num-partitions", type=int, default=100)
+    parser.add_argument("--features", type=int, default=256)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        nargs="+",
+        default=[1, 2, 4, 8],
+        help="Numbers of lowering threads to time. 1 lowers sequentially.",
+    )
+    args = parser.parse_args()
+
+    model = ManyPartitions(args.num_partitions, args.features).eval()
+    example_inputs = (torch.randn(1, args.features),)
+
+    # The first lowering also pays for one time setup, such as building the
+    # XNNPACK partitioner's patterns, so it is not timed.
+    lower(to_edge(export(model, example_inputs)), 1)
+
+    baseline_elapsed = None
+    baseline_bytes = None
+    for max_workers in args.workers:
+        # to_backend() consumes the delegated constants of the edge program, so
+        # lower a fresh one each time.
+        edge = to_edge(export(model, example_inputs))
+        start = time.perf_counter()
+        lowered = lower(edge, max_workers)
+        elapsed = time.perf_counter() - start
+
+        processed_bytes = [
+            module.processed_bytes
+            for module in get_lowered_backend_modules(
+                lowered.exported_program().graph_module
+            )
+        ]
+        if baseline_elapsed is None:
+            baseline_elapsed, baseline_bytes = elapsed, processed_bytes
+        print(
+            f"{max_workers:3d} workers: {elapsed:8.3f}s "
+            + f"(speedup {baseline_elapsed / elapsed:.2f}x, "
+            + f"{len(processed_bytes)} partitions, "
+            + f"same result: {processed_bytes == baseline_bytes})"
+        )
+
+
+if __name__ == "__main__":
+    main()  # pragma: no cover
@@ -6,6 +6,9 @@
 
 import unittest
 
+import torch
+from executorch.backends.xnnpack.operators.node_visitor import _tensor_bytes
+
 from executorch.backends.xnnpack.serialization.xnnpack_graph_schema import (
     ConstantDataOffset,
     XNNGraph,
@@ -16,6 +19,7 @@ from executorch.backends.xnnpack.serialization.xnnpack_graph_serialize import (
     serialize_xnnpack_binary,
     XNNHeader,
 )
+from executorch.exir._serialize._cord import Cord
 
 
 class TestSerialization(unittest.TestCase):
@@ -48,3 +52,27 @@ class TestSerialization(unittest.TestCase):
         self.assertEqual(
             serialized_binary[flatbuffer_offset:][XNNHeader.MAGIC_OFFSET], b"XN01"
         )
+
+    def test_serialize_xnnpack_binary_from_cord(self):
+        xnn_graph = XNNGraph(
+            version="0",
+            xnodes=[],
+            xvalues=[],
+            num_externs=0,
+            input_ids=[],
+            output_ids=[],
+            constant_data=[ConstantDataOffset(0, 0)],
+        )
+        weight = torch.arange(8, dtype=torch.float32).reshape(2, 2, 1, 2)
+        weight = weight.to(memory_format=torch.channels_last)
+        constant_data = Cord(_tensor_bytes(weight))
+        constant_data.append(b"\x00" * 32)
+
+        # The tensor is referenced in its memory format, not copied.
+        self.assertEqual(
+            bytes(constant_data)[:32], bytes(weight.permute(0, 2, 3, 1).numpy())
+        )
+        self.assertEqual(
+            serialize_xnnpack_binary(xnn_graph, constant_data),
+            serialize_xnnpack_binary(xnn_graph, bytearray(bytes(constant_data))),
+        )
@@ -0,0 +1,75 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+# All rights reserved.
+#
+# This source code is licensed under the BSD-style license found in the
+# LICENSE file in the root directory of this source tree.
+
+import unittest
+
+import torch
+from executorch.backends.xnnpack.partition.xnnpack_partitioner import XnnpackPartitioner
+from executorch.backends.xnnpack.test.concurrent_lowering_benchmark import (
+    ManyPartitions,
+)
+from executorch.exir import EdgeProgramManager, to_edge
+from executorch.exir.backend.backend_api import concurrent_lowering
+from executorch.exir.lowered_backend_module import get_lowered_backend_modules
+from executorch.extension.pybindings.portable_lib import (  # @manual
+    _load_for_executorch_from_buffer,
+)
+from torch.export import export
+
+
+class TestConcurrentLowering(unittest.TestCase):
+    def test_same_as_sequential_lowering(self) -> None:
+        torch.manual_seed(0)
+        model = ManyPartitions(num_partitions=8, features=16).eval()
+        inputs = (torch.randn(1, 16),)
+
+        def lower(max_workers: int) -> EdgeProgramManager:
+            edge = to_edge(export(model, inputs))
+            if max_workers == 1:
+                return edge.to_backend(XnnpackPartitioner())
+            with concurrent_lowering(max_workers):
+                return edge.to_backend(XnnpackPartitioner())
+
+        sequential = lower(1).exported_program()
+        sequential_modules = get_lowered_backend_modules(sequential.graph_module)
+        self.assertEqual(len(sequential_modules), 8)
+
+        for max_workers in (2, 4):
+            concurrent = lower(max_workers).exported_program()
+            concurrent_modules = get_lowered_backend_modules(concurrent.graph_module)
+            # Preprocess runs on the thread pool, but the lowered modules are
+            # spliced in in the order of the partitions.
+            self.assertEqual(
+                [module.processed_bytes for module in concurrent_modules],
+                [module.processed_bytes for module in sequential_modules],
+            )
+            self.assertEqual(concurrent.graph_signature, sequential.graph_signature)
+            self.assertEqual(concurrent.state_dict.keys(), sequential.state_dict.keys())
+            torch.testing.assert_close(
+                concurrent.module()(*inputs), sequential.module()(*inputs)
+            )
+
+        # Each partition is traced in its own fake mode; the program must still
+        # go through to_executorch() and run.
+        executorch_program = lower(4).to_executorch()
+        executorch_module = _load_for_executorch_from_buffer(executorch_program.buffer)
+        torch.testing.assert_close(
+            executorch_module.run_method("forward", inputs)[0],
+            model(*inputs),
+            atol=1e-3,
+            rtol=1e-3,
+        )
+
+        # The threads don't leave node metadata behind for later exports.
+        self.assertEqual(
+            [
+                module.processed_bytes
+                for module in get_lowered_backend_modules(
+                    lower(1).exported_program().graph_module
+                )
+            ],
+            [module.processed_bytes for module in sequential_modules],
+        )
@@ -30,6 +30,7 @@ from executorch.backends.xnnpack.utils.xnnpack_constants import (
     XNN_VALUE_FLAG_EXTERNAL_OUTPUT,
 )
 
+from executorch.exir._serialize._cord import Cord
 from executorch.exir.backend.backend_details import (
     BackendDetails,
     CompileSpec,
@@ -140,7 +141,7 @@ class XnnpackBackend(BackendDetails):
             constant_data=[ConstantDataOffset(0, 0)],
         )
 
-        constant_data_bytes = bytearray()
+        constant_data_bytes = Cord()
         node_visitors = get_node_visitors(ep, node_to_external_map, constant_data_bytes)
 
         for node in graph_module.graph.nodes:
@@ -40,6 +40,7 @@ class ETPybindEvalWrapper(EagerEvalWrapper):
         model: str,
         tokenizer: Union[SentencePieceTokenizer, Tiktoken],
         max_seq_length: Optional[int] = None,
+        prefill_chunk_size: Optional[int] = None,
     ):
         super().__init__(None, tokenizer, max_seq_length)
         self._model = model  # Expects model to be path to a .pte file
@@ -48,27 +49,48 @@ class ETPybindEvalWrapper(EagerEvalWrapper):
 
         self._et_model = _load_for_executorch(self._model)
         self._use_kv_cache = self._et_model.run_method("use_kv_cache")[0]
+        try:
+            self._enable_dynamic_shape = self._et_model.run_method(
+                "enable_dynamic_shape"
+            )[0]
+        except RuntimeError:
+            # Exported before the metadata was added.
+            self._enable_dynamic_shape = False
+        # Maximum number of tokens to feed to a model with a KV cache at once.
+        # Defaults to the whole window.
+        self._prefill_chunk_size = prefill_chunk_size or self._max_seq_length
 
     def _model_call(self, inps):
         # Given inps (tokens), return the logits from a single forward call
-        # inps: Tensor of shape (1, max_seq_len - 1)
-        # logits: Tensor of shape (1, max_seq_len - 1, vocab_size)
-        if self._use_kv_cache:
-            result_logits = []
-            for pos in range(self._max_seq_length):
-                pos_tensor = torch.tensor([pos], dtype=torch.int64)
-                logits = self._et_model.forward((inps[:, pos : pos + 1], pos_tensor))
-                result_logits.append(logits[0])
-            return torch.cat(result_logits, dim=1)
-        else:
+        # inps: Tensor of shape (1, N), N <= max_seq_len - 1
+        # logits: Tensor of shape (1, N, vocab_size)
+        if not self._use_kv_cache:
             result = self._et_model.forward((inps,))
             return result[0]
 
+        # Models exported with a dynamic sequence length take many tokens per
+        # call and return the logits of all of them; others take one at a time.
+        chunk_size = self._prefill_chunk_size if self._enable_dynamic_shape else 1
+        result_logits = []
+        pos_tensor = torch.zeros(1, dtype=torch.int64)
+        for pos in range(0, inps.shape[1], chunk_size):
+            pos_tensor[0] = pos
+            logits = self._et_model.forward(
+                (inps[:, pos : pos + chunk_size], pos_tensor)
+            )
+            result_logits.append(logits[0])
+        if len(result_logits) == 1:
+            return result_logits[0]
+        return torch.cat(result_logits, dim=1)
+
 
 class ETRunnerEvalWrapper(EagerEvalWrapper):
     """
     A wrapper class for ExecuTorch Runtime integration with the
     lm-evaluation-harness library.
+
+    Not supported yet: the runner binary only prints the text it generates,
+    not the logits the evaluation needs. Use ETPybindEvalWrapper instead.
     """
 
     def __init__(
@@ -78,18 +100,11 @@ class ETRunnerEvalWrapper(EagerEvalWrapper):
         tokenizer_bin: str,
         max_seq_length: Optional[int] = None,
     ):
-        super().__init__(None, tokenizer, max_seq_length)
-        self._model = model
-        self._tokenizer_bin = tokenizer_bin
-
-    def _model_call(self, inps):
-        # Given inps (tokens), return the logits from a single
-        # forward call
-
-        # Example:
-        # inps: Tensor of shape (1, N)
-        # logits: Tensor of shape (1, N, vocab_size)
-        pass
+        raise NotImplementedError(
+            "Evaluating through the ExecuTorch runner is not supported, since "
+            "the runner does not output logits. Remove --tokenizer_bin to "
+            "evaluate the model through the Python bindings."
+        )
 
 
 def gen_eval_wrapper(
@@ -113,7 +128,7 @@ def gen_eval_wrapper(
                 model=model,
                 tokenizer=tokenizer,
                 tokenizer_bin=tokenizer_bin,
-                max_seq_length=args.max_seq_length,
+                max_seq_length=args.max_seq_length - 1,
             )
 
         # ETPybindEvalWrapper: Create a wrapper around an ExecuTorch model, evaluated with pybindings
@@ -123,6 +138,7 @@ def gen_eval_wrapper(
             # Exported model takes at most (max_seq_length - 1) tokens.
             # Note that the eager model takes at most max_seq_length tokens.
             max_seq_length=args.max_seq_length - 1,
+            prefill_chunk_size=args.prefill_chunk_size,
         )
 
     pt2e_quant_params, quantizers, quant_dtype = get_quantizer_and_quant_params(args)
@@ -182,7 +198,15 @@ def build_args_parser() -> argparse.ArgumentParser:
         "--tokenizer_bin",
         type=str,
         default=None,
-        help="[For ExecuTorch] Path to the Tokenizer binary for evaluating ExecuTorch models via runtime",
+        help="[For ExecuTorch] Path to the Tokenizer binary for evaluating ExecuTorch models via runtime. "
+        "Not supported yet: the runner does not output logits",
+    )
+    parser.add_argument(
+        "--prefill_chunk_size",
+        type=int,
+        default=None,
+        help="[For ExecuTorch] Maximum number of tokens to feed to a model with a "
+        "KV cache and dynamic shape at once. Defaults to the whole window",
     )
 
     return parser
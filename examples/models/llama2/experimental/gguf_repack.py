@@ -0,0 +1,262 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+# All rights reserved.
+#
+# This source code is licensed under the BSD-style license found in the
+# LICENSE file in the root directory of this source tree.
+
+# Repack GGML quantized weights into the groupwise layout used by
+# quantized_decomposed.dequantize_per_channel_group, without going through
+# float weights:
+#
+#   weight[i, j] = (int_data[i, j] - zeros[i, g]) * scales[i, g]
+#   where g = j // group_size
+#
+# int_data is an int8 tensor of shape [out_features, in_features]. 4-bit
+# formats store values in [-8, 7], which XNNPACK packs into 4 bits when it
+# lowers a dynamically quantized linear.
+#
+# Supported block formats, with 32 weights per group:
+#   Q4_0: 2 bytes (fp16 d) + 16 bytes (32 x uint4 q), w = d * (q - 8)
+#   Q4_1: 2 bytes (fp16 d) + 2 bytes (fp16 m) + 16 bytes, w = d * q + m
+#   Q8_0: 2 bytes (fp16 d) + 32 bytes (32 x int8 q), w = d * q
+#   Q4_K: super-blocks of 8 groups: 2 bytes (fp16 d) + 2 bytes (fp16 dmin)
+#         + 12 bytes (8 x 6-bit scale and min) + 128 bytes (256 x uint4 q),
+#         w = d * scale * q - dmin * min
+#
+# In Q4_0 and Q4_1 blocks, the low nibbles of the 16 bytes hold the first 16
+# weights and the high nibbles the last 16. Q4_0 and Q8_0 are symmetric, so
+# their zeros are 0.
+
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Sequence, Tuple
+
+import numpy as np
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+from torch.ao.quantization.fx._decomposed import quantized_decomposed_lib  # noqa
+
+GROUP_SIZE = 32
+
+
+@dataclass
+class GroupwiseQuantizedWeight:
+    """A weight in the layout of quantized_decomposed.dequantize_per_channel_group."""
+
+    # int8 tensor of shape [out_features, in_features].
+    int_data: torch.Tensor
+    # float32 tensors of shape [out_features, in_features // group_size].
+    scales: torch.Tensor
+    zeros: torch.Tensor
+    group_size: int
+    quant_min: int
+    quant_max: int
+
+    @property
+    def is_symmetric(self) -> bool:
+        return not bool(self.zeros.any())
+
+    def dequantize(self, output_dtype: torch.dtype = torch.float32) -> torch.Tensor:
+        return torch.ops.quantized_decomposed.dequantize_per_channel_group(
+            self.int_data,
+            self.scales,
+            self.zeros,
+            self.quant_min,
+            self.quant_max,
+            torch.int8,
+            self.group_size,
+            output_dtype,
+        )
+
+
+def _blocks(data: np.ndarray, block_bytes: int) -> np.ndarray:
+    return np.ascontiguousarray(data).view(np.uint8).reshape(-1, block_bytes)
+
+
+def _fp16(blocks: np.ndarray, offset: int) -> np.ndarray:
+    """Reads the fp16 value at `offset` of each block, as float32."""
+    return (
+        np.ascontiguousarray(blocks[:, offset : offset + 2])
+        .view(np.float16)
+        .reshape(-1)
+        .astype(np.float32)
+    )
+
+
+def _unpack_nibbles(qs: np.ndarray) -> np.ndarray:
+    """Unpacks [..., n] bytes into [..., 2n] values, low nibbles first."""
+    return np.concatenate([qs & 0xF, qs >> 4], axis=-1)
+
+
+def _affine_to_groupwise(
+    q: np.ndarray, scale: np.ndarray, offset: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Converts groups of uint4 values `q` with `w = scale * q + offset` into
+    int8 values in [-8, 7] with `w = (int_data - zeros) * scales`.
+    """
+    int_data = q.astype(np.int8) - 8
+    # With a zero scale, every weight of the group is `offset`.
+    zero_scale = scale == 0
+    scales = np.where(zero_scale, np.float32(1), scale)
+    zeros = np.where(zero_scale, -offset, -8 - offset / scales)
+    int_data[zero_scale] = 0
+    return int_data, scales, zeros
+
+
+def _repack_q4_0(data: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    blocks = _blocks(data, 18)
+    int_data = _unpack_nibbles(blocks[:, 2:]).astype(np.int8) - 8
+    scales = _fp16(blocks, 0)
+    return int_data, scales, np.zeros_like(scales)
+
+
+def _repack_q4_1(data: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    blocks = _blocks(data, 20)
+    q = _unpack_nibbles(blocks[:, 4:])
+    return _affine_to_groupwise(q, _fp16(blocks, 0), _fp16(blocks, 2))
+
+
+def _repack_q8_0(data: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    blocks = _blocks(data, 34)
+    int_data = np.ascontiguousarray(blocks[:, 2:]).view(np.int8)
+    scales = _fp16(blocks, 0)
+    return int_data, scales, np.zeros_like(scales)
+
+
+def _repack_q4_k(data: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    blocks = _blocks(data, 144)
+    d = _fp16(blocks, 0)
+    dmin = _fp16(blocks, 2)
+
+    # The 6-bit scales and mins of the 8 groups. The first 4 of each are in
+    # the low 6 bits of bytes 0-3 and 4-7; the last 4 are split between the
+    # nibbles of bytes 8-11 and the top 2 bits of bytes 0-7.
+    packed = blocks[:, 4:16]
+    sc = np.concatenate(
+        [packed[:, 0:4] & 63, (packed[:, 8:12] & 0xF) | ((packed[:, 0:4] >> 6) << 4)],
+        axis=1,
+    )
+    mins = np.concatenate(
+        [packed[:, 4:8] & 63, (packed[:, 8:12] >> 4) | ((packed[:, 4:8] >> 6) << 4)],
+        axis=1,
+    )
+
+    # Each run of 32 bytes holds two groups: the first in the low nibbles and
+    # the second in the high nibbles.
+    q = _unpack_nibbles(blocks[:, 16:].reshape(-1, 4, 32)).reshape(-1, GROUP_SIZE)
+    scale = (d[:, None] * sc).reshape(-1)
+    offset = (-dmin[:, None] * mins).reshape(-1)
+    return _affine_to_groupwise(q, scale, offset)
+
+
+# GGML type name -> (repack function, quant_min, quant_max)
+_REPACKERS: Dict[
+    str, Tuple[Callable[[np.ndarray], Tuple[np.ndarray, ...]], int, int]
+] = {
+    "Q4_0": (_repack_q4_0, -8, 7),
+    "Q4_1": (_repack_q4_1, -8, 7),
+    "Q8_0": (_repack_q8_0, -128, 127),
+    "Q4_K": (_repack_q4_k, -8, 7),
+}
+
+
+def can_repack(tensor_type: Any) -> bool:
+    """Whether tensors of this GGMLQuantizationType can be repacked."""
+    return getattr(tensor_type, "name", tensor_type) in _REPACKERS
+
+
+def repack(
+    data: np.ndarray, tensor_type: Any, shape: Sequence[int]
+) -> GroupwiseQuantizedWeight:
+    """
+    Repacks GGML blocks into a GroupwiseQuantizedWeight.
+
+    Args:
+        data: The raw blocks, e.g. ReaderTensor.data.
+        tensor_type: The GGMLQuantizationType of the blocks, or its name.
+        shape: The PyTorch shape of the weight, [out_features, in_features].
+            This is the reverse of the GGUF shape.
+    """
+    type_name = getattr(tensor_type, "name", tensor_type)
+    if type_name not in _REPACKERS:
+        raise NotImplementedError(
+            f"Repacking {type_name} is not supported, only {sorted(_REPACKERS)}"
+        )
+    repack_fn, quant_min, quant_max = _REPACKERS[type_name]
+    out_features, in_features = shape
+    if in_features % GROUP_SIZE != 0:
+        raise ValueError(f"Expected in_features divisible by {GROUP_SIZE}: {shape}")
+
+    int_data, scales, zeros = repack_fn(data)
+    num_groups = in_features // GROUP_SIZE
+    return GroupwiseQuantizedWeight(
+        int_data=torch.from_numpy(int_data).reshape(out_features, in_features),
+        scales=torch.from_numpy(scales.astype(np.float32)).reshape(-1, num_groups),
+        zeros=torch.from_numpy(zeros.astype(np.float32)).reshape(-1, num_groups),
+        group_size=GROUP_SIZE,
+        quant_min=quant_min,
+        quant_max=quant_max,
+    )
+
+
+def repack_gguf_tensor(tensor: Any) -> GroupwiseQuantizedWeight:
+    """Repacks a 2D gguf.ReaderTensor."""
+    # The reader's shape is a numpy uint64 array.
+    shape = [int(dim) for dim in tensor.shape[::-1]]
+    return repack(tensor.data, tensor.tensor_type, shape)
+
+
+class GroupwiseQuantizedLinear(nn.Module):
+    """
+    A linear layer without bias whose weight is a GroupwiseQuantizedWeight.
+
+    With `dynamically_quantize_input`, the input is quantized per token to
+    int8 first. For symmetric 4-bit weights (Q4_0), this exports to the
+    pattern that XNNPACK lowers to its 4-bit groupwise dynamically quantized
+    linear.
+    """
+
+    def __init__(
+        self,
+        weight: GroupwiseQuantizedWeight,
+        dynamically_quantize_input: bool = False,
+    ) -> None:
+        super().__init__()
+        self.out_features, self.in_features = weight.int_data.shape
+        self.group_size = weight.group_size
+        self.quant_min = weight.quant_min
+        self.quant_max = weight.quant_max
+        self.dynamically_quantize_input = dynamically_quantize_input
+        self.register_buffer("weight", weight.int_data)
+        self.register_buffer("scales", weight.scales)
+        self.register_buffer("zeros", weight.zeros)
+
+    def forward(self, input: torch.Tensor) -> torch.Tensor:
+        if self.dynamically_quantize_input:
+            input = _quantize_dequantize_per_token(input)
+        weight = torch.ops.quantized_decomposed.dequantize_per_channel_group(
+            self.weight,
+            self.scales,
+            self.zeros,
+            self.quant_min,
+            self.quant_max,
+            torch.int8,
+            self.group_size,
+            input.dtype,
+        )
+        return F.linear(input, weight)
+
+
+def _quantize_dequantize_per_token(input: torch.Tensor) -> torch.Tensor:
+    scales, zero_points = (
+        torch.ops.quantized_decomposed.choose_qparams_per_token_asymmetric(
+            input, torch.int8
+        )
+    )
+    quantized = torch.ops.quantized_decomposed.quantize_per_token(
+        input, scales, zero_points, -128, 127, torch.int8
+    )
+    return torch.ops.quantized_decomposed.dequantize_per_token(
+        quantized, scales, zero_points, -128, 127, torch.int8, input.dtype
+    )
@@ -8,12 +8,21 @@
 # For float weights, we load them directly from the GGUF file.
 # For Q4_0 weights, we load them into a Tensor subclass (GGMLInt4LinearWeight).
 # This is done by replacing the linear weight with the subclass.
+#
+# load_gguf_quantized() instead repacks the Q4_0, Q4_1, Q8_0 and Q4_K linear
+# weights into GroupwiseQuantizedLinear modules, which export to
+# quantized_decomposed ops.
 
 import logging
 import os
-from typing import Callable, Dict, Mapping
+from typing import Callable, Collection, Dict, Mapping, Optional
 
 import torch
+from executorch.examples.models.llama2.experimental.gguf_repack import (
+    can_repack,
+    GroupwiseQuantizedLinear,
+    repack_gguf_tensor,
+)
 from executorch.examples.models.llama2.experimental.subclass import (
     _unpack_two_uint8,
     GGMLInt4LinearWeight,
@@ -69,7 +78,7 @@ def _get_subclass_inserter(
             fqn in weight_map
         ), f"Expect {fqn} to be in weight map but not found. All keys are {weight_map.keys()}"
         tensor = weight_map[fqn]
-        print(fqn, tensor.shape, tensor.data.shape, lin.weight.shape)
+        logging.debug(f"{fqn} {tensor.shape} {tensor.data.shape} {lin.weight.shape}")
         packed = torch.from_numpy(tensor.data).reshape(-1, 18)
         scale = torch.tensor(_unpack_two_uint8(packed[:, :2]), dtype=torch.float16)
         lin.weight = torch.nn.Parameter(
@@ -119,7 +128,9 @@ def change_linear_weights_to_q4_0_tensors(
 
 
 def get_float_weights(
-    pt_model: torch.nn.Module, gguf_weights: GGUFWeights
+    pt_model: torch.nn.Module,
+    gguf_weights: GGUFWeights,
+    dequantize_types: Collection[str] = (),
 ) -> Mapping[str, torch.Tensor]:
     """
     Returns a mapping from the fqn to the float weight tensor. Even though
@@ -127,6 +138,8 @@ def get_float_weights(
     Args:
         pt_model (torch.nn.Module): The model to load the weights.
         gguf_weights (GGUFWeights): The weights to extract the weights from.
+        dequantize_types (Collection[str]): Names of the repackable GGML types
+            whose weights are all dequantized, not only the embeddings.
     """
     state_dict = {}
     for tensor in gguf_weights.tensors:
@@ -135,18 +148,25 @@ def get_float_weights(
             tensor.tensor_type == GGMLQuantizationType.F32
             or tensor.tensor_type == GGMLQuantizationType.F16
         ):
-            print(tensor.name)
+            logging.debug(tensor.name)
             reversed_shape = tensor.shape[::-1]
             new_tensor = tensor.data.reshape(reversed_shape)
             state_dict[model_key] = torch.from_numpy(new_tensor)
         # Load token_embd.weight which is quantized in Q4_0 and we dequantize it into float.
         elif tensor.tensor_type == GGMLQuantizationType.Q4_0:
             if tensor.name == "token_embd.weight":
-                print(tensor.name)
+                logging.debug(tensor.name)
                 unpacked = to_float(torch.from_numpy(tensor.data.reshape(-1, 18)))
                 state_dict[model_key] = unpacked.reshape(
                     pt_model.params.vocab_size, pt_model.params.dim
                 )
+        # Embeddings can't use the linear weight layout, so dequantize them.
+        elif can_repack(tensor.tensor_type) and (
+            tensor.name == "token_embd.weight"
+            or tensor.tensor_type.name in dequantize_types
+        ):
+            logging.debug(tensor.name)
+            state_dict[model_key] = repack_gguf_tensor(tensor).dequantize()
 
     # We need to fake initialize the mask, to match with the llama_transformer.py
     for id in range(pt_model.params.n_layers):
@@ -173,7 +193,8 @@ def load_gguf_q4_0(gguf_file: str) -> torch.nn.Module:
 
     logging.info("Load float weights")
     state_dict = get_float_weights(pt_model, gguf_weights)
-    pt_model.load_state_dict(state_dict, strict=False)
+    # The parameters of the model are on the meta device.
+    pt_model.load_state_dict(state_dict, strict=False, assign=True)
 
     logging.info("Change linear weights to Q4_0 tensors")
     change_linear_weights_to_q4_0_tensors(pt_model, gguf_weights)
@@ -181,3 +202,111 @@ def load_gguf_q4_0(gguf_file: str) -> torch.nn.Module:
     pt_model = pt_model.to(dtype=torch.float16)
 
     return pt_model
+
+
+def change_linear_weights_to_groupwise_quantized(
+    model: torch.nn.Module,
+    gguf_weights: GGUFWeights,
+    dynamically_quantize_input: bool = False,
+    tensor_types: Optional[Collection[str]] = None,
+) -> None:
+    """
+    Replaces the linear modules whose GGUF weights are in a supported GGML
+    block format with GroupwiseQuantizedLinear modules holding the repacked
+    weights. If `tensor_types` is given, only the linears whose GGML type
+    name is in it are replaced.
+    """
+    weight_map = {
+        _convert_gguf_tensor_name_to_llama_nn(tensor.name): tensor
+        for tensor in gguf_weights.tensors
+    }
+
+    def _is_quantized_linear(mod, fqn):
+        tensor = weight_map.get(fqn + ".weight")
+        return (
+            isinstance(mod, torch.nn.Linear)
+            and tensor is not None
+            and can_repack(tensor.tensor_type)
+            and (tensor_types is None or tensor.tensor_type.name in tensor_types)
+        )
+
+    def _repack_linear(lin, fqn):
+        tensor = weight_map[fqn + ".weight"]
+        logging.debug(f"{fqn}: {tensor.tensor_type.name} {lin.weight.shape}")
+        return GroupwiseQuantizedLinear(
+            repack_gguf_tensor(tensor), dynamically_quantize_input
+        )
+
+    _replace_with_custom_fn_if_matches_filter(
+        model, _repack_linear, _is_quantized_linear
+    )
+
+
+# The GGML types whose linears can stay quantized in an exported program.
+# ExecuTorch has no kernel for quantized_decomposed.dequantize_per_channel_group,
+# so a GroupwiseQuantizedLinear only runs once XNNPACK lowers it, and XNNPACK
+# only has a symmetric 4-bit groupwise linear.
+EXPORTABLE_TYPES = ("Q4_0",)
+
+
+def load_gguf_quantized(
+    gguf_file: str,
+    dynamically_quantize_input: bool = False,
+    for_export: bool = False,
+) -> torch.nn.Module:
+    """
+    Loads a llama model from a GGUF file, keeping its Q4_0, Q4_1, Q8_0 and Q4_K
+    linear weights quantized. With `dynamically_quantize_input`, the
+    activations of these linears are quantized to int8 per token, which lets
+    XNNPACK lower the Q4_0 ones to its 4-bit groupwise linear.
+
+    With `for_export`, only the linears in EXPORTABLE_TYPES stay quantized and
+    the others are dequantized to float, so that the exported program can run.
+    This requires `dynamically_quantize_input`.
+    """
+    assert os.path.isfile(gguf_file), f"Expect a valid gguf_file path, got {gguf_file}"
+    if for_export and not dynamically_quantize_input:
+        raise ValueError(
+            "Exporting groupwise quantized linears requires "
+            "dynamically_quantize_input=True, so that XNNPACK lowers them: "
+            "ExecuTorch has no kernel for "
+            "quantized_decomposed.dequantize_per_channel_group"
+        )
+
+    logging.info(f"Loading GGUF file: {gguf_file}")
+    gguf_model_args, gguf_weights = load_file(gguf_file)
+
+    logging.info("Creating the PyTorch model")
+    pt_model = _create_pt_model(
+        gguf_model_args,
+    )
+
+    logging.info("Change linear weights to groupwise quantized weights")
+    tensor_types = EXPORTABLE_TYPES if for_export else None
+    change_linear_weights_to_groupwise_quantized(
+        pt_model, gguf_weights, dynamically_quantize_input, tensor_types
+    )
+
+    logging.info("Load float weights")
+    dequantize_types = {
+        tensor.tensor_type.name
+        for tensor in gguf_weights.tensors
+        if for_export
+        and can_repack(tensor.tensor_type)
+        and tensor.tensor_type.name not in EXPORTABLE_TYPES
+    }
+    if dequantize_types:
+        logging.warning(
+            f"Dequantizing the {', '.join(sorted(dequantize_types))} weights to "
+            "float, since ExecuTorch can only run quantized "
+            f"{', '.join(EXPORTABLE_TYPES)} linears"
+        )
+    state_dict = get_float_weights(pt_model, gguf_weights, dequantize_types)
+    pt_model.load_state_dict(state_dict, strict=False, assign=True)
+    missing = [name for name, param in pt_model.named_parameters() if param.is_meta]
+    if missing:
+        raise NotImplementedError(
+            f"Unsupported GGML types for weights: {', '.join(missing)}"
+        )
+
+    return pt_model
@@ -21,3 +21,51 @@ def define_common_targets():
             ":subclass",
         ],
     )
+
+    runtime.python_library(
+        name = "gguf_repack",
+        srcs = [
+            "gguf_repack.py",
+        ],
+        deps = [
+            "//caffe2:torch",
+        ],
+    )
+
+    runtime.python_test(
+        name = "test_gguf_repack",
+        srcs = [
+            "test_gguf_repack.py",
+        ],
+        deps = [
+            ":gguf_repack",
+        ],
+    )
+
+    runtime.python_library(
+        name = "load_gguf_q4_0",
+        srcs = [
+            "load_gguf_q4_0.py",
+        ],
+        deps = [
+            ":gguf_repack",
+            ":subclass",
+            "//caffe2:torch",
+            "//executorch/extension/gguf_util:gguf_util",
+            "//pytorch/ao:torchao",
+            "fbsource//third-party/pypi/gguf:gguf",
+        ],
+    )
+
+    runtime.python_test(
+        name = "test_load_gguf_q4_0",
+        srcs = [
+            "test_load_gguf_q4_0.py",
+        ],
+        deps = [
+            ":gguf_repack",
+            ":load_gguf_q4_0",
+            "fbsource//third-party/pypi/gguf:gguf",
+            "fbsource//third-party/pypi/numpy:numpy",
+        ],
+    )
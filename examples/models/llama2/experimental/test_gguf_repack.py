@@ -0,0 +1,133 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+# All rights reserved.
+#
+# This source code is licensed under the BSD-style license found in the
+# LICENSE file in the root directory of this source tree.
+
+import unittest
+
+import numpy as np
+import torch
+
+from .gguf_repack import GroupwiseQuantizedLinear, repack
+
+OUT_FEATURES = 4
+IN_FEATURES = 512
+
+
+def _random_blocks(rng, num_blocks, block_bytes, fp16_offsets):
+    blocks = rng.integers(0, 256, size=(num_blocks, block_bytes), dtype=np.uint8)
+    for offset in fp16_offsets:
+        values = rng.uniform(-0.1, 0.1, num_blocks).astype(np.float16)
+        blocks[:, offset : offset + 2] = values.view(np.uint8).reshape(-1, 2)
+    return blocks
+
+
+def _fp16(block, offset):
+    return float(block[offset : offset + 2].view(np.float16)[0])
+
+
+def _nibbles(qs):
+    return [b & 0xF for b in qs] + [b >> 4 for b in qs]
+
+
+def _dequantize_q4_0(block):
+    d = _fp16(block, 0)
+    return [d * (q - 8) for q in _nibbles(block[2:])]
+
+
+def _dequantize_q4_1(block):
+    d, m = _fp16(block, 0), _fp16(block, 2)
+    return [d * q + m for q in _nibbles(block[4:])]
+
+
+def _dequantize_q8_0(block):
+    d = _fp16(block, 0)
+    return [d * q for q in block[2:].view(np.int8)]
+
+
+def _dequantize_q4_k(block):
+    # Follows dequantize_row_q4_K() in ggml-quants.c.
+    d, dmin = _fp16(block, 0), _fp16(block, 2)
+    scales, qs = block[4:16], block[16:]
+
+    def scale_min(j):
+        if j < 4:
+            return scales[j] & 63, scales[j + 4] & 63
+        return (
+            (scales[j + 4] & 0xF) | ((scales[j - 4] >> 6) << 4),
+            (scales[j + 4] >> 4) | ((scales[j] >> 6) << 4),
+        )
+
+    result = []
+    for chunk in range(4):
+        q = qs[chunk * 32 : (chunk + 1) * 32]
+        sc, m = scale_min(2 * chunk)
+        result += [d * sc * (b & 0xF) - dmin * m for b in q]
+        sc, m = scale_min(2 * chunk + 1)
+        result += [d * sc * (b >> 4) - dmin * m for b in q]
+    return result
+
+
+class TestGGUFRepack(unittest.TestCase):
+    def check_repack(self, type_name, block_bytes, block_size, fp16_offsets, ref):
+        rng = np.random.default_rng(0)
+        num_blocks = OUT_FEATURES * IN_FEATURES // block_size
+        blocks = _random_blocks(rng, num_blocks, block_bytes, fp16_offsets)
+        if type_name == "Q4_1":
+            # A block with a zero scale holds a single value.
+            blocks[1, 0:2] = 0
+        expected = torch.tensor(
+            [value for block in blocks for value in ref(block)]
+        ).reshape(OUT_FEATURES, IN_FEATURES)
+
+        weight = repack(blocks.reshape(-1), type_name, [OUT_FEATURES, IN_FEATURES])
+
+        self.assertEqual(weight.int_data.dtype, torch.int8)
+        self.assertEqual(weight.int_data.shape, (OUT_FEATURES, IN_FEATURES))
+        self.assertEqual(weight.scales.shape, (OUT_FEATURES, IN_FEATURES // 32))
+        self.assertGreaterEqual(weight.int_data.min().item(), weight.quant_min)
+        self.assertLessEqual(weight.int_data.max().item(), weight.quant_max)
+        torch.testing.assert_close(
+            weight.dequantize(), expected, atol=1e-5, rtol=1e-5, check_dtype=False
+        )
+        return weight
+
+    def test_q4_0(self) -> None:
+        weight = self.check_repack("Q4_0", 18, 32, [0], _dequantize_q4_0)
+        self.assertTrue(weight.is_symmetric)
+        self.assertEqual((weight.quant_min, weight.quant_max), (-8, 7))
+
+    def test_q4_1(self) -> None:
+        weight = self.check_repack("Q4_1", 20, 32, [0, 2], _dequantize_q4_1)
+        self.assertFalse(weight.is_symmetric)
+
+    def test_q8_0(self) -> None:
+        weight = self.check_repack("Q8_0", 34, 32, [0], _dequantize_q8_0)
+        self.assertTrue(weight.is_symmetric)
+        self.assertEqual((weight.quant_min, weight.quant_max), (-128, 127))
+
+    def test_q4_k(self) -> None:
+        self.check_repack("Q4_K", 144, 256, [0, 2], _dequantize_q4_k)
+
+    def test_unsupported_type(self) -> None:
+        with self.assertRaises(NotImplementedError):
+            repack(np.zeros(210, dtype=np.uint8), "Q6_K", [1, 256])
+
+    def test_linear(self) -> None:
+        rng = np.random.default_rng(0)
+        blocks = _random_blocks(rng, OUT_FEATURES * IN_FEATURES // 32, 18, [0])
+        weight = repack(blocks, "Q4_0", [OUT_FEATURES, IN_FEATURES])
+        input = torch.randn(2, IN_FEATURES)
+
+        linear = GroupwiseQuantizedLinear(weight)
+        torch.testing.assert_close(
+            linear(input), torch.nn.functional.linear(input, weight.dequantize())
+        )
+
+        dynamic_linear = GroupwiseQuantizedLinear(
+            weight, dynamically_quantize_input=True
+        )
+        torch.testing.assert_close(
+            dynamic_linear(input), linear(input), atol=0.1, rtol=0.05
+        )
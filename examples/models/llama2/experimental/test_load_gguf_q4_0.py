@@ -0,0 +1,105 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+# All rights reserved.
+#
+# This source code is licensed under the BSD-style license found in the
+# LICENSE file in the root directory of this source tree.
+
+import os
+import tempfile
+import unittest
+
+import gguf
+import numpy as np
+import torch
+from gguf.constants import GGMLQuantizationType
+
+from .gguf_repack import GroupwiseQuantizedLinear
+from .load_gguf_q4_0 import load_gguf_quantized
+
+DIM = 32
+HIDDEN_DIM = 64
+VOCAB_SIZE = 8
+
+
+def _write_tiny_llama(path: str) -> None:
+    """
+    Writes a one-layer llama GGUF file whose attention weights are in Q4_0 and
+    whose feed forward weights are in Q8_0.
+    """
+    rng = np.random.default_rng(0)
+    tensors = {
+        "token_embd.weight": ((VOCAB_SIZE, DIM), GGMLQuantizationType.F32),
+        "blk.0.attn_norm.weight": ((DIM,), GGMLQuantizationType.F32),
+        "blk.0.attn_q.weight": ((DIM, DIM), GGMLQuantizationType.Q4_0),
+        "blk.0.attn_k.weight": ((DIM, DIM), GGMLQuantizationType.Q4_0),
+        "blk.0.attn_v.weight": ((DIM, DIM), GGMLQuantizationType.Q4_0),
+        "blk.0.attn_output.weight": ((DIM, DIM), GGMLQuantizationType.Q4_0),
+        "blk.0.ffn_norm.weight": ((DIM,), GGMLQuantizationType.F32),
+        "blk.0.ffn_gate.weight": ((HIDDEN_DIM, DIM), GGMLQuantizationType.Q8_0),
+        "blk.0.ffn_up.weight": ((HIDDEN_DIM, DIM), GGMLQuantizationType.Q8_0),
+        "blk.0.ffn_down.weight": ((DIM, HIDDEN_DIM), GGMLQuantizationType.Q8_0),
+        "output_norm.weight": ((DIM,), GGMLQuantizationType.F32),
+        "output.weight": ((VOCAB_SIZE, DIM), GGMLQuantizationType.F32),
+    }
+
+    writer = gguf.GGUFWriter(path, "llama")
+    writer.add_embedding_length(DIM)
+    writer.add_block_count(1)
+    writer.add_feed_forward_length(HIDDEN_DIM)
+    writer.add_head_count(2)
+    writer.add_head_count_kv(2)
+    writer.add_layer_norm_rms_eps(1e-5)
+    writer.add_token_list([f"token{i}" for i in range(VOCAB_SIZE)])
+    for name, (shape, tensor_type) in tensors.items():
+        data = rng.standard_normal(shape).astype(np.float32)
+        if tensor_type == GGMLQuantizationType.F32:
+            writer.add_tensor(name, data)
+        else:
+            writer.add_tensor(
+                name, gguf.quantize(data, tensor_type), raw_dtype=tensor_type
+            )
+    writer.write_header_to_file()
+    writer.write_kv_data_to_file()
+    writer.write_tensors_to_file()
+    writer.close()
+
+
+class TestLoadGGUFQuantized(unittest.TestCase):
+    def setUp(self) -> None:
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.path = os.path.join(tmp_dir.name, "tiny_llama.gguf")
+        _write_tiny_llama(self.path)
+
+    def test_load(self) -> None:
+        model = load_gguf_quantized(self.path)
+        attention = model.layers[0].attention
+        feed_forward = model.layers[0].feed_forward
+        self.assertIsInstance(attention.wq, GroupwiseQuantizedLinear)
+        self.assertIsInstance(feed_forward.w1, GroupwiseQuantizedLinear)
+        self.assertEqual(feed_forward.w1.quant_min, -128)
+
+    def test_load_for_export(self) -> None:
+        model = load_gguf_quantized(
+            self.path, dynamically_quantize_input=True, for_export=True
+        )
+        attention = model.layers[0].attention
+        feed_forward = model.layers[0].feed_forward
+        self.assertIsInstance(attention.wq, GroupwiseQuantizedLinear)
+        # The Q8_0 linears can't run once exported, so they are dequantized.
+        self.assertNotIsInstance(feed_forward.w1, GroupwiseQuantizedLinear)
+        self.assertEqual(feed_forward.w1.weight.dtype, torch.float32)
+        self.assertEqual(feed_forward.w1.weight.shape, (HIDDEN_DIM, DIM))
+
+        quantized = load_gguf_quantized(self.path)
+        input = torch.randn(2, DIM)
+        torch.testing.assert_close(
+            feed_forward.w1(input), quantized.layers[0].feed_forward.w1(input)
+        )
+
+        logits = model(torch.tensor([[1, 2, 3]]))
+        self.assertTrue(torch.isfinite(logits).all())
+
+    def test_export_requires_dynamic_quantization(self) -> None:
+        with self.assertRaisesRegex(ValueError, "dynamically_quantize_input"):
+            load_gguf_quantized(self.path, for_export=True)
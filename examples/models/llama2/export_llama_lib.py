@@ -242,6 +242,21 @@ def build_args_parser() -> argparse.ArgumentParser:
         default=None,
         help="group_size for weight quantization",
     )
+    parser.add_argument(
+        "--quantization_cache_dir",
+        default=None,
+        help="Directory to cache int8 weight-only and embedding quantized weights "
+        "in, keyed by the checkpoint file and quantization config, so that repeated "
+        "exports skip quantizing them.",
+    )
+    parser.add_argument(
+        "--export_cache_dir",
+        default=None,
+        help="Directory to cache the exported and edge programs in, keyed by the "
+        "transformed model, quantizers and edge config, so that exports which only "
+        "change later stages, e.g. the partitioner, skip capturing, calibrating and "
+        "exporting the model.",
+    )
 
     parser.add_argument(
         "-d",
@@ -403,6 +418,7 @@ def _prepare_for_llama_export(modelname: str, args) -> LLMEdgeManager:
             verbose=args.verbose,
             max_seq_len=args.max_seq_length,
             metadata_str=args.metadata,
+            export_cache_dir=args.export_cache_dir,
         )
         .set_output_dir(output_dir_path)
         .to_dtype(dtype_override)
@@ -594,6 +610,7 @@ def _load_llama_model(
     verbose: bool = False,
     max_seq_len: int = 128,
     metadata_str: Optional[str] = None,
+    export_cache_dir: Optional[str] = None,
 ) -> "LLMEdgeManager":
     """
     A helper util that builds a Llama2 model. It returns a LLMEdgeManager that
@@ -655,4 +672,5 @@ def _load_llama_model(
             model.params,
             metadata_str,
         ),
+        cache_dir=export_cache_dir,
     )
@@ -8,7 +8,9 @@
 import argparse
 
 import json
-from typing import List, Optional, Tuple, TypedDict
+import time
+from dataclasses import dataclass
+from typing import Any, List, Optional, Tuple, TypedDict
 
 import torch
 import torch.nn.functional as F
@@ -59,13 +61,117 @@ def sample_top_p(probs, p):
     return next_token
 
 
+@dataclass
+class GenerationStats:
+    """Timing of the last call to LlamaRunner.generate()."""
+
+    prefill_tokens: int = 0
+    prefill_time_s: float = 0.0
+    decode_tokens: int = 0
+    decode_time_s: float = 0.0
+
+    @property
+    def prefill_tokens_per_second(self) -> float:
+        return self.prefill_tokens / self.prefill_time_s if self.prefill_time_s else 0.0
+
+    @property
+    def decode_tokens_per_second(self) -> float:
+        return self.decode_tokens / self.decode_time_s if self.decode_time_s else 0.0
+
+
 class LlamaRunner:
-    def __init__(self, model_path: str, tokenizer_path: str, model_args: ModelArgs):
+    def __init__(
+        self,
+        model_path: str,
+        tokenizer_path: str,
+        model_args: ModelArgs,
+        prefill_chunk_size: Optional[int] = None,
+    ):
+        """
+        Args:
+            model_path: Path to the .pte file.
+            tokenizer_path: Path to the tokenizer model.
+            model_args: Arguments the model was exported with.
+            prefill_chunk_size: The maximum number of prompt tokens to feed to
+                the model in one call, when the model was exported with a
+                dynamic sequence length and a KV cache. Defaults to, and is
+                at most, max_seq_len - 1, the longest sequence the exported
+                program accepts. Models without a dynamic sequence length are
+                fed one token at a time.
+        """
         # model is a pte file.
         self.model = _load_for_executorch(model_path)
         self.params = model_args
         self.tokenizer = Tokenizer(tokenizer_path)
         assert model_args.vocab_size == self.tokenizer.n_words
+        self.enable_dynamic_shape: bool = self._get_metadata(
+            "enable_dynamic_shape", model_args.enable_dynamic_shape
+        )
+        # The dynamic sequence length is exported with max=max_seq_len - 1.
+        max_chunk_size = model_args.max_seq_len - 1
+        self.prefill_chunk_size: int = min(
+            prefill_chunk_size or max_chunk_size, max_chunk_size
+        )
+        assert self.prefill_chunk_size > 0, self.prefill_chunk_size
+        self.stats = GenerationStats()
+
+    def _get_metadata(self, method_name: str, default: Any) -> Any:
+        """Returns the value of a metadata method of the model, like the C++
+        runner does, or `default` if the model doesn't have the method.
+        """
+        try:
+            return self.model.run_method(method_name, ())[0]
+        except RuntimeError:
+            return default
+
+    def _prefill(
+        self,
+        tokens: torch.Tensor,
+        num_tokens: int,
+        token_logprobs: Optional[torch.Tensor],
+    ) -> torch.Tensor:
+        """
+        Feeds the first `num_tokens` tokens to the model, and returns the
+        logits of the last one. If `token_logprobs` is provided, fills in the
+        log probabilities of tokens 1 to `num_tokens - 1`.
+        """
+        if not self.params.use_kv_cache:
+            logits = self.model.forward((tokens[:, :num_tokens],))[0]
+            if token_logprobs is not None:
+                self._fill_logprobs(token_logprobs, tokens, logits, 0, num_tokens)
+            return logits
+
+        chunk_size = self.prefill_chunk_size if self.enable_dynamic_shape else 1
+        pos = torch.zeros(1, dtype=torch.int64)
+        for start in range(0, num_tokens, chunk_size):
+            end = min(start + chunk_size, num_tokens)
+            pos[0] = start
+            logits = self.model.forward((tokens[:, start:end], pos))[0]
+            if token_logprobs is not None:
+                self._fill_logprobs(token_logprobs, tokens, logits, start, num_tokens)
+        return logits
+
+    def _fill_logprobs(
+        self,
+        token_logprobs: torch.Tensor,
+        tokens: torch.Tensor,
+        logits: torch.Tensor,
+        start: int,
+        num_tokens: int,
+    ) -> None:
+        """
+        Given the logits of the tokens from position `start`, fills in the log
+        probabilities of the tokens they predict, up to `num_tokens - 1`.
+        """
+        end = min(start + logits.shape[1], num_tokens - 1)
+        if end <= start:
+            return
+        token_logprobs[:, start + 1 : end + 1] = -F.cross_entropy(
+            input=logits[:, : end - start].transpose(1, 2),
+            target=tokens[:, start + 1 : end + 1],
+            reduction="none",
+            ignore_index=self.tokenizer.pad_id,
+        )
 
     def generate(  # noqa: C901
         self,
@@ -89,40 +195,28 @@ class LlamaRunner:
         tokens = torch.full((bsz, total_len), pad_id, dtype=torch.long, device="cpu")
         for k, t in enumerate(prompt_tokens):
             tokens[k, : len(t)] = torch.tensor(t, dtype=torch.long, device="cpu")
-        if logprobs:
-            token_logprobs = torch.zeros_like(tokens, dtype=torch.float)
-
-        prev_pos = 0
-        if self.params.use_kv_cache:
-            min_prompt_len = 1
+        token_logprobs = (
+            torch.zeros_like(tokens, dtype=torch.float) if logprobs else None
+        )
 
         eos_reached = torch.tensor([False] * bsz, device="cpu")
         input_text_mask = tokens != pad_id
-        pos = torch.tensor([prev_pos], dtype=torch.int64)
-        if min_prompt_len == total_len:
-            if self.params.use_kv_cache:
-                inputs = (tokens, pos)
-            else:
-                inputs = (tokens,)
-            logits = self.model.forward(inputs)  # updated forward call.
-            logits = logits[0]
-            token_logprobs = -F.cross_entropy(
-                input=logits.transpose(1, 2),
-                target=tokens,
-                reduction="none",
-                ignore_index=pad_id,
-            )
-
         stop_tokens = torch.tensor(list(self.tokenizer.stop_tokens))
 
+        # Feed the part of the prompt that all sequences share in as few
+        # calls as the model allows.
+        self.stats = GenerationStats()
+        start_time = time.perf_counter()
+        logits = self._prefill(tokens, min_prompt_len, token_logprobs)
+        self.stats.prefill_tokens = bsz * min_prompt_len
+        self.stats.prefill_time_s = time.perf_counter() - start_time
+
+        # Then generate one token at a time, reusing the input tensors.
+        start_time = time.perf_counter()
+        next_input = torch.empty((bsz, 1), dtype=torch.long)
+        pos = torch.zeros(1, dtype=torch.int64)
         for cur_pos in range(min_prompt_len, total_len):
-            pos = torch.tensor([prev_pos], dtype=torch.int64)
-            if self.params.use_kv_cache:
-                inputs = (tokens[:, prev_pos:cur_pos], pos)
-            else:
-                inputs = (tokens[:, :cur_pos],)
-            logits = self.model.forward(inputs)  # updated forward call.
-            logits = logits[0]
+            # logits[:, -1] predicts the token at cur_pos.
             if temperature > 0:
                 probs = torch.softmax(logits[:, -1] / temperature, dim=-1)
                 next_token = sample_top_p(probs, top_p)
@@ -132,27 +226,35 @@ class LlamaRunner:
             next_token = next_token.reshape(-1)
 
             # only replace token if prompt has already been generated
-            if not self.params.use_kv_cache or cur_pos < len(prompt_tokens[0]):
-                next_token = torch.where(
-                    input_text_mask[:, cur_pos], tokens[:, cur_pos], next_token
-                )
+            next_token = torch.where(
+                input_text_mask[:, cur_pos], tokens[:, cur_pos], next_token
+            )
 
             tokens[:, cur_pos] = next_token
-            if logprobs:
-                token_logprobs[:, prev_pos + 1 : cur_pos + 1] = -F.cross_entropy(
-                    input=logits.transpose(1, 2),
-                    target=tokens[:, prev_pos + 1 : cur_pos + 1],
+            if token_logprobs is not None:
+                token_logprobs[:, cur_pos] = -F.cross_entropy(
+                    input=logits[:, -1],
+                    target=next_token,
                     reduction="none",
                     ignore_index=pad_id,
                 )
             eos_reached |= (~input_text_mask[:, cur_pos]) & (
                 torch.isin(next_token, stop_tokens)
             )
-            prev_pos = cur_pos
-            if all(eos_reached):
+            self.stats.decode_tokens += bsz
+            if all(eos_reached) or cur_pos == total_len - 1:
                 break
 
-        if logprobs:
+            if params.use_kv_cache:
+                next_input.copy_(tokens[:, cur_pos : cur_pos + 1])
+                pos[0] = cur_pos
+                inputs = (next_input, pos)
+            else:
+                inputs = (tokens[:, : cur_pos + 1],)
+            logits = self.model.forward(inputs)[0]
+        self.stats.decode_time_s = time.perf_counter() - start_time
+
+        if token_logprobs is not None:
             token_logprobs = token_logprobs.tolist()
         out_tokens, out_logprobs = [], []
         for i, toks in enumerate(tokens.tolist()):
@@ -203,7 +305,7 @@ class LlamaRunner:
             If logprobs is True, token log probabilities are computed for each generated token.
         """
         if max_gen_len is None:
-            max_gen_len = self.model.params.max_seq_len - 1
+            max_gen_len = self.params.max_seq_len - 1
         prompt_tokens = [self.tokenizer.encode(x, bos=True, eos=False) for x in prompts]
         generation_tokens, generation_logprobs = self.generate(
             prompt_tokens=prompt_tokens,
@@ -257,7 +359,7 @@ class LlamaRunner:
             If logprobs is True, token log probabilities are computed for each generated token.
         """
         if max_gen_len is None:
-            max_gen_len = self.model.params.max_seq_len - 1
+            max_gen_len = self.params.max_seq_len - 1
 
         prompt_tokens = [
             self.formatter.encode_dialog_prompt(dialog) for dialog in dialogs
@@ -340,6 +442,15 @@ def build_args_parser() -> argparse.ArgumentParser:
         help="Maximum length of the generated response sequence.",
     )
 
+    parser.add_argument(
+        "--prefill_chunk_size",
+        type=int,
+        default=None,
+        help="Maximum number of prompt tokens to feed to the model at once, if "
+        "it was exported with a dynamic sequence length. Defaults to, and is at "
+        "most, max_seq_len - 1.",
+    )
+
     return parser
 
 
@@ -356,7 +467,10 @@ def main() -> None:
         **params,
     )
     runner = LlamaRunner(
-        model_path=args.pte, tokenizer_path=args.tokenizer, model_args=model_args
+        model_path=args.pte,
+        tokenizer_path=args.tokenizer,
+        model_args=model_args,
+        prefill_chunk_size=args.prefill_chunk_size,
     )
     result = runner.text_completion(
         prompts=[args.prompt],
@@ -364,6 +478,13 @@ def main() -> None:
         temperature=args.temperature,
     )
     print(f"Result: {result}")
+    stats = runner.stats
+    print(
+        f"Prefill: {stats.prefill_tokens} tokens at "
+        + f"{stats.prefill_tokens_per_second:.2f} tokens/s, "
+        + f"decode: {stats.decode_tokens} tokens at "
+        + f"{stats.decode_tokens_per_second:.2f} tokens/s"
+    )
 
 
 if __name__ == "__main__":
@@ -4,9 +4,13 @@
 # This source code is licensed under the BSD-style license found in the
 # LICENSE file in the root directory of this source tree.
 
+import hashlib
+import os
+from collections import defaultdict
+from concurrent.futures import as_completed, ThreadPoolExecutor
 from functools import partial
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 import torch
 import torch.nn as nn
@@ -47,12 +51,19 @@ def quantize(
     blocksize: int = 128,
     tokenizer_path: Optional[Path] = None,
     verbose: bool = False,
+    # following arguments are only used for int8 quantization
+    cache_dir: Optional[str] = None,
+    checkpoint_dir: Optional[Path] = None,
 ) -> torch.nn.Module:
     """
     Quantizes a model by converting all weights to int8.
     Args:
         model: A model to quantize.
         qmode: quantization mode, e.g. int8, 8da4w, 8da4w-gptq
+        cache_dir: A directory to cache quantized weights in, for int8.
+        checkpoint_dir: The directory of checkpoint shards the model was
+            loaded from, if any, which takes precedence over checkpoint_path
+            for caching.
     Returns:
         A quantized model.
     """
@@ -67,7 +78,11 @@ def quantize(
 
     if qmode == "int8":
         # Add quantization mode options here: group size, bit width, etc.
-        return WeightOnlyInt8QuantHandler(model).quantized_model()
+        return WeightOnlyInt8QuantHandler(
+            model,
+            cache_dir=cache_dir,
+            checkpoint_path=checkpoint_dir or checkpoint_path,
+        ).quantized_model()
     elif qmode == "8da4w":
         # Check for required args
         if group_size is None:
@@ -216,11 +231,14 @@ def dynamically_quantize_per_channel(
 
     # quantize based on qmin/qmax/scales/zp
     # reference: https://www.internalfb.com/code/fbsource/[8edc275012b1]/fbcode/caffe2/torch/ao/quantization/fx/_decomposed.py?lines=63
+    # The zero points are all 0, so skip adding them, and reuse the buffer
+    # of x_div for the rest of the steps.
     x_div = x / scales.unsqueeze(-1)
-    x_round = torch.round(x_div)
-    x_zp = x_round + zero_points.unsqueeze(-1)
     quant = (
-        torch.clamp(x_zp, quant_min, quant_max).to(target_dtype).view(x.shape[0], -1)
+        x_div.round_()
+        .clamp_(quant_min, quant_max)
+        .to(target_dtype)
+        .view(x.shape[0], -1)
     )
 
     scales = scales.to(dtype=scales_dtype)
@@ -229,6 +247,223 @@ def dynamically_quantize_per_channel(
     return quant, scales, zero_points
 
 
+#########################################################################
+###                Batched weight quantization                        ###
+
+
+def checkpoint_fingerprint(checkpoint_path: Optional[Path]) -> Optional[str]:
+    """
+    Identifies a checkpoint file, or a directory of checkpoint shards, by the
+    canonical path, size and modification time of each file, without reading
+    them. Returns None if there is no such checkpoint.
+    """
+    if checkpoint_path is None or not os.path.exists(checkpoint_path):
+        return None
+    path = Path(checkpoint_path).resolve()
+    files = (
+        sorted(p for p in path.iterdir() if p.is_file()) if path.is_dir() else [path]
+    )
+    keys = []
+    for file in files:
+        stat = file.stat()
+        keys.append(f"{file}|{stat.st_size}|{stat.st_mtime_ns}")
+    return hashlib.sha256("\n".join(keys).encode()).hexdigest()
+
+
+class QuantizedWeightCache:
+    """
+    Stores quantized weights on disk, so that exporting the same checkpoint
+    with the same quantization config again skips quantizing them.
+
+    Entries are keyed by the checkpoint fingerprint, the quantization config,
+    and the name, shape and dtype of each weight. Transforms that change the
+    weights of the model before quantization must be reflected in `config`.
+    """
+
+    def __init__(self, cache_dir: str, checkpoint_key: str, config: str) -> None:
+        self.cache_dir = cache_dir
+        self.prefix = f"{checkpoint_key}|{config}"
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, fqn: str, weight: torch.Tensor) -> str:
+        key = f"{self.prefix}|{fqn}|{tuple(weight.shape)}|{weight.dtype}"
+        digest = hashlib.sha256(key.encode()).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.pt")
+
+    def load(
+        self, fqn: str, weight: torch.Tensor
+    ) -> Optional[Tuple[torch.Tensor, torch.Tensor]]:
+        path = self._path(fqn, weight)
+        if not os.path.isfile(path):
+            return None
+        entry = torch.load(path, weights_only=True)
+        return entry["weight"], entry["scales"]
+
+    def save(
+        self,
+        fqn: str,
+        weight: torch.Tensor,
+        quantized: torch.Tensor,
+        scales: torch.Tensor,
+    ) -> None:
+        path = self._path(fqn, weight)
+        # Write to a temporary file first, so readers never see partial entries.
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        torch.save({"weight": quantized, "scales": scales}, tmp_path)
+        os.replace(tmp_path, path)
+
+
+def quantize_weights_batched(
+    weights: Dict[str, torch.Tensor],
+    quant_min: int,
+    quant_max: int,
+    group_size: Optional[int] = None,
+    *,
+    cache: Optional[QuantizedWeightCache] = None,
+    num_workers: Optional[int] = None,
+    max_batch_bytes: int = 1 << 20,
+) -> Iterator[Tuple[str, torch.Tensor, torch.Tensor]]:
+    """
+    Quantizes weights to int8 with dynamically_quantize_per_channel(), with
+    scales in the dtype of each weight.
+
+    Since every row is quantized independently, the rows of all weights with
+    the same shape and dtype are quantized in batches of about
+    `max_batch_bytes` (as float32): small weights are concatenated into one
+    call, and large ones are split into several, which keeps each pass over
+    the data in cache. Batches run on `num_workers` threads, and each call
+    uses torch's intra-op threads.
+
+    Yields (fqn, quantized weight, scales) tuples as each weight is done, in
+    no particular order.
+    """
+    # Rows of each weight that are still being quantized.
+    remaining: Dict[str, int] = {}
+    outputs: Dict[str, Tuple[torch.Tensor, torch.Tensor]] = {}
+    pending: Dict[Tuple[torch.Size, torch.dtype], List[str]] = defaultdict(list)
+    for fqn, weight in weights.items():
+        cached = cache.load(fqn, weight) if cache is not None else None
+        if cached is not None:
+            yield fqn, cached[0], cached[1]
+            continue
+        rows, cols = weight.shape
+        num_groups = 1 if not group_size else (cols + group_size - 1) // group_size
+        outputs[fqn] = (
+            torch.empty((rows, cols), dtype=torch.int8),
+            torch.empty((rows, num_groups), dtype=weight.dtype),
+        )
+        remaining[fqn] = rows
+        pending[(weight.shape, weight.dtype)].append(fqn)
+
+    batches = _plan_batches(pending, max_batch_bytes)
+    if not batches:
+        return
+    if num_workers is None:
+        num_workers = min(4, os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=num_workers) as executor:
+        futures = [
+            executor.submit(
+                _quantize_batch,
+                batch,
+                weights,
+                outputs,
+                quant_min,
+                quant_max,
+                group_size,
+            )
+            for batch in batches
+        ]
+        for future in as_completed(futures):
+            for fqn, num_rows in future.result():
+                remaining[fqn] -= num_rows
+                if remaining[fqn] > 0:
+                    continue
+                quantized, scales = outputs.pop(fqn)
+                if cache is not None:
+                    cache.save(fqn, weights[fqn], quantized, scales)
+                yield fqn, quantized, scales
+
+
+def _plan_batches(
+    pending: Dict[Tuple[torch.Size, torch.dtype], List[str]],
+    max_batch_bytes: int,
+) -> List[List[Tuple[str, int, int]]]:
+    """
+    Splits the rows of the weights in `pending`, grouped by shape and dtype,
+    into batches of about `max_batch_bytes` (as float32). Each batch is a list
+    of (fqn, start row, end row) slices.
+    """
+    batches: List[List[Tuple[str, int, int]]] = []
+    for (shape, _), fqns in pending.items():
+        rows, cols = shape
+        batch_rows = max(max_batch_bytes // max(cols * 4, 1), 1)
+        batch: List[Tuple[str, int, int]] = []
+        batch_len = 0
+        for fqn in fqns:
+            start = 0
+            while start < rows:
+                end = min(start + batch_rows - batch_len, rows)
+                batch.append((fqn, start, end))
+                batch_len += end - start
+                start = end
+                if batch_len == batch_rows:
+                    batches.append(batch)
+                    batch, batch_len = [], 0
+        if batch:
+            batches.append(batch)
+    return batches
+
+
+# Grad mode is thread-local, so disable it in the worker threads too.
+@torch.no_grad()
+def _quantize_batch(
+    batch: List[Tuple[str, int, int]],
+    weights: Dict[str, torch.Tensor],
+    outputs: Dict[str, Tuple[torch.Tensor, torch.Tensor]],
+    quant_min: int,
+    quant_max: int,
+    group_size: Optional[int],
+) -> List[Tuple[str, int]]:
+    """
+    Quantizes the slices in `batch` with one call and writes them into
+    `outputs`. Returns the number of rows done for each weight.
+    """
+    slices = [weights[fqn][start:end] for fqn, start, end in batch]
+    quantized, scales, _ = dynamically_quantize_per_channel(
+        torch.cat(slices).float() if len(slices) > 1 else slices[0].float(),
+        quant_min,
+        quant_max,
+        torch.int8,
+        group_size,
+        scales_dtype=slices[0].dtype,
+    )
+    # The slices of a weight are disjoint, so threads can fill them in
+    # concurrently.
+    row = 0
+    for fqn, start, end in batch:
+        out_quantized, out_scales = outputs[fqn]
+        out_quantized[start:end] = quantized[row : row + end - start]
+        out_scales[start:end] = scales[row : row + end - start]
+        row += end - start
+    return [(fqn, end - start) for fqn, start, end in batch]
+
+
+def make_weight_cache(
+    cache_dir: Optional[str], checkpoint_path: Optional[Path], config: str
+) -> Optional[QuantizedWeightCache]:
+    """
+    Returns a cache for the weights loaded from `checkpoint_path`, which is
+    either a checkpoint file or a directory of checkpoint shards, or None if
+    there is no cache directory or the checkpoint cannot be identified.
+    """
+    if cache_dir is None:
+        return None
+    checkpoint_key = checkpoint_fingerprint(checkpoint_path)
+    if checkpoint_key is None:
+        return None
+    return QuantizedWeightCache(cache_dir, checkpoint_key, config)
+
+
 #########################################################################
 ###                QuantHandler API definition                        ###
 
@@ -284,6 +519,8 @@ class WeightOnlyInt8QuantHandler(QuantHandler):
         node_type: str = "*",
         bitwidth: Optional[int] = None,
         group_size: Optional[int] = None,
+        cache_dir: Optional[str] = None,
+        checkpoint_path: Optional[Path] = None,
     ):
         self.mod = mod
         self.group_size = group_size
@@ -292,6 +529,12 @@ class WeightOnlyInt8QuantHandler(QuantHandler):
             self.bitwidth = 8
         else:
             self.bitwidth = bitwidth
+        # Quantized weights are only cached when they can be tied to a checkpoint.
+        self.cache = make_weight_cache(
+            cache_dir,
+            checkpoint_path,
+            f"linear|{self.node_type}|{self.bitwidth}|{self.group_size}",
+        )
 
     @torch.no_grad()
     def create_quantized_state_dict(self) -> Dict:
@@ -306,6 +549,7 @@ class WeightOnlyInt8QuantHandler(QuantHandler):
         else:
             raise ValueError(f"Unsupported bitwidth {self.bitwidth}")
 
+        weights = {}
         for fqn, mod in self.mod.named_modules():
             # print(f"maybe? quantize {fqn}...{type(mod)}")
             if isinstance(mod, torch.nn.Linear) or isinstance(mod, fsLinear):
@@ -318,26 +562,18 @@ class WeightOnlyInt8QuantHandler(QuantHandler):
                         and fqn not in ["output", "final_proj"]
                     )
                 ):
-                    print(
-                        f"quantize {self.node_type} {fqn, mod} with group_size {self.group_size}, bitwidth {self.bitwidth}"
-                    )
-
-                    # print(f"initial weight shape {mod.weight.shape}")
-                    input_weight = mod.weight.float()
-
-                    # print(f"expanded weight shape {input_weight.shape}")
-                    weight, scales, _ = dynamically_quantize_per_channel(
-                        input_weight,
-                        range_min,
-                        range_max,
-                        torch.int8,
-                        self.group_size,
-                        scales_dtype=mod.weight.dtype,
-                    )
+                    weights[fqn] = mod.weight
 
-                    cur_state_dict[f"{fqn}.weight"] = weight
-                    # squeeze makes group_size=rowsize unidimensional
-                    cur_state_dict[f"{fqn}.scales"] = scales.squeeze(dim=-1)
+        print(
+            f"quantize {len(weights)} {self.node_type} linears with group_size "
+            + f"{self.group_size}, bitwidth {self.bitwidth}"
+        )
+        for fqn, weight, scales in quantize_weights_batched(
+            weights, range_min, range_max, self.group_size, cache=self.cache
+        ):
+            cur_state_dict[f"{fqn}.weight"] = weight
+            # squeeze makes group_size=rowsize unidimensional
+            cur_state_dict[f"{fqn}.scales"] = scales.squeeze(dim=-1)
 
         return cur_state_dict
 
@@ -417,6 +653,8 @@ class EmbeddingQuantHandler(QuantHandler):
         bitwidth: int = 8,
         group_size: Optional[int] = None,
         packed=False,
+        cache_dir: Optional[str] = None,
+        checkpoint_path: Optional[Path] = None,
     ):
         if isinstance(packed, str):
             packed = packed == "True"
@@ -427,6 +665,12 @@ class EmbeddingQuantHandler(QuantHandler):
         self.packed = packed
         if (bitwidth != 4) and packed:
             raise RuntimeError("pack only works with bitsize 4")
+        # Quantized weights are only cached when they can be tied to a checkpoint.
+        self.cache = make_weight_cache(
+            cache_dir,
+            checkpoint_path,
+            f"embedding|{self.bitwidth}|{self.group_size}",
+        )
 
     @torch.no_grad()
     def create_quantized_state_dict(self, packed=False) -> Dict:
@@ -441,44 +685,38 @@ class EmbeddingQuantHandler(QuantHandler):
         else:
             raise ValueError(f"Unsupported bitwidth {self.bitwidth}")
 
-        for fqn, mod in self.mod.named_modules():
-            if isinstance(mod, nn.Embedding):
-                # print("****")
-                # print(f"Embedding identified: {fqn, mod}")
-                # print(f"weights size: {mod.weight.size()}")
-                # print(f"quantize {fqn}...")
-
-                print(
-                    f"quantize {fqn, mod} with group_size {self.group_size}, bitwidth {self.bitwidth}"
-                )
-                weight, scales, _ = dynamically_quantize_per_channel(
-                    mod.weight.float(),
-                    range_min,
-                    range_max,
-                    torch.int8,
-                    self.group_size,
-                    scales_dtype=mod.weight.dtype,
-                )
-
-                if packed:
-                    if weight.shape[-1] % 2 != 0:
-                        raise RuntimeError("automatic padding not implemented yet")
+        weights = {
+            fqn: mod.weight
+            for fqn, mod in self.mod.named_modules()
+            if isinstance(mod, nn.Embedding)
+        }
 
-                    weight_range_shifted = weight.add(8).view(torch.uint8)
-                    weight_view = weight_range_shifted.view(
-                        weight.shape[0], weight.shape[1] // 2, 2
-                    )
-                    weight_even = weight_view[:, :, 0] * 16  # left shift 4
-                    weight_odd = weight_view[:, :, 1]
-                    weight_packed = weight_even + weight_odd
-                    weight = weight_packed
-
-                weight = weight.to(device=self.device)
-                scales = scales.to(device=self.device)
-                # Update state dict
-                cur_state_dict[f"{fqn}.weight"] = weight
-                # squeeze makes group_size=rowsize unidimensional
-                cur_state_dict[f"{fqn}.scales"] = scales.squeeze(dim=-1)
+        print(
+            f"quantize {len(weights)} embeddings with group_size {self.group_size}, "
+            + f"bitwidth {self.bitwidth}"
+        )
+        for fqn, weight, scales in quantize_weights_batched(
+            weights, range_min, range_max, self.group_size, cache=self.cache
+        ):
+            if packed:
+                if weight.shape[-1] % 2 != 0:
+                    raise RuntimeError("automatic padding not implemented yet")
+
+                weight_range_shifted = weight.add(8).view(torch.uint8)
+                weight_view = weight_range_shifted.view(
+                    weight.shape[0], weight.shape[1] // 2, 2
+                )
+                weight_even = weight_view[:, :, 0] * 16  # left shift 4
+                weight_odd = weight_view[:, :, 1]
+                weight_packed = weight_even + weight_odd
+                weight = weight_packed
+
+            weight = weight.to(device=self.device)
+            scales = scales.to(device=self.device)
+            # Update state dict
+            cur_state_dict[f"{fqn}.weight"] = weight
+            # squeeze makes group_size=rowsize unidimensional
+            cur_state_dict[f"{fqn}.scales"] = scales.squeeze(dim=-1)
 
         return cur_state_dict
 
@@ -553,6 +791,16 @@ class QuantizedGroupEmbedding(torch.nn.Module):
 ############################ Source Transform Start #######################
 
 
+def _loaded_checkpoint(args) -> Optional[Path]:
+    # The model is loaded from the shards in --checkpoint_dir when it is set,
+    # and from --checkpoint otherwise.
+    checkpoint_dir = getattr(args, "checkpoint_dir", None)
+    if checkpoint_dir is not None:
+        return Path(checkpoint_dir)
+    checkpoint = getattr(args, "checkpoint", None)
+    return Path(checkpoint) if checkpoint is not None else None
+
+
 def get_quant_embedding_transform(args):
     bitwidth, group_size = args.embedding_quantize.split(",")
     if group_size == "none" or group_size == "None" or group_size == "0":
@@ -565,6 +813,8 @@ def get_quant_embedding_transform(args):
         bitwidth=bitwidth,
         group_size=group_size,
         packed=(bitwidth == 4),
+        cache_dir=getattr(args, "quantization_cache_dir", None),
+        checkpoint_path=_loaded_checkpoint(args),
     ).quantized_model()
 
 
@@ -592,6 +842,10 @@ def get_quant_weight_transform(args, dtype_override, verbose):
         tokenizer_path=(
             Path(path) if (path := args.tokenizer_path) is not None else None
         ),
+        cache_dir=arg_dict.get("quantization_cache_dir"),
+        checkpoint_dir=(
+            Path(path) if (path := arg_dict.get("checkpoint_dir")) is not None else None
+        ),
     )
 
 
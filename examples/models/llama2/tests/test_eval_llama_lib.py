@@ -0,0 +1,108 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+# All rights reserved.
+#
+# This source code is licensed under the BSD-style license found in the
+# LICENSE file in the root directory of this source tree.
+
+import unittest
+from argparse import Namespace
+from typing import Any, Dict, List, Tuple
+from unittest import mock
+
+import torch
+from executorch.examples.models.llama2 import eval_llama_lib
+from executorch.examples.models.llama2.eval_llama_lib import (
+    ETPybindEvalWrapper,
+    ETRunnerEvalWrapper,
+    gen_eval_wrapper,
+)
+from lm_eval.models.huggingface import HFLM
+
+
+class FakeProgram:
+    """Stands in for a loaded .pte file. The logits of each token are its
+    value and its position in the sequence, and each call records the
+    (start position, length) of its input.
+    """
+
+    def __init__(self, metadata: Dict[str, Any]) -> None:
+        self.metadata = metadata
+        self.calls: List[Tuple[int, int]] = []
+
+    def run_method(self, method_name, inputs=()):
+        if method_name not in self.metadata:
+            raise RuntimeError(f"No method {method_name}")
+        return [self.metadata[method_name]]
+
+    def forward(self, inputs):
+        tokens = inputs[0]
+        start = int(inputs[1][0]) if len(inputs) > 1 else 0
+        self.calls.append((start, tokens.shape[1]))
+        positions = torch.arange(start, start + tokens.shape[1]).unsqueeze(0)
+        return [torch.stack([tokens.float(), positions.float()], dim=-1)]
+
+
+class ETEvalWrapperTest(unittest.TestCase):
+    def make_wrapper(self, program: FakeProgram, **kwargs) -> ETPybindEvalWrapper:
+        args = Namespace(
+            pte="model.pte",
+            tokenizer_path="tokenizer.model",
+            tokenizer_bin=None,
+            max_seq_length=16,
+            prefill_chunk_size=None,
+        )
+        for name, value in kwargs.items():
+            setattr(args, name, value)
+        # Don't let lm_eval load a Hugging Face model.
+        with mock.patch.object(HFLM, "__init__", return_value=None), mock.patch.object(
+            eval_llama_lib, "get_tokenizer"
+        ), mock.patch(
+            "executorch.extension.pybindings.portable_lib._load_for_executorch",
+            return_value=program,
+        ):
+            return gen_eval_wrapper("llama2", args)
+
+    def test_wrapper_selection(self) -> None:
+        program = FakeProgram({"use_kv_cache": True})
+        wrapper = self.make_wrapper(program)
+        self.assertIs(type(wrapper), ETPybindEvalWrapper)
+        # The exported model takes at most max_seq_length - 1 tokens.
+        self.assertEqual(wrapper._max_seq_length, 15)
+        self.assertEqual(wrapper._prefill_chunk_size, 15)
+        self.assertFalse(wrapper._enable_dynamic_shape)
+
+    def test_runner_evaluation_unsupported(self) -> None:
+        program = FakeProgram({"use_kv_cache": True})
+        with self.assertRaisesRegex(NotImplementedError, "--tokenizer_bin"):
+            self.make_wrapper(program, tokenizer_bin="tokenizer.bin")
+        with self.assertRaises(NotImplementedError):
+            ETRunnerEvalWrapper(
+                model="model.pte", tokenizer=mock.Mock(), tokenizer_bin="tokenizer.bin"
+            )
+        self.assertEqual(program.calls, [])
+
+    def test_model_call(self) -> None:
+        inps = torch.randint(0, 32, (1, 11))
+        expected = torch.stack([inps.float(), torch.arange(11.0).unsqueeze(0)], -1)
+        for metadata, prefill_chunk_size, calls in (
+            ({"use_kv_cache": False}, None, [(0, 11)]),
+            (
+                {"use_kv_cache": True},
+                4,
+                [(i, 1) for i in range(11)],
+            ),
+            (
+                {"use_kv_cache": True, "enable_dynamic_shape": True},
+                None,
+                [(0, 11)],
+            ),
+            (
+                {"use_kv_cache": True, "enable_dynamic_shape": True},
+                4,
+                [(0, 4), (4, 4), (8, 3)],
+            ),
+        ):
+            program = FakeProgram(metadata)
+            wrapper = self.make_wrapper(program, prefill_chunk_size=prefill_chunk_size)
+            self.assertTrue(torch.equal(wrapper._model_call(inps), expected))
+            self.assertEqual(program.calls, calls)
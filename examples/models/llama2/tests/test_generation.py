@@ -0,0 +1,107 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+# All rights reserved.
+#
+# This source code is licensed under the BSD-style license found in the
+# LICENSE file in the root directory of this source tree.
+
+import unittest
+from typing import List, Tuple
+from unittest import mock
+
+import torch
+from executorch.examples.models.llama2.llama_transformer import ModelArgs, Transformer
+from executorch.examples.models.llama2.runner import generation
+from executorch.examples.models.llama2.runner.generation import LlamaRunner
+
+
+class EagerProgram:
+    """Runs an eager llama model like the loaded program, recording the
+    (start position, length) of each call.
+    """
+
+    def __init__(self, model: Transformer) -> None:
+        self.model = model
+        self.calls: List[Tuple[int, int]] = []
+
+    def forward(self, inputs):
+        start = int(inputs[1][0]) if len(inputs) > 1 else 0
+        self.calls.append((start, inputs[0].shape[1]))
+        with torch.no_grad():
+            return [self.model(*inputs)]
+
+    def run_method(self, method_name, inputs):
+        raise RuntimeError(f"No method {method_name}")
+
+
+class PrefillTest(unittest.TestCase):
+    def setUp(self) -> None:
+        torch.manual_seed(0)
+        self.vocab_size = 32
+        self.max_seq_len = 16
+        self.tokens = torch.randint(1, self.vocab_size, (1, self.max_seq_len))
+
+    def make_runner(self, use_kv_cache: bool, **kwargs) -> LlamaRunner:
+        model_args = ModelArgs(
+            dim=32,
+            n_layers=2,
+            n_heads=4,
+            vocab_size=self.vocab_size,
+            max_seq_len=self.max_seq_len,
+            max_batch_size=1,
+            use_kv_cache=use_kv_cache,
+            enable_dynamic_shape=True,
+        )
+        # Every runner gets the same weights and fresh caches.
+        torch.manual_seed(1)
+        program = EagerProgram(Transformer(model_args).eval())
+        tokenizer = mock.Mock(n_words=self.vocab_size, pad_id=-1)
+        with mock.patch.object(
+            generation, "_load_for_executorch", return_value=program
+        ), mock.patch.object(generation, "Tokenizer", return_value=tokenizer):
+            return LlamaRunner("model.pte", "tokenizer.model", model_args, **kwargs)
+
+    def prefill(self, runner: LlamaRunner, num_tokens: int):
+        token_logprobs = torch.zeros(self.tokens.shape)
+        logits = runner._prefill(self.tokens, num_tokens, token_logprobs)
+        return logits[:, -1], token_logprobs[:, :num_tokens]
+
+    def test_chunk_size(self) -> None:
+        # The exported sequence length is at most max_seq_len - 1.
+        self.assertEqual(self.make_runner(True).prefill_chunk_size, 15)
+        self.assertEqual(
+            self.make_runner(True, prefill_chunk_size=64).prefill_chunk_size, 15
+        )
+        self.assertEqual(
+            self.make_runner(True, prefill_chunk_size=4).prefill_chunk_size, 4
+        )
+
+        # A prompt of max_seq_len tokens is split to fit.
+        runner = self.make_runner(True)
+        self.prefill(runner, self.max_seq_len)
+        self.assertEqual(runner.model.calls, [(0, 15), (15, 1)])
+
+    def test_chunked_matches_single_step(self) -> None:
+        num_tokens = 11
+        single_step = self.make_runner(True, prefill_chunk_size=1)
+        expected_logits, expected_logprobs = self.prefill(single_step, num_tokens)
+        self.assertEqual(len(single_step.model.calls), num_tokens)
+
+        chunked = self.make_runner(True, prefill_chunk_size=4)
+        logits, logprobs = self.prefill(chunked, num_tokens)
+        self.assertEqual(chunked.model.calls, [(0, 4), (4, 4), (8, 3)])
+        torch.testing.assert_close(logits, expected_logits)
+        torch.testing.assert_close(logprobs, expected_logprobs)
+        self.assertTrue((logprobs[:, 1:] < 0).all())
+
+        # Without a KV cache, the prompt is fed in one call.
+        no_kv_cache = self.make_runner(False)
+        logits, logprobs = self.prefill(no_kv_cache, num_tokens)
+        self.assertEqual(no_kv_cache.model.calls, [(0, num_tokens)])
+        torch.testing.assert_close(logits, expected_logits)
+        torch.testing.assert_close(logprobs, expected_logprobs)
+
+    def test_static_shape_is_single_step(self) -> None:
+        runner = self.make_runner(True, prefill_chunk_size=4)
+        runner.enable_dynamic_shape = False
+        self.prefill(runner, 3)
+        self.assertEqual(runner.model.calls, [(0, 1), (1, 1), (2, 1)])
@@ -0,0 +1,130 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+# All rights reserved.
+#
+# This source code is licensed under the BSD-style license found in the
+# LICENSE file in the root directory of this source tree.
+
+import os
+import tempfile
+import unittest
+from argparse import Namespace
+from pathlib import Path
+
+import torch
+from executorch.examples.models.llama2.source_transformation.quantize import (
+    _loaded_checkpoint,
+    checkpoint_fingerprint,
+    dynamically_quantize_per_channel,
+    EmbeddingQuantHandler,
+    make_weight_cache,
+    quantize_weights_batched,
+    QuantizedWeightCache,
+    WeightOnlyInt8QuantHandler,
+)
+
+
+class QuantizeTest(unittest.TestCase):
+    def setUp(self) -> None:
+        torch.manual_seed(0)
+        self.weights = {
+            "a": torch.randn(16, 64),
+            "b": torch.randn(16, 64),
+            "c": torch.randn(8, 64, dtype=torch.float16),
+            "d": torch.randn(16, 64),
+        }
+
+    def check_matches_unbatched(self, results, group_size) -> None:
+        for fqn, quantized, scales in results:
+            weight = self.weights[fqn]
+            expected, expected_scales, _ = dynamically_quantize_per_channel(
+                weight.float(), -8, 7, torch.int8, group_size, scales_dtype=weight.dtype
+            )
+            self.assertTrue(torch.equal(quantized, expected), fqn)
+            self.assertTrue(torch.equal(scales, expected_scales), fqn)
+
+    def test_batched_matches_unbatched(self) -> None:
+        for group_size in (None, 32):
+            # Small batches, so some weights share a batch and others don't.
+            results = list(
+                quantize_weights_batched(
+                    self.weights, -8, 7, group_size, max_batch_bytes=16 * 64 * 4 * 2
+                )
+            )
+            self.assertEqual(sorted(fqn for fqn, _, _ in results), sorted(self.weights))
+            self.check_matches_unbatched(results, group_size)
+
+    def test_cache(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            checkpoint = os.path.join(tmp_dir, "checkpoint.pth")
+            torch.save(self.weights, checkpoint)
+            cache_dir = os.path.join(tmp_dir, "cache")
+            cache = QuantizedWeightCache(
+                cache_dir, checkpoint_fingerprint(checkpoint), "config"
+            )
+            list(quantize_weights_batched(self.weights, -8, 7, 32, cache=cache))
+            self.assertEqual(len(os.listdir(cache_dir)), len(self.weights))
+
+            # Cached results are used instead of quantizing again.
+            fqn, quantized, scales = next(
+                quantize_weights_batched({"a": self.weights["a"]}, -8, 7, 32)
+            )
+            cache.save("a", self.weights["a"], quantized + 1, scales)
+            results = list(
+                quantize_weights_batched(self.weights, -8, 7, 32, cache=cache)
+            )
+            cached = {fqn: quantized for fqn, quantized, _ in results}
+            self.assertTrue(torch.equal(cached["a"], quantized + 1))
+            self.check_matches_unbatched(
+                [result for result in results if result[0] != "a"], 32
+            )
+
+            # A different config doesn't share entries.
+            other_cache = QuantizedWeightCache(
+                cache_dir, checkpoint_fingerprint(checkpoint), "other"
+            )
+            self.assertIsNone(other_cache.load("a", self.weights["a"]))
+
+    def test_checkpoint_keys(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            checkpoint_dir = Path(tmp_dir, "shards")
+            checkpoint_dir.mkdir()
+            for i in range(2):
+                torch.save(self.weights, checkpoint_dir / f"consolidated.0{i}.pth")
+            checkpoint = Path(tmp_dir, "checkpoint.pth")
+            torch.save(self.weights, checkpoint)
+
+            # --checkpoint_dir takes precedence over --checkpoint.
+            args = Namespace(checkpoint=str(checkpoint), checkpoint_dir=None)
+            self.assertEqual(_loaded_checkpoint(args), checkpoint)
+            args.checkpoint_dir = str(checkpoint_dir)
+            self.assertEqual(_loaded_checkpoint(args), checkpoint_dir)
+
+            # Changing any shard changes the key.
+            key = checkpoint_fingerprint(checkpoint_dir)
+            self.assertNotEqual(key, checkpoint_fingerprint(checkpoint))
+            self.assertEqual(key, checkpoint_fingerprint(checkpoint_dir))
+            torch.save(self.weights["a"], checkpoint_dir / "consolidated.01.pth")
+            self.assertNotEqual(key, checkpoint_fingerprint(checkpoint_dir))
+
+            # Checkpoints that don't exist are not cached.
+            missing = Path(tmp_dir, "missing.pth")
+            self.assertIsNone(checkpoint_fingerprint(missing))
+            cache_dir = os.path.join(tmp_dir, "cache")
+            self.assertIsNone(make_weight_cache(cache_dir, missing, "config"))
+            self.assertIsNotNone(make_weight_cache(cache_dir, checkpoint, "config"))
+
+    def test_handlers(self) -> None:
+        model = torch.nn.Sequential(
+            torch.nn.Embedding(32, 64),
+            torch.nn.Linear(64, 64, bias=False),
+            torch.nn.Linear(64, 16, bias=False),
+        )
+        input = torch.randint(0, 32, (1, 4))
+        expected = model(input)
+
+        model = WeightOnlyInt8QuantHandler(model).quantized_model()
+        model = EmbeddingQuantHandler(model, bitwidth=8).quantized_model()
+
+        self.assertEqual(model[1].weight.dtype, torch.int8)
+        self.assertEqual(model[0].weight.dtype, torch.int8)
+        torch.testing.assert_close(model(input), expected, atol=0.1, rtol=0.1)
@@ -5,7 +5,12 @@
 # LICENSE file in the root directory of this source tree.
 
 import io
-from typing import List, Optional, Union
+import os
+from typing import Any, List, Optional, Union
+
+# The maximum number of buffers to pass to a single os.writev() call. POSIX
+# only guarantees 16, but Linux and macOS both allow 1024.
+_MAX_WRITEV_BUFFERS: int = 1024
 
 
 class Cord:
@@ -14,11 +19,16 @@ class Cord:
     Users can use a Cord to assemble large files and data blobs using references
     to and slices of other data, instead of copying and appending that data to a
     `bytes` or `bytearray` object.
+
+    Any object that supports the buffer protocol can be appended, including
+    `memoryview`s, `mmap`s and numpy arrays. Such objects are referenced rather
+    than copied, so they must not be modified while the Cord is in use.
     """
 
-    def __init__(self, data: Optional[Union[bytes, "Cord"]] = None) -> None:
+    # pyre-ignore[2]: `data` can be any object that supports the buffer protocol.
+    def __init__(self, data: Optional[Union[bytes, "Cord", Any]] = None) -> None:
         """Initialize Cord data structure."""
-        self._buffers: List[bytes] = []
+        self._buffers: List[Union[bytes, memoryview]] = []
         self._byte_size: int = 0
 
         if data is not None:
@@ -32,8 +42,9 @@ class Cord:
         """Return the contents of the Cord as a single `bytes` object."""
         return b"".join(self._buffers)
 
-    def append(self, data: Union[bytes, "Cord"]) -> None:
-        """Append a bytes or Cord to the current Cord."""
+    # pyre-ignore[2]: `data` can be any object that supports the buffer protocol.
+    def append(self, data: Union[bytes, "Cord", Any]) -> None:
+        """Append a Cord or a buffer-protocol object to the current Cord."""
         if isinstance(data, bytes):
             self._buffers.append(data)
             self._byte_size += len(data)
@@ -41,9 +52,89 @@ class Cord:
             self._buffers.extend(data._buffers)
             self._byte_size += len(data)
         else:
-            raise TypeError(f"Can only append bytes or Cords, received {type(data)}")
+            try:
+                view = memoryview(data)
+            except TypeError:
+                raise TypeError(
+                    "Can only append Cords or objects that support the buffer "
+                    + f"protocol, received {type(data)}"
+                )
+            if not view.c_contiguous:
+                raise ValueError("Can only append contiguous buffers")
+            # Address the data as unsigned bytes, whatever its element type.
+            view = view.cast("B") if view.format != "B" or view.ndim != 1 else view
+            self._buffers.append(view)
+            self._byte_size += view.nbytes
 
-    def write_to_file(self, outfile: io.BufferedIOBase) -> None:
-        """Write the Cord to a file."""
+    def readinto(self, buffer: Any) -> int:  # pyre-ignore[2]
+        """Copies the contents of the Cord into the start of a writable buffer.
+
+        Returns:
+            The number of bytes copied, which is always len(self).
+        Raises:
+            ValueError: If the buffer is smaller than the Cord.
+        """
+        out = memoryview(buffer).cast("B")
+        if out.nbytes < self._byte_size:
+            raise ValueError(
+                f"Buffer of {out.nbytes} bytes is too small for {self._byte_size} "
+                + "bytes of Cord data"
+            )
+        offset = 0
         for item in self._buffers:
-            outfile.write(item)
+            size = len(item)
+            out[offset : offset + size] = item
+            offset += size
+        return offset
+
+    def to_memoryview(self) -> memoryview:
+        """Return the contents of the Cord as a single contiguous `memoryview`.
+
+        If the Cord holds a single buffer, the result refers to it directly.
+        Otherwise, the contents are copied once into a new buffer.
+        """
+        if len(self._buffers) == 1:
+            return memoryview(self._buffers[0])
+        data = bytearray(self._byte_size)
+        self.readinto(data)
+        return memoryview(data)
+
+    def write_to_file(self, outfile: io.BufferedIOBase) -> None:
+        """Write the Cord to a file.
+
+        If the file is backed by a file descriptor, writes the buffers with
+        `os.writev()`, batching many buffers into each system call.
+        """
+        fd = _fileno(outfile)
+        if fd is None:
+            for item in self._buffers:
+                outfile.write(item)
+            return
+
+        # Make sure previously-buffered data lands before ours.
+        outfile.flush()
+        pending = [memoryview(item) for item in self._buffers if len(item) > 0]
+        start = 0
+        while start < len(pending):
+            batch = pending[start : start + _MAX_WRITEV_BUFFERS]
+            written = os.writev(fd, batch)  # pyre-ignore[16]
+            # Skip the buffers that were written completely, and trim the
+            # next one if it was written partially.
+            for item in batch:
+                if written < len(item):
+                    pending[start] = item[written:]
+                    break
+                written -= len(item)
+                start += 1
+
+
+def _fileno(outfile: io.BufferedIOBase) -> Optional[int]:
+    """Returns the file descriptor to write `outfile` data to, or None if the
+    data should be written with `outfile.write()` instead.
+    """
+    if not hasattr(os, "writev"):
+        return None
+    try:
+        return outfile.fileno()
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        return None
@@ -24,7 +24,7 @@ class _DataclassEncoder(json.JSONEncoder):
                     props[f"{field.name}_type"] = type(getattr(o, field.name)).__name__
             return props
 
-        if isinstance(o, bytes):
+        if isinstance(o, (bytes, memoryview)):
             return list(o)
 
         return super().default(o)
@@ -120,6 +120,10 @@ def _json_to_dataclass(json_dict: Dict[str, Any], cls: Any = None) -> Any:
             data[key] = None
             continue
 
+        # E.g. Union[bytes, memoryview]: decode into the first type.
+        if get_origin(T) is Union:
+            T = get_args(T)[0]
+
         if is_dataclass(T):
             data[key] = _json_to_dataclass(value, T)
             continue
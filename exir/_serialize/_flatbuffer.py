@@ -6,6 +6,7 @@
 
 # pyre-strict
 
+import functools
 import importlib.resources
 import os
 import re
@@ -15,7 +16,13 @@ import subprocess
 import tempfile
 
 from dataclasses import dataclass
-from typing import Callable, Dict, List, Optional, Sequence
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from executorch.exir._serialize._flatbuffer_builder import (
+    _DataclassSerializer,
+    _parse_schema,
+    _Schema,
+)
 
 # If this environment variable is set to true, save the flatc input files when
 # serialization fails.
@@ -120,6 +127,11 @@ class _ResourceFiles:
         for name in self._files.keys():
             self._files[name] = patch_fn(self._files[name])
 
+    @property
+    def files(self) -> Dict[str, bytes]:
+        """Maps each resource name to its current contents."""
+        return self._files
+
     def write_to(self, out_dir: str) -> None:
         """Writes the files to the specified directory. File names are based on
         the original resource names.
@@ -140,20 +152,24 @@ class _SchemaInfo:
     max_alignment: int
 
 
-def _prepare_schema(
-    out_dir: str,
+# The root program schema.
+_PROGRAM_SCHEMA: str = "program.fbs"
+# Included by the root program schema; must also be present.
+_PROGRAM_SCHEMA_DEPS: Sequence[str] = ("scalar_type.fbs",)
+
+
+def _load_program_schema_files(
     constant_tensor_alignment: Optional[int] = None,
     delegate_alignment: Optional[int] = None,
-) -> _SchemaInfo:
-    """Returns the path to the program schema file after copying it and its deps
-    into out_dir. May patch the schema contents depending on the parameters to
-    this function.
-    """
-    program_schema = "program.fbs"
-    # Included by the root program schema; must also be present.
-    deps = ["scalar_type.fbs"]
+) -> Tuple[_ResourceFiles, int]:
+    """Loads the program schema files, patching their alignments depending on
+    the parameters to this function.
 
-    schemas = _ResourceFiles([program_schema] + deps)
+    Returns:
+        The possibly-patched schema files, and an alignment value that can
+        satisfy all "force_align" entries found in them.
+    """
+    schemas = _ResourceFiles([_PROGRAM_SCHEMA] + list(_PROGRAM_SCHEMA_DEPS))
 
     # Update annotated alignments in the schema files.
     schemas.patch_files(
@@ -166,16 +182,47 @@ def _prepare_schema(
     # Find the largest alignment used in the patched schema files.
     get_alignments = _SchemaMaxAlignmentGetter()
     schemas.patch_files(get_alignments)
+    return schemas, get_alignments.max_alignment
+
+
+def _prepare_schema(
+    out_dir: str,
+    constant_tensor_alignment: Optional[int] = None,
+    delegate_alignment: Optional[int] = None,
+) -> _SchemaInfo:
+    """Returns the path to the program schema file after copying it and its deps
+    into out_dir. May patch the schema contents depending on the parameters to
+    this function.
+    """
+    schemas, max_alignment = _load_program_schema_files(
+        constant_tensor_alignment=constant_tensor_alignment,
+        delegate_alignment=delegate_alignment,
+    )
 
     # Write the patched schema files to the filesystem.
     schemas.write_to(out_dir)
 
     return _SchemaInfo(
-        root_path=os.path.join(out_dir, program_schema),
-        max_alignment=get_alignments.max_alignment,
+        root_path=os.path.join(out_dir, _PROGRAM_SCHEMA),
+        max_alignment=max_alignment,
     )
 
 
+@functools.lru_cache(maxsize=8)
+def _get_program_schema(
+    constant_tensor_alignment: Optional[int],
+    delegate_alignment: Optional[int],
+) -> Tuple[_Schema, int]:
+    """Returns the parsed program schema and its max alignment. Cached, since
+    the schema files don't change during the lifetime of the process.
+    """
+    schemas, max_alignment = _load_program_schema_files(
+        constant_tensor_alignment=constant_tensor_alignment,
+        delegate_alignment=delegate_alignment,
+    )
+    return _parse_schema(schemas.files, _PROGRAM_SCHEMA), max_alignment
+
+
 @dataclass
 class _FlatbufferResult:
     # Serialized flatbuffer data.
@@ -330,6 +377,39 @@ def _program_json_to_flatbuffer(
             )
 
 
+def _program_to_flatbuffer(
+    program: Any,
+    *,
+    constant_tensor_alignment: Optional[int] = None,
+    delegate_alignment: Optional[int] = None,
+) -> _FlatbufferResult:
+    """Converts a Program dataclass into binary flatbuffer data.
+
+    Writes the flatbuffer tables directly from the dataclasses instead of going
+    through JSON and `flatc`, but produces the same data as
+    `_program_json_to_flatbuffer()` would for the JSON form of the Program.
+
+    Args:
+        program: The Program to convert, using the dataclasses in
+            //executorch/exir/schema.py.
+        constant_tensor_alignment: If provided, the alignment to use for tensor
+            data embedded in the output flatbuffer data. If not provided, uses
+            the alignment in the schema.
+        delegate_alignment: If provided, the alignment to use for delegate
+            data embedded in the output flatbuffer data. If not provided, uses
+            the alignment in the schema.
+
+    Returns: The flatbuffer data and associated metadata.
+    """
+    schema, max_alignment = _get_program_schema(
+        constant_tensor_alignment, delegate_alignment
+    )
+    return _FlatbufferResult(
+        data=_DataclassSerializer(schema).serialize(program),
+        max_alignment=max_alignment,
+    )
+
+
 def _program_flatbuffer_to_json(program_flatbuffer: bytes) -> bytes:
     """Converts binary flatbuffer data into Program-compatible JSON.
 
@@ -0,0 +1,637 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+# All rights reserved.
+#
+# This source code is licensed under the BSD-style license found in the
+# LICENSE file in the root directory of this source tree.
+
+# pyre-strict
+
+"""Serializes dataclass trees (like those in exir/schema.py) to flatbuffers
+without going through JSON and the `flatc` tool.
+
+The output is byte-for-byte identical to what `flatc --binary` produces for the
+JSON created by `_DataclassEncoder`: objects are written in the same order as
+flatc's JSON parser would write them, table fields are sorted the same way,
+and vtables are deduplicated the same way.
+"""
+
+import re
+import struct
+from dataclasses import dataclass, field, fields
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+# Buffer-protocol objects that can be written into the output without copying.
+_Bytes = Union[bytes, bytearray, memoryview]
+
+# Flatbuffer scalar type name -> (struct format character, size in bytes).
+_SCALAR_TYPES: Dict[str, Tuple[str, int]] = {
+    "bool": ("?", 1),
+    "byte": ("b", 1),
+    "ubyte": ("B", 1),
+    "int8": ("b", 1),
+    "uint8": ("B", 1),
+    "short": ("h", 2),
+    "ushort": ("H", 2),
+    "int16": ("h", 2),
+    "uint16": ("H", 2),
+    "int": ("i", 4),
+    "uint": ("I", 4),
+    "int32": ("i", 4),
+    "uint32": ("I", 4),
+    "float": ("f", 4),
+    "float32": ("f", 4),
+    "long": ("q", 8),
+    "ulong": ("Q", 8),
+    "int64": ("q", 8),
+    "uint64": ("Q", 8),
+    "double": ("d", 8),
+    "float64": ("d", 8),
+}
+
+# Size in bytes of flatbuffer uoffset_t/soffset_t values.
+_OFFSET_SIZE: int = 4
+
+
+@dataclass
+class _FieldDef:
+    """A field of a flatbuffer table, as declared in the schema."""
+
+    name: str
+    # Type name of the field, or of the elements if is_vector is True. Names
+    # from the schema have their namespace stripped.
+    type_name: str
+    is_vector: bool
+    # Index of the field in the table's vtable. For union fields, this is the
+    # index of the value; the `<name>_type` field uses `id - 1`.
+    id: int
+    # Default value for scalar fields, as a string from the schema.
+    default: Optional[str] = None
+    # Value of the (force_align: N) attribute, if present.
+    force_align: Optional[int] = None
+
+
+@dataclass
+class _TableDef:
+    name: str
+    # Structs are parsed, but serializing them is not supported.
+    is_struct: bool = False
+    fields: Dict[str, _FieldDef] = field(default_factory=dict)
+
+
+@dataclass
+class _EnumDef:
+    name: str
+    # Underlying scalar type name.
+    type_name: str
+    values: Dict[str, int] = field(default_factory=dict)
+
+
+@dataclass
+class _Schema:
+    """The subset of a parsed flatbuffer schema needed to read and write data."""
+
+    tables: Dict[str, _TableDef] = field(default_factory=dict)
+    enums: Dict[str, _EnumDef] = field(default_factory=dict)
+    # Union name -> member table names, in declaration order. The type value
+    # of each member is its index in this list plus one; zero means NONE.
+    unions: Dict[str, List[str]] = field(default_factory=dict)
+    root_type: Optional[str] = None
+    file_identifier: Optional[str] = None
+
+
+def _strip_namespace(name: str) -> str:
+    return name.rsplit(".", 1)[-1]
+
+
+class _SchemaParser:
+    """Parses the subset of the flatbuffer schema language used by ExecuTorch
+    schemas: includes, namespaces, enums, unions, tables and structs.
+    """
+
+    _TOKEN_RE: "re.Pattern[str]" = re.compile(
+        r'"(?:[^"\\]|\\.)*"|[A-Za-z_][A-Za-z0-9_.]*|[-+]?[0-9][A-Za-z0-9_.+-]*|\S'
+    )
+
+    def __init__(self, files: Dict[str, bytes]) -> None:
+        # Map each file name to its contents, for resolving includes.
+        self._files: Dict[str, bytes] = files
+        self._parsed: set[str] = set()
+        self._schema: _Schema = _Schema()
+        self._tokens: List[str] = []
+        self._pos: int = 0
+
+    def parse(self, root_file: str) -> _Schema:
+        self._parse_file(root_file, is_root=True)
+        return self._schema
+
+    def _parse_file(self, name: str, is_root: bool) -> None:
+        if name in self._parsed:
+            return
+        self._parsed.add(name)
+        if name not in self._files:
+            raise ValueError(f"Schema file '{name}' not found")
+        text = re.sub(r"//[^\n]*", "", self._files[name].decode("utf-8"))
+        # Save the state of the including file.
+        saved = (self._tokens, self._pos)
+        self._tokens, self._pos = self._TOKEN_RE.findall(text), 0
+        while self._pos < len(self._tokens):
+            self._parse_statement(is_root)
+        self._tokens, self._pos = saved
+
+    def _next(self) -> str:
+        if self._pos >= len(self._tokens):
+            raise ValueError("Unexpected end of flatbuffer schema")
+        token = self._tokens[self._pos]
+        self._pos += 1
+        return token
+
+    def _peek(self) -> str:
+        return self._tokens[self._pos] if self._pos < len(self._tokens) else ""
+
+    def _expect(self, expected: str) -> None:
+        token = self._next()
+        if token != expected:
+            raise ValueError(f"Expected '{expected}' in schema, found '{token}'")
+
+    def _string(self) -> str:
+        token = self._next()
+        if not token.startswith('"'):
+            raise ValueError(f"Expected string in schema, found '{token}'")
+        return token[1:-1]
+
+    def _parse_attributes(self) -> Dict[str, Optional[str]]:
+        attributes: Dict[str, Optional[str]] = {}
+        if self._peek() != "(":
+            return attributes
+        self._expect("(")
+        while self._peek() != ")":
+            key = self._next()
+            value = None
+            if self._peek() == ":":
+                self._next()
+                value = self._next()
+            attributes[key] = value
+            if self._peek() == ",":
+                self._next()
+        self._expect(")")
+        return attributes
+
+    def _parse_statement(self, is_root: bool) -> None:
+        keyword = self._next()
+        if keyword == "include":
+            self._parse_file(self._string(), is_root=False)
+            self._expect(";")
+        elif keyword in ("namespace", "attribute", "file_extension"):
+            self._next()
+            self._expect(";")
+        elif keyword == "file_identifier":
+            identifier = self._string()
+            if is_root:
+                self._schema.file_identifier = identifier
+            self._expect(";")
+        elif keyword == "root_type":
+            root_type = _strip_namespace(self._next())
+            if is_root:
+                self._schema.root_type = root_type
+            self._expect(";")
+        elif keyword == "enum":
+            self._parse_enum()
+        elif keyword == "union":
+            self._parse_union()
+        elif keyword in ("table", "struct"):
+            self._parse_table(is_struct=keyword == "struct")
+        else:
+            raise ValueError(f"Unsupported flatbuffer schema statement '{keyword}'")
+
+    def _parse_enum(self) -> None:
+        name = self._next()
+        self._expect(":")
+        enum_def = _EnumDef(name=name, type_name=self._next())
+        self._parse_attributes()
+        self._expect("{")
+        value = 0
+        while self._peek() != "}":
+            key = self._next()
+            if self._peek() == "=":
+                self._next()
+                value = int(self._next(), 0)
+            enum_def.values[key] = value
+            value += 1
+            if self._peek() == ",":
+                self._next()
+        self._expect("}")
+        self._schema.enums[name] = enum_def
+
+    def _parse_union(self) -> None:
+        name = self._next()
+        self._parse_attributes()
+        self._expect("{")
+        members: List[str] = []
+        while self._peek() != "}":
+            member = self._next()
+            if self._peek() == ":":
+                raise ValueError(f"Aliased union members are not supported: {name}")
+            members.append(_strip_namespace(member))
+            if self._peek() == ",":
+                self._next()
+        self._expect("}")
+        self._schema.unions[name] = members
+
+    def _parse_table(self, is_struct: bool) -> None:
+        table = _TableDef(name=self._next(), is_struct=is_struct)
+        self._parse_attributes()
+        self._expect("{")
+        next_id = 0
+        while self._peek() != "}":
+            name = self._next()
+            self._expect(":")
+            is_vector = self._peek() == "["
+            if is_vector:
+                self._next()
+                type_name = _strip_namespace(self._next())
+                self._expect("]")
+            else:
+                type_name = _strip_namespace(self._next())
+            default = None
+            if self._peek() == "=":
+                self._next()
+                default = self._next()
+            attributes = self._parse_attributes()
+            self._expect(";")
+            if "id" in attributes:
+                raise ValueError(f"Explicit field ids are not supported: {name}")
+            # Unions occupy two slots: the type, then the value.
+            if not is_vector and type_name in self._schema.unions:
+                next_id += 1
+            force_align = attributes.get("force_align")
+            table.fields[name] = _FieldDef(
+                name=name,
+                type_name=type_name,
+                is_vector=is_vector,
+                id=next_id,
+                default=default,
+                force_align=int(force_align) if force_align is not None else None,
+            )
+            next_id += 1
+        self._expect("}")
+        self._schema.tables[table.name] = table
+
+
+def _parse_schema(files: Dict[str, bytes], root_file: str) -> _Schema:
+    """Parses the flatbuffer schema in `files[root_file]`, resolving includes
+    using the other entries of `files`.
+    """
+    return _SchemaParser(files).parse(root_file)
+
+
+def _scalar_info(schema: _Schema, type_name: str) -> Optional[Tuple[str, int]]:
+    """Returns the struct format and size of a scalar or enum type, or None if
+    the type is not a scalar.
+    """
+    enum_def = schema.enums.get(type_name)
+    if enum_def is not None:
+        type_name = enum_def.type_name
+    return _SCALAR_TYPES.get(type_name)
+
+
+def _default_value(schema: _Schema, field_def: _FieldDef) -> Any:
+    """Returns the default value of a scalar field."""
+    scalar = _scalar_info(schema, field_def.type_name)
+    fmt = scalar[0] if scalar is not None else ""
+    default = field_def.default
+    if default is None:
+        return False if fmt == "?" else 0.0 if fmt in ("f", "d") else 0
+    enum_def = schema.enums.get(field_def.type_name)
+    if enum_def is not None and default in enum_def.values:
+        return enum_def.values[default]
+    if default in ("true", "false"):
+        return default == "true"
+    if fmt in ("f", "d"):
+        return float(default)
+    return int(default, 0)
+
+
+def _field_offset(field_id: int) -> int:
+    """Returns the vtable offset of a field; see FieldIndexToOffset() in
+    flatbuffers/flatbuffer_builder.h.
+    """
+    return (field_id + 2) * 2
+
+
+class _Builder:
+    """A minimal flatbuffer builder that mirrors the C++ FlatBufferBuilder used
+    by flatc, so that it produces the same bytes.
+
+    Like the C++ builder, data is written back-to-front. Written chunks are
+    kept as a list instead of being copied into a single growing buffer, so
+    large byte vectors are only copied once, when the output is assembled.
+    """
+
+    def __init__(self) -> None:
+        # Chunks of the output, last chunk first.
+        self._chunks: List[_Bytes] = []
+        self._size: int = 0
+        self._minalign: int = 1
+        # Maps the contents of each vtable written so far to its offset.
+        self._vtables: Dict[bytes, int] = {}
+        # (vtable offset, location) of each field of the current table.
+        self._field_locs: List[Tuple[int, int]] = []
+        self._max_voffset: int = 0
+        self._table_start: int = 0
+
+    def _push(self, data: _Bytes) -> None:
+        self._chunks.append(data)
+        self._size += len(data)
+
+    def _pad(self, num_bytes: int) -> None:
+        if num_bytes > 0:
+            self._push(b"\x00" * num_bytes)
+
+    def _track_min_align(self, alignment: int) -> None:
+        if alignment > self._minalign:
+            self._minalign = alignment
+
+    def _align(self, elem_size: int) -> None:
+        self._track_min_align(elem_size)
+        self._pad(-self._size % elem_size)
+
+    def _prealign(self, length: int, alignment: int) -> None:
+        """Aligns so that `alignment` holds after writing `length` more bytes."""
+        if length == 0:
+            return
+        self._track_min_align(alignment)
+        self._pad(-(self._size + length) % alignment)
+
+    def _refer_to(self, offset: int) -> int:
+        self._align(_OFFSET_SIZE)
+        return self._size - offset + _OFFSET_SIZE
+
+    def _push_uoffset(self, value: int) -> int:
+        self._align(_OFFSET_SIZE)
+        self._push(struct.pack("<I", value))
+        return self._size
+
+    def create_string(self, value: str) -> int:
+        data = value.encode("utf-8")
+        self._prealign(len(data) + 1, _OFFSET_SIZE)
+        # Null terminator.
+        self._push(b"\x00")
+        self._push(data)
+        return self._push_uoffset(len(data))
+
+    def create_scalar_vector(
+        self,
+        fmt: str,
+        elem_size: int,
+        values: Union[_Bytes, List[Any]],
+        force_align: Optional[int] = None,
+    ) -> int:
+        """Writes a vector of scalars. `values` may be a bytes-like object if
+        the element type is one byte wide; it is then referenced, not copied.
+        """
+        length = len(values)
+        num_bytes = length * elem_size
+        if force_align is not None and force_align > 1:
+            self._prealign(num_bytes, force_align)
+        self._prealign(num_bytes, _OFFSET_SIZE)
+        self._prealign(num_bytes, elem_size)
+        if length > 0:
+            self._track_min_align(elem_size)
+            if isinstance(values, (bytes, bytearray, memoryview)):
+                if elem_size != 1:
+                    raise ValueError(
+                        f"Expected a list for vector of {elem_size}-byte elements"
+                    )
+                self._push(values)
+            else:
+                self._push(struct.pack(f"<{length}{fmt}", *values))
+        return self._push_uoffset(length)
+
+    def create_offset_vector(self, offsets: List[int]) -> int:
+        """Writes a vector of references to already-written objects."""
+        length = len(offsets)
+        self._prealign(length * _OFFSET_SIZE, _OFFSET_SIZE)
+        if length > 0:
+            self._track_min_align(_OFFSET_SIZE)
+            # Elements are written last-first, and each is relative to its
+            # own location.
+            end = self._size + length * _OFFSET_SIZE
+            relative = [
+                end - _OFFSET_SIZE * i - offset for i, offset in enumerate(offsets)
+            ]
+            self._push(struct.pack(f"<{length}I", *relative))
+        return self._push_uoffset(length)
+
+    def start_table(self) -> None:
+        self._field_locs = []
+        self._max_voffset = 0
+        self._table_start = self._size
+
+    def _track_field(self, field_offset: int) -> None:
+        self._field_locs.append((field_offset, self._size))
+        if field_offset > self._max_voffset:
+            self._max_voffset = field_offset
+
+    def add_scalar(self, field_offset: int, fmt: str, size: int, value: Any) -> None:
+        self._align(size)
+        self._push(struct.pack("<" + fmt, value))
+        self._track_field(field_offset)
+
+    def add_offset(self, field_offset: int, offset: int) -> None:
+        relative = self._refer_to(offset)
+        self._push(struct.pack("<I", relative))
+        self._track_field(field_offset)
+
+    def end_table(self) -> int:
+        self._align(_OFFSET_SIZE)
+        # Location of the table's soffset_t to its vtable, once written.
+        object_offset = self._size + _OFFSET_SIZE
+        # Include space for the last offset, and ensure that empty tables have
+        # a minimum size.
+        vtable_size = max(self._max_voffset + 2, _field_offset(0))
+        entries = [0] * (vtable_size // 2)
+        entries[0] = vtable_size
+        entries[1] = object_offset - self._table_start
+        for field_offset, loc in self._field_locs:
+            entries[field_offset // 2] = object_offset - loc
+        vtable = struct.pack(f"<{len(entries)}H", *entries)
+
+        # Reuse an identical vtable if one has already been written.
+        existing = self._vtables.get(vtable)
+        if existing is not None:
+            self._push(struct.pack("<i", existing - object_offset))
+        else:
+            self._push(struct.pack("<i", vtable_size))
+            self._push(vtable)
+            self._vtables[vtable] = self._size
+        self._field_locs = []
+        self._max_voffset = 0
+        return object_offset
+
+    def finish(self, root: int, file_identifier: Optional[str]) -> None:
+        ident = file_identifier.encode("ascii") if file_identifier else b""
+        self._prealign(_OFFSET_SIZE + len(ident), self._minalign)
+        if ident:
+            self._push(ident)
+        relative = self._refer_to(root)
+        self._push(struct.pack("<I", relative))
+
+    def __len__(self) -> int:
+        return self._size
+
+    def output(self) -> bytes:
+        """Returns the finished flatbuffer as a single `bytes` object."""
+        return b"".join(reversed(self._chunks))
+
+
+# A value to store in a table: (size, field offset, fmt, value). A fmt of None
+# means that the value is an offset to a child object.
+_TableEntry = Tuple[int, int, Optional[str], Any]
+
+
+class _DataclassSerializer:
+    """Writes a tree of dataclasses to a flatbuffer described by a schema.
+
+    Dataclass fields are visited in declaration order, matching the key order
+    of the JSON produced by `_DataclassEncoder`. Fields set to None are
+    omitted. Union-typed fields select the member table whose name matches the
+    name of the value's class.
+    """
+
+    def __init__(self, schema: _Schema) -> None:
+        self._schema: _Schema = schema
+        self._field_names: Dict[type, Tuple[str, ...]] = {}
+
+    def serialize(self, root: Any) -> bytes:
+        root_type = self._schema.root_type
+        if root_type is None:
+            raise ValueError("Flatbuffer schema does not declare a root_type")
+        builder = _Builder()
+        offset = self._write_table(builder, root_type, root)
+        builder.finish(offset, self._schema.file_identifier)
+        return builder.output()
+
+    def _get_field_names(self, cls: type) -> Tuple[str, ...]:
+        names = self._field_names.get(cls)
+        if names is None:
+            names = tuple(f.name for f in fields(cls))
+            self._field_names[cls] = names
+        return names
+
+    def _write_vector(self, builder: _Builder, field_def: _FieldDef, value: Any) -> int:
+        type_name = field_def.type_name
+        scalar = _scalar_info(self._schema, type_name)
+        if scalar is not None:
+            fmt, size = scalar
+            return builder.create_scalar_vector(
+                fmt, size, value, force_align=field_def.force_align
+            )
+        if type_name == "string":
+            return builder.create_offset_vector(
+                [builder.create_string(v) for v in value]
+            )
+        if type_name in self._schema.tables:
+            return builder.create_offset_vector(
+                [self._write_table(builder, type_name, v) for v in value]
+            )
+        raise ValueError(
+            f"Unsupported vector type [{type_name}] for field {field_def.name}"
+        )
+
+    def _write_child(self, builder: _Builder, field_def: _FieldDef, value: Any) -> int:
+        """Writes the vector, string or table referenced by a field and returns
+        its offset.
+        """
+        if field_def.is_vector:
+            return self._write_vector(builder, field_def, value)
+        if field_def.type_name == "string":
+            return builder.create_string(value)
+        return self._write_table(builder, field_def.type_name, value)
+
+    def _union_entries(
+        self, builder: _Builder, table_name: str, field_def: _FieldDef, value: Any
+    ) -> List[_TableEntry]:
+        """Writes the member table of a union field and returns the entries for
+        its offset and its type.
+        """
+        members = self._schema.unions[field_def.type_name]
+        member = type(value).__name__
+        if member not in members:
+            raise ValueError(
+                f"{member} is not a member of union {field_def.type_name} "
+                + f"for field {table_name}.{field_def.name}"
+            )
+        offset = self._write_table(builder, member, value)
+        field_offset = _field_offset(field_def.id)
+        return [
+            (_OFFSET_SIZE, field_offset, None, offset),
+            # The union type is a ubyte stored just before the value.
+            (1, field_offset - 2, "B", members.index(member) + 1),
+        ]
+
+    def _scalar_entries(
+        self, table_name: str, field_def: _FieldDef, value: Any
+    ) -> List[_TableEntry]:
+        scalar = _scalar_info(self._schema, field_def.type_name)
+        if scalar is None:
+            raise ValueError(
+                f"Unsupported type {field_def.type_name} for field "
+                + f"{table_name}.{field_def.name}"
+            )
+        # Like flatc, don't store values that are equal to the default.
+        if value == _default_value(self._schema, field_def):
+            return []
+        fmt, size = scalar
+        return [(size, _field_offset(field_def.id), fmt, value)]
+
+    def _field_entries(
+        self, builder: _Builder, table_name: str, field_def: _FieldDef, value: Any
+    ) -> List[_TableEntry]:
+        """Serializes the child objects of a field and returns the values to
+        store for it in its table.
+        """
+        type_name = field_def.type_name
+        if (
+            field_def.is_vector
+            or type_name == "string"
+            or type_name in self._schema.tables
+        ):
+            offset = self._write_child(builder, field_def, value)
+            return [(_OFFSET_SIZE, _field_offset(field_def.id), None, offset)]
+        if type_name in self._schema.unions:
+            return self._union_entries(builder, table_name, field_def, value)
+        return self._scalar_entries(table_name, field_def, value)
+
+    def _write_table(self, builder: _Builder, table_name: str, obj: Any) -> int:
+        table = self._schema.tables.get(table_name)
+        if table is None or table.is_struct:
+            raise ValueError(f"Cannot serialize '{table_name}' as a table")
+
+        # Serialize child objects first, in field order.
+        entries: List[_TableEntry] = []
+        for name in self._get_field_names(type(obj)):
+            value = getattr(obj, name)
+            if value is None:
+                continue
+            field_def = table.fields.get(name)
+            if field_def is None:
+                raise ValueError(f"Field '{name}' is not in table {table_name}")
+            entries.extend(self._field_entries(builder, table_name, field_def, value))
+
+        # Like flatc, add the fields sorted by decreasing size, and in reverse
+        # order for fields of the same size.
+        builder.start_table()
+        for size in (8, 4, 2, 1):
+            for entry_size, field_offset, fmt, value in reversed(entries):
+                if entry_size != size:
+                    continue
+                if fmt is None:
+                    builder.add_offset(field_offset, value)
+                else:
+                    try:
+                        builder.add_scalar(field_offset, fmt, size, value)
+                    except struct.error as err:
+                        raise ValueError(
+                            f"Bad value {value!r} for field in table {table_name}"
+                        ) from err
+        return builder.end_table()
@@ -0,0 +1,483 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+# All rights reserved.
+#
+# This source code is licensed under the BSD-style license found in the
+# LICENSE file in the root directory of this source tree.
+
+# pyre-strict
+
+"""Lazily reads flatbuffer data described by a parsed schema.
+
+Tables and vectors are exposed as views into the underlying buffer, which may
+be an mmap. Nothing is decoded until it is accessed, and byte vectors are
+returned as `memoryview` slices of the buffer instead of copies.
+"""
+
+import enum
+import struct
+from dataclasses import fields
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    get_args,
+    get_origin,
+    get_type_hints,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
+
+from executorch.exir._serialize._flatbuffer_builder import (
+    _default_value,
+    _field_offset,
+    _FieldDef,
+    _scalar_info,
+    _Schema,
+    _TableDef,
+)
+
+
+def _read_uoffset(buf: memoryview, pos: int) -> int:
+    return struct.unpack_from("<I", buf, pos)[0]
+
+
+class _VectorView:
+    """A lazily-decoded flatbuffer vector of scalars, strings or tables."""
+
+    __slots__ = ("_schema", "_buf", "_pos", "_len", "_type_name", "_fmt", "_size")
+
+    def __init__(
+        self, schema: _Schema, buf: memoryview, pos: int, type_name: str
+    ) -> None:
+        self._schema: _Schema = schema
+        self._buf: memoryview = buf
+        # Position of the first element.
+        self._pos: int = pos + 4
+        self._len: int = _read_uoffset(buf, pos)
+        self._type_name: str = type_name
+        scalar = _scalar_info(schema, type_name)
+        self._fmt: str = scalar[0] if scalar else "I"
+        self._size: int = scalar[1] if scalar else 4
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __getitem__(self, index: int) -> Any:
+        if index < 0:
+            index += self._len
+        if not 0 <= index < self._len:
+            raise IndexError(f"Vector index {index} out of range [0, {self._len})")
+        pos = self._pos + index * self._size
+        if self._type_name in self._schema.tables:
+            return _TableView(
+                self._schema,
+                self._schema.tables[self._type_name],
+                self._buf,
+                pos + _read_uoffset(self._buf, pos),
+            )
+        if self._type_name == "string":
+            return _read_string(self._buf, pos + _read_uoffset(self._buf, pos))
+        return struct.unpack_from("<" + self._fmt, self._buf, pos)[0]
+
+    def __iter__(self) -> Iterator[Any]:
+        for i in range(self._len):
+            yield self[i]
+
+    def to_list(self) -> list:  # pyre-ignore[24]
+        """Decodes all elements. Faster than iterating for scalar vectors."""
+        if self._type_name in self._schema.tables or self._type_name == "string":
+            return list(self)
+        return list(
+            struct.unpack_from(f"<{self._len}{self._fmt}", self._buf, self._pos)
+        )
+
+    def as_memoryview(self) -> memoryview:
+        """Returns the raw element data, without copying it."""
+        return self._buf[self._pos : self._pos + self._len * self._size]
+
+
+def _read_string(buf: memoryview, pos: int) -> str:
+    length = _read_uoffset(buf, pos)
+    return str(buf[pos + 4 : pos + 4 + length], "utf-8")
+
+
+class _TableView:
+    """A lazily-decoded flatbuffer table.
+
+    Fields are accessed by their schema names, either as attributes or with
+    get(). Absent scalar fields return their default value; other absent
+    fields return None. Vectors of single-byte scalars are returned as
+    `memoryview` slices of the underlying buffer; other vectors are returned
+    as `_VectorView`s.
+    """
+
+    __slots__ = ("_schema", "_table", "_buf", "_pos", "_vtable", "_vtable_size")
+
+    def __init__(
+        self, schema: _Schema, table: _TableDef, buf: memoryview, pos: int
+    ) -> None:
+        self._schema: _Schema = schema
+        self._table: _TableDef = table
+        self._buf: memoryview = buf
+        self._pos: int = pos
+        self._vtable: int = pos - struct.unpack_from("<i", buf, pos)[0]
+        self._vtable_size: int = struct.unpack_from("<H", buf, self._vtable)[0]
+
+    @property
+    def table_name(self) -> str:
+        return self._table.name
+
+    def _field_pos(self, field_id: int) -> int:
+        """Returns the position of a field's data, or 0 if it is absent."""
+        voffset = _field_offset(field_id)
+        if voffset >= self._vtable_size:
+            return 0
+        offset = struct.unpack_from("<H", self._buf, self._vtable + voffset)[0]
+        return self._pos + offset if offset else 0
+
+    def _field_def(self, name: str) -> _FieldDef:
+        field_def = self._table.fields.get(name)
+        if field_def is None:
+            raise AttributeError(f"Table {self._table.name} has no field '{name}'")
+        return field_def
+
+    def enum_name(self, name: str) -> str:
+        """Returns the name of the value of an enum field, as flatc would write
+        it, or the value as a string if it has no name.
+        """
+        value = self.get(name)
+        enum_def = self._schema.enums.get(self._field_def(name).type_name)
+        if enum_def is not None:
+            for enum_name, enum_value in enum_def.values.items():
+                if enum_value == value:
+                    return enum_name
+        return str(value)
+
+    def has(self, name: str) -> bool:
+        """Returns True if the field is present in the data."""
+        return self._field_pos(self._field_def(name).id) != 0
+
+    def get(self, name: str) -> Any:
+        field_def = self._field_def(name)
+        pos = self._field_pos(field_def.id)
+        type_name = field_def.type_name
+        schema = self._schema
+        if field_def.is_vector:
+            if not pos:
+                return None
+            pos += _read_uoffset(self._buf, pos)
+            vector = _VectorView(schema, self._buf, pos, type_name)
+            scalar = _scalar_info(schema, type_name)
+            if scalar is not None and scalar[1] == 1 and type_name != "bool":
+                return vector.as_memoryview()
+            return vector
+        if type_name in schema.unions:
+            type_pos = self._field_pos(field_def.id - 1)
+            member_index = self._buf[type_pos] if type_pos else 0
+            if not pos or member_index == 0:
+                return None
+            member = schema.unions[type_name][member_index - 1]
+            return _TableView(
+                schema,
+                schema.tables[member],
+                self._buf,
+                pos + _read_uoffset(self._buf, pos),
+            )
+        if type_name in schema.tables:
+            if not pos:
+                return None
+            return _TableView(
+                schema,
+                schema.tables[type_name],
+                self._buf,
+                pos + _read_uoffset(self._buf, pos),
+            )
+        if type_name == "string":
+            if not pos:
+                return None
+            return _read_string(self._buf, pos + _read_uoffset(self._buf, pos))
+        scalar = _scalar_info(schema, type_name)
+        if scalar is None:
+            raise ValueError(f"Unsupported type {type_name} for field {name}")
+        if not pos:
+            return _default_value(schema, field_def)
+        return struct.unpack_from("<" + scalar[0], self._buf, pos)[0]
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self.get(name)
+
+    def __repr__(self) -> str:
+        return f"<{self._table.name} view at offset {self._pos}>"
+
+
+def _root_table_view(schema: _Schema, buf: memoryview) -> _TableView:
+    """Returns a view of the root table of the flatbuffer data in `buf`."""
+    if schema.root_type is None:
+        raise ValueError("Flatbuffer schema does not declare a root_type")
+    if len(buf) < 8:
+        raise ValueError(f"Flatbuffer data length {len(buf)} < 8")
+    return _TableView(
+        schema, schema.tables[schema.root_type], buf, _read_uoffset(buf, 0)
+    )
+
+
+# Maps each dataclass type to its resolved field type hints.
+_TYPE_HINTS: Dict[type, Dict[str, Any]] = {}
+
+
+def _get_type_hints(cls: type) -> Dict[str, Any]:
+    hints = _TYPE_HINTS.get(cls)
+    if hints is None:
+        hints = get_type_hints(cls)
+        _TYPE_HINTS[cls] = hints
+    return hints
+
+
+_unpack_soffset = struct.Struct("<i").unpack_from
+_unpack_uoffset = struct.Struct("<I").unpack_from
+_unpack_voffset = struct.Struct("<H").unpack_from
+
+# Reads a field of a table, given the buffer, the position of the table and
+# the position and size of its vtable.
+_FieldReader = Callable[[memoryview, int, int, int], Any]
+
+# Maps (id of a table definition, dataclass type) to the table definition and
+# the readers for each field of the dataclass. Building the readers resolves
+# the type hints and schema lookups once, instead of once per table.
+_FIELD_READERS: Dict[Tuple[int, type], Tuple[_TableDef, List[_FieldReader]]] = {}
+
+
+# pyre-ignore[2]: `cls` can be any dataclass type.
+def _view_to_dataclass(view: _TableView, cls: Any) -> Any:
+    """Decodes a table view into an instance of the dataclass `cls`, with the
+    same results as converting the data to JSON with flatc and parsing it with
+    `_json_to_dataclass()`.
+    """
+    return _read_dataclass(view._schema, view._table, view._buf, view._pos, cls)
+
+
+# pyre-ignore[2]: `cls` can be any dataclass type.
+def _read_dataclass(
+    schema: _Schema, table: _TableDef, buf: memoryview, pos: int, cls: Any
+) -> Any:
+    key = (id(table), cls)
+    entry = _FIELD_READERS.get(key)
+    if entry is None or entry[0] is not table:
+        entry = (table, _make_field_readers(schema, table, cls))
+        _FIELD_READERS[key] = entry
+    vtable = pos - _unpack_soffset(buf, pos)[0]
+    vtable_size = _unpack_voffset(buf, vtable)[0]
+    return cls(*[read(buf, pos, vtable, vtable_size) for read in entry[1]])
+
+
+def _make_field_readers(
+    schema: _Schema, table: _TableDef, cls: type
+) -> List[_FieldReader]:
+    hints = _get_type_hints(cls)
+    readers = []
+    for f in fields(cls):
+        field_def = table.fields.get(f.name)
+        if field_def is None:
+            raise AttributeError(f"Table {table.name} has no field '{f.name}'")
+        readers.append(_make_field_reader(schema, field_def, hints[f.name]))
+    return readers
+
+
+# pyre-ignore[2]: `hint` can be any type.
+def _make_missing(name: str, hint: Any, optional: bool) -> Callable[[], Any]:
+    """Returns the function that produces the value of an absent field."""
+
+    def missing() -> None:
+        if optional:
+            return None
+        raise TypeError(
+            f"Invalid Buffer. Received no value for field: {name}, "
+            + f"but {name} : {hint} is not an Optional type."
+        )
+
+    return missing
+
+
+def _make_union_reader(
+    schema: _Schema,
+    field_def: _FieldDef,
+    member_classes: Dict[str, Any],
+    missing: Callable[[], Any],
+) -> _FieldReader:
+    members = schema.unions[field_def.type_name]
+    voffset = _field_offset(field_def.id)
+    type_voffset = _field_offset(field_def.id - 1)
+
+    def read_union(buf: memoryview, pos: int, vtable: int, size: int) -> Any:
+        member_index = 0
+        if type_voffset < size:
+            offset = _unpack_voffset(buf, vtable + type_voffset)[0]
+            if offset:
+                member_index = buf[pos + offset]
+        if member_index and voffset < size:
+            offset = _unpack_voffset(buf, vtable + voffset)[0]
+            if offset:
+                pos += offset
+                member = members[member_index - 1]
+                return _read_dataclass(
+                    schema,
+                    schema.tables[member],
+                    buf,
+                    pos + _unpack_uoffset(buf, pos)[0],
+                    member_classes[member],
+                )
+        return missing()
+
+    return read_union
+
+
+def _make_offset_reader(
+    schema: _Schema,
+    field_def: _FieldDef,
+    hint: Any,  # pyre-ignore[2]
+    missing: Callable[[], Any],
+) -> _FieldReader:
+    voffset = _field_offset(field_def.id)
+    decode = _make_offset_decoder(schema, field_def, hint)
+
+    def read_offset(buf: memoryview, pos: int, vtable: int, size: int) -> Any:
+        if voffset < size:
+            offset = _unpack_voffset(buf, vtable + voffset)[0]
+            if offset:
+                pos += offset
+                return decode(buf, pos + _unpack_uoffset(buf, pos)[0])
+        return missing()
+
+    return read_offset
+
+
+def _make_scalar_reader(
+    schema: _Schema, field_def: _FieldDef, hint: Any  # pyre-ignore[2]
+) -> _FieldReader:
+    type_name = field_def.type_name
+    scalar = _scalar_info(schema, type_name)
+    if scalar is None:
+        raise ValueError(f"Unsupported type {type_name} for field {field_def.name}")
+    voffset = _field_offset(field_def.id)
+    unpack = struct.Struct("<" + scalar[0]).unpack_from
+    convert = _scalar_converter(schema, type_name, scalar[0], hint)
+    default = _default_value(schema, field_def)
+    if convert is not None:
+        default = convert(default)
+
+    def read_scalar(buf: memoryview, pos: int, vtable: int, size: int) -> Any:
+        if voffset < size:
+            offset = _unpack_voffset(buf, vtable + voffset)[0]
+            if offset:
+                value = unpack(buf, pos + offset)[0]
+                return value if convert is None else convert(value)
+        return default
+
+    return read_scalar
+
+
+# pyre-ignore[2]: `hint` can be any type.
+def _make_field_reader(
+    schema: _Schema, field_def: _FieldDef, hint: Any
+) -> _FieldReader:
+    args = [hint]
+    optional = False
+    if get_origin(hint) is Union:
+        args = [a for a in get_args(hint) if a is not type(None)]
+        optional = len(args) < len(get_args(hint))
+    missing = _make_missing(field_def.name, hint, optional)
+
+    type_name = field_def.type_name
+    if not field_def.is_vector and type_name in schema.unions:
+        # Find the dataclass with the same name as each member table.
+        member_classes = {a.__name__: a for a in args}
+        return _make_union_reader(schema, field_def, member_classes, missing)
+    if field_def.is_vector or type_name in schema.tables or type_name == "string":
+        return _make_offset_reader(schema, field_def, args[0], missing)
+    return _make_scalar_reader(schema, field_def, args[0])
+
+
+def _scalar_converter(
+    schema: _Schema, type_name: str, fmt: str, hint: Any  # pyre-ignore[2]
+) -> Optional[Callable[[Any], Any]]:
+    """Returns the function that converts a scalar read from the buffer to the
+    type of its dataclass field, or None if no conversion is needed.
+    """
+    enum_def = schema.enums.get(type_name)
+    if enum_def is not None and hint is str:
+        # flatc writes enum values by name.
+        names = {v: k for k, v in enum_def.values.items()}
+        return lambda value: names.get(value, str(value))
+    if (
+        (hint is int and fmt not in ("?", "f", "d"))
+        or (hint is float and fmt in ("f", "d"))
+        or (hint is bool and fmt == "?")
+    ):
+        return None
+    return hint
+
+
+# pyre-ignore[2]: `hint` can be any type.
+def _make_offset_decoder(
+    schema: _Schema, field_def: _FieldDef, hint: Any
+) -> Callable[[memoryview, int], Any]:
+    """Returns a function that decodes the string, table or vector at a
+    position in the buffer.
+    """
+    type_name = field_def.type_name
+    if not field_def.is_vector:
+        if type_name == "string":
+            return _read_string
+        table = schema.tables[type_name]
+        return lambda buf, pos: _read_dataclass(schema, table, buf, pos, hint)
+
+    if hint is bytes:
+        return lambda buf, pos: bytes(
+            buf[pos + 4 : pos + 4 + _unpack_uoffset(buf, pos)[0]]
+        )
+    (elem_hint,) = get_args(hint)
+    if type_name == "string":
+
+        def decode_strings(buf: memoryview, pos: int) -> List[str]:
+            start = pos + 4
+            end = start + 4 * _unpack_uoffset(buf, pos)[0]
+            return [
+                _read_string(buf, p + _unpack_uoffset(buf, p)[0])
+                for p in range(start, end, 4)
+            ]
+
+        return decode_strings
+
+    if type_name in schema.tables:
+        table = schema.tables[type_name]
+
+        def decode_tables(buf: memoryview, pos: int) -> List[Any]:
+            start = pos + 4
+            end = start + 4 * _unpack_uoffset(buf, pos)[0]
+            return [
+                _read_dataclass(
+                    schema, table, buf, p + _unpack_uoffset(buf, p)[0], elem_hint
+                )
+                for p in range(start, end, 4)
+            ]
+
+        return decode_tables
+
+    scalar = _scalar_info(schema, type_name)
+    if scalar is None:
+        raise ValueError(f"Unsupported type {type_name} for field {field_def.name}")
+    fmt = scalar[0]
+    convert = elem_hint if isinstance(elem_hint, enum.EnumMeta) else None
+
+    def decode_scalars(buf: memoryview, pos: int) -> List[Any]:
+        items = list(
+            struct.unpack_from(f"<{_unpack_uoffset(buf, pos)[0]}{fmt}", buf, pos + 4)
+        )
+        return items if convert is None else [convert(v) for v in items]
+
+    return decode_scalars
@@ -6,19 +6,27 @@
 
 # pyre-strict
 
-import copy
+import hashlib
 import json
+import logging
+import mmap
 import re
 
-from dataclasses import dataclass
-from typing import ClassVar, List, Literal, Optional, Tuple
+from dataclasses import dataclass, replace
+from typing import Any, ClassVar, Dict, List, Literal, Optional, Tuple, Union
 
 from executorch.exir._serialize._cord import Cord
 from executorch.exir._serialize._dataclass import _DataclassEncoder, _json_to_dataclass
 from executorch.exir._serialize._flatbuffer import (
     _FlatbufferResult,
-    _program_flatbuffer_to_json,
-    _program_json_to_flatbuffer,
+    _get_program_schema,
+    _program_to_flatbuffer,
+)
+from executorch.exir._serialize._flatbuffer_reader import (
+    _root_table_view,
+    _TableView,
+    _VectorView,
+    _view_to_dataclass,
 )
 
 from executorch.exir.schema import (
@@ -27,12 +35,17 @@ from executorch.exir.schema import (
     Buffer,
     DataLocation,
     DataSegment,
+    EValue,
     Program,
     SubsegmentOffsets,
+    Tensor,
 )
 from executorch.exir.tensor import ALIGNMENT
 
 
+# Pattern that the file_identifier of serialized programs must match.
+_PROGRAM_MAGIC_REGEX: str = r"ET[0-9a-zA-Z][0-9a-zA-Z]"
+
 # Byte order of numbers written to program headers. Always little-endian
 # regardless of the host system, since all commonly-used modern CPUs are little
 # endian.
@@ -254,6 +267,9 @@ def _extract_delegate_segments(
     """
     remaining_inline: List[BackendDelegateInlineData] = []
     inline_indices_seen: set[int] = set()
+    # Maps the original backend_delegate_data index to the reference that
+    # replaced it, so delegates sharing the same data keep sharing it.
+    new_references: Dict[int, BackendDelegateDataReference] = {}
     for plan in program.execution_plan:
         for delegate in plan.delegates:
             if delegate.processed.location != DataLocation.INLINE:
@@ -261,6 +277,9 @@ def _extract_delegate_segments(
                     "Program must only contain inline delegate data, "
                     + f"saw {repr(delegate)}"
                 )
+            if delegate.processed.index in new_references:
+                delegate.processed = replace(new_references[delegate.processed.index])
+                continue
             # TODO(T144120904): Don't extract small blobs into segments;
             # have a cutoff. Or callers could provide a callback that
             # returns true/false for a given BackendDelegate, letting them
@@ -276,8 +295,9 @@ def _extract_delegate_segments(
                     + f"{len(program.backend_delegate_data)} "
                     + f"in {repr(delegate)}"
                 )
-            inline_indices_seen.add(delegate.processed.index)
-            if inline.data:
+            original_index = delegate.processed.index
+            inline_indices_seen.add(original_index)
+            if memoryview(inline.data).nbytes > 0:
                 # Move the delegate data out of the program.
                 segment_index = len(segments)
                 segments.append(Cord(inline.data))
@@ -291,6 +311,7 @@ def _extract_delegate_segments(
                 new_index = len(remaining_inline)
                 remaining_inline.append(inline)
                 delegate.processed.index = new_index
+            new_references[original_index] = delegate.processed
 
     # Make sure we visited all entries in backend_delegate_data, so that it's
     # safe to overwrite it.
@@ -311,8 +332,11 @@ def _extract_constant_segment(
     constant_buffer: List[Buffer],
     tensor_alignment: Optional[int] = None,
 ) -> Tuple[Cord, List[int]]:
-    """Copies the tensors from the provided list into a Cord and tracks the offsets
-        of each tensor.
+    """Collects references to the tensors from the provided list into a Cord and
+        tracks the offsets of each tensor.
+
+    The tensor storage may be `bytes` or any other object that supports the
+    buffer protocol; it is not copied.
 
     Args:
         constant_buffer: list of Buffers from which to extract constants from. Not modified.
@@ -328,7 +352,7 @@ def _extract_constant_segment(
     for i in range(len(constant_buffer)):
         buffer = constant_buffer[i]
         constant_segment_data.append(buffer.storage)
-        buffer_length = len(buffer.storage)
+        buffer_length = len(constant_segment_data) - current_offset
         pad_length = (
             _padding_required(buffer_length, tensor_alignment)
             if tensor_alignment is not None
@@ -342,6 +366,141 @@ def _extract_constant_segment(
     return constant_segment_data, constant_segment_offsets
 
 
+# pyre-ignore[2]: Blobs can be any objects that support the buffer protocol.
+def _content_keys(blobs: List[Any]) -> List[Optional[Tuple[int, bytes]]]:
+    """Returns a key for each blob that is equal for blobs with equal contents.
+
+    Only blobs that share their size with another blob are hashed; the others
+    get a None key, since they cannot have a duplicate.
+    """
+    sizes = [memoryview(blob).nbytes for blob in blobs]
+    size_counts: Dict[int, int] = {}
+    for size in sizes:
+        size_counts[size] = size_counts.get(size, 0) + 1
+    return [
+        (size, hashlib.sha256(blob).digest()) if size_counts[size] > 1 else None
+        for size, blob in zip(sizes, blobs)
+    ]
+
+
+# pyre-ignore[2]: Blobs can be any objects that support the buffer protocol.
+def _unique_indices(blobs: List[Any]) -> Tuple[List[int], int]:
+    """Finds the first occurrence of each blob's contents.
+
+    Returns:
+        A tuple of (the index of the first blob with the same contents as each
+        blob, the number of bytes in blobs that duplicate an earlier blob).
+    """
+    first_index: Dict[Tuple[int, bytes], int] = {}
+    unique_indices: List[int] = []
+    duplicate_bytes = 0
+    for i, key in enumerate(_content_keys(blobs)):
+        if key is None:
+            unique_indices.append(i)
+            continue
+        unique_indices.append(first_index.setdefault(key, i))
+        if unique_indices[i] != i:
+            duplicate_bytes += key[0]
+    return unique_indices, duplicate_bytes
+
+
+def _remap_constant_tensor(evalue: EValue, index_map: List[int]) -> EValue:
+    """Returns `evalue`, or a copy pointing to the remapped constant buffer."""
+    tensor = evalue.val
+    if (
+        not isinstance(tensor, Tensor)
+        # Tensors with allocation info are not constants; their buffer index
+        # refers to the mutable data.
+        or tensor.allocation_info is not None
+        or index_map[tensor.data_buffer_idx] == tensor.data_buffer_idx
+    ):
+        return evalue
+    return EValue(
+        val=replace(tensor, data_buffer_idx=index_map[tensor.data_buffer_idx])
+    )
+
+
+def _deduplicate_program_data(program: Program) -> int:
+    """Removes constant buffers and delegate data blobs whose contents are
+    identical to an earlier entry, rewriting the indices that refer to them.
+
+    Modifies `program` in place, but does not modify any of the tables that it
+    shares with the original program when created by `_shallow_copy_program()`.
+    The reserved, empty constant buffer at index 0 is always left in place.
+    Mutable data is never deduplicated, since it is written at runtime.
+
+    Returns:
+        The number of data bytes removed from the program.
+    """
+    saved_bytes = 0
+
+    # Constant buffers.
+    unique, duplicate_bytes = _unique_indices(
+        [buffer.storage for buffer in program.constant_buffer[1:]]
+    )
+    if duplicate_bytes > 0:
+        saved_bytes += duplicate_bytes
+        # Account for the reserved entry at index 0.
+        unique = [0] + [i + 1 for i in unique]
+        index_map: List[int] = []
+        constant_buffer: List[Buffer] = []
+        for i, buffer in enumerate(program.constant_buffer):
+            if unique[i] == i:
+                index_map.append(len(constant_buffer))
+                constant_buffer.append(buffer)
+            else:
+                index_map.append(index_map[unique[i]])
+        program.constant_buffer = constant_buffer
+        for plan in program.execution_plan:
+            plan.values = [_remap_constant_tensor(v, index_map) for v in plan.values]
+
+    # Delegate data blobs.
+    unique, duplicate_bytes = _unique_indices(
+        [inline.data for inline in program.backend_delegate_data]
+    )
+    if duplicate_bytes > 0:
+        saved_bytes += duplicate_bytes
+        index_map = []
+        backend_delegate_data: List[BackendDelegateInlineData] = []
+        for i, inline in enumerate(program.backend_delegate_data):
+            if unique[i] == i:
+                index_map.append(len(backend_delegate_data))
+                backend_delegate_data.append(inline)
+            else:
+                index_map.append(index_map[unique[i]])
+        program.backend_delegate_data = backend_delegate_data
+        for plan in program.execution_plan:
+            for delegate in plan.delegates:
+                if delegate.processed.location == DataLocation.INLINE:
+                    delegate.processed.index = index_map[delegate.processed.index]
+
+    return saved_bytes
+
+
+def _shallow_copy_program(program: Program) -> Program:
+    """Returns a copy of the program that can be modified by
+    serialize_pte_binary() without affecting the original.
+
+    Lists and tables that serialization replaces or mutates are copied, but
+    potentially large leaf data like Buffer.storage and
+    BackendDelegateInlineData.data is shared with the original program.
+    """
+    return replace(
+        program,
+        execution_plan=[
+            replace(
+                plan,
+                delegates=[
+                    replace(delegate, processed=replace(delegate.processed))
+                    for delegate in plan.delegates
+                ],
+            )
+            for plan in program.execution_plan
+        ],
+        segments=list(program.segments),
+    )
+
+
 def serialize_pte_binary(
     program: Program,
     *,
@@ -351,6 +510,7 @@ def serialize_pte_binary(
     segment_alignment: int = 4096,
     constant_tensor_alignment: Optional[int] = None,
     delegate_alignment: Optional[int] = None,
+    deduplicate_data: bool = False,
 ) -> Cord:
     """Returns the runtime binary representation of the given Program.
 
@@ -372,6 +532,9 @@ def serialize_pte_binary(
         delegate_alignment: If provided, the minimum alignment of delegate data
             in the program. Must be a power of 2. If not provided, uses the
             value in the schema file.
+        deduplicate_data: Whether to store constant buffers and delegate data
+            blobs with identical contents only once, pointing all of their
+            users at the same copy.
     Returns:
         The serialized form of the Program, ready for execution by the runtime.
     """
@@ -379,10 +542,13 @@ def serialize_pte_binary(
     if constant_tensor_alignment is None:
         constant_tensor_alignment = ALIGNMENT
 
-    # Don't modify the original program.
-    # TODO(T144120904): Could avoid yet more huge copies with a more shallow
-    # copy, reusing the actual data blobs.
-    program = copy.deepcopy(program)
+    # Don't modify the original program. Only the containers that serialization
+    # rewrites are copied; the tensor and delegate data blobs are shared.
+    program = _shallow_copy_program(program)
+
+    if deduplicate_data:
+        saved_bytes = _deduplicate_program_data(program)
+        logging.info(f"Deduplicated program data, saving {saved_bytes} bytes")
 
     # Store extracted segment data; this may be constant data or delegate data.
     segments: List[Cord] = []
@@ -441,8 +607,8 @@ def serialize_pte_binary(
         segments_data.append(data)
 
     # Convert to a standard flatbuffer binary.
-    result: _FlatbufferResult = _program_json_to_flatbuffer(
-        _program_to_json(program),
+    result: _FlatbufferResult = _program_to_flatbuffer(
+        program,
         constant_tensor_alignment=constant_tensor_alignment,
         delegate_alignment=delegate_alignment,
     )
@@ -472,20 +638,18 @@ def serialize_pte_binary(
     ).to_bytes()
     header_data = _pad_to(header_data, padded_header_length)
 
-    # Insert the header into the flatbuffer data.
-    program_data: bytes = _insert_flatbuffer_header(
-        flatbuffer_data=result.data,
-        magic_regex=r"ET[0-9a-zA-Z][0-9a-zA-Z]",
+    # Insert the header after the first 8 bytes of the flatbuffer data. Only
+    # the root offset and magic are rewritten; the rest of the flatbuffer data,
+    # which can be O(10MB to 100MB), is referenced rather than copied.
+    program_prefix: bytes = _insert_flatbuffer_header(
+        flatbuffer_data=result.data[:8],
+        magic_regex=_PROGRAM_MAGIC_REGEX,
         header_data=header_data,
     )
-    assert len(program_data) == program_size
-
-    # Potentially large. Try to free it as soon as we can.
-    del result.data
 
     # Double-check that the extended header is in the right place and has the
     # right contents.
-    eh = _get_extended_header(program_data)
+    eh = _get_extended_header(program_prefix)
     assert eh is not None
     assert eh.program_size == program_size
     assert eh.segment_base_offset == segment_base_offset
@@ -493,7 +657,9 @@ def serialize_pte_binary(
     # Construct the final pte file containing:
     # - program data; written to offset 0.
     # - segments data (optional); aligned to segment_alignment.
-    pte_data = Cord(program_data)
+    pte_data = Cord(program_prefix)
+    pte_data.append(memoryview(result.data)[8:])
+    assert len(pte_data) == program_size
     if len(segments_data) > 0:
         padding_length = _padding_required(len(pte_data), segment_alignment)
         pte_data.append(b"\x00" * padding_length)
@@ -505,7 +671,9 @@ def serialize_pte_binary(
     return pte_data
 
 
-def _restore_segments(program: Program, segment_data: bytes) -> Program:
+def _restore_segments(
+    program: Program, segment_data: Union[bytes, memoryview]
+) -> Program:
     """Moves segments from `segment_data` into `program`.
 
     This should recreate the original Program that the segments were extracted
@@ -528,7 +696,9 @@ def _restore_segments(program: Program, segment_data: bytes) -> Program:
             raise ValueError(
                 f"Segment {i} {segment} overflows data length {len(segment_data)}"
             )
-        segments.append(segment_data[segment.offset : segment.offset + segment.size])
+        segments.append(
+            bytes(segment_data[segment.offset : segment.offset + segment.size])
+        )
 
     # Find and replace the Program's references to these segments, inlining the
     # data.
@@ -557,27 +727,157 @@ def _restore_segments(program: Program, segment_data: bytes) -> Program:
     return program
 
 
+class PTEFile:
+    """A read-only view of serialized program data, decoded lazily on access.
+
+    When created with `PTEFile.open()`, the file is mmapped and only the pages
+    holding the accessed fields are read. Byte data, like constant buffers,
+    delegate data and segments, is returned as `memoryview` slices of the
+    underlying data instead of copies. Release any such slices before calling
+    `close()`.
+    """
+
+    def __init__(self, data: Union[bytes, bytearray, memoryview, mmap.mmap]) -> None:
+        """Wraps runtime binary data, as produced by `serialize_pte_binary()`.
+
+        Raises:
+            ValueError: If the data does not look like a serialized program.
+        """
+        self._mmap: Optional[mmap.mmap] = None
+        self._data: memoryview = memoryview(data)
+        if len(self._data) < 8:
+            raise ValueError(f"Program data length {len(self._data)} < 8")
+        magic = bytes(self._data[4:8]).decode(errors="replace")
+        if not re.match(_PROGRAM_MAGIC_REGEX, magic):
+            raise ValueError(
+                f"Program data magic bytes {repr(magic)} "
+                + f"does not match pattern /{_PROGRAM_MAGIC_REGEX}/"
+            )
+
+        # Look for an extended header to see if segments follow the flatbuffer
+        # data.
+        self.header: Optional[_ExtendedHeader] = _get_extended_header(
+            bytes(self._data[: 8 + _ExtendedHeader.EXPECTED_LENGTH])
+        )
+        program_size = len(self._data)
+        self.segment_base_offset: int = 0
+        if self.header is not None:
+            program_size = self.header.program_size
+            self.segment_base_offset = self.header.segment_base_offset
+
+        schema, _ = _get_program_schema(None, None)
+        self._program_data: memoryview = self._data[:program_size]
+        self._program: _TableView = _root_table_view(schema, self._program_data)
+
+    @staticmethod
+    def open(path: str) -> "PTEFile":
+        """Returns a PTEFile backed by a read-only mmap of the file at `path`."""
+        with open(path, "rb") as fp:
+            mapped = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        pte = PTEFile(mapped)
+        pte._mmap = mapped
+        return pte
+
+    def close(self) -> None:
+        """Releases the underlying data, unmapping the file if needed."""
+        self._program_data.release()
+        self._data.release()
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    def __enter__(self) -> "PTEFile":
+        return self
+
+    # pyre-ignore[2]: Exception info is unused.
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    @property
+    def program(self) -> _TableView:
+        """A view of the root Program table.
+
+        Fields are accessed by the names used in //executorch/schema/program.fbs,
+        e.g. `pte.program.execution_plan[0].name`.
+        """
+        return self._program
+
+    @property
+    def execution_plans(self) -> _VectorView:
+        return self._program.execution_plan
+
+    def operators(self, plan_index: int = 0) -> List[Tuple[str, str]]:
+        """Returns the (name, overload) of each operator used by a plan."""
+        return [
+            (op.name, op.overload)
+            for op in self.execution_plans[plan_index].operators or []
+        ]
+
+    def segment_data(self, segment_index: int) -> memoryview:
+        """Returns the data of an entry in Program.segments."""
+        segment = self._program.segments[segment_index]
+        start = self.segment_base_offset + segment.offset
+        end = start + segment.size
+        if self.segment_base_offset == 0 or end > len(self._data):
+            raise ValueError(
+                f"Segment {segment_index} [{start}, {end}) is outside of the "
+                + f"data of length {len(self._data)}"
+            )
+        return self._data[start:end]
+
+    def constant_data(self, buffer_index: int) -> memoryview:
+        """Returns the data of a constant buffer, whether it is stored inline or
+        in the constant segment.
+
+        Data stored in the constant segment may be followed by the padding that
+        aligns the next buffer.
+        """
+        constant_buffer = self._program.constant_buffer
+        if constant_buffer is not None and len(constant_buffer) > 0:
+            return constant_buffer[buffer_index].storage
+        constant_segment = self._program.constant_segment
+        offsets = constant_segment.offsets if constant_segment is not None else None
+        if not offsets:
+            raise ValueError(
+                f"Constant buffer {buffer_index} is outside of the program, which "
+                + "has no constant data"
+            )
+        data = self.segment_data(constant_segment.segment_index)
+        start = offsets[buffer_index]
+        end = (
+            offsets[buffer_index + 1] if buffer_index + 1 < len(offsets) else len(data)
+        )
+        return data[start:end]
+
+    def delegate_data(self, plan_index: int, delegate_index: int) -> memoryview:
+        """Returns the processed data of a delegate, whether it is stored inline
+        or in a segment.
+        """
+        delegate = self.execution_plans[plan_index].delegates[delegate_index]
+        processed = delegate.processed
+        if processed.location == DataLocation.INLINE:
+            return self._program.backend_delegate_data[processed.index].data
+        return self.segment_data(processed.index)
+
+    def to_program(self) -> Program:
+        """Decodes the entire flatbuffer into a Program.
+
+        Segment data is not copied into the Program; see
+        `deserialize_pte_binary()` for that.
+        """
+        return _view_to_dataclass(self._program, Program)
+
+
 def deserialize_pte_binary(program_data: bytes) -> Program:
     """Returns a Program deserialized from the given runtime binary data."""
-    program_size = len(program_data)
-    segment_base_offset = 0
-
-    # Look for an extended header to see if segments follow the flatbuffer
-    # data.
-    eh: Optional[_ExtendedHeader] = _get_extended_header(program_data)
-    if eh and eh.is_valid():
-        program_size = eh.program_size
-        segment_base_offset = eh.segment_base_offset
-
-    # Parse the flatbuffer data.
-    program: Program = _json_to_program(
-        _program_flatbuffer_to_json(program_data[:program_size])
-    )
+    pte = PTEFile(program_data)
+    program: Program = pte.to_program()
 
-    if segment_base_offset != 0:
+    if pte.segment_base_offset != 0:
         # Move segment data back into the Program.
         program = _restore_segments(
-            program=program, segment_data=program_data[segment_base_offset:]
+            program=program,
+            segment_data=memoryview(program_data)[pte.segment_base_offset :],
         )
 
     return program
@@ -0,0 +1,74 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+# All rights reserved.
+#
+# This source code is licensed under the BSD-style license found in the
+# LICENSE file in the root directory of this source tree.
+
+"""Compares the native flatbuffer builder against the JSON + flatc path.
+
+Example:
+    python -m executorch.exir._serialize.test.flatbuffer_benchmark \\
+        --num-constants 64 --constant-size 1048576
+"""
+
+import argparse
+import os
+import time
+from typing import Callable, Tuple
+
+from executorch.exir._serialize._flatbuffer import (
+    _FlatbufferResult,
+    _program_json_to_flatbuffer,
+    _program_to_flatbuffer,
+)
+from executorch.exir._serialize._program import _program_to_json
+from executorch.exir.schema import Buffer, EValue, Int, IntList, Program
+from executorch.exir.tests.common import get_test_program
+
+
+def make_program(num_constants: int, constant_size: int, num_values: int) -> Program:
+    """Returns a Program with synthetic constant data and values."""
+    program = get_test_program()
+    for _ in range(num_constants):
+        program.constant_buffer.append(Buffer(storage=os.urandom(constant_size)))
+    values = program.execution_plan[0].values
+    for i in range(num_values):
+        values.append(EValue(val=Int(int_val=i) if i % 2 else IntList(items=[i, 1])))
+    return program
+
+
+def time_call(fn: Callable[[], _FlatbufferResult]) -> Tuple[float, bytes]:
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result.data
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--num-constants", type=int, default=32)
+    parser.add_argument("--constant-size", type=int, default=1024 * 1024)
+    parser.add_argument("--num-values", type=int, default=10000)
+    parser.add_argument(
+        "--skip-flatc", action="store_true", help="Only time the native builder."
+    )
+    args = parser.parse_args()
+
+    program = make_program(args.num_constants, args.constant_size, args.num_values)
+    total_mb = args.num_constants * args.constant_size / (1024 * 1024)
+    print(f"Program with {total_mb:.1f} MiB of constants, {args.num_values} values")
+
+    native_time, native_data = time_call(lambda: _program_to_flatbuffer(program))
+    print(f"native builder: {native_time:8.3f}s ({len(native_data)} bytes)")
+    if args.skip_flatc:
+        return
+
+    flatc_time, flatc_data = time_call(
+        lambda: _program_json_to_flatbuffer(_program_to_json(program))
+    )
+    print(f"JSON + flatc:   {flatc_time:8.3f}s ({len(flatc_data)} bytes)")
+    print(f"speedup: {flatc_time / native_time:.1f}x")
+    print(f"identical output: {native_data == flatc_data}")
+
+
+if __name__ == "__main__":
+    main()  # pragma: no cover
@@ -6,8 +6,11 @@
 
 
 import io
+import tempfile
 import unittest
 
+import numpy as np
+
 from executorch.exir._serialize._cord import Cord
 
 
@@ -53,6 +56,65 @@ class TestCord(unittest.TestCase):
         self.assertEqual(id(cord2._buffers[1]), id(cord._buffers[0]))
         self.assertEqual(id(cord2._buffers[2]), id(cord._buffers[1]))
 
+    def test_cord_append_memoryview(self) -> None:
+        data = bytearray(b"HelloWorld")
+        cord = Cord(b"Prefix")
+        cord.append(memoryview(data)[5:])
+
+        self.assertEqual(11, len(cord))
+        self.assertEqual(b"PrefixWorld", bytes(cord))
+
+        # The memoryview refers to the original data.
+        data[5:] = b"Thing"
+        self.assertEqual(b"PrefixThing", bytes(cord))
+
+    def test_cord_append_buffer_protocol_object(self) -> None:
+        array = np.arange(4, dtype=np.int16).reshape(2, 2)
+        cord = Cord(array)
+        cord.append(bytearray(b"!"))
+
+        self.assertEqual(9, len(cord))
+        self.assertEqual(array.tobytes() + b"!", bytes(cord))
+
+        with self.assertRaises(TypeError):
+            cord.append("not a buffer")
+        with self.assertRaises(ValueError):
+            cord.append(array.T)
+
+    def test_cord_to_memoryview(self) -> None:
+        data = b"HelloWorld"
+        # A single buffer is not copied.
+        self.assertIs(Cord(data).to_memoryview().obj, data)
+
+        cord = Cord(b"Hello")
+        cord.append(memoryview(b"World"))
+        self.assertEqual(b"HelloWorld", cord.to_memoryview())
+
+    def test_cord_readinto(self) -> None:
+        cord = Cord(b"Hello")
+        cord.append(memoryview(b"World"))
+
+        out = bytearray(12)
+        self.assertEqual(10, cord.readinto(out))
+        self.assertEqual(b"HelloWorld\x00\x00", out)
+
+        with self.assertRaises(ValueError):
+            cord.readinto(bytearray(9))
+
+    def test_cord_write_to_real_file(self) -> None:
+        # Use more buffers than a single os.writev() call accepts.
+        cord = Cord()
+        for i in range(3000):
+            cord.append(i.to_bytes(2, "little"))
+            cord.append(b"")
+
+        with tempfile.TemporaryFile() as outfile:
+            outfile.write(b"Prefix")
+            cord.write_to_file(outfile)
+            outfile.write(b"Suffix")
+            outfile.seek(0)
+            self.assertEqual(b"Prefix" + bytes(cord) + b"Suffix", outfile.read())
+
     def test_cord_write_to_file(self) -> None:
         cord = Cord()
         cord.append(b"Hello")
@@ -0,0 +1,275 @@
+#!/usr/bin/env fbpython
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+# All rights reserved.
+#
+# This source code is licensed under the BSD-style license found in the
+# LICENSE file in the root directory of this source tree.
+
+import unittest
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from executorch.exir._serialize._flatbuffer import (
+    _program_json_to_flatbuffer,
+    _program_to_flatbuffer,
+)
+from executorch.exir._serialize._flatbuffer_builder import (
+    _DataclassSerializer,
+    _parse_schema,
+    _Schema,
+)
+from executorch.exir._serialize._program import _program_to_json
+from executorch.exir.backend.compile_spec_schema import CompileSpec
+from executorch.exir.scalar_type import ScalarType
+from executorch.exir.schema import (
+    AllocationDetails,
+    BackendDelegate,
+    BackendDelegateDataReference,
+    BackendDelegateInlineData,
+    Bool,
+    BoolList,
+    Buffer,
+    DataLocation,
+    Double,
+    EValue,
+    Frame,
+    FrameList,
+    Int,
+    IntList,
+    Null,
+    Program,
+    SubsegmentOffsets,
+    Tensor,
+    TensorShapeDynamism,
+)
+from executorch.exir.tests.common import get_test_program
+
+SCHEMA_FILES: Dict[str, bytes] = {
+    "root.fbs": b"""
+        include "enums.fbs";
+        namespace test;
+        file_identifier "TE01";
+
+        table Leaf { x:int; y:long = 3; }
+        table Other {}
+        union Choice { Leaf, Other }
+        table Root {
+          name:string;  // A comment.
+          color:test.Color;
+          value:Choice;
+          leaves:[Leaf];
+          data:[ubyte] (force_align: 16);
+          flag:bool;
+        }
+        root_type Root;
+    """,
+    "enums.fbs": b"""
+        namespace test;
+        enum Color : byte { RED = 1, GREEN, BLUE = 5 }
+    """,
+}
+
+
+@dataclass
+class Leaf:
+    x: int
+    y: int
+
+
+@dataclass
+class Other:
+    pass
+
+
+@dataclass
+class NotAMember:
+    pass
+
+
+@dataclass
+class Root:
+    name: str
+    color: int
+    value: "Leaf | Other"
+    leaves: List[Leaf]
+    data: bytes
+    flag: bool
+    extra: Optional[int] = None
+
+
+def make_program_with_all_types() -> Program:
+    """Returns a Program that uses every table type in the program schema."""
+    program = get_test_program()
+    plan = program.execution_plan[0]
+    plan.values.extend(
+        [
+            EValue(val=Null()),
+            EValue(val=Int(int_val=-(2**40))),
+            EValue(val=Bool(bool_val=True)),
+            EValue(val=Double(double_val=float("inf"))),
+            EValue(val=Double(double_val=-0.5)),
+            EValue(val=IntList(items=[1, 32, -1])),
+            EValue(val=BoolList(items=[True, False, True])),
+            EValue(
+                val=Tensor(
+                    scalar_type=ScalarType.FLOAT,
+                    storage_offset=0,
+                    sizes=[2, 3],
+                    dim_order=[0, 1],
+                    requires_grad=False,
+                    layout=0,
+                    data_buffer_idx=0,
+                    allocation_info=AllocationDetails(
+                        memory_id=1, memory_offset_low=48, memory_offset_high=1
+                    ),
+                    shape_dynamism=TensorShapeDynamism.DYNAMIC_BOUND,
+                )
+            ),
+        ]
+    )
+    plan.chains[0].stacktrace = [
+        FrameList(items=[Frame(filename="f.py", lineno=7, name="fn", context="x")])
+        for _ in plan.chains[0].instructions
+    ]
+    program.constant_buffer.extend(
+        [Buffer(storage=b""), Buffer(storage=b"\x01\x02\x03")]
+    )
+    for i, blob in enumerate((b"\x10" * 17, b"")):
+        program.backend_delegate_data.append(BackendDelegateInlineData(data=blob))
+        plan.delegates.append(
+            BackendDelegate(
+                id=f"delegate{i}",
+                processed=BackendDelegateDataReference(
+                    location=DataLocation.INLINE, index=i
+                ),
+                compile_specs=[CompileSpec(key="key", value=b"\x04")],
+            )
+        )
+    program.mutable_data_segments = [
+        SubsegmentOffsets(segment_index=1, offsets=[0, 64])
+    ]
+    return program
+
+
+class TestParseSchema(unittest.TestCase):
+    def test_parse(self) -> None:
+        schema: _Schema = _parse_schema(SCHEMA_FILES, "root.fbs")
+        self.assertEqual(schema.root_type, "Root")
+        self.assertEqual(schema.file_identifier, "TE01")
+        self.assertEqual(schema.enums["Color"].type_name, "byte")
+        self.assertEqual(
+            schema.enums["Color"].values, {"RED": 1, "GREEN": 2, "BLUE": 5}
+        )
+        self.assertEqual(schema.unions["Choice"], ["Leaf", "Other"])
+
+        fields = schema.tables["Root"].fields
+        self.assertEqual(fields["color"].type_name, "Color")
+        # Union fields take up two ids: one for the type, then the value.
+        self.assertEqual(
+            [f.id for f in fields.values()],
+            [0, 1, 3, 4, 5, 6],
+        )
+        self.assertTrue(fields["leaves"].is_vector)
+        self.assertEqual(fields["data"].force_align, 16)
+        self.assertEqual(schema.tables["Leaf"].fields["y"].default, "3")
+
+    def test_unsupported_statement_fails(self) -> None:
+        with self.assertRaises(ValueError):
+            _parse_schema({"a.fbs": b"rpc_service S { F(A):B; }"}, "a.fbs")
+
+    def test_missing_include_fails(self) -> None:
+        with self.assertRaises(ValueError):
+            _parse_schema({"a.fbs": b'include "b.fbs";'}, "a.fbs")
+
+
+class TestDataclassSerializer(unittest.TestCase):
+    def serialize(self, root: Root) -> bytes:
+        schema = _parse_schema(SCHEMA_FILES, "root.fbs")
+        return _DataclassSerializer(schema).serialize(root)
+
+    def test_header_and_alignment(self) -> None:
+        data = self.serialize(
+            Root(
+                name="hi",
+                color=5,
+                value=Leaf(x=1, y=3),
+                leaves=[Leaf(x=2, y=0)],
+                data=b"\xaa\xbb",
+                flag=True,
+            )
+        )
+        self.assertEqual(data[4:8], b"TE01")
+        # The force_align value applies to the whole buffer.
+        self.assertEqual(len(data) % 16, 0)
+        index = data.find(b"\xaa\xbb")
+        self.assertEqual(index % 16, 0)
+        # Vector length precedes the data.
+        self.assertEqual(int.from_bytes(data[index - 4 : index], "little"), 2)
+
+    def test_unknown_field_fails(self) -> None:
+        with self.assertRaisesRegex(ValueError, "extra"):
+            self.serialize(
+                Root(
+                    name="",
+                    color=1,
+                    value=Other(),
+                    leaves=[],
+                    data=b"",
+                    flag=False,
+                    extra=1,
+                )
+            )
+
+    def test_bad_union_member_fails(self) -> None:
+        with self.assertRaisesRegex(ValueError, "union"):
+            self.serialize(
+                Root(
+                    name="",
+                    color=1,
+                    value=NotAMember(),
+                    leaves=[],
+                    data=b"",
+                    flag=False,
+                )
+            )
+
+
+class TestProgramToFlatbuffer(unittest.TestCase):
+    def assert_same_as_flatc(
+        self,
+        program: Program,
+        constant_tensor_alignment: Optional[int] = None,
+        delegate_alignment: Optional[int] = None,
+    ) -> None:
+        expected = _program_json_to_flatbuffer(
+            _program_to_json(program),
+            constant_tensor_alignment=constant_tensor_alignment,
+            delegate_alignment=delegate_alignment,
+        )
+        actual = _program_to_flatbuffer(
+            program,
+            constant_tensor_alignment=constant_tensor_alignment,
+            delegate_alignment=delegate_alignment,
+        )
+        self.assertEqual(actual.max_alignment, expected.max_alignment)
+        self.assertEqual(len(actual.data), len(expected.data))
+        self.assertTrue(actual.data == expected.data)
+
+    def test_test_program(self) -> None:
+        self.assert_same_as_flatc(get_test_program())
+
+    def test_all_types(self) -> None:
+        self.assert_same_as_flatc(make_program_with_all_types())
+
+    def test_patched_alignment(self) -> None:
+        program = make_program_with_all_types()
+        for tensor_alignment, delegate_alignment in ((1, 2), (32, None), (8, 32)):
+            with self.subTest(
+                tensor_alignment=tensor_alignment,
+                delegate_alignment=delegate_alignment,
+            ):
+                self.assert_same_as_flatc(
+                    program,
+                    constant_tensor_alignment=tensor_alignment,
+                    delegate_alignment=delegate_alignment,
+                )
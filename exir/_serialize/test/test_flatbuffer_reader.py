@@ -0,0 +1,120 @@
+#!/usr/bin/env fbpython
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+# All rights reserved.
+#
+# This source code is licensed under the BSD-style license found in the
+# LICENSE file in the root directory of this source tree.
+
+import unittest
+from dataclasses import dataclass
+from typing import List, Optional, Union
+
+from executorch.exir._serialize._flatbuffer_builder import (
+    _DataclassSerializer,
+    _parse_schema,
+    _Schema,
+)
+from executorch.exir._serialize._flatbuffer_reader import (
+    _root_table_view,
+    _view_to_dataclass,
+)
+
+SCHEMA: bytes = b"""
+    file_identifier "TE02";
+    enum Kind : short { A, B = 7 }
+    table Leaf { x:int; f:double; }
+    table Empty {}
+    union Choice { Leaf, Empty }
+    table Root {
+      name:string;
+      kind:Kind;
+      value:Choice;
+      leaves:[Leaf];
+      data:[ubyte];
+      sizes:[long];
+      flags:[bool];
+      child:Leaf;
+      count:uint = 5;
+    }
+    root_type Root;
+"""
+
+
+@dataclass
+class Leaf:
+    x: int
+    f: float
+
+
+@dataclass
+class Empty:
+    pass
+
+
+Choice = Union[Leaf, Empty]
+
+
+@dataclass
+class Root:
+    name: str
+    kind: int
+    value: "Choice"
+    leaves: List[Leaf]
+    data: bytes
+    sizes: List[int]
+    flags: List[bool]
+    child: Optional[Leaf]
+    count: int
+
+
+def make_root() -> Root:
+    return Root(
+        name="root",
+        kind=7,
+        value=Leaf(x=-3, f=0.25),
+        leaves=[Leaf(x=1, f=0.0), Leaf(x=0, f=-1.5)],
+        data=b"\x00\x01\x02",
+        sizes=[1, -(2**40)],
+        flags=[True, False],
+        child=None,
+        count=5,
+    )
+
+
+class TestFlatbufferReader(unittest.TestCase):
+    def setUp(self) -> None:
+        self.schema: _Schema = _parse_schema({"root.fbs": SCHEMA}, "root.fbs")
+        self.data: bytes = _DataclassSerializer(self.schema).serialize(make_root())
+
+    def test_table_view(self) -> None:
+        view = _root_table_view(self.schema, memoryview(self.data))
+        self.assertEqual(view.name, "root")
+        self.assertEqual(view.kind, 7)
+        self.assertEqual(view.enum_name("kind"), "B")
+        self.assertEqual(view.value.table_name, "Leaf")
+        self.assertEqual(view.value.x, -3)
+        self.assertEqual(len(view.leaves), 2)
+        self.assertEqual(view.leaves[-1].f, -1.5)
+        # Absent scalars read as their defaults; absent tables as None.
+        self.assertFalse(view.has("count"))
+        self.assertEqual(view.count, 5)
+        self.assertEqual(view.leaves[0].x, 1)
+        self.assertIsNone(view.child)
+        self.assertEqual(view.sizes.to_list(), [1, -(2**40)])
+        self.assertEqual(list(view.flags), [True, False])
+
+        with self.assertRaises(AttributeError):
+            view.not_a_field
+        with self.assertRaises(IndexError):
+            view.leaves[2]
+
+    def test_byte_vectors_are_not_copied(self) -> None:
+        buf = memoryview(self.data)
+        data = _root_table_view(self.schema, buf).data
+        self.assertIsInstance(data, memoryview)
+        self.assertEqual(data, b"\x00\x01\x02")
+        self.assertIs(data.obj, self.data)
+
+    def test_view_to_dataclass(self) -> None:
+        view = _root_table_view(self.schema, memoryview(self.data))
+        self.assertEqual(_view_to_dataclass(view, Root), make_root())
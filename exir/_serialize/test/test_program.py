@@ -8,19 +8,24 @@
 import copy
 import difflib
 import json
+import os
+import tempfile
 import unittest
 
 from typing import List, Sequence
 
 from executorch.exir._serialize._flatbuffer import _program_flatbuffer_to_json
 from executorch.exir._serialize._program import (
+    _deduplicate_program_data,
     _ExtendedHeader,
     _get_extended_header,
     _json_to_program,
     _program_to_json,
     deserialize_pte_binary,
+    PTEFile,
     serialize_pte_binary,
 )
+from executorch.exir.scalar_type import ScalarType
 
 from executorch.exir.schema import (
     BackendDelegate,
@@ -30,9 +35,12 @@ from executorch.exir.schema import (
     ContainerMetadata,
     DataLocation,
     DataSegment,
+    EValue,
     ExecutionPlan,
     Program,
     SubsegmentOffsets,
+    Tensor,
+    TensorShapeDynamism,
 )
 from executorch.exir.tests.common import get_test_program
 
@@ -781,6 +789,203 @@ class TestProgram(unittest.TestCase):
             + b"\x40\x44\x44",
         )
 
+    def make_program_with_duplicate_data(self) -> Program:
+        program = get_test_program()
+        # Index 0 is reserved, like in emitted programs.
+        add_constant_data(program, (b"", b"\x01" * 8, b"\x02" * 8, b"\x01" * 8))
+        add_delegate_data(
+            program, program.execution_plan[0], (b"blob0", b"blob1", b"blob0")
+        )
+        # A constant tensor for each buffer.
+        for i in range(len(program.constant_buffer)):
+            program.execution_plan[0].values.append(
+                EValue(
+                    val=Tensor(
+                        scalar_type=ScalarType.BYTE,
+                        storage_offset=0,
+                        sizes=[8],
+                        dim_order=[0],
+                        requires_grad=False,
+                        layout=0,
+                        data_buffer_idx=i,
+                        allocation_info=None,
+                        shape_dynamism=TensorShapeDynamism.STATIC,
+                    )
+                )
+            )
+        return program
+
+    def test_deduplicate_program_data(self) -> None:
+        program = self.make_program_with_duplicate_data()
+        num_values = len(program.execution_plan[0].values)
+
+        self.assertEqual(_deduplicate_program_data(program), 8 + 5)
+
+        self.assertEqual(
+            [b.storage for b in program.constant_buffer],
+            [b"", b"\x01" * 8, b"\x02" * 8],
+        )
+        self.assertEqual(
+            [
+                v.val.data_buffer_idx
+                for v in program.execution_plan[0].values[num_values - 4 :]
+            ],
+            [0, 1, 2, 1],
+        )
+        self.assertEqual(
+            [d.data for d in program.backend_delegate_data], [b"blob0", b"blob1"]
+        )
+        self.assertEqual(
+            [d.processed.index for d in program.execution_plan[0].delegates],
+            [0, 1, 0],
+        )
+
+        # Nothing left to remove.
+        self.assertEqual(_deduplicate_program_data(program), 0)
+
+    def test_deduplicate_data_with_segments(self) -> None:
+        program = self.make_program_with_duplicate_data()
+        expected_program = copy.deepcopy(program)
+
+        with self.assertLogs(level="INFO") as logs:
+            pte_data = bytes(
+                serialize_pte_binary(
+                    program,
+                    extract_delegate_segments=True,
+                    extract_constant_segment=True,
+                    segment_alignment=SEGMENT_ALIGNMENT,
+                    deduplicate_data=True,
+                )
+            )
+        self.assertIn("saving 13 bytes", "".join(logs.output))
+
+        # The input Program should not have been modified.
+        self.assert_programs_equal(program, expected_program)
+
+        pte = PTEFile(pte_data)
+        # One segment for the constants, and one per unique delegate blob.
+        self.assertEqual(len(pte.program.segments), 3)
+        self.assertEqual(len(pte.program.constant_segment.offsets), 3)
+        self.assertEqual(pte.delegate_data(0, 0), b"blob0")
+        self.assertEqual(pte.delegate_data(0, 1), b"blob1")
+        self.assertEqual(pte.delegate_data(0, 2), b"blob0")
+        self.assertEqual(
+            pte.program.execution_plan[0].delegates[2].processed.index,
+            pte.program.execution_plan[0].delegates[0].processed.index,
+        )
+
+    def test_segment_data_is_not_copied(self) -> None:
+        program = get_test_program()
+        constant_blob = self.gen_blob_data(
+            CONSTANT_TENSOR_ALIGNMENT + 1, b"\x10\x11\x01"
+        )
+        delegate_blob = self.gen_blob_data(SEGMENT_ALIGNMENT + 1, b"\x20\x22\x02")
+        add_constant_data(program, (constant_blob,))
+        add_delegate_data(program, program.execution_plan[0], (delegate_blob,))
+        expected_program = copy.deepcopy(program)
+
+        pte_data = serialize_pte_binary(
+            program,
+            extract_delegate_segments=True,
+            extract_constant_segment=True,
+            segment_alignment=SEGMENT_ALIGNMENT,
+            constant_tensor_alignment=CONSTANT_TENSOR_ALIGNMENT,
+        )
+
+        # The output should refer to the data blobs of the input Program
+        # instead of copies.
+        buffer_ids = [id(b) for b in pte_data._buffers]
+        self.assertIn(id(program.constant_buffer[-1].storage), buffer_ids)
+        self.assertIn(id(program.backend_delegate_data[0].data), buffer_ids)
+
+        # The input Program should not have been modified.
+        self.assert_programs_equal(program, expected_program)
+
+        # Writing to a file should produce the same data as bytes().
+        with tempfile.TemporaryFile() as fp:
+            pte_data.write_to_file(fp)
+            fp.seek(0)
+            self.assertEqual(fp.read(), bytes(pte_data))
+
+
+class TestPTEFile(unittest.TestCase):
+    def make_program(self) -> Program:
+        program = get_test_program()
+        add_constant_data(program, (b"", b"\x01" * 3, b"\x02" * 20))
+        add_delegate_data(
+            program, program.execution_plan[0], (b"delegate0", b"delegate1 data")
+        )
+        return program
+
+    def test_inline_data(self) -> None:
+        program = self.make_program()
+        pte = PTEFile(bytes(serialize_pte_binary(program)))
+
+        self.assertIsNone(pte.header)
+        self.assertEqual(pte.execution_plans[0].name, "forward")
+        self.assertEqual(pte.operators(), [("aten::add", "Tensor")])
+        self.assertEqual(pte.constant_data(1), b"\x01" * 3)
+        self.assertEqual(pte.constant_data(2), b"\x02" * 20)
+        self.assertIsInstance(pte.delegate_data(0, 0), memoryview)
+        self.assertEqual(pte.delegate_data(0, 0), b"delegate0")
+        self.assertEqual(pte.delegate_data(0, 1), b"delegate1 data")
+        self.assertEqual(pte.to_program(), program)
+
+    def test_segment_data_from_file(self) -> None:
+        program = self.make_program()
+        pte_data = serialize_pte_binary(
+            program,
+            extract_delegate_segments=True,
+            extract_constant_segment=True,
+            segment_alignment=SEGMENT_ALIGNMENT,
+            constant_tensor_alignment=CONSTANT_TENSOR_ALIGNMENT,
+        )
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "program.pte")
+            with open(path, "wb") as fp:
+                pte_data.write_to_file(fp)
+
+            with PTEFile.open(path) as pte:
+                self.assertIsNotNone(pte.header)
+                self.assertEqual(pte.operators(0), [("aten::add", "Tensor")])
+                self.assertEqual(len(pte.program.segments), 3)
+
+                # Constants in the segment are followed by alignment padding,
+                # except for the last one.
+                self.assertEqual(
+                    bytes(pte.constant_data(1)),
+                    b"\x01" * 3 + b"\x00" * (CONSTANT_TENSOR_ALIGNMENT - 3),
+                )
+                self.assertEqual(pte.constant_data(2), b"\x02" * 20)
+                self.assertEqual(pte.delegate_data(0, 0), b"delegate0")
+                self.assertEqual(pte.delegate_data(0, 1), b"delegate1 data")
+
+                # Decoding the whole program sees the segment references.
+                program_with_segments = pte.to_program()
+                self.assertEqual(
+                    program_with_segments.execution_plan[0].delegates[1].processed,
+                    BackendDelegateDataReference(
+                        location=DataLocation.SEGMENT, index=2
+                    ),
+                )
+                self.assertEqual(program_with_segments.constant_buffer, [])
+
+    def test_no_constant_data_fails(self) -> None:
+        program = get_test_program()
+        # Older programs have no constant segment, and others have one with no
+        # offsets.
+        for constant_segment in (None, program.constant_segment):
+            program.constant_segment = constant_segment
+            pte = PTEFile(bytes(serialize_pte_binary(program)))
+            with self.assertRaisesRegex(ValueError, "no constant data"):
+                pte.constant_data(0)
+
+    def test_bad_magic_fails(self) -> None:
+        pte_data = bytearray(bytes(serialize_pte_binary(get_test_program())))
+        pte_data[4:8] = b"XX00"
+        with self.assertRaisesRegex(ValueError, "magic"):
+            PTEFile(pte_data)
+
 
 # Common data for extended header tests. The two example values should produce
 # the example data.
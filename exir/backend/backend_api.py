@@ -6,16 +6,27 @@
 
 import copy
 import logging
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
 from contextlib import contextmanager
 from functools import singledispatch
-from typing import Generator, List
+from typing import Any, Dict, Generator, Iterable, List, Optional, Tuple
 
 import torch
+import torch.fx.traceback as fx_traceback
 
 from executorch.exir.backend.backend_details import BackendDetails, PreprocessResult
 from executorch.exir.backend.compile_spec_schema import CompileSpec
 
-from executorch.exir.backend.partitioner import Partitioner, PartitionResult
+from executorch.exir.backend.partitioner import (
+    DelegationSpec,
+    Partitioner,
+    PartitionResult,
+)
+from executorch.exir.backend.preprocess_cache import (
+    preprocess_cache_key,
+    PreprocessCache,
+)
 from executorch.exir.backend.utils import (
     _maybe_duplicate_constant_nodes,
     is_identical_graph,
@@ -36,7 +47,10 @@ from executorch.exir.program._fake_program import (
     update_to_real_program,
 )
 from torch._export.utils import is_buffer, is_lifted_tensor_constant, is_param
+from torch._subclasses.fake_tensor import FakeTensor, FakeTensorMode
 from torch.export import ExportedProgram
+from torch.fx.passes.utils.fuser_utils import legalize_graph
+from torch.utils import _pytree as pytree
 
 
 @singledispatch
@@ -110,11 +124,21 @@ def _(
     # All backend implementation are final, so we don't need to consider nested subclasses.
     for cls in BackendDetails.__subclasses__():
         if backend_id == cls.__name__:
-            copied_edge_program = copy.deepcopy(edge_program)
-            preprocess_result: PreprocessResult = cls.preprocess(
-                copied_edge_program,
-                compile_specs,
-            )
+            cache = _PREPROCESS_CACHE
+            cache_key = None
+            preprocess_result: Optional[PreprocessResult] = None
+            if cache is not None:
+                cache_key = preprocess_cache_key(cls, edge_program, compile_specs)
+                if cache_key is not None:
+                    preprocess_result = cache.get(cache_key)
+            if preprocess_result is None:
+                copied_edge_program = copy.deepcopy(edge_program)
+                preprocess_result = cls.preprocess(
+                    copied_edge_program,
+                    compile_specs,
+                )
+                if cache is not None and cache_key is not None:
+                    cache.put(cache_key, preprocess_result)
             lowered_module = LoweredBackendModule(
                 edge_program=edge_program,
                 backend_id=backend_id,
@@ -154,133 +178,336 @@ def validation_disabled() -> Generator[None, None, None]:
         _ENABLE_VALIDATION = existing_setting
 
 
-def _get_node_list_with_same_tag(
+# The number of threads used to preprocess the partitions of a graph module, see
+# concurrent_lowering().
+_LOWERING_MAX_WORKERS: int = 1
+
+
+@contextmanager
+def concurrent_lowering(
+    max_workers: Optional[int] = None,
+) -> Generator[None, None, None]:
+    """
+    Preprocesses the partitions of each graph module concurrently on a pool of
+    `max_workers` threads, `os.cpu_count()` by default, when lowering with a
+    partitioner. The partitions are still extracted from and spliced back into
+    the graph one at a time, in the order of the partition tags, so the result
+    does not depend on which preprocess call finishes first.
+
+    Backends only benefit from this if their preprocess releases the GIL for
+    a significant part of the work, e.g. by running a native compiler or a
+    subprocess, and they must not share mutable state between calls.
+    """
+    global _LOWERING_MAX_WORKERS
+    existing_setting = _LOWERING_MAX_WORKERS
+    _LOWERING_MAX_WORKERS = max_workers or os.cpu_count() or 1
+    try:
+        yield
+    finally:
+        _LOWERING_MAX_WORKERS = existing_setting
+
+
+# The cache of preprocess results used by to_backend(), see cached_preprocess().
+_PREPROCESS_CACHE: Optional[PreprocessCache] = None
+
+
+@contextmanager
+def cached_preprocess(
+    cache: Optional[PreprocessCache] = None,
+) -> Generator[PreprocessCache, None, None]:
+    """
+    Looks up the results of BackendDetails.preprocess() in `cache`, a new
+    in-memory PreprocessCache by default, before running it, and stores them
+    there afterwards. Partitions whose graph, constants and compile specs are
+    identical to one lowered before are then not compiled again. Yields the
+    cache, whose `hits` and `misses` count the lookups.
+
+    ::
+
+     with cached_preprocess(PreprocessCache(cache_dir)) as cache:
+         edge_manager.to_backend(partitioner)
+     print(cache.hits, cache.misses)
+    """
+    global _PREPROCESS_CACHE
+    existing_cache = _PREPROCESS_CACHE
+    _PREPROCESS_CACHE = cache if cache is not None else PreprocessCache()
+    try:
+        yield _PREPROCESS_CACHE
+    finally:
+        _PREPROCESS_CACHE = existing_cache
+
+
+def _get_nodes_by_tag(
     tagged_graph_module: torch.fx.GraphModule,
-    tag: str,
+    tags: Iterable[str],
     owning_program: ExportedProgram,
-) -> List[torch.fx.Node]:
+) -> Dict[str, List[torch.fx.Node]]:
     """
-    Return a list of nodes with the same tag.
+    Return the nodes of each of the given tags, in graph order, with a single
+    pass over the graph.
     """
-    node_list = []
+    nodes_by_tag: Dict[str, List[torch.fx.Node]] = {tag: [] for tag in tags}
 
     for node in tagged_graph_module.graph.nodes:
-        if node.meta.get("delegation_tag", "") == tag:
-            if node.op == "output":
-                raise RuntimeError(f"output node {node} should not be tagged")
-            if node.op == "placeholder":
-                if (
-                    not is_param(owning_program, node)
-                    and not is_buffer(owning_program, node)
-                    and not is_lifted_tensor_constant(owning_program, node)
-                ):
-                    raise RuntimeError(
-                        f"placeholder node for non-params, non-buffer, and non-tensor constants should not be tagged: {node} "
-                    )
-                else:
-                    # check that the users all belong to the same tag
-                    for user in node.users:
-                        users_tag = user.meta.get("delegation_tag", None)
-                        if users_tag != tag:
-                            raise RuntimeError(
-                                f"constant data node ({node}) is tagged with ({tag}) but has user ({user}) which has tag ({users_tag})"
-                            )
-            node_list.append(node)
-    return node_list
+        tag = node.meta.get("delegation_tag", "")
+        node_list = nodes_by_tag.get(tag)
+        if node_list is None:
+            continue
+        if node.op == "output":
+            raise RuntimeError(f"output node {node} should not be tagged")
+        if node.op == "placeholder":
+            if (
+                not is_param(owning_program, node)
+                and not is_buffer(owning_program, node)
+                and not is_lifted_tensor_constant(owning_program, node)
+            ):
+                raise RuntimeError(
+                    f"placeholder node for non-params, non-buffer, and non-tensor constants should not be tagged: {node} "
+                )
+            else:
+                # check that the users all belong to the same tag
+                for user in node.users:
+                    users_tag = user.meta.get("delegation_tag", None)
+                    if users_tag != tag:
+                        raise RuntimeError(
+                            f"constant data node ({node}) is tagged with ({tag}) but has user ({user}) which has tag ({users_tag})"
+                        )
+        node_list.append(node)
+    return nodes_by_tag
+
+
+def _extract_partition(
+    tagged_graph_module: torch.fx.GraphModule,
+    tag: str,
+    node_list: List[torch.fx.Node],
+    owning_program: ExportedProgram,
+) -> Optional[Tuple[ExportedProgram, torch.fx.Node]]:
+    """
+    Replaces the nodes with the given tag by a call_module node, and returns the
+    exported program of the submodule together with that node. Returns None if
+    no node has the tag.
 
+    The graph is not topologically sorted again, so that the nodes of the other
+    partitions stay valid; the caller has to legalize it once all partitions
+    are extracted.
+    """
+    # Create partition with nodes containing this tag. There should only be
+    # one contained submodule per tag
+    if len(node_list) == 0:
+        logging.debug(f"Did not find any nodes for tag {tag}")
+        return None
+
+    logging.debug("For tag %s, found nodes %s", tag, node_list)
+    # Tag the nodes that are params as buffers, so we can order the submodule as (Parms + Buffers) (User Inputs)
+    submodule, call_module_node = create_submodule_from_nodes(
+        tagged_graph_module, node_list, tag, skip_legalize_graph=True
+    )
+    tagged_graph_module_output_node = tagged_graph_module.graph.find_nodes(op="output")
+    submodule_output_node = submodule.graph.find_nodes(op="output")
+    # Copy the output node meta from the original output node, because create_submodule_from_nodes doesn't cover the meta field
+    submodule_output_node[0].meta = tagged_graph_module_output_node[0].meta
+    logging.debug("Partitioned graph module: %s", tagged_graph_module)
+
+    submodule_program = create_exported_program_from_submodule(
+        submodule, owning_program, tag
+    )
+    return submodule_program, call_module_node
 
-def _partition_and_lower_one_graph_module(
+
+def _insert_lowered_submodule(
     tagged_graph_module: torch.fx.GraphModule,
-    partition_result: PartitionResult,
-    owning_program: ExportedProgram,
-) -> torch.fx.GraphModule:
+    submodule_program: ExportedProgram,
+    call_module_node: torch.fx.Node,
+    lowered_name: str,
+) -> None:
     """
-    Partitioned and lowered the graph module based on the partition tag, this is to handle one graph module.
+    Replaces the call_module node of a partition with a call to its lowered
+    module, which has been added to the graph module as `lowered_name`.
     """
-    for tag, delegation_spec in partition_result.partition_tags.items():
-        # Create partition with nodes containing this tag. There should only be
-        # one contained submodule per tag
-        node_list = _get_node_list_with_same_tag(
-            tagged_graph_module, tag, owning_program
+    # call delegate args should only use user_inputs
+    call_delegate_args = []
+    # Preserve input order as user_inputs
+    for inp_name in submodule_program.graph_signature.user_inputs:
+        for inp_node in call_module_node.all_input_nodes:
+            if inp_node.name == inp_name:
+                call_delegate_args.append(inp_node)
+                break
+
+    # Replace the partitioned submodule with a lowered submodule
+    # Add call_method node with function "forward"
+    with tagged_graph_module.graph.inserting_before(call_module_node):
+        lowered_node = tagged_graph_module.graph.get_attr(lowered_name)
+        call_delegate_node = tagged_graph_module.graph.call_function(
+            executorch_call_delegate,
+            (lowered_node,) + tuple(call_delegate_args),
+            call_module_node.kwargs,
         )
+        call_delegate_node.meta["debug_handle"] = len(tagged_graph_module.graph.nodes)
+        call_module_node.replace_all_uses_with(call_delegate_node)
+        tagged_graph_module.graph.erase_node(call_module_node)
+
+
+def _is_symbolic(value: Any) -> bool:
+    if isinstance(value, (torch.SymInt, torch.SymFloat, torch.SymBool)):
+        return True
+    return isinstance(value, torch.Tensor) and any(
+        isinstance(size, torch.SymInt) for size in (*value.shape, *value.stride())
+    )
+
+
+def _use_own_fake_mode(program: ExportedProgram) -> bool:
+    """
+    Replaces the FakeTensors in the node metadata of `program` with FakeTensors
+    of the same shape, strides and dtype in a new FakeTensorMode. The passes
+    run by preprocess find the FakeTensorMode through this metadata, and a
+    FakeTensorMode can't be used by several threads at once.
 
-        if len(node_list) == 0:
-            logging.debug(f"Did not find any nodes for tag {tag}")
+    Returns False, leaving `program` unchanged, if it has symbolic shapes,
+    since their ShapeEnv would still be shared.
+    """
+    nodes = [node for node in program.graph.nodes if "val" in node.meta]
+    if any(_is_symbolic(v) for n in nodes for v in pytree.tree_leaves(n.meta["val"])):
+        return False
+
+    fake_mode = FakeTensorMode(allow_non_fake_inputs=True)
+    # Keeps the FakeTensors that several nodes share shared.
+    refakified: Dict[int, FakeTensor] = {}
+
+    def refakify(value: Any) -> Any:
+        if not isinstance(value, FakeTensor):
+            return value
+        if id(value) not in refakified:
+            with fake_mode:
+                refakified[id(value)] = torch.empty_strided(
+                    value.shape,
+                    value.stride(),
+                    dtype=value.dtype,
+                    device=value.device,
+                    requires_grad=value.requires_grad,
+                )
+        return refakified[id(value)]
+
+    for node in nodes:
+        # The metadata dict may be shared with a node of the owning program.
+        node.meta = {**node.meta, "val": pytree.tree_map(refakify, node.meta["val"])}
+    return True
+
+
+def _erase_consumed_placeholders(
+    tagged_graph_module: torch.fx.GraphModule,
+    owning_program: ExportedProgram,
+) -> None:
+    """
+    Deletes the parameters and buffers that are no longer used in the graph
+    module because the lowered modules consumed them.
+    """
+    toplevel_signature = owning_program.graph_signature
+    for node in tagged_graph_module.graph.find_nodes(op="placeholder"):
+        # Find placeholders consumed by the delegate
+        if len(node.users) != 0:
             continue
 
-        logging.debug(f"For tag {tag}, found nodes {node_list}")
-        # Tag the nodes that are params as buffers, so we can order the submodule as (Parms + Buffers) (User Inputs)
-        submodule, call_module_node = create_submodule_from_nodes(
-            tagged_graph_module, node_list, tag
-        )
-        tagged_graph_module_output_node = [
-            node for node in tagged_graph_module.graph.nodes if node.op == "output"
-        ]
-        submodule_output_node = [
-            node for node in submodule.graph.nodes if node.op == "output"
-        ]
-        # Copy the output node meta from the original output node, because create_submodule_from_nodes doesn't cover the meta field
-        submodule_output_node[0].meta = tagged_graph_module_output_node[0].meta
-        logging.debug(f"Partitioned graph module: {tagged_graph_module}")
-
-        submodule_program = create_exported_program_from_submodule(
-            submodule, owning_program, tag
-        )
+        if node.name in toplevel_signature.inputs_to_buffers:
+            # Delete the consumed buffers
+            buffer_name = toplevel_signature.inputs_to_buffers.get(node.name)
+            if buffer_name in owning_program.state_dict:
+                owning_program.state_dict.pop(buffer_name)
+            else:
+                owning_program.constants.pop(buffer_name)
+            tagged_graph_module.graph.erase_node(node)
+        elif node.name in toplevel_signature.inputs_to_parameters:
+            # Delete the consumed parameters
+            param_name = toplevel_signature.inputs_to_parameters.get(node.name)
+            owning_program.state_dict.pop(param_name)
+            tagged_graph_module.graph.erase_node(node)
 
-        lowered_submodule = to_backend(
-            delegation_spec.backend_id,
-            submodule_program,
-            delegation_spec.compile_specs,
-        )
 
-        # call delegate args should only use user_inputs
-        call_delegate_args = []
-        # Preserve input order as user_inputs
-        for inp_name in submodule_program.graph_signature.user_inputs:
-            for inp_node in call_module_node.all_input_nodes:
-                if inp_node.name == inp_name:
-                    call_delegate_args.append(inp_node)
-                    break
-
-        # Replace the partitioned submodule with a lowered submodule
-        # Add call_method node with function "forward"
-        with tagged_graph_module.graph.inserting_before(call_module_node):
-            lowered_name = get_lowered_module_name(
-                tagged_graph_module, lowered_submodule
-            )
-            lowered_node = tagged_graph_module.graph.get_attr(lowered_name)
-            call_delegate_node = tagged_graph_module.graph.call_function(
-                executorch_call_delegate,
-                (lowered_node,) + tuple(call_delegate_args),
-                call_module_node.kwargs,
+def _partition_and_lower_one_graph_module(
+    tagged_graph_module: torch.fx.GraphModule,
+    partition_result: PartitionResult,
+    owning_program: ExportedProgram,
+) -> torch.fx.GraphModule:
+    """
+    Partitioned and lowered the graph module based on the partition tag, this is to handle one graph module.
+    """
+    # Extracting a partition rebuilds the graph and requires every other
+    # partition to still be inline, so partitions are extracted and spliced in
+    # one at a time. With concurrent_lowering(), only preprocess runs on the
+    # thread pool, on a program with its own FakeTensorMode, and the lowered
+    # modules are set once it is done.
+    executor = None
+    if _LOWERING_MAX_WORKERS > 1 and len(partition_result.partition_tags) > 1:
+        executor = ThreadPoolExecutor(max_workers=_LOWERING_MAX_WORKERS)
+    # Grad mode is thread local, so preprocess in the caller's mode.
+    grad_enabled = torch.is_grad_enabled()
+    # The node metadata that passes preserve is module state that each pass
+    # saves and restores, and the preprocess threads interleave these.
+    saved_node_meta_state = (
+        fx_traceback.should_preserve_node_meta,
+        fx_traceback.current_meta.copy(),
+    )
+
+    def lower(
+        submodule_program: ExportedProgram, delegation_spec: DelegationSpec
+    ) -> LoweredBackendModule:
+        with torch.set_grad_enabled(grad_enabled):
+            return to_backend(
+                delegation_spec.backend_id,
+                submodule_program,
+                delegation_spec.compile_specs,
             )
-            call_delegate_node.meta["debug_handle"] = len(
-                tagged_graph_module.graph.nodes
+
+    nodes_by_tag = _get_nodes_by_tag(
+        tagged_graph_module, partition_result.partition_tags.keys(), owning_program
+    )
+    lowered_any = False
+    pending: List[Tuple[str, "Future[LoweredBackendModule]"]] = []
+    try:
+        for tag, delegation_spec in partition_result.partition_tags.items():
+            partition = _extract_partition(
+                tagged_graph_module, tag, nodes_by_tag[tag], owning_program
             )
-            call_module_node.replace_all_uses_with(call_delegate_node)
-            tagged_graph_module.graph.erase_node(call_module_node)
-
-        # Delete all parameters/buffers consumed by the created exported program
-        toplevel_signature = owning_program.graph_signature
-        for node in tagged_graph_module.graph.nodes:
-            # Find placeholders consumed by the delegate
-            if node.op != "placeholder" or len(node.users) != 0:
+            if partition is None:
                 continue
+            submodule_program, call_module_node = partition
+            lowered_any = True
+
+            if executor is None or not _use_own_fake_mode(submodule_program):
+                lowered_submodule = lower(submodule_program, delegation_spec)
+                lowered_name = get_lowered_module_name(
+                    tagged_graph_module, lowered_submodule
+                )
+            else:
+                future = executor.submit(lower, submodule_program, delegation_spec)
+                # Reserve the name with an empty module until preprocess is done.
+                lowered_name = get_lowered_module_name(
+                    tagged_graph_module, torch.nn.Module()
+                )
+                pending.append((lowered_name, future))
+
+            _insert_lowered_submodule(
+                tagged_graph_module,
+                submodule_program,
+                call_module_node,
+                lowered_name,
+            )
 
-            if node.name in toplevel_signature.inputs_to_buffers:
-                # Delete the consumed buffers
-                buffer_name = toplevel_signature.inputs_to_buffers.get(node.name)
-                if buffer_name in owning_program.state_dict:
-                    owning_program.state_dict.pop(buffer_name)
-                else:
-                    owning_program.constants.pop(buffer_name)
-                tagged_graph_module.graph.erase_node(node)
-            elif node.name in toplevel_signature.inputs_to_parameters:
-                # Delete the consumed parameters
-                param_name = toplevel_signature.inputs_to_parameters.get(node.name)
-                owning_program.state_dict.pop(param_name)
-                tagged_graph_module.graph.erase_node(node)
-
+        # Waits in the order of the partitions, and re-raises the exception of
+        # the first failed preprocess.
+        for lowered_name, future in pending:
+            tagged_graph_module.add_module(lowered_name, future.result())
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+            (
+                fx_traceback.should_preserve_node_meta,
+                fx_traceback.current_meta,
+            ) = saved_node_meta_state
+
+    if lowered_any:
+        # Once for all partitions instead of after each of them.
+        _erase_consumed_placeholders(tagged_graph_module, owning_program)
+        legalize_graph(tagged_graph_module)
         tagged_graph_module.recompile()
     return tagged_graph_module
 
@@ -0,0 +1,270 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+# All rights reserved.
+#
+# This source code is licensed under the BSD-style license found in the
+# LICENSE file in the root directory of this source tree.
+
+import dataclasses
+import enum
+import hashlib
+import inspect
+import logging
+import os
+import pickle
+import sys
+import threading
+from typing import Any, Dict, List, Optional, Type
+
+import torch
+from executorch.exir.backend.backend_details import BackendDetails, PreprocessResult
+from executorch.exir.backend.compile_spec_schema import CompileSpec
+from executorch.exir.cache_util import atomic_write, update_with_tensor_data
+from torch._subclasses.fake_tensor import FakeTensor
+from torch.export import ExportedProgram
+from torch.export.graph_signature import InputKind
+from torch.utils import _pytree as pytree
+
+
+class _Uncacheable(Exception):
+    """Raised while hashing a program that has no canonical description."""
+
+
+def _update_with_tensor(hasher: "hashlib._Hash", tensor: torch.Tensor) -> None:
+    if type(tensor) is not torch.Tensor and not isinstance(tensor, torch.nn.Parameter):
+        raise _Uncacheable(f"Tensor of type {type(tensor)}")
+    update_with_tensor_data(hasher, tensor)
+
+
+def _describe_value(value: Any) -> str:
+    """Describes a node's meta["val"] without the identity of fake tensors."""
+
+    def describe(leaf: Any) -> str:
+        if isinstance(leaf, torch.Tensor):
+            return f"T({leaf.dtype}, {list(leaf.shape)}, {list(leaf.stride())})"
+        return repr(leaf)
+
+    return str(pytree.tree_map(describe, value))
+
+
+# Node.meta entries that record where a node came from, or that repeat
+# meta["val"], rather than describe what the node computes. Delegation tags
+# differ between otherwise identical partitions.
+_IGNORED_META_KEYS = {
+    "delegation_tag",
+    "example_value",
+    "from_node",
+    "nn_module_stack",
+    "original_aten",
+    "seq_nr",
+    "source_fn_stack",
+    "stack_trace",
+    "tensor_meta",
+    "torch_fn",
+    "val",
+}
+
+
+def _describe_meta(value: Any) -> str:
+    """
+    Describes a node.meta entry, e.g. the quantization parameters a pass
+    annotated the node with, since backends may read it during preprocess.
+    Raises _Uncacheable for values that cannot be described by their contents.
+    """
+    if value is None or isinstance(value, (bool, int, float, str, torch.dtype)):
+        return repr(value)
+    if isinstance(value, torch.Tensor):
+        if isinstance(value, FakeTensor):
+            return _describe_value(value)
+        hasher = hashlib.sha256()
+        _update_with_tensor(hasher, value)
+        return f"T({hasher.hexdigest()})"
+    if isinstance(value, (list, tuple)):
+        return f"{type(value).__name__}({', '.join(map(_describe_meta, value))})"
+    if isinstance(value, dict):
+        items = sorted(
+            f"{_describe_meta(k)}: {_describe_meta(v)}" for k, v in value.items()
+        )
+        return f"{{{', '.join(items)}}}"
+    if isinstance(value, enum.Enum):
+        return f"{type(value).__qualname__}.{value.name}"
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return _describe_meta((type(value).__qualname__, dataclasses.asdict(value)))
+    description = repr(value)
+    if " at 0x" in description:
+        raise _Uncacheable(f"Node meta of type {type(value)}")
+    return f"{type(value).__qualname__}:{description}"
+
+
+def _update_with_graph_module(
+    hasher: "hashlib._Hash", graph_module: torch.fx.GraphModule
+) -> None:
+    # Nodes are referred to by their position, so that the key does not depend
+    # on node names.
+    node_ids: Dict[torch.fx.Node, str] = {}
+    for node in graph_module.graph.nodes:
+        node_ids[node] = f"%{len(node_ids)}"
+        args = torch.fx.node.map_arg(
+            (node.args, node.kwargs), lambda arg: node_ids[arg]  # noqa: B023
+        )
+        target = node.target
+        if node.op == "get_attr":
+            _update_with_attribute(hasher, getattr(graph_module, node.target))
+            target = "attr"
+        elif not isinstance(target, str):
+            # E.g. aten and edge ops have the same qualified name.
+            name = getattr(target, "__qualname__", None) or str(target)
+            target = f"{getattr(target, '__module__', '')}.{name}"
+        # Backends may read any other meta, e.g. quantization parameters, or
+        # embed it into what they produce, like debug handles.
+        meta = {
+            key: value
+            for key, value in node.meta.items()
+            if key not in _IGNORED_META_KEYS
+        }
+        description = (
+            f"{node.op} {target} {args} {_describe_value(node.meta.get('val'))} "
+            + f"{_describe_meta(meta)}\n"
+        )
+        hasher.update(description.encode())
+
+
+def _update_with_attribute(hasher: "hashlib._Hash", attribute: Any) -> None:
+    if isinstance(attribute, torch.Tensor):
+        _update_with_tensor(hasher, attribute)
+    elif isinstance(attribute, torch.fx.GraphModule):
+        _update_with_graph_module(hasher, attribute)
+    elif hasattr(attribute, "processed_bytes"):
+        # A LoweredBackendModule nested in the program.
+        hasher.update(attribute.backend_id.encode())
+        hasher.update(attribute.processed_bytes)
+    else:
+        raise _Uncacheable(f"Attribute of type {type(attribute)}")
+
+
+_source_hashes: Dict[Type[BackendDetails], str] = {}
+
+
+def _backend_source_hash(backend: Type[BackendDetails]) -> str:
+    """
+    Returns a hash of the source of the module defining `backend`, so that
+    entries written to disk by an older version of the backend are not used.
+    Changes to other modules the backend depends on are not detected.
+    """
+    if backend not in _source_hashes:
+        try:
+            source = inspect.getsource(sys.modules[backend.__module__])
+        except (KeyError, OSError, TypeError):
+            source = ""
+        _source_hashes[backend] = hashlib.sha256(source.encode()).hexdigest()
+    return _source_hashes[backend]
+
+
+def preprocess_cache_key(
+    backend: Type[BackendDetails],
+    edge_program: ExportedProgram,
+    compile_specs: List[CompileSpec],
+) -> Optional[str]:
+    """
+    Returns a canonical hash of the graph of `edge_program`, its constants, and
+    the compile specs, or None if the program contains values that cannot be
+    hashed reliably, in which case it should not be cached.
+    """
+    hasher = hashlib.sha256()
+    hasher.update(f"{backend.__module__}.{backend.__qualname__}".encode())
+    hasher.update(_backend_source_hash(backend).encode())
+    for spec in compile_specs:
+        hasher.update(f"{spec.key}={len(spec.value)}:".encode())
+        hasher.update(spec.value)
+
+    try:
+        _update_with_graph_module(hasher, edge_program.graph_module)
+        for input_spec in edge_program.graph_signature.input_specs:
+            hasher.update(f"{input_spec.kind.name}\n".encode())
+            if input_spec.kind in (InputKind.PARAMETER, InputKind.BUFFER):
+                _update_with_tensor(hasher, edge_program.state_dict[input_spec.target])
+            elif input_spec.kind == InputKind.CONSTANT_TENSOR:
+                _update_with_tensor(hasher, edge_program.constants[input_spec.target])
+        for output_spec in edge_program.graph_signature.output_specs:
+            hasher.update(f"{output_spec.kind.name}\n".encode())
+    except _Uncacheable as e:
+        logging.debug("Not caching the preprocess result: %s", e)
+        return None
+    return hasher.hexdigest()
+
+
+class PreprocessCache:
+    """
+    Caches the PreprocessResults of backends, keyed on preprocess_cache_key(),
+    so that lowering identical partitions again, e.g. when exporting the same
+    model again or when several methods share a partition, skips the backend
+    compilation.
+
+    Results are kept in memory and, if `cache_dir` is given, also written to
+    `<cache_dir>/<key>.preprocess` so that later processes can reuse them.
+    Entries on disk are only invalidated by changes to the module that defines
+    the backend; clear `cache_dir` after updating anything else the backend
+    depends on.
+
+    `hits` and `misses` count the lookups. The cache can be shared between
+    threads, see backend_api.concurrent_lowering().
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None) -> None:
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+        self._results: Dict[str, PreprocessResult] = {}
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> str:
+        assert self.cache_dir is not None
+        return os.path.join(self.cache_dir, f"{key}.preprocess")
+
+    def _load(self, key: str) -> Optional[PreprocessResult]:
+        if self.cache_dir is None or not os.path.exists(self._path(key)):
+            return None
+        try:
+            with open(self._path(key), "rb") as f:
+                processed_bytes, debug_handle_map = pickle.load(f)
+        except Exception as e:
+            # It gets overwritten by the next put().
+            logging.warning(f"Ignoring unreadable preprocess cache entry {key}: {e}")
+            return None
+        return PreprocessResult(processed_bytes, debug_handle_map)
+
+    def _save(self, key: str, result: PreprocessResult) -> None:
+        def write(path: str) -> None:
+            with open(path, "wb") as f:
+                pickle.dump((result.processed_bytes, result.debug_handle_map), f)
+
+        try:
+            atomic_write(self._path(key), write)
+        except Exception as e:
+            logging.warning(f"Could not save preprocess cache entry {key}: {e}")
+
+    def get(self, key: str) -> Optional[PreprocessResult]:
+        """Returns a copy of the cached result for `key`, or None."""
+        with self._lock:
+            result = self._results.get(key)
+        if result is None:
+            result = self._load(key)
+        with self._lock:
+            if result is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._results[key] = result
+        return PreprocessResult(
+            result.processed_bytes,
+            (
+                dict(result.debug_handle_map)
+                if result.debug_handle_map is not None
+                else None
+            ),
+        )
+
+    def put(self, key: str, result: PreprocessResult) -> None:
+        with self._lock:
+            self._results[key] = result
+        if self.cache_dir is not None:
+            self._save(key, result)
@@ -0,0 +1,132 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+# All rights reserved.
+#
+# This source code is licensed under the BSD-style license found in the
+# LICENSE file in the root directory of this source tree.
+
+"""Times to_backend() on a synthetic graph with many small partitions.
+
+The defaults build a graph of about 10k nodes split into 1k partitions.
+
+Example:
+    python -m executorch.exir.backend.test.partition_lowering_benchmark \\
+        --num-partitions 1000 --ops-per-partition 8
+"""
+
+import argparse
+import time
+from typing import Dict, final
+
+import torch
+from executorch.exir import to_edge
+from executorch.exir.backend.backend_details import CompileSpec
+from executorch.exir.backend.partitioner import (
+    DelegationSpec,
+    Partitioner,
+    PartitionResult,
+)
+from executorch.exir.backend.test.backend_with_compiler_demo import (
+    BackendWithCompilerDemo,
+)
+from executorch.exir.dialects._ops import ops as exir_ops
+from executorch.exir.lowered_backend_module import get_lowered_backend_modules
+from torch._export.utils import is_param
+from torch.export import export, ExportedProgram
+
+
+class ManyPartitions(torch.nn.Module):
+    """
+    Blocks of an mm followed by adds, separated by a cos that the demo
+    backend does not get, so that each block is lowered as its own partition.
+    """
+
+    def __init__(self, num_partitions: int, ops_per_partition: int) -> None:
+        super().__init__()
+        self.weights = torch.nn.ParameterList(
+            [torch.nn.Parameter(torch.randn(4, 4)) for _ in range(num_partitions)]
+        )
+        self.num_adds = ops_per_partition - 1
+
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        for weight in self.weights:
+            x = torch.mm(x, weight)
+            for _ in range(self.num_adds):
+                x = x + x
+            x = torch.cos(x)
+        return x
+
+
+@final
+class RunsPartitioner(Partitioner):
+    """
+    Tags each run of consecutive mm/add nodes, and the parameters they
+    consume, as one partition. Unlike the capability based partitioners, this
+    takes linear time, so the benchmark measures to_backend() itself.
+    """
+
+    def __init__(self) -> None:
+        self.delegation_spec = DelegationSpec(
+            BackendWithCompilerDemo.__name__,
+            [CompileSpec("max_value", bytes([4]))],
+        )
+
+    def partition(self, exported_program: ExportedProgram) -> PartitionResult:
+        supported = {exir_ops.edge.aten.mm.default, exir_ops.edge.aten.add.Tensor}
+        partition_tags: Dict[str, DelegationSpec] = {}
+        tag = None
+        for node in exported_program.graph_module.graph.nodes:
+            if node.op == "call_function" and node.target in supported:
+                if tag is None:
+                    tag = f"tag{len(partition_tags)}"
+                    partition_tags[tag] = self.delegation_spec
+                node.meta["delegation_tag"] = tag
+            elif node.op == "call_function":
+                tag = None
+
+        for node in exported_program.graph_module.graph.find_nodes(op="placeholder"):
+            users_tags = {user.meta.get("delegation_tag") for user in node.users}
+            if is_param(exported_program, node) and len(users_tags) == 1:
+                node.meta["delegation_tag"] = users_tags.pop()
+
+        return PartitionResult(
+            tagged_exported_program=exported_program, partition_tags=partition_tags
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--num-partitions", type=int, default=1000)
+    parser.add_argument(
+        "--ops-per-partition",
+        type=int,
+        default=8,
+        help="Delegated ops per partition. Each partition also consumes one "
+        + "parameter and is followed by one op that is not delegated.",
+    )
+    parser.add_argument("--iterations", type=int, default=1)
+    args = parser.parse_args()
+
+    model = ManyPartitions(args.num_partitions, args.ops_per_partition).eval()
+    example_inputs = (torch.randn(4, 4),)
+    exported = export(model, example_inputs)
+
+    for _ in range(args.iterations):
+        # to_backend() consumes the delegated parameters of the edge program, so
+        # lower a fresh one each time.
+        edge = to_edge(exported)
+        num_nodes = len(edge.exported_program().graph.nodes)
+        start = time.perf_counter()
+        lowered = edge.to_backend(RunsPartitioner())
+        elapsed = time.perf_counter() - start
+
+        lowered_modules = get_lowered_backend_modules(
+            lowered.exported_program().graph_module
+        )
+        print(
+            f"{num_nodes} nodes, {len(lowered_modules)} partitions: "
+            + f"to_backend() took {elapsed:.3f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()  # pragma: no cover
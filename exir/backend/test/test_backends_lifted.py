@@ -10,7 +10,11 @@ from typing import Dict, List
 import executorch.exir as exir
 import torch
 from executorch.exir import to_edge
-from executorch.exir.backend.backend_api import LoweredBackendModule, to_backend
+from executorch.exir.backend.backend_api import (
+    concurrent_lowering,
+    LoweredBackendModule,
+    to_backend,
+)
 from executorch.exir.backend.compile_spec_schema import CompileSpec
 from executorch.exir.backend.partitioner import (
     DelegationSpec,
@@ -872,6 +876,63 @@ class TestBackends(unittest.TestCase):
             torch.allclose(model_output[0], ref_output, atol=1e-03, rtol=1e-03),
         )
 
+    def test_add_mul_partitioner_concurrent_lowering(self):
+        class Model(torch.nn.Module):
+            def __init__(self):
+                super().__init__()
+                self.register_buffer("c", torch.ones(2, 2))
+
+            def forward(self, a, x, b):
+                y = torch.mm(a, x)
+                z = y + b
+                a = z - a
+                y = torch.mm(a, self.c)
+                z = y + b
+                a = z - a
+                y = torch.mm(a, x)
+                z = y + b
+                return z
+
+        m = Model()
+        inputs = (torch.randn(2, 2), torch.randn(2, 2), torch.randn(2, 2))
+
+        sequential_prog = to_edge(export(m, inputs)).to_backend(AddMulPartitionerDemo())
+        with concurrent_lowering(max_workers=3):
+            concurrent_prog = to_edge(export(m, inputs)).to_backend(
+                AddMulPartitionerDemo()
+            )
+
+        sequential_modules = get_lowered_backend_modules(
+            sequential_prog.exported_program().graph_module
+        )
+        concurrent_modules = get_lowered_backend_modules(
+            concurrent_prog.exported_program().graph_module
+        )
+        self.assertEqual(len(concurrent_modules), 3)
+        # The lowered modules are spliced in in the order of the partitions.
+        self.assertEqual(
+            [module.processed_bytes for module in concurrent_modules],
+            [module.processed_bytes for module in sequential_modules],
+        )
+        self.assertEqual(
+            concurrent_prog.exported_program().graph_signature,
+            sequential_prog.exported_program().graph_signature,
+        )
+        self.assertTrue(
+            torch.allclose(
+                concurrent_prog.exported_program().module()(*inputs), m(*inputs)
+            )
+        )
+
+        # The partitions were traced in their own fake modes; the lowered
+        # program must still go through to_executorch() and run.
+        executorch_prog = concurrent_prog.to_executorch()
+        executorch_module = _load_for_executorch_from_buffer(executorch_prog.buffer)
+        model_output = executorch_module.run_method("forward", inputs)
+        self.assertTrue(
+            torch.allclose(model_output[0], m(*inputs), atol=1e-03, rtol=1e-03)
+        )
+
     @vary_segments
     def test_partitioner_with_attributes(self, extract_delegate_segments: bool):
         """
@@ -0,0 +1,137 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+# All rights reserved.
+#
+# This source code is licensed under the BSD-style license found in the
+# LICENSE file in the root directory of this source tree.
+
+import tempfile
+import unittest
+
+import torch
+from executorch.exir import to_edge
+from executorch.exir.backend.backend_api import cached_preprocess, to_backend
+from executorch.exir.backend.compile_spec_schema import CompileSpec
+from executorch.exir.backend.preprocess_cache import (
+    preprocess_cache_key,
+    PreprocessCache,
+)
+from executorch.exir.backend.test.backend_with_compiler_demo import (
+    BackendWithCompilerDemo,
+)
+from executorch.exir.backend.test.op_partitioner_demo import AddMulPartitionerDemo
+from executorch.exir.lowered_backend_module import get_lowered_backend_modules
+from torch.export import export, ExportedProgram
+
+
+class MatmulAdd(torch.nn.Module):
+    def __init__(self):
+        super().__init__()
+        self.weight = torch.nn.Parameter(torch.randn(2, 2))
+
+    def forward(self, x):
+        return torch.mm(x, self.weight) + x
+
+
+class TestPreprocessCache(unittest.TestCase):
+    def setUp(self) -> None:
+        torch.manual_seed(0)
+        self.compile_specs = [CompileSpec("max_value", bytes([4]))]
+
+    def _edge_program(self, model: torch.nn.Module) -> ExportedProgram:
+        return to_edge(export(model, (torch.randn(2, 2),))).exported_program()
+
+    def _lower(self, edge_program: ExportedProgram, compile_specs=None):
+        return to_backend(
+            BackendWithCompilerDemo.__name__,
+            edge_program,
+            compile_specs or self.compile_specs,
+        )
+
+    def test_lowering_again_hits(self) -> None:
+        model = MatmulAdd()
+        with cached_preprocess() as cache:
+            first = self._lower(self._edge_program(model))
+            self.assertEqual((cache.hits, cache.misses), (0, 1))
+
+            second = self._lower(self._edge_program(model))
+            self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+        self.assertEqual(first.processed_bytes, second.processed_bytes)
+        self.assertEqual(first.meta, second.meta)
+
+    def test_weights_and_compile_specs_are_part_of_the_key(self) -> None:
+        model = MatmulAdd()
+        with cached_preprocess() as cache:
+            self._lower(self._edge_program(model))
+
+            with torch.no_grad():
+                model.weight.add_(1)
+            self._lower(self._edge_program(model))
+            self.assertEqual((cache.hits, cache.misses), (0, 2))
+
+            self._lower(
+                self._edge_program(model), [CompileSpec("max_value", bytes([8]))]
+            )
+            self.assertEqual((cache.hits, cache.misses), (0, 3))
+
+    def test_node_meta_is_part_of_the_key(self) -> None:
+        model = MatmulAdd()
+
+        def key(**meta) -> str:
+            edge_program = self._edge_program(model)
+            for node in edge_program.graph.nodes:
+                if node.op == "call_function":
+                    node.meta.update(meta)
+            return preprocess_cache_key(
+                BackendWithCompilerDemo, edge_program, self.compile_specs
+            )
+
+        # E.g. quantization parameters annotated by a pass before lowering.
+        quant_attrs = {"scale": 0.1, "zero_point": 3, "dtype": torch.int8}
+        self.assertEqual(key(quant_attrs=quant_attrs), key(quant_attrs=quant_attrs))
+        self.assertNotEqual(
+            key(quant_attrs=quant_attrs),
+            key(quant_attrs={**quant_attrs, "scale": 0.2}),
+        )
+        self.assertNotEqual(key(quant_attrs=quant_attrs), key())
+        self.assertNotEqual(
+            key(scales=torch.ones(2)), key(scales=torch.full((2,), 2.0))
+        )
+        # Where a node came from does not change what it computes.
+        self.assertEqual(key(stack_trace="a"), key(stack_trace="b"))
+        # Values only described by their identity disable caching.
+        self.assertIsNone(key(annotation=object()))
+
+    def test_disk_cache(self) -> None:
+        model = MatmulAdd()
+        with tempfile.TemporaryDirectory() as cache_dir:
+            with cached_preprocess(PreprocessCache(cache_dir)):
+                expected = self._lower(self._edge_program(model))
+
+            # A new cache, as in another process, reads the entry from disk.
+            with cached_preprocess(PreprocessCache(cache_dir)) as cache:
+                lowered = self._lower(self._edge_program(model))
+            self.assertEqual((cache.hits, cache.misses), (1, 0))
+            self.assertEqual(lowered.processed_bytes, expected.processed_bytes)
+
+    def test_partitioner(self) -> None:
+        model = MatmulAdd()
+        expected = to_edge(export(model, (torch.randn(2, 2),))).to_backend(
+            AddMulPartitionerDemo()
+        )
+        with cached_preprocess() as cache:
+            for _ in range(2):
+                lowered = to_edge(export(model, (torch.randn(2, 2),))).to_backend(
+                    AddMulPartitionerDemo()
+                )
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+        def processed_bytes(edge_manager):
+            return [
+                module.processed_bytes
+                for module in get_lowered_backend_modules(
+                    edge_manager.exported_program().graph_module
+                )
+            ]
+
+        self.assertEqual(processed_bytes(lowered), processed_bytes(expected))
@@ -0,0 +1,45 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+# All rights reserved.
+#
+# This source code is licensed under the BSD-style license found in the
+# LICENSE file in the root directory of this source tree.
+
+# Helpers shared by the on-disk caches of exported programs and of backend
+# preprocess results.
+
+import contextlib
+import hashlib
+import os
+import tempfile
+from typing import Callable
+
+import torch
+
+
+def update_with_tensor_data(hasher: "hashlib._Hash", tensor: torch.Tensor) -> None:
+    """
+    Updates `hasher` with the dtype, shape and contents of a plain tensor.
+    Callers decide how to hash tensor subclasses and tensors without data.
+    """
+    hasher.update(f"{tensor.dtype}{list(tensor.shape)}".encode())
+    data = tensor.detach().contiguous().cpu().reshape(-1)
+    hasher.update(memoryview(data.view(torch.uint8).numpy()))
+
+
+def atomic_write(path: str, write: Callable[[str], None]) -> None:
+    """
+    Calls `write` with a temporary path in the directory of `path`, then moves
+    the file to `path`, so that concurrent or interrupted runs never see a
+    partial file. The temporary file is removed if `write` raises.
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    os.close(fd)
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(tmp_path)
+        raise
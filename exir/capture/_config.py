@@ -60,6 +60,12 @@ class ExecutorchBackendConfig:
     )
     emit_stacktrace: bool = False
 
+    # Whether constant operator arguments with the same value, like scalars,
+    # None and int lists, share a single EValue in each execution plan. This
+    # makes the values table smaller, which reduces the size of the .pte file
+    # and the time and memory the runtime needs to load each method.
+    intern_values: bool = False
+
     # Whether to move delegate data blobs from the Program into separate
     # segments, rather than encoding those blobs in the flatbuffer data.
     # This makes it possible to free those blobs at runtime.
@@ -82,6 +88,11 @@ class ExecutorchBackendConfig:
     # If provided, the minimum alignment of delegate data in the program. Must
     # be a power of 2. If not provided, uses the value in the schema file.
     delegate_alignment: Optional[int] = None
+
+    # Whether to store constant buffers and delegate data blobs with identical
+    # contents only once in the .pte file. Useful for multi-method programs
+    # whose methods share weights.
+    deduplicate_data: bool = False
     sym_shape_eval_pass: PassType = HintBasedSymShapeEvalPass()
 
     # If set to true, view_copy operations will be converted to lightweight
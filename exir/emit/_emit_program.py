@@ -82,6 +82,7 @@ def emit_program(
     methods: Union[ExportedProgram, Dict[str, ExportedProgram]],
     emit_stacktrace: bool = False,
     prim_getters: Optional[Dict[str, Any]] = None,
+    intern_values: bool = False,
 ) -> EmitterOutput:
     """
     Given a exported program, it returns the program in the format
@@ -93,6 +94,10 @@ def emit_program(
             ExportedPrograms.
         emit_stacktrace: Flag to enable emission of a stacktrace for each
            instruction for debugging purposes
+        prim_getters: Values to emit as methods that return them.
+        intern_values: Whether constant arguments with the same value, like
+           scalars and int lists, share a single EValue within each execution
+           plan, which makes the values table smaller
 
     Return:
         The program in a Python class which mimics the flatbuffer schema
@@ -127,6 +132,7 @@ def emit_program(
             operator_cache={},
             delegate_cache={},
             emit_stacktrace=emit_stacktrace,
+            intern_values=intern_values,
         )
 
         gm = _remove_non_user_outputs(exported_program)
@@ -147,6 +153,8 @@ def emit_program(
     if prim_getters is not None:
         plans.extend(emitter._emit_prim_getters(prim_getters))
 
+    program_state.deduplicate_buffers(plans)
+
     return EmitterOutput(
         debug_handle_map=debug_handle_map,
         method_to_delegate_debug_id_map=method_to_delegate_debug_id_map,
@@ -28,11 +28,11 @@ their instructions.
 # presence of aot autograd param lifting.
 
 # pyre-strict
-import ctypes
 import hashlib
 import operator
 import typing
 import warnings
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
 from typing import Any, Callable, cast, Dict, List, Mapping, Optional, Tuple, Union
 
@@ -95,6 +95,117 @@ from torch.utils import _pytree as pytree
 from typing_extensions import TypeAlias
 
 
+# Buffers that may have duplicates are hashed on several threads when they are at least this
+# large in total.
+_PARALLEL_HASH_MIN_BYTES: int = 1 << 20
+
+
+def _storage_bytes(storage: torch.UntypedStorage) -> memoryview:
+    """Returns a byte view of the storage that keeps it alive, without copying it."""
+    data = torch.empty(0, dtype=torch.uint8).set_(storage, 0, (storage.nbytes(),))
+    return memoryview(data.numpy())
+
+
+def _digest(buffer_data: Any) -> bytes:
+    return hashlib.sha256(buffer_data).digest()
+
+
+class _BufferIndex:
+    """Finds the buffer in a list of Buffers that references a storage.
+
+    While the program is emitted, storages seen before are found by their identity, and the
+    buffers are grouped by size. Buffers with the same contents are merged by deduplicate()
+    once every method has been emitted, which hashes each group of buffers with the same
+    size, all at once and in parallel.
+    """
+
+    def __init__(self, buffers: List[Buffer]) -> None:
+        self.buffers = buffers
+        # Keyed on the (data_ptr, nbytes) of the storages referenced by each buffer. The
+        # storage is kept next to its buffer index, so that its memory can't be reused by
+        # another storage with the same key.
+        self._by_storage: Dict[Tuple[int, int], Tuple[torch.UntypedStorage, int]] = {}
+        self._by_size: Dict[int, List[int]] = {}
+
+    def find_or_append(self, storage: torch.UntypedStorage) -> Tuple[int, bool]:
+        """Returns the index of the buffer referencing `storage`, and whether it is a new
+        buffer, appended because there was none.
+        """
+        nbytes = storage.nbytes()
+        key = (storage.data_ptr(), nbytes)
+        if key in self._by_storage:
+            return self._by_storage[key][1], False
+
+        index = len(self.buffers)
+        self.buffers.append(Buffer(storage=_storage_bytes(storage)))
+        self._by_size.setdefault(nbytes, []).append(index)
+        self._by_storage[key] = (storage, index)
+        return index, True
+
+    def deduplicate(self) -> List[int]:
+        """Removes the buffers whose contents duplicate an earlier buffer.
+
+        Returns:
+            The new index of each buffer, by its index before deduplication.
+        """
+        pending = [
+            i for indices in self._by_size.values() if len(indices) > 1 for i in indices
+        ]
+        data = [self.buffers[i].storage for i in pending]
+        # Hashing releases the GIL.
+        if len(data) > 1 and sum(len(d) for d in data) >= _PARALLEL_HASH_MIN_BYTES:
+            with ThreadPoolExecutor() as pool:
+                digests = list(pool.map(_digest, data))
+        else:
+            digests = [_digest(d) for d in data]
+
+        unique = list(range(len(self.buffers)))
+        first_index: Dict[Tuple[int, bytes], int] = {}
+        for i, buffer_data, digest in zip(pending, data, digests):
+            unique[i] = first_index.setdefault((len(buffer_data), digest), i)
+
+        index_map: List[int] = []
+        buffers: List[Buffer] = []
+        for i, buffer in enumerate(self.buffers):
+            if unique[i] == i:
+                index_map.append(len(buffers))
+                buffers.append(buffer)
+            else:
+                index_map.append(index_map[unique[i]])
+        self.buffers[:] = buffers
+        self._by_storage = {
+            key: (storage, index_map[i])
+            for key, (storage, i) in self._by_storage.items()
+        }
+        self._by_size = {
+            size: [index_map[i] for i in indices if unique[i] == i]
+            for size, indices in self._by_size.items()
+        }
+        return index_map
+
+
+# EValues that are never written to by the runtime when they are arguments.
+_INTERNABLE_VALUE_TYPES = (
+    Null,
+    Int,
+    Bool,
+    Double,
+    String,
+    IntList,
+    BoolList,
+    DoubleList,
+)
+
+
+def _interning_key(evalue: EValue) -> Optional[str]:
+    """Returns a key identifying the type and value of an internable EValue, or None."""
+    if not isinstance(evalue.val, _INTERNABLE_VALUE_TYPES):
+        return None
+    # The repr tells apart values that compare equal, like Int(1) and Bool(True), or 0.0 and
+    # -0.0. The items of an IntList are ids of values, which are interned themselves.
+    return repr(evalue.val)
+
+
 @dataclass
 class _ProgramState:
     """State shared between all methods of a program and the graph module it represents.
@@ -106,19 +217,39 @@ class _ProgramState:
     # Parallel list of specs and the buffers that backed them, have to add + 1 to any index in here
     # as index 0 in the constant_buffer is reserved.
     allocated_specs: List[TensorSpec] = field(default_factory=list)
-    # Weights in any arbitrary graph_module only need to compare against weights from previously
-    # emitted graph modules, not any weights emitted from itself. This should speed up the lookup,
-    # from O(N) to O(1)
-    cached_spec_hash_values: Dict[str, int] = field(default_factory=dict)
-    cached_spec_mutable_hash_values: Dict[str, int] = field(default_factory=dict)
     # The 0 index is reserved to be pointed to by non-constant tensors, so add an empty placeholder.
     constant_buffer: List[Buffer] = field(default_factory=lambda: [Buffer(storage=b"")])
     # The 0 index is reserved to be pointed to by non-constant tensors, so add an empty placeholder.
     mutable_buffer: List[Buffer] = field(default_factory=lambda: [Buffer(storage=b"")])
+    # Find the buffers already referencing a storage, and merge those holding the same contents,
+    # so that weights shared within and across methods are serialized once.
+    constant_buffer_index: "_BufferIndex" = field(init=False)
+    mutable_buffer_index: "_BufferIndex" = field(init=False)
     # Delegate data stored directly in the flatbuffer. Pointed to by BackendDelegateDataReference,
     # and should be copied to Program.backend_delegate_data.
     backend_delegate_data: List[BackendDelegateInlineData] = field(default_factory=list)
 
+    def __post_init__(self) -> None:
+        self.constant_buffer_index = _BufferIndex(self.constant_buffer)
+        self.mutable_buffer_index = _BufferIndex(self.mutable_buffer)
+
+    def deduplicate_buffers(self, plans: List[ExecutionPlan]) -> None:
+        """Merges the buffers that hold the same data once every method has been emitted, and
+        points the tensors of `plans` to the remaining buffers.
+        """
+        constant_map = self.constant_buffer_index.deduplicate()
+        mutable_map = self.mutable_buffer_index.deduplicate()
+        for plan in plans:
+            for evalue in plan.values:
+                tensor = evalue.val
+                if not isinstance(tensor, Tensor) or tensor.data_buffer_idx == 0:
+                    continue
+                # Tensors with allocation info refer to the mutable buffers.
+                index_map = (
+                    mutable_map if tensor.allocation_info is not None else constant_map
+                )
+                tensor.data_buffer_idx = index_map[tensor.data_buffer_idx]
+
 
 @dataclass
 class _EmitterState:
@@ -134,8 +265,13 @@ class _EmitterState:
     operator_cache: Dict[Tuple[str, str], int]
     delegate_cache: Dict[bytes, int]
     emit_stacktrace: bool
+    # Whether constant arguments with the same value share a single EValue, see
+    # _Emitter._emit_constant.
+    intern_values: bool = False
 
     spec2id_dict: Dict[TensorSpec, int] = field(default_factory=dict)
+    # Index in the values table of each interned constant, keyed on _interning_key().
+    constant_cache: Dict[str, int] = field(default_factory=dict)
 
     def spec2id(self, spec: TensorSpec) -> int:
         """Map a TensorSpec to value index in the values array."""
@@ -270,9 +406,7 @@ class _Emitter(torch.fx.Interpreter):
             if isinstance(item, _AbstractValue):
                 boxed_list.append(item.id)
             elif isinstance(item, int):
-                boxed_list.append(
-                    self._emit_evalue(self._constant_to_evalue(item, None)).id
-                )
+                boxed_list.append(self._emit_constant(item, None).id)
             else:
                 self._internal_assert_emitter(
                     False, self.node, "Unsupported type encountered in int list."
@@ -353,48 +487,19 @@ class _Emitter(torch.fx.Interpreter):
 
         if spec.const:
             # Tensor with a blob we need to serialize. May not actually be constant at runtime
-            # if it's a weight with an associated gradient
-            spec_array_type = (
-                ctypes.c_char * typing.cast(torch.UntypedStorage, spec.storage).nbytes()
+            # if it's a weight with an associated gradient. The buffer references the storage,
+            # which is only copied when the program is serialized.
+            buffer_index = (
+                self.program_state.mutable_buffer_index
+                if allocation_info
+                else self.program_state.constant_buffer_index
             )
-
-            buffer_data = (
-                bytes(
-                    ctypes.cast(
-                        typing.cast(torch.UntypedStorage, spec.storage).data_ptr(),
-                        ctypes.POINTER(spec_array_type),
-                    ).contents
-                )
-                if spec.allocated_memory != 0
-                else b""
+            buffer_idx, is_new = buffer_index.find_or_append(
+                typing.cast(torch.UntypedStorage, spec.storage)
             )
-
-            hashed = hashlib.sha256(buffer_data).hexdigest()
-
-            if allocation_info:
-                buffer_idx = self.program_state.cached_spec_mutable_hash_values.get(
-                    hashed, -1
-                )
-            else:
-                buffer_idx = self.program_state.cached_spec_hash_values.get(hashed, -1)
-
-            # Haven't seen this constant before
-            if buffer_idx == -1:
-                # Update buffer_idx to point to the end of the list where we are adding the new buffer.
-                buffer = Buffer(storage=buffer_data)
+            if is_new:
                 self.program_state.allocated_specs.append(spec)
-                # +1 because the first buffer location is reserved
-
-                if allocation_info:
-                    buffer_idx = len(self.program_state.mutable_buffer)
-                    self.program_state.cached_spec_mutable_hash_values[hashed] = (
-                        buffer_idx
-                    )
-                    self.program_state.mutable_buffer.append(buffer)
-                else:
-                    buffer_idx = len(self.program_state.constant_buffer)
-                    self.program_state.cached_spec_hash_values[hashed] = buffer_idx
-                    self.program_state.constant_buffer.append(buffer)
+            buffer_data = buffer_index.buffers[buffer_idx].storage
 
             if spec.const and spec.nbytes() != len(buffer_data):
                 raise InternalError(
@@ -956,7 +1061,29 @@ class _Emitter(torch.fx.Interpreter):
         return the previously emitted location"""
         if isinstance(arg, _AbstractValue):
             return arg
-        return self._emit_evalue(self._constant_to_evalue(arg, arg_type))
+        return self._emit_constant(arg, arg_type)
+
+    def _emit_constant(
+        self, val: _Argument, val_type: Optional[_SchemaType]
+    ) -> _AbstractValue:
+        """Emits a constant argument.
+
+        If the emitter state interns values, constants that the runtime never writes to, like
+        scalars, strings, None and lists of them, are emitted once per execution plan and shared
+        by every argument with the same value.
+        """
+        evalue = self._constant_to_evalue(val, val_type)
+        if not self.emitter_state.intern_values:
+            return self._emit_evalue(evalue)
+
+        key = _interning_key(evalue)
+        if key is None:
+            return self._emit_evalue(evalue)
+        value_id = self.emitter_state.constant_cache.get(key)
+        if value_id is None:
+            value_id = self._emit_evalue(evalue).id
+            self.emitter_state.constant_cache[key] = value_id
+        return _AbstractValue(value_id, None)
 
     def _get_sym_ret(
         self,
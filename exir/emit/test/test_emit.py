@@ -1538,6 +1538,85 @@ class TestEmit(unittest.TestCase):
         self.assertEqual(len(program.constant_buffer), 2)
         self.assertEqual(len(program.constant_buffer[1].storage), 24)
 
+    def test_constant_buffer_deduplication(self) -> None:
+        class SharedWeights(nn.Module):
+            def __init__(self):
+                super().__init__()
+                self.a = torch.nn.Parameter(torch.ones(2, 2))
+                # Same contents as `a`, in a different storage.
+                self.b = torch.nn.Parameter(torch.ones(2, 2))
+                # Same size as `a`, different contents.
+                self.c = torch.nn.Parameter(torch.full((2, 2), 2.0))
+
+            def forward(self, x):
+                return x + self.a + self.b + self.c
+
+        model = SharedWeights()
+        program = to_edge(export(model, (torch.ones(2, 2),))).to_executorch()
+        program = program._emitter_output.program
+
+        self.assertEqual(len(program.constant_buffer), 3)
+        # The buffers reference the weights instead of copying them.
+        storage = program.constant_buffer[1].storage
+        self.assertIsInstance(storage, memoryview)
+        self.assertEqual(bytes(storage), model.a.detach().numpy().tobytes())
+        self.assertEqual(
+            bytes(program.constant_buffer[2].storage),
+            model.c.detach().numpy().tobytes(),
+        )
+        # The tensors of `a` and `b` point to the merged buffer.
+        constant_indices = [
+            value.val.data_buffer_idx
+            for value in program.execution_plan[0].values
+            if isinstance(value.val, Tensor) and value.val.data_buffer_idx > 0
+        ]
+        self.assertEqual(sorted(constant_indices), [1, 1, 2])
+
+    def test_intern_values(self) -> None:
+        class RepeatedArgs(nn.Module):
+            def forward(self, x):
+                for _ in range(4):
+                    x = torch.softmax(x.reshape(2, 8), dim=-1)
+                    x = torch.cumsum(x.reshape(4, 4), dim=-1)
+                return x
+
+        def emit(intern_values: bool) -> ExecutionPlan:
+            edge = to_edge(export(RepeatedArgs(), (torch.randn(4, 4),)))
+            program = edge.to_executorch(
+                ExecutorchBackendConfig(intern_values=intern_values)
+            )
+            return program.executorch_program.execution_plan[0]
+
+        plan = emit(False)
+        interned_plan = emit(True)
+        self.assertLess(len(interned_plan.values), len(plan.values))
+        self.assertEqual(len(interned_plan.chains), len(plan.chains))
+
+        def count(plan: ExecutionPlan, value: EValue) -> int:
+            return sum(v == value for v in plan.values)
+
+        self.assertGreater(count(plan, EValue(Int(-1))), 1)
+        self.assertEqual(count(interned_plan, EValue(Int(-1))), 1)
+        self.assertEqual(count(interned_plan, EValue(Bool(False))), 1)
+        self.assertEqual(
+            sum(isinstance(v.val, IntList) for v in interned_plan.values), 2
+        )
+
+        # The kernel arguments have the same values.
+        def args(plan: ExecutionPlan) -> List[List[object]]:
+            def resolve(i: int) -> object:
+                value = plan.values[i].val
+                if isinstance(value, IntList):
+                    return [plan.values[item].val for item in value.items]
+                return value
+
+            return [
+                [resolve(i) for i in instruction.instr_args.args]
+                for instruction in plan.chains[0].instructions
+            ]
+
+        self.assertEqual(args(interned_plan), args(plan))
+
     def test_mutable_buffers(self) -> None:
         def count_copies(gm: torch.fx.GraphModule) -> int:
             return sum(
@@ -0,0 +1,97 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+# All rights reserved.
+#
+# This source code is licensed under the BSD-style license found in the
+# LICENSE file in the root directory of this source tree.
+
+"""Compares programs emitted with and without ExecutorchBackendConfig.intern_values.
+
+Reports the size of the values table, the size of the .pte file and the time
+the runtime takes to load it, for a stack of transformer-like blocks whose ops
+repeat the same shapes, dims and flags, and checks that both programs compute
+the same outputs.
+
+Example:
+    python -m executorch.exir.emit.test.value_interning_benchmark --num-layers 32
+"""
+
+import argparse
+import time
+
+import torch
+from executorch.exir import ExecutorchBackendConfig, to_edge
+from executorch.extension.pybindings.portable_lib import (
+    _load_for_executorch_from_buffer,
+)
+from torch.export import export
+
+
+class Block(torch.nn.Module):
+    def __init__(self, dim: int, num_heads: int) -> None:
+        super().__init__()
+        self.num_heads = num_heads
+        self.qkv = torch.nn.Linear(dim, 3 * dim)
+        self.proj = torch.nn.Linear(dim, dim)
+        self.norm = torch.nn.LayerNorm(dim)
+
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        seq_len, dim = x.shape
+        head_dim = dim // self.num_heads
+        q, k, v = self.qkv(self.norm(x)).split(dim, dim=-1)
+        q, k, v = (
+            t.reshape(seq_len, self.num_heads, head_dim).transpose(0, 1)
+            for t in (q, k, v)
+        )
+        attention = torch.softmax(q @ k.transpose(-2, -1) / head_dim**0.5, dim=-1)
+        out = (attention @ v).transpose(0, 1).reshape(seq_len, dim)
+        return x + self.proj(out)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--num-layers", type=int, default=32)
+    parser.add_argument("--dim", type=int, default=64)
+    parser.add_argument("--num-heads", type=int, default=4)
+    parser.add_argument("--seq-len", type=int, default=16)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    model = torch.nn.Sequential(
+        *(Block(args.dim, args.num_heads) for _ in range(args.num_layers))
+    ).eval()
+    example_inputs = (torch.randn(args.seq_len, args.dim),)
+    exported = export(model, example_inputs)
+
+    baseline_outputs = None
+    for intern_values in (False, True):
+        program = to_edge(exported).to_executorch(
+            ExecutorchBackendConfig(intern_values=intern_values)
+        )
+        num_values = len(program.executorch_program.execution_plan[0].values)
+        buffer = program.buffer
+
+        outputs = _load_for_executorch_from_buffer(buffer).forward(example_inputs)
+        if baseline_outputs is None:
+            baseline_outputs = outputs
+        # The fastest of several runs, since a single one is noisy.
+        load_time = float("inf")
+        for _ in range(args.repeats):
+            start = time.perf_counter()
+            for _ in range(args.iterations):
+                _load_for_executorch_from_buffer(buffer)
+            load_time = min(load_time, (time.perf_counter() - start) / args.iterations)
+
+        same_outputs = all(
+            torch.equal(output, baseline_output)
+            for output, baseline_output in zip(outputs, baseline_outputs)
+        )
+        print(
+            f"intern_values={intern_values}: {num_values} values, "
+            + f"{len(buffer)} bytes, loaded in {load_time * 1e3:.3f}ms "
+            + f"(same outputs: {same_outputs})"
+        )
+
+
+if __name__ == "__main__":
+    main()  # pragma: no cover
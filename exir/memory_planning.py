@@ -6,9 +6,12 @@
 
 # pyre-strict
 
+import bisect
+import heapq
 import itertools
 import logging
 import operator
+import sys
 import typing
 from collections import defaultdict
 from dataclasses import dataclass
@@ -132,8 +135,6 @@ class Verifier:
         Returns:
             Number of pairs of tenors that have overlapping storage.
         """
-        num_reuse_pairs = 0
-
         # unique tensors specs
         all_specs = list(
             collect_specs_from_nodes(
@@ -147,37 +148,137 @@ class Verifier:
                 dedup=True,
             )
         )
+        return self.verify_specs_storage_reuse(
+            all_specs, allow_lifetime_and_storage_overlap
+        )
 
-        for lhs_spec_idx, lhs_spec in enumerate(all_specs):
-            for rhs_spec in all_specs[lhs_spec_idx + 1 :]:
-                # Check that both specs are consistent about whether mem_obj_id is defined
-                if (lhs_spec.mem_obj_id is None) != (rhs_spec.mem_obj_id is None):
-                    raise InternalError(
-                        "Specs do not agree on whether mem_obj_id is defined."
-                    )
-
-                has_storage_overlap = Verifier.storage_overlap(lhs_spec, rhs_spec)
-                if not has_storage_overlap:
-                    continue
+    @classmethod
+    def verify_specs_storage_reuse(
+        cls,
+        all_specs: List[TensorSpec],
+        allow_lifetime_and_storage_overlap: bool = False,
+    ) -> int:
+        """
+        Implements verify_storage_reuse() for a list of unique specs.
 
-                if not allow_lifetime_and_storage_overlap and self.lifetime_overlap(
-                    lhs_spec, rhs_spec
-                ):
-                    raise InternalError(
-                        f"Unexpected storage overlap: lhs {lhs_spec}, rhs {rhs_spec}"
-                    )
+        Instead of comparing every pair of specs, the specs of each memory id
+        are swept in order of memory offset to count the pairs with
+        overlapping storage, and in order of lifetime to find pairs that also
+        overlap in lifetime. Both take O(n log n) time.
+        """
+        # Check that all specs are consistent about whether mem_obj_id is defined
+        for rhs_spec in all_specs[1:]:
+            if (all_specs[0].mem_obj_id is None) != (rhs_spec.mem_obj_id is None):
+                raise InternalError(
+                    "Specs do not agree on whether mem_obj_id is defined."
+                )
 
-                # Check that each mem_obj_id is consistent with whether the tensors have
-                # storage overlap
-                if not Verifier.mem_obj_id_match(lhs_spec, rhs_spec):
-                    raise InternalError(
-                        f"Unexpected mem_obj_id mismatch: lhs {lhs_spec}, rhs {rhs_spec}"
-                    )
+        specs_by_mem_id: Dict[Optional[int], List[int]] = defaultdict(list)
+        for idx, spec in enumerate(all_specs):
+            specs_by_mem_id[spec.mem_id].append(idx)
 
-                num_reuse_pairs += 1
+        num_reuse_pairs = 0
+        for indices in specs_by_mem_id.values():
+            if len(indices) < 2:
+                continue
+            for idx in indices:
+                spec = all_specs[idx]
+                internal_assert(
+                    spec.allocated_memory >= 0,
+                    f"{spec} should have non-zero allocated memory",
+                )
+                internal_assert(
+                    isinstance(spec.mem_offset, int) and spec.mem_offset >= 0,
+                    f"{spec} should have specified memory offset",
+                )
+            # Zero-sized tensors have empty storage, which overlaps nothing.
+            indices = [idx for idx in indices if all_specs[idx].allocated_memory > 0]
+            if not allow_lifetime_and_storage_overlap:
+                cls._check_no_lifetime_and_storage_overlap(all_specs, indices)
+            num_reuse_pairs += cls._count_storage_overlap_pairs(all_specs, indices)
 
         return num_reuse_pairs
 
+    @classmethod
+    def _raise_for_pair(
+        cls, message: str, all_specs: List[TensorSpec], lhs_idx: int, rhs_idx: int
+    ) -> None:
+        lhs_idx, rhs_idx = min(lhs_idx, rhs_idx), max(lhs_idx, rhs_idx)
+        raise InternalError(
+            f"{message}: lhs {all_specs[lhs_idx]}, rhs {all_specs[rhs_idx]}"
+        )
+
+    @classmethod
+    def _check_no_lifetime_and_storage_overlap(
+        cls, all_specs: List[TensorSpec], indices: List[int]
+    ) -> None:
+        """
+        Sweeps over time, keeping the storage ranges of the live specs sorted by
+        offset. If no live specs overlap in storage, a new spec can only
+        overlap with its neighbors in that order.
+        """
+        for idx in indices:
+            lifetime = all_specs[idx].lifetime
+            internal_assert(
+                lifetime[0] is not None and lifetime[1] is not None,
+                f"{all_specs[idx]} should have valid start and end",
+            )
+        # (storage start, storage end, index) of live specs, sorted by offset.
+        live: List[Tuple[int, int, int]] = []
+        # (lifetime end, storage start, storage end, index) of live specs.
+        ends: List[Tuple[int, int, int, int]] = []
+        for idx in sorted(indices, key=lambda i: all_specs[i].lifetime[0]):
+            spec = all_specs[idx]
+            start, end = spec.lifetime
+            if start > end:
+                # Empty lifetime.
+                continue
+            while ends and ends[0][0] < start:
+                _, mem_start, mem_end, dead_idx = heapq.heappop(ends)
+                del live[bisect.bisect_left(live, (mem_start, mem_end, dead_idx))]
+            mem_start = spec.mem_offset
+            mem_end = mem_start + spec.allocated_memory
+            pos = bisect.bisect_left(live, (mem_start, mem_end, idx))
+            for neighbor in live[max(pos - 1, 0) : pos + 1]:
+                if neighbor[0] < mem_end and mem_start < neighbor[1]:
+                    cls._raise_for_pair(
+                        "Unexpected storage overlap", all_specs, neighbor[2], idx
+                    )
+            live.insert(pos, (mem_start, mem_end, idx))
+            heapq.heappush(ends, (end, mem_start, mem_end, idx))
+
+    @classmethod
+    def _count_storage_overlap_pairs(
+        cls, all_specs: List[TensorSpec], indices: List[int]
+    ) -> int:
+        """
+        Sweeps over storage, counting the pairs of specs whose storage overlaps
+        and checking that their mem_obj_ids match.
+        """
+        num_pairs = 0
+        # (storage end, index) of specs whose storage covers the sweep point.
+        active: List[Tuple[int, int]] = []
+        active_obj_ids: Dict[Optional[int], int] = defaultdict(int)
+        for idx in sorted(indices, key=lambda i: all_specs[i].mem_offset):
+            spec = all_specs[idx]
+            mem_start = spec.mem_offset
+            while active and active[0][0] <= mem_start:
+                _, done_idx = heapq.heappop(active)
+                active_obj_ids[all_specs[done_idx].mem_obj_id] -= 1
+            if active_obj_ids[spec.mem_obj_id] != len(active):
+                for _, other_idx in active:
+                    if not cls.mem_obj_id_match(all_specs[other_idx], spec):
+                        cls._raise_for_pair(
+                            "Unexpected mem_obj_id mismatch",
+                            all_specs,
+                            other_idx,
+                            idx,
+                        )
+            num_pairs += len(active)
+            heapq.heappush(active, (mem_start + spec.allocated_memory, idx))
+            active_obj_ids[spec.mem_obj_id] += 1
+        return num_pairs
+
     def verify_graph_input_output(self) -> None:
         r"""
         alloc_graph_input / alloc_graph_output indicas if memory for graph
@@ -656,6 +757,154 @@ def naive(
     return bufsizes
 
 
+class _LifetimeIndex:
+    r"""
+    An interval tree over tensor lifetimes, used to find the already-placed
+    tensors whose lifetime overlaps with a new tensor.
+
+    Lifetimes are inclusive [start, end] node indices in [0, num_steps). Each
+    inserted lifetime is stored on the O(log n) segment tree nodes that exactly
+    cover it, so the lifetimes containing a point can be found by walking from
+    the root to that point's leaf. The remaining overlapping lifetimes are the
+    ones that start inside the queried lifetime, found with a sorted list of
+    start points.
+    """
+
+    def __init__(self, num_steps: int) -> None:
+        self._size: int = 1
+        while self._size < max(num_steps, 1):
+            self._size *= 2
+        self._covering: Dict[int, List[int]] = defaultdict(list)
+        # Sorted (start, item) pairs.
+        self._starts: List[Tuple[int, int]] = []
+
+    def insert(self, start: int, end: int, item: int) -> None:
+        bisect.insort(self._starts, (start, item))
+        lo, hi = start + self._size, end + self._size + 1
+        while lo < hi:
+            if lo & 1:
+                self._covering[lo].append(item)
+                lo += 1
+            if hi & 1:
+                hi -= 1
+                self._covering[hi].append(item)
+            lo //= 2
+            hi //= 2
+
+    def overlapping(self, start: int, end: int) -> List[int]:
+        """Returns the items whose lifetime overlaps with [start, end]."""
+        items = []
+        node = start + self._size
+        while node > 0:
+            items.extend(self._covering.get(node, ()))
+            node //= 2
+        first = bisect.bisect_right(self._starts, (start, sys.maxsize))
+        last = bisect.bisect_right(self._starts, (end, sys.maxsize))
+        items.extend(item for _, item in self._starts[first:last])
+        return items
+
+
+def _best_fit_offsets(
+    specs: List[TensorSpec], order: Callable[[TensorSpec], Any], base_offset: int
+) -> Tuple[List[int], int]:
+    r"""
+    Place each spec, in the given order, at an offset that does not overlap
+    with any already-placed spec whose lifetime overlaps with its own.
+
+    Among the free gaps between those specs, the smallest one that fits is
+    picked; if none fit, the spec goes after the highest one.
+
+    Returns:
+        A tuple of (offset of each spec in `specs`, total buffer size).
+    """
+    num_steps = max((spec.lifetime[1] for spec in specs), default=0) + 1
+    index = _LifetimeIndex(num_steps)
+    offsets = [0] * len(specs)
+    total_size = base_offset
+    for i in sorted(range(len(specs)), key=lambda i: order(specs[i])):
+        spec = specs[i]
+        size = spec.allocated_memory
+        start, end = spec.lifetime
+        live = sorted(
+            (offsets[j], offsets[j] + specs[j].allocated_memory)
+            for j in index.overlapping(start, end)
+        )
+        best_offset, best_gap = None, None
+        prev_end = base_offset
+        for live_offset, live_end in live:
+            gap = live_offset - prev_end
+            if gap >= size and (best_gap is None or gap < best_gap):
+                best_offset, best_gap = prev_end, gap
+            prev_end = max(prev_end, live_end)
+        offsets[i] = prev_end if best_offset is None else best_offset
+        total_size = max(total_size, offsets[i] + size)
+        index.insert(start, end, i)
+    return offsets, total_size
+
+
+# Orders in which best_fit tries placing tensors. Placing large and long-lived
+# tensors first usually leaves the fewest unusable gaps, but no single order
+# is best for every graph.
+_BEST_FIT_ORDERS: Tuple[Callable[[TensorSpec], Any], ...] = (
+    lambda spec: (-spec.allocated_memory, spec.lifetime[0]),
+    lambda spec: (
+        -(spec.lifetime[1] - spec.lifetime[0] + 1) * spec.allocated_memory,
+        spec.lifetime[0],
+    ),
+    lambda spec: (spec.lifetime[0] - spec.lifetime[1], -spec.allocated_memory),
+)
+
+
+@register_algo
+def best_fit(
+    graph_module: torch.fx.GraphModule,
+    alignment: int,
+    graph_signature: Optional[ExportGraphSignature] = None,
+    alloc_graph_input: bool = True,
+    alloc_graph_output: bool = True,
+) -> List[int]:
+    r"""
+    Plan an offset for each tensor directly, instead of grouping tensors into
+    shared objects like greedy does. A tensor can then reuse any free range of
+    the buffer, including parts of the ranges used by several dead tensors.
+
+    Each ordering in _BEST_FIT_ORDERS is tried and the one needing the
+    smallest buffer is kept. Tensors planned this way do not have a
+    mem_obj_id.
+    """
+    do_assertion = not getattr(graph_module, "encounter_to_out_var_failure", False)
+    specs_by_mem_id: Dict[int, List[TensorSpec]] = defaultdict(list)
+    for spec in collect_specs_from_nodes(
+        graph_module.graph.nodes,
+        graph_signature,
+        do_assertion=do_assertion,
+        ignore_graph_input=not alloc_graph_input,
+        ignore_graph_output=not alloc_graph_output,
+    ):
+        if spec.mem_id is None:
+            spec.mem_id = 1
+        spec.realign(alignment)
+        specs_by_mem_id[spec.mem_id].append(spec)
+
+    bufsizes = list(getattr(graph_module, "input_mem_buffer_sizes", None) or [0, 0])
+    for mem_id, specs in specs_by_mem_id.items():
+        if mem_id >= len(bufsizes):
+            bufsizes.extend([0] * (mem_id - len(bufsizes) + 1))
+        offsets, total_size = min(
+            (
+                _best_fit_offsets(specs, order, bufsizes[mem_id])
+                for order in _BEST_FIT_ORDERS
+            ),
+            key=lambda result: result[1],
+        )
+        for spec, offset in zip(specs, offsets):
+            spec.mem_offset = offset
+        bufsizes[mem_id] = total_size
+
+    logging.debug(f"best_fit algorithm returns bufsizes: {bufsizes}")
+    return bufsizes
+
+
 def get_algo(algo_name: str) -> Callable[..., List[int]]:
     if algo_name not in REGISTERED_ALGOS:
         raise ExportError(
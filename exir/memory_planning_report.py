@@ -0,0 +1,247 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+# All rights reserved.
+#
+# This source code is licensed under the BSD-style license found in the
+# LICENSE file in the root directory of this source tree.
+
+# pyre-strict
+
+import html
+import json
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional, Sequence
+
+import torch
+from executorch.exir import memory
+from executorch.exir.memory_planning import collect_specs_from_nodes
+from executorch.exir.tensor import TensorSpec
+from torch.export.exported_program import ExportGraphSignature
+
+
+@dataclass
+class PlannedTensor:
+    """Where and when a tensor lives in its memory arena."""
+
+    # Name of the first node that refers to the tensor.
+    node: str
+    mem_offset: int
+    # Allocated size in bytes, including alignment padding.
+    size: int
+    # Inclusive range of node indices during which the tensor is live.
+    lifetime: List[int]
+
+
+@dataclass
+class MemoryArenaReport:
+    """Summary of the planned memory for a single mem_id."""
+
+    mem_id: int
+    # Size of the buffer the runtime needs to provide for this mem_id.
+    arena_size: int
+    # The largest number of bytes used by tensors that are live at the same
+    # time. No plan can need less memory than this.
+    peak_live_bytes: int
+    # Index and name of the first node where peak_live_bytes is reached.
+    peak_node_index: int
+    peak_node: str
+    # Bytes used by live tensors at each node index.
+    live_bytes: List[int]
+    # The largest tensors, largest first.
+    largest_tensors: List[PlannedTensor]
+    # Every tensor in the arena, for drawing timelines.
+    tensors: List[PlannedTensor]
+
+    @property
+    def fragmentation_bytes(self) -> int:
+        """Bytes of the arena that are never needed at the peak."""
+        return self.arena_size - self.peak_live_bytes
+
+    @property
+    def fragmentation(self) -> float:
+        """The fraction of the arena that is not needed at the peak."""
+        return self.fragmentation_bytes / self.arena_size if self.arena_size else 0.0
+
+
+@dataclass
+class MemoryPlanningReport:
+    """Report on the memory plan of a graph module.
+
+    Create one with `from_graph_module()` after memory planning has run, e.g.
+    on `ExecutorchProgramManager.exported_program().graph_module`, or have
+    `MemoryPlanningPass(generate_report=True)` store one in
+    `graph_module.meta["memory_planning_report"]`.
+
+    Only the top-level graph is described; tensors of control flow submodules
+    are planned separately.
+    """
+
+    arenas: List[MemoryArenaReport]
+    # Names of the nodes, by the node indices used in tensor lifetimes.
+    node_names: List[str]
+
+    @staticmethod
+    def from_graph_module(
+        graph_module: torch.fx.GraphModule,
+        graph_signature: Optional[ExportGraphSignature] = None,
+        alloc_graph_input: bool = True,
+        alloc_graph_output: bool = True,
+        top_n: int = 10,
+    ) -> "MemoryPlanningReport":
+        # Lifetimes were computed before memory planning inserted calls to
+        # free, so leave those out of the node indices.
+        nodes = [
+            node for node in graph_module.graph.nodes if node.target != memory.free
+        ]
+        node_names = [node.name for node in nodes]
+        first_node: Dict[TensorSpec, str] = {}
+        for node in nodes:
+            for spec in collect_specs_from_nodes(
+                [node],
+                graph_signature,
+                ignore_graph_input=not alloc_graph_input,
+                ignore_graph_output=not alloc_graph_output,
+                ignore_out_var_node=False,
+                do_assertion=False,
+            ):
+                first_node.setdefault(spec, node.name)
+        return MemoryPlanningReport.from_specs(
+            first_node,
+            node_names,
+            graph_module.meta.get("non_const_buffer_sizes"),
+            top_n,
+        )
+
+    @staticmethod
+    def from_specs(
+        spec_nodes: Dict[TensorSpec, str],
+        node_names: List[str],
+        bufsizes: Optional[Sequence[int]] = None,
+        top_n: int = 10,
+    ) -> "MemoryPlanningReport":
+        """Creates a report from planned specs.
+
+        Args:
+            spec_nodes: The planned specs, mapped to the name of the node that
+                first refers to each of them. Specs without a memory offset
+                are ignored.
+            node_names: Names of the nodes, by node index.
+            bufsizes: The buffer sizes returned by the memory planning
+                algorithm. If not provided, each arena is assumed to end with
+                its last tensor.
+            top_n: The number of largest tensors to list for each arena.
+        """
+        tensors_by_mem_id: Dict[int, List[PlannedTensor]] = {}
+        for spec, node in spec_nodes.items():
+            if spec.mem_id is None or spec.mem_offset is None:
+                continue
+            tensors_by_mem_id.setdefault(spec.mem_id, []).append(
+                PlannedTensor(
+                    node=node,
+                    mem_offset=spec.mem_offset,
+                    size=spec.allocated_memory,
+                    lifetime=list(spec.lifetime),
+                )
+            )
+
+        arenas = []
+        for mem_id, tensors in sorted(tensors_by_mem_id.items()):
+            num_steps = max(len(node_names), max(t.lifetime[1] for t in tensors) + 1)
+            # Changes in live bytes at each node index.
+            deltas = [0] * (num_steps + 1)
+            for tensor in tensors:
+                deltas[tensor.lifetime[0]] += tensor.size
+                deltas[tensor.lifetime[1] + 1] -= tensor.size
+            live_bytes = []
+            current = 0
+            for delta in deltas[:-1]:
+                current += delta
+                live_bytes.append(current)
+            peak_live_bytes = max(live_bytes)
+            peak_node_index = live_bytes.index(peak_live_bytes)
+
+            arena_size = max(t.mem_offset + t.size for t in tensors)
+            if bufsizes is not None and mem_id < len(bufsizes):
+                arena_size = max(arena_size, bufsizes[mem_id])
+            arenas.append(
+                MemoryArenaReport(
+                    mem_id=mem_id,
+                    arena_size=arena_size,
+                    peak_live_bytes=peak_live_bytes,
+                    peak_node_index=peak_node_index,
+                    peak_node=(
+                        node_names[peak_node_index]
+                        if peak_node_index < len(node_names)
+                        else ""
+                    ),
+                    live_bytes=live_bytes,
+                    largest_tensors=sorted(
+                        tensors, key=lambda t: (-t.size, t.lifetime[0])
+                    )[:top_n],
+                    tensors=tensors,
+                )
+            )
+        return MemoryPlanningReport(arenas=arenas, node_names=node_names)
+
+    def to_dict(self) -> Dict[str, object]:
+        arenas = []
+        for arena in self.arenas:
+            arena_dict = asdict(arena)
+            arena_dict["fragmentation_bytes"] = arena.fragmentation_bytes
+            arena_dict["fragmentation"] = arena.fragmentation
+            arenas.append(arena_dict)
+        return {"arenas": arenas, "node_names": self.node_names}
+
+    def to_json(self, indent: Optional[int] = None) -> str:
+        return json.dumps(self.to_dict(), indent=indent)
+
+    def to_html(self, width: int = 1200, height: int = 400) -> str:
+        """Returns a standalone HTML page with a timeline of each arena.
+
+        Tensors are drawn as boxes spanning their lifetime (x axis) and their
+        memory range (y axis). Hovering over a box shows its details. The
+        peak node is marked with a red line.
+        """
+        sections = []
+        for arena in self.arenas:
+            num_steps = max(len(arena.live_bytes), 1)
+            arena_size = max(arena.arena_size, 1)
+            x_scale = width / num_steps
+            y_scale = height / arena_size
+            rects = []
+            for tensor in arena.tensors:
+                start, end = tensor.lifetime
+                title = html.escape(
+                    f"{tensor.node}: {tensor.size} bytes at offset "
+                    + f"{tensor.mem_offset}, live for nodes [{start}, {end}]"
+                )
+                rects.append(
+                    f'<rect x="{start * x_scale:.2f}" '
+                    + f'y="{tensor.mem_offset * y_scale:.2f}" '
+                    + f'width="{max((end - start + 1) * x_scale, 1):.2f}" '
+                    + f'height="{max(tensor.size * y_scale, 1):.2f}">'
+                    + f"<title>{title}</title></rect>"
+                )
+            peak_x = (arena.peak_node_index + 0.5) * x_scale
+            sections.append(
+                f"<h2>mem_id {arena.mem_id}</h2>\n"
+                + "<p>"
+                + f"Arena size: {arena.arena_size} bytes. "
+                + f"Peak live: {arena.peak_live_bytes} bytes at node "
+                + f"{arena.peak_node_index} ({html.escape(arena.peak_node)}). "
+                + f"Fragmentation: {arena.fragmentation_bytes} bytes "
+                + f"({arena.fragmentation:.1%}).</p>\n"
+                + f'<svg width="{width}" height="{height}" '
+                + 'style="border: 1px solid #888">\n'
+                + "\n".join(rects)
+                + f'\n<line x1="{peak_x:.2f}" y1="0" x2="{peak_x:.2f}" '
+                + f'y2="{height}" stroke="red"/>\n</svg>'
+            )
+        return (
+            "<!DOCTYPE html>\n<html><head><meta charset='utf-8'>"
+            + "<title>Memory plan</title><style>"
+            + "rect { fill: #4a90d9; stroke: #fff; stroke-width: 0.5; }"
+            + "rect:hover { fill: #f5a623; }"
+            + "</style></head><body>\n"
+            + "\n".join(sections)
+            + "\n</body></html>\n"
+        )
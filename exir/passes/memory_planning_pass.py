@@ -18,6 +18,7 @@ from executorch.exir.memory_planning import (
     get_node_tensor_specs,
     Verifier,
 )
+from executorch.exir.memory_planning_report import MemoryPlanningReport
 from executorch.exir.operator.convert import get_out_args_from_opoverload
 from executorch.exir.pass_base import PassBase, PassResult
 from executorch.exir.tensor import ALIGNMENT
@@ -32,18 +33,23 @@ class MemoryPlanningPass(PassBase):
         alloc_graph_input: bool = True,
         alloc_graph_output: bool = True,
         alignment: int = ALIGNMENT,
+        generate_report: bool = False,
     ) -> None:
         r"""
         alloc_graph_input/alloc_graph_output will have 4 different combinations
         to control if the memory planning algorithm need allocate memory for
         the graph input/output. The default behavior is the algorithm will allocate
         memory for both graph input and output.
+
+        If generate_report is True, a MemoryPlanningReport describing the plan
+        is stored in graph_module.meta["memory_planning_report"].
         """
         self.memory_planning_algo = memory_planning_algo
         self.allow_lifetime_and_storage_overlap = allow_lifetime_and_storage_overlap
         self.alloc_graph_input = alloc_graph_input
         self.alloc_graph_output = alloc_graph_output
         self.alignment = alignment
+        self.generate_report = generate_report
 
     def _set_alloc_node_spec(self, graph_module: torch.fx.GraphModule) -> None:
         """
@@ -111,6 +117,16 @@ class MemoryPlanningPass(PassBase):
             self.alloc_graph_output,
         )
 
+        if self.generate_report:
+            graph_module.meta["memory_planning_report"] = (
+                MemoryPlanningReport.from_graph_module(
+                    graph_module,
+                    graph_signature,
+                    self.alloc_graph_input,
+                    self.alloc_graph_output,
+                )
+            )
+
         # TODO: make the verifier do the work recursively to handle
         # control flow
         verifier = Verifier(
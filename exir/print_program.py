@@ -265,10 +265,11 @@ def pretty_print(obj: Any, indent: int = 0, out: Optional[TextIO] = None) -> Non
         print(obj, end="", file=out)
         return
 
-    if isinstance(obj, bytes):
+    if isinstance(obj, (bytes, memoryview)):
         r = reprlib.Repr()
         r.maxother = 1024
-        print(r.repr(obj), end="", file=out)
+        # Only the start of the data is printed, so avoid copying all of a memoryview.
+        print(r.repr(bytes(obj[: r.maxother])), end="", file=out)
         return
 
     if isinstance(obj, list):
@@ -438,11 +438,13 @@ class ExirExportedProgram:
         executorch_prog = ExecutorchProgram(
             new_prog,
             emit_stacktrace=config.emit_stacktrace,
+            intern_values=config.intern_values,
             extract_delegate_segments=config.extract_delegate_segments,
             extract_constant_segment=config.extract_constant_segment,
             segment_alignment=config.segment_alignment,
             constant_tensor_alignment=config.constant_tensor_alignment,
             delegate_alignment=config.delegate_alignment,
+            deduplicate_data=config.deduplicate_data,
         )
         executorch_prog.graph_module.meta.update(new_gm.meta)
         executorch_prog.graph_module.meta.update(
@@ -472,6 +474,8 @@ class ExecutorchProgram:
         segment_alignment: int,
         constant_tensor_alignment: Optional[int] = None,
         delegate_alignment: Optional[int] = None,
+        deduplicate_data: bool = False,
+        intern_values: bool = False,
     ) -> None:
         if not exir_exported_program.after_to_edge_passes:
             raise RuntimeError(
@@ -487,6 +491,8 @@ class ExecutorchProgram:
         self._segment_alignment: int = segment_alignment
         self._constant_tensor_alignment: Optional[int] = constant_tensor_alignment
         self._delegate_alignment: Optional[int] = delegate_alignment
+        self._deduplicate_data: bool = deduplicate_data
+        self._intern_values: bool = intern_values
 
     def _get_pte_data(self) -> Cord:
         if self._pte_data is None:
@@ -497,6 +503,7 @@ class ExecutorchProgram:
                 segment_alignment=self._segment_alignment,
                 constant_tensor_alignment=self._constant_tensor_alignment,
                 delegate_alignment=self._delegate_alignment,
+                deduplicate_data=self._deduplicate_data,
             )
         return self._pte_data
 
@@ -518,7 +525,9 @@ class ExecutorchProgram:
     def program(self) -> Program:
         if self._emitter_output is None:
             self._emitter_output = emit_program(
-                self.exported_program, self._emit_stacktrace
+                self.exported_program,
+                self._emit_stacktrace,
+                intern_values=self._intern_values,
             )
         return self._emitter_output.program
 
@@ -1321,6 +1330,7 @@ class ExecutorchProgramManager:
             self._execution_programs,
             backend_config.emit_stacktrace,
             self._config_methods,
+            intern_values=backend_config.intern_values,
         )
 
         # Serialize emitter output, ready to be written to a file.
@@ -1332,6 +1342,7 @@ class ExecutorchProgramManager:
             segment_alignment=backend_config.segment_alignment,
             constant_tensor_alignment=backend_config.constant_tensor_alignment,
             delegate_alignment=backend_config.delegate_alignment,
+            deduplicate_data=backend_config.deduplicate_data,
         )
         self._buffer: Optional[bytes] = None
 
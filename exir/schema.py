@@ -132,7 +132,9 @@ class EValue:
 
 @dataclass
 class Buffer:
-    storage: bytes
+    # The emitter references the data of constant tensors through a memoryview,
+    # which is only copied when the program is serialized.
+    storage: Union[bytes, memoryview]
 
 
 @dataclass
@@ -0,0 +1,101 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+# All rights reserved.
+#
+# This source code is licensed under the BSD-style license found in the
+# LICENSE file in the root directory of this source tree.
+
+"""Times Verifier.verify_specs_storage_reuse() on synthetic memory plans.
+
+Example:
+    python -m executorch.exir.tests.memory_planning_benchmark \\
+        --num-specs 10000 30000 100000 --pairwise-limit 2000
+"""
+
+import argparse
+import random
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+import torch
+from executorch.exir.memory_planning import (
+    materialize_buffer,
+    pick_shared_obj,
+    SharedObject,
+    Verifier,
+)
+from executorch.exir.tensor import TensorSpec
+
+
+def make_planned_specs(num_specs: int, seed: int = 0) -> List[TensorSpec]:
+    """Returns specs with lifetimes resembling a long chain of layers, planned
+    with the same shared objects as the greedy algorithm.
+    """
+    rng = random.Random(seed)
+    specs = []
+    for node_idx in range(num_specs):
+        spec = TensorSpec(torch.float32, torch.Size([rng.choice((16, 256, 4096))]))
+        # Most activations die within a few nodes; a few live much longer, like
+        # residual connections and KV caches.
+        length = rng.randrange(1, 8) if rng.random() < 0.95 else rng.randrange(1000)
+        spec.lifetime = [node_idx, node_idx + length]
+        spec.mem_id = rng.choice((1, 1, 1, 2))
+        spec.realign(16)
+        specs.append(spec)
+
+    shared_objects: Dict[int, List[SharedObject]] = defaultdict(list)
+    spec_objects = [pick_shared_obj(shared_objects[s.mem_id], s) for s in specs]
+    for objects in shared_objects.values():
+        materialize_buffer(objects)
+    for spec, sobj in zip(specs, spec_objects):
+        spec.mem_obj_id = sobj.idx
+        spec.mem_offset = sobj.offset
+    return specs
+
+
+def verify_pairwise(specs: List[TensorSpec]) -> int:
+    """The pairwise comparison that verify_storage_reuse() used to do."""
+    num_reuse_pairs = 0
+    for lhs_idx, lhs_spec in enumerate(specs):
+        for rhs_spec in specs[lhs_idx + 1 :]:
+            if not Verifier.storage_overlap(lhs_spec, rhs_spec):
+                continue
+            assert not Verifier.lifetime_overlap(lhs_spec, rhs_spec)
+            assert Verifier.mem_obj_id_match(lhs_spec, rhs_spec)
+            num_reuse_pairs += 1
+    return num_reuse_pairs
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--num-specs", type=int, nargs="+", default=[2000, 10000, 30000, 100000]
+    )
+    parser.add_argument(
+        "--pairwise-limit",
+        type=int,
+        default=2000,
+        help="Also time the pairwise comparison for up to this many specs.",
+    )
+    args = parser.parse_args()
+
+    for num_specs in args.num_specs:
+        specs = make_planned_specs(num_specs)
+        start = time.perf_counter()
+        num_pairs = Verifier.verify_specs_storage_reuse(specs)
+        elapsed = time.perf_counter() - start
+        print(f"{num_specs:7d} specs: {elapsed:8.3f}s ({num_pairs} reuse pairs)")
+
+        if num_specs <= args.pairwise_limit:
+            start = time.perf_counter()
+            pairwise_num_pairs = verify_pairwise(specs)
+            pairwise_elapsed = time.perf_counter() - start
+            print(
+                f"{'':7s}  pairwise: {pairwise_elapsed:8.3f}s "
+                + f"(speedup {pairwise_elapsed / elapsed:.1f}x, "
+                + f"same result: {pairwise_num_pairs == num_pairs})"
+            )
+
+
+if __name__ == "__main__":
+    main()  # pragma: no cover
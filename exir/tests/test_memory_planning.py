@@ -14,9 +14,15 @@ import executorch.exir as exir
 
 import torch
 from executorch.exir import ExecutorchBackendConfig, to_edge
+from executorch.exir.error import InternalError
 from executorch.exir.memory_planning import (
+    _best_fit_offsets,
+    _BEST_FIT_ORDERS,
     filter_nodes,
     get_node_tensor_specs,
+    materialize_buffer,
+    pick_shared_obj,
+    SharedObject,
     Verifier,
 )
 from executorch.exir.pass_base import PassResult
@@ -27,6 +33,7 @@ from executorch.exir.passes import (  # noqa
     ToOutVarPass,
 )
 from executorch.exir.passes.sym_shape_eval_pass import ConstraintBasedSymShapeEvalPass
+from executorch.exir.tensor import TensorSpec
 from parameterized import parameterized
 
 from torch import nn
@@ -225,6 +232,7 @@ def maketest(
                 ("naive", False),
                 # greedy algorithm should reuse tensor storages in the testing model
                 ("greedy", True),
+                ("best_fit", True),
             ]
 
         for algo, expect_reuse in criteria:
@@ -355,6 +363,7 @@ class TestMemoryPlanning(unittest.TestCase):
         criteria=[
             ("naive", False),
             ("greedy", True),
+            ("best_fit", True),
         ],
     )
 
@@ -365,6 +374,7 @@ class TestMemoryPlanning(unittest.TestCase):
         criteria=[
             ("naive", False),
             ("greedy", True),
+            ("best_fit", True),
         ],
         extra_check=ModuleListArg.extra_check,
     )
@@ -397,6 +407,42 @@ class TestVerifier(unittest.TestCase):
         # non overlap. first on the right side
         self.assertFalse(Verifier.has_overlap([5, 6], [1, 2]))
 
+    def make_spec(
+        self, mem_offset: int, size: int, lifetime: List[int], mem_obj_id: Optional[int]
+    ) -> TensorSpec:
+        spec = TensorSpec(torch.int8, torch.Size([size]))
+        spec.realign(1)
+        spec.mem_id = 1
+        spec.mem_offset = mem_offset
+        spec.mem_obj_id = mem_obj_id
+        spec.lifetime = lifetime
+        return spec
+
+    def test_verify_specs_storage_reuse(self) -> None:
+        specs = [
+            self.make_spec(0, 8, [0, 1], mem_obj_id=0),
+            self.make_spec(8, 8, [0, 3], mem_obj_id=1),
+            self.make_spec(0, 8, [2, 3], mem_obj_id=0),
+            self.make_spec(0, 4, [4, 5], mem_obj_id=0),
+            # Zero-sized tensors do not use any storage.
+            self.make_spec(0, 0, [0, 5], mem_obj_id=2),
+        ]
+        self.assertEqual(Verifier.verify_specs_storage_reuse(specs), 3)
+
+        # Overlapping lifetime and storage.
+        specs.append(self.make_spec(2, 8, [5, 6], mem_obj_id=1))
+        with self.assertRaisesRegex(InternalError, "Unexpected storage overlap"):
+            Verifier.verify_specs_storage_reuse(specs)
+        # Unless allowed; but the mem_obj_ids must still match.
+        with self.assertRaisesRegex(InternalError, "mem_obj_id mismatch"):
+            Verifier.verify_specs_storage_reuse(
+                specs, allow_lifetime_and_storage_overlap=True
+            )
+
+        specs[-1] = self.make_spec(0, 8, [6, 6], mem_obj_id=None)
+        with self.assertRaisesRegex(InternalError, "do not agree"):
+            Verifier.verify_specs_storage_reuse(specs)
+
 
 class TestMisc(unittest.TestCase):
     def test_filter_nodes(self) -> None:
@@ -475,6 +521,11 @@ class TestMisc(unittest.TestCase):
                 [(1, 0), (3, 0), (1, 4), (3, 4), (1, 0)],
                 [0, 8, 0, 8],
             ),
+            (
+                "best_fit",
+                [(1, 0), (3, 0), (1, 4), (3, 4), (1, 0)],
+                [0, 8, 0, 8],
+            ),
         ]
     )
     def test_multiple_pools(
@@ -520,6 +571,31 @@ class TestMisc(unittest.TestCase):
                 idx += 1
         self.assertEqual(graph_module.meta["non_const_buffer_sizes"], expected_bufsizes)
 
+    def test_best_fit_splits_dead_storage(self) -> None:
+        def make_spec(num_elements: int, lifetime: List[int]) -> TensorSpec:
+            spec = TensorSpec(torch.int8, torch.Size([num_elements]))
+            spec.lifetime = lifetime
+            spec.realign(1)
+            return spec
+
+        # Once `a` is dead, `b` and `c` can both fit in its storage.
+        specs = [make_spec(16, [0, 1]), make_spec(8, [2, 3]), make_spec(8, [2, 3])]
+
+        shared_objects: List[SharedObject] = []
+        for spec in specs:
+            pick_shared_obj(shared_objects, spec)
+        self.assertEqual(materialize_buffer(shared_objects), 24)
+
+        for order in _BEST_FIT_ORDERS:
+            offsets, total_size = _best_fit_offsets(specs, order, base_offset=0)
+            self.assertEqual(total_size, 16)
+            self.assertEqual(sorted(offsets[1:]), [0, 8])
+
+        # Planning starts after the base offset.
+        offsets, total_size = _best_fit_offsets(specs, _BEST_FIT_ORDERS[0], 32)
+        self.assertEqual(offsets[0], 32)
+        self.assertEqual(total_size, 48)
+
     def test_constants_not_memory_planned(self) -> None:
         class Simple(torch.nn.Module):
             def __init__(self) -> None:
@@ -0,0 +1,80 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+# All rights reserved.
+#
+# This source code is licensed under the BSD-style license found in the
+# LICENSE file in the root directory of this source tree.
+
+# pyre-strict
+
+import json
+import unittest
+from typing import Dict, List
+
+import torch
+from executorch.exir.memory_planning_report import MemoryPlanningReport
+from executorch.exir.tensor import TensorSpec
+
+
+def make_spec(
+    mem_id: int, mem_offset: int, size: int, lifetime: List[int]
+) -> TensorSpec:
+    spec = TensorSpec(torch.int8, torch.Size([size]))
+    spec.realign(1)
+    spec.mem_id = mem_id
+    spec.mem_offset = mem_offset
+    spec.lifetime = lifetime
+    return spec
+
+
+class TestMemoryPlanningReport(unittest.TestCase):
+    def make_report(self) -> MemoryPlanningReport:
+        spec_nodes: Dict[TensorSpec, str] = {
+            make_spec(1, 0, 16, [0, 1]): "a",
+            make_spec(1, 16, 8, [1, 2]): "b",
+            make_spec(1, 0, 4, [2, 3]): "c",
+            make_spec(2, 0, 32, [0, 3]): "d",
+            # Not planned.
+            TensorSpec(torch.int8, torch.Size([100])): "e",
+        }
+        return MemoryPlanningReport.from_specs(
+            spec_nodes,
+            node_names=["n0", "n1", "n2", "n3"],
+            bufsizes=[0, 32, 32],
+            top_n=2,
+        )
+
+    def test_from_specs(self) -> None:
+        report = self.make_report()
+        self.assertEqual([a.mem_id for a in report.arenas], [1, 2])
+
+        arena = report.arenas[0]
+        self.assertEqual(arena.arena_size, 32)
+        self.assertEqual(arena.live_bytes, [16, 24, 12, 4])
+        self.assertEqual(arena.peak_live_bytes, 24)
+        self.assertEqual(arena.peak_node_index, 1)
+        self.assertEqual(arena.peak_node, "n1")
+        self.assertEqual(arena.fragmentation_bytes, 8)
+        self.assertEqual(arena.fragmentation, 0.25)
+        self.assertEqual([t.node for t in arena.largest_tensors], ["a", "b"])
+        self.assertEqual(len(arena.tensors), 3)
+
+        self.assertEqual(report.arenas[1].fragmentation_bytes, 0)
+
+    def test_to_json(self) -> None:
+        data = json.loads(self.make_report().to_json())
+        self.assertEqual(data["node_names"], ["n0", "n1", "n2", "n3"])
+        arena = data["arenas"][0]
+        self.assertEqual(arena["peak_node"], "n1")
+        self.assertEqual(arena["fragmentation"], 0.25)
+        self.assertEqual(
+            arena["largest_tensors"][0],
+            {"node": "a", "mem_offset": 0, "size": 16, "lifetime": [0, 1]},
+        )
+
+    def test_to_html(self) -> None:
+        page = self.make_report().to_html()
+        self.assertTrue(page.startswith("<!DOCTYPE html>"))
+        self.assertIn("<h2>mem_id 2</h2>", page)
+        # One box per planned tensor.
+        self.assertEqual(page.count("<rect "), 4)
+        self.assertIn("<title>b: 8 bytes at offset 16", page)
@@ -139,7 +139,7 @@ class Interpreter:
         # pyre-ignore
         self.data_buffers: List[bindings.DataBuffer] = [
             # pyre-ignore
-            bindings.DataBuffer(b.storage, len(b.storage))
+            bindings.DataBuffer(bytes(b.storage), len(b.storage))
             for b in program.constant_buffer
         ]
 
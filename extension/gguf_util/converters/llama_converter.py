@@ -5,7 +5,7 @@
 # LICENSE file in the root directory of this source tree.
 
 import copy
-from typing import Any, Mapping
+from typing import Iterator, Tuple
 
 import torch
 import torch.nn as nn
@@ -29,7 +29,11 @@ def _create_pt_model(
         hidden_dim=gguf_model_args.feed_forward_length,
         rope_freq_base=gguf_model_args.rope.freq_base,
     )
-    pt_model = LlamaTransformer(llama_model_args)
+    # The weights are assigned from the GGUF file later, so don't allocate and
+    # initialize them here. Buffers, like the rotary embeddings and attention
+    # masks, are created on the CPU explicitly, so they are computed as usual.
+    with torch.device("meta"):
+        pt_model = LlamaTransformer(llama_model_args)
     pt_model.eval()
     return pt_model
 
@@ -56,38 +60,45 @@ def _convert_gguf_tensor_name_to_llama_nn(gguf_name: str) -> str:
     return result
 
 
-def _convert_to_state_dict(gguf_weights: GGUFWeights) -> Mapping[str, Any]:
-
-    state_dict = {}
+def _iter_state_dict(gguf_weights: GGUFWeights) -> Iterator[Tuple[str, torch.Tensor]]:
+    """Yields the weights one at a time, as views of the memory-mapped GGUF
+    file.
+    """
     for tensor in gguf_weights.tensors:
         gguf_tensor_name = tensor.name
         nn_tensor_name = _convert_gguf_tensor_name_to_llama_nn(gguf_tensor_name)
         # gguf is reversed
         reversed_shape = tensor.shape[::-1]
         new_tensor = tensor.data.reshape(reversed_shape)
-        state_dict[nn_tensor_name] = torch.from_numpy(new_tensor)
-
-    return state_dict
+        yield nn_tensor_name, torch.from_numpy(new_tensor)
 
 
-def _load_weights_into_nn(
-    pt_model: nn.Module, gguf_model_args: GGUFModelArgs, gguf_weights: GGUFWeights
-):
+def _load_weights_into_nn(pt_model: nn.Module, gguf_weights: GGUFWeights):
+    """Assigns the GGUF weights to the parameters of `pt_model`, which were
+    created on the meta device by `_create_pt_model()`.
 
-    state_dict: Mapping[str, Any] = _convert_to_state_dict(gguf_weights)
-
-    # We need to fake initialize the mask, to match with the llama_transformer.py
-    for id in range(gguf_model_args.block_count):
-        mask_name = f"layers.{id}.attention.mask"
-        mask = torch.full(
-            (1, 1, pt_model.params.max_seq_len, pt_model.params.max_seq_len),
-            float("-inf"),
+    Weights whose dtype matches the parameter are used in place, without
+    copying them out of the file; others are converted one at a time.
+    """
+    params = dict(pt_model.named_parameters())
+    for name, tensor in _iter_state_dict(gguf_weights):
+        if name not in params:
+            raise ValueError(f"Unexpected weight {name} in the GGUF file")
+        param = params.pop(name)
+        if tensor.shape != param.shape:
+            raise ValueError(
+                f"Weight {name} has shape {tuple(tensor.shape)} in the GGUF file, "
+                + f"expected {tuple(param.shape)}"
+            )
+        module_name, _, param_name = name.rpartition(".")
+        setattr(
+            pt_model.get_submodule(module_name),
+            param_name,
+            nn.Parameter(tensor.to(param.dtype), requires_grad=False),
         )
-        mask = torch.triu(mask, diagonal=1)
-        state_dict[mask_name] = mask
 
-    pt_model.load_state_dict(state_dict)
-    return
+    if params:
+        raise ValueError(f"Missing weights in the GGUF file: {sorted(params)}")
 
 
 def _create_pte_program(pt_model: nn.Module) -> bytes:
@@ -115,7 +126,7 @@ def convert_to_pte(gguf_model_args: GGUFModelArgs, gguf_weights: GGUFWeights) ->
 
     # Step 2: Load the weights into the PyTorch model
     print("Load the weights into the PyTorch model")
-    _load_weights_into_nn(pt_model, gguf_model_args, gguf_weights)
+    _load_weights_into_nn(pt_model, gguf_weights)
 
     # Step 3: Export to ExecuTorch
     print("Exporting to ExecuTorch.")
@@ -0,0 +1,93 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+# All rights reserved.
+#
+# This source code is licensed under the BSD-style license found in the
+# LICENSE file in the root directory of this source tree.
+
+import os
+import tempfile
+import unittest
+
+import gguf
+import numpy as np
+import torch
+from executorch.extension.gguf_util.converters.llama_converter import (
+    _create_pt_model,
+    _load_weights_into_nn,
+)
+from executorch.extension.gguf_util.load_gguf import load_file
+
+DIM = 16
+HIDDEN_DIM = 32
+VOCAB_SIZE = 8
+
+
+def _write_tiny_llama(path: str) -> dict:
+    """Writes a one-layer llama GGUF file with float weights, and returns its
+    tensors by GGUF name.
+    """
+    rng = np.random.default_rng(0)
+    tensors = {
+        "token_embd.weight": (VOCAB_SIZE, DIM),
+        "blk.0.attn_norm.weight": (DIM,),
+        "blk.0.attn_q.weight": (DIM, DIM),
+        "blk.0.attn_k.weight": (DIM, DIM),
+        "blk.0.attn_v.weight": (DIM, DIM),
+        "blk.0.attn_output.weight": (DIM, DIM),
+        "blk.0.ffn_norm.weight": (DIM,),
+        "blk.0.ffn_gate.weight": (HIDDEN_DIM, DIM),
+        "blk.0.ffn_up.weight": (HIDDEN_DIM, DIM),
+        "blk.0.ffn_down.weight": (DIM, HIDDEN_DIM),
+        "output_norm.weight": (DIM,),
+        "output.weight": (VOCAB_SIZE, DIM),
+    }
+    tensors = {
+        name: rng.standard_normal(shape).astype(np.float32)
+        for name, shape in tensors.items()
+    }
+
+    writer = gguf.GGUFWriter(path, "llama")
+    writer.add_embedding_length(DIM)
+    writer.add_block_count(1)
+    writer.add_feed_forward_length(HIDDEN_DIM)
+    writer.add_head_count(2)
+    writer.add_head_count_kv(2)
+    writer.add_layer_norm_rms_eps(1e-5)
+    writer.add_token_list([f"token{i}" for i in range(VOCAB_SIZE)])
+    for name, tensor in tensors.items():
+        writer.add_tensor(name, tensor)
+    writer.write_header_to_file()
+    writer.write_kv_data_to_file()
+    writer.write_tensors_to_file()
+    writer.close()
+    return tensors
+
+
+class LlamaConverterTest(unittest.TestCase):
+    def test_load_weights(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "tiny_llama.gguf")
+            tensors = _write_tiny_llama(path)
+            gguf_model_args, gguf_weights = load_file(path)
+
+            pt_model = _create_pt_model(gguf_model_args)
+            self.assertTrue(all(p.is_meta for p in pt_model.parameters()))
+            self.assertFalse(any(b.is_meta for b in pt_model.buffers()))
+
+            _load_weights_into_nn(pt_model, gguf_weights)
+            params = dict(pt_model.named_parameters())
+            self.assertEqual([n for n, p in params.items() if p.is_meta], [])
+            self.assertTrue(
+                torch.equal(
+                    params["layers.0.feed_forward.w1.weight"],
+                    torch.from_numpy(tensors["blk.0.ffn_gate.weight"]),
+                )
+            )
+
+            # The model runs with the loaded weights.
+            logits = pt_model(torch.tensor([[1, 2, 3]]))
+            self.assertEqual(logits.shape[-1], VOCAB_SIZE)
+            self.assertTrue(torch.isfinite(logits).all())
+
+            # Modules created afterwards are unaffected.
+            self.assertFalse(torch.nn.Linear(2, 2).weight.is_meta)
@@ -10,7 +10,7 @@
 
 import logging
 from enum import Enum
-from typing import Any, Callable, List, Optional
+from typing import Any, Callable, List, Optional, Tuple
 
 import torch
 from executorch.backends.transforms.duplicate_dynamic_quant_chain import (
@@ -26,7 +26,19 @@ from executorch.exir.passes import MemoryPlanningPass
 from executorch.exir.passes.quant_fusion_pass import QuantFusionPass
 from executorch.exir.passes.sym_shape_eval_pass import ConstraintBasedSymShapeEvalPass
 
-from executorch.extension.export_util.utils import export_to_edge, save_pte_program
+from executorch.extension.export_util.utils import (
+    _core_aten_to_edge,
+    _to_core_aten,
+    export_to_edge,
+    save_pte_program,
+)
+from executorch.extension.llm.export.export_cache import (
+    combine_keys,
+    executorch_fingerprint,
+    ExportCache,
+    module_fingerprint,
+    UncacheableError,
+)
 from torch._export import capture_pre_autograd_graph
 from torch.ao.quantization.quantize_pt2e import convert_pt2e, prepare_pt2e
 from torch.ao.quantization.quantizer import Quantizer
@@ -69,10 +81,11 @@ class LLMEdgeManager:
         verbose: bool = False,
         metadata: Optional[dict] = None,
         dynamic_shapes: Optional[Any] = None,
+        cache_dir: Optional[str] = None,
     ):
         self.model = model
         # graph module returned from capture_pre_autograd_graph
-        self.pre_autograd_graph_module: Optional[torch.fx.GraphModule] = None
+        self._pre_autograd_graph_module: Optional[torch.fx.GraphModule] = None
         self.modelname = modelname
         self.max_seq_len = max_seq_len
         self.dtype = dtype
@@ -87,6 +100,30 @@ class LLMEdgeManager:
         self.output_dir = "."
         self.dynamic_shapes = dynamic_shapes
         self._saved_pte_filename = None
+        # With a cache_dir, the exported programs are cached, and capturing and
+        # quantizing are deferred until export_to_edge() knows whether the
+        # programs they lead to are cached. The pending stages are described
+        # by ("capture", None) and ("quantize", quantizers) entries.
+        self.export_cache: Optional[ExportCache] = (
+            ExportCache(cache_dir) if cache_dir else None
+        )
+        self._pending_stages: List[Tuple[str, Any]] = []
+        # Stable descriptions of the stages that produce the pre-autograd graph
+        # module, for the cache key. None if it was set by the caller.
+        self._graph_stages: Optional[List[Any]] = []
+
+    @property
+    def pre_autograd_graph_module(self) -> Optional[torch.fx.GraphModule]:
+        self._run_pending_stages()
+        return self._pre_autograd_graph_module
+
+    @pre_autograd_graph_module.setter
+    def pre_autograd_graph_module(
+        self, graph_module: Optional[torch.fx.GraphModule]
+    ) -> None:
+        self._pending_stages = []
+        self._graph_stages = None
+        self._pre_autograd_graph_module = graph_module
 
     def set_output_dir(self, output_dir: str) -> "LLMEdgeManager":
         """
@@ -157,14 +194,29 @@ class LLMEdgeManager:
         return edge_config
 
     def capture_pre_autograd_graph(self) -> "LLMEdgeManager":
+        self._graph_stages = ["capture"]
+        if self.export_cache is not None:
+            self._pending_stages = [("capture", None)]
+        else:
+            self._capture_pre_autograd_graph()
+        return self
+
+    def _capture_pre_autograd_graph(self) -> None:
         dynamic_shape = self._get_dynamic_shape()
         # 1. torch.nn.attention.sdpa_kernel([SDPBackend.MATH]) is for bypassing the dynamo error when tracing
         # 2. torch.no_grad() is for getting rid of the dropout (not sure why training ops will show up)
         with torch.nn.attention.sdpa_kernel([SDPBackend.MATH]), torch.no_grad():
-            self.pre_autograd_graph_module = capture_pre_autograd_graph(
+            self._pre_autograd_graph_module = capture_pre_autograd_graph(
                 self.model, self.example_inputs, dynamic_shapes=dynamic_shape
             )
-        return self
+
+    def _run_pending_stages(self) -> None:
+        pending_stages, self._pending_stages = self._pending_stages, []
+        for stage, quantizers in pending_stages:
+            if stage == "capture":
+                self._capture_pre_autograd_graph()
+            else:
+                self._quantize(quantizers)
 
     def pt2e_quantize(self, quantizers: Optional[List[Quantizer]]) -> "LLMEdgeManager":
         """
@@ -177,41 +229,57 @@ class LLMEdgeManager:
         ), "export_to_edge is already called, please call pt2e_quantize before export_to_edge"
         logging.info(f"Using pt2e {quantizers} to quantizing the model...")
 
-        # 1. torch.nn.attention.sdpa_kernel([SDPBackend.MATH]) is for bypassing the dynamo error when tracing
-        # 2. torch.no_grad() is for getting rid of the dropout (not sure why training ops will show up)
         if quantizers:
-            with torch.nn.attention.sdpa_kernel([SDPBackend.MATH]), torch.no_grad():
-                if self.verbose:
-                    logging.info(f"Applied quantizers: {quantizers}")
-                composed_quantizer = ComposableQuantizer(quantizers)
-                assert (
-                    self.pre_autograd_graph_module is not None
-                ), "Please run capture_pre_autograd_graph first"
-                m = prepare_pt2e(self.pre_autograd_graph_module, composed_quantizer)
-                # Calibrate
-                m(*self.example_inputs)
-                m = convert_pt2e(m)
-                DuplicateDynamicQuantChainPass()(m)
-                self.pre_autograd_graph_module = m
+            if self._pending_stages:
+                self._pending_stages.append(("quantize", quantizers))
+            else:
+                self._quantize(quantizers)
+            if self._graph_stages is not None:
+                self._graph_stages.append(quantizers)
             return self
         else:
             logging.info("No quantizer provided, passing...")
             return self
 
+    def _quantize(self, quantizers: List[Quantizer]) -> None:
+        # 1. torch.nn.attention.sdpa_kernel([SDPBackend.MATH]) is for bypassing the dynamo error when tracing
+        # 2. torch.no_grad() is for getting rid of the dropout (not sure why training ops will show up)
+        with torch.nn.attention.sdpa_kernel([SDPBackend.MATH]), torch.no_grad():
+            if self.verbose:
+                logging.info(f"Applied quantizers: {quantizers}")
+            composed_quantizer = ComposableQuantizer(quantizers)
+            assert (
+                self._pre_autograd_graph_module is not None
+            ), "Please run capture_pre_autograd_graph first"
+            m = prepare_pt2e(self._pre_autograd_graph_module, composed_quantizer)
+            # Calibrate
+            m(*self.example_inputs)
+            m = convert_pt2e(m)
+            DuplicateDynamicQuantChainPass()(m)
+            self._pre_autograd_graph_module = m
+
     def export_to_edge(self) -> "LLMEdgeManager":
         """
         Export the model to Edge dialect and retrieve a LLMEdgeManager.
         """
         dynamic_shape = self._get_dynamic_shape()
         edge_config = self._get_edge_config()
+        if self.export_cache is not None and self._graph_stages is not None:
+            try:
+                aten_key, edge_key = self._export_cache_keys(dynamic_shape, edge_config)
+            except UncacheableError as e:
+                logging.warning(f"Not using the export cache: {e}")
+            else:
+                self._export_to_edge_with_cache(
+                    dynamic_shape, edge_config, aten_key, edge_key
+                )
+                return self
 
         # 1. torch.nn.attention.sdpa_kernel([SDPBackend.MATH]) is for bypassing the dynamo error when tracing
         # 2. torch.no_grad() is for getting rid of the dropout (not sure why training ops will show up)
         with torch.nn.attention.sdpa_kernel([SDPBackend.MATH]), torch.no_grad():
             if self.pre_autograd_graph_module is None:
-                self.pre_autograd_graph_module = capture_pre_autograd_graph(
-                    self.model, self.example_inputs, dynamic_shapes=dynamic_shape
-                )
+                self._capture_pre_autograd_graph()
             self.edge_manager = export_to_edge(
                 self.pre_autograd_graph_module,
                 self.example_inputs,
@@ -222,6 +290,75 @@ class LLMEdgeManager:
             )
         return self
 
+    def _export_cache_keys(
+        self, dynamic_shape: Any, edge_config: EdgeCompileConfig
+    ) -> Tuple[str, str]:
+        """
+        Returns the cache keys of the core ATen and the edge programs. The
+        first covers the torch and ExecuTorch versions, the model, its inputs
+        and the quantizers, and the second adds the edge compile config and
+        the metadata. Raises UncacheableError
+        if the quantizers or other configs cannot be described reliably.
+        """
+        aten_key = combine_keys(
+            torch.__version__,
+            executorch_fingerprint(),
+            module_fingerprint(self.model),
+            self.example_inputs,
+            dynamic_shape,
+            self._graph_stages or ["capture"],
+        )
+        edge_key = combine_keys(aten_key, edge_config, self.metadata)
+        return aten_key, edge_key
+
+    def _export_to_edge_with_cache(
+        self,
+        dynamic_shape: Any,
+        edge_config: EdgeCompileConfig,
+        aten_key: str,
+        edge_key: str,
+    ) -> None:
+        """
+        Resumes from the deepest cached stage. Only ExportedPrograms can be
+        serialized, so the pre-autograd graph module, captured and quantized,
+        is cached in its exported core ATen form.
+        """
+        assert self.export_cache is not None
+
+        edge_program = self.export_cache.load("edge", edge_key)
+        if edge_program is not None:
+            self._pending_stages = []
+            self.edge_manager = EdgeProgramManager(
+                edge_programs={"forward": edge_program},
+                constant_methods=self.metadata,
+                compile_config=edge_config,
+            )
+            return
+
+        # 1. torch.nn.attention.sdpa_kernel([SDPBackend.MATH]) is for bypassing the dynamo error when tracing
+        # 2. torch.no_grad() is for getting rid of the dropout (not sure why training ops will show up)
+        with torch.nn.attention.sdpa_kernel([SDPBackend.MATH]), torch.no_grad():
+            aten_program = self.export_cache.load("aten", aten_key)
+            if aten_program is None:
+                if self.pre_autograd_graph_module is None:
+                    self._capture_pre_autograd_graph()
+                aten_program = _to_core_aten(
+                    self.pre_autograd_graph_module,
+                    self.example_inputs,
+                    dynamic_shape,
+                    verbose=self.verbose,
+                )
+                self.export_cache.save("aten", aten_key, aten_program)
+            else:
+                self._pending_stages = []
+            self.edge_manager = _core_aten_to_edge(
+                aten_program,
+                self.metadata,
+                edge_config,
+                verbose=self.verbose,
+            )
+        self.export_cache.save("edge", edge_key, self.edge_manager.exported_program())
+
     def to_backend(self, partitioners: Optional[List[Partitioner]]) -> "LLMEdgeManager":
         """
         Partition the model and lower to different backends. The signature is
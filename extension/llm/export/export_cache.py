@@ -0,0 +1,295 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+# All rights reserved.
+#
+# This source code is licensed under the BSD-style license found in the
+# LICENSE file in the root directory of this source tree.
+
+# A content-addressed on-disk cache of the ExportedPrograms produced while
+# exporting an LLM, so that a run which only changes later stages (e.g. the
+# partitioner or memory planning) does not have to capture, calibrate and
+# export the model again.
+
+import enum
+import functools
+import hashlib
+import inspect
+import logging
+import os
+from typing import Any, Optional, Set
+
+import torch
+from executorch.exir.cache_util import atomic_write, update_with_tensor_data
+from executorch.exir.serde import serialize
+from torch.export import ExportedProgram
+
+# Maximum nesting of objects described by stable_repr().
+_MAX_REPR_DEPTH = 32
+
+# Values of torch types that str() describes completely, e.g.
+# torch.per_tensor_affine.
+_TORCH_LEAF_TYPES = (
+    torch.dtype,
+    torch.device,
+    torch.layout,
+    torch.memory_format,
+    torch.qscheme,
+    torch.Size,
+)
+
+
+# The attributes that every nn.Module has. Its parameters, buffers and
+# submodules are fingerprinted separately.
+_MODULE_INTERNALS = frozenset(vars(torch.nn.Module())) - {"training"}
+
+
+class UncacheableError(Exception):
+    """Raised by stable_repr() for objects it cannot describe reliably."""
+
+
+def _update_with_tensor(hasher: "hashlib._Hash", tensor: torch.Tensor) -> None:
+    hasher.update(f"{type(tensor).__name__}{tensor.dtype}{list(tensor.shape)}".encode())
+    if hasattr(tensor, "__tensor_flatten__") and type(tensor) is not torch.Tensor:
+        # Tensor subclasses, e.g. quantized weights, are hashed by their parts.
+        inner_names, ctx = tensor.__tensor_flatten__()
+        hasher.update(stable_repr(ctx).encode())
+        for name in inner_names:
+            _update_with_tensor(hasher, getattr(tensor, name))
+        return
+    if tensor.device.type == "meta":
+        return
+    update_with_tensor_data(hasher, tensor)
+
+
+def tensor_fingerprint(tensor: torch.Tensor) -> str:
+    """Returns a hash of the type, dtype, shape and contents of a tensor."""
+    hasher = hashlib.sha256()
+    _update_with_tensor(hasher, tensor)
+    return hasher.hexdigest()
+
+
+def _source_fingerprint(cls: type) -> str:
+    try:
+        source = inspect.getsource(cls)
+    except (OSError, TypeError):
+        return ""
+    return hashlib.sha256(source.encode()).hexdigest()
+
+
+@functools.lru_cache(maxsize=None)
+def executorch_fingerprint() -> str:
+    """
+    Returns the installed ExecuTorch version, or a hash of the exir sources if
+    it is unavailable, e.g. when running from a source tree. Programs from
+    every stage depend on ExecuTorch's own passes and edge dialect, so entries
+    written by another version must not be reused.
+    """
+    try:
+        from executorch.version import __version__, git_version
+
+        return f"{__version__}+{git_version}"
+    except ImportError:
+        pass
+    import executorch.exir
+
+    exir_dir = os.path.dirname(executorch.exir.__file__)
+    hasher = hashlib.sha256()
+    for root, dirs, files in os.walk(exir_dir):
+        dirs.sort()
+        for name in sorted(files):
+            if not name.endswith(".py"):
+                continue
+            path = os.path.join(root, name)
+            hasher.update(os.path.relpath(path, exir_dir).encode())
+            with open(path, "rb") as f:
+                hasher.update(f.read())
+    return hasher.hexdigest()
+
+
+def _attributes_repr(module: torch.nn.Module) -> str:
+    """
+    Describes the plain attributes of a module, e.g. the ModelArgs of a
+    Transformer, which configure its forward() without showing in its repr().
+    """
+    attributes = {
+        key: value
+        for key, value in vars(module).items()
+        if key not in _MODULE_INTERNALS
+        and not isinstance(value, (torch.nn.Module, torch.Tensor))
+    }
+    return stable_repr(attributes)
+
+
+def module_fingerprint(module: torch.nn.Module) -> str:
+    """
+    Returns a hash of a module's structure, the source code of its submodule
+    classes, the plain attributes of its submodules, and the contents of its
+    parameters and buffers. Source transforms and dtype conversions change at
+    least one of those.
+
+    Raises UncacheableError if an attribute cannot be described reliably.
+    """
+    hasher = hashlib.sha256()
+    hasher.update(repr(module).encode())
+    seen_classes: Set[type] = set()
+    for name, submodule in module.named_modules(remove_duplicate=False):
+        hasher.update(name.encode())
+        hasher.update(_attributes_repr(submodule).encode())
+        cls = type(submodule)
+        if cls not in seen_classes:
+            seen_classes.add(cls)
+            hasher.update(f"{cls.__module__}.{cls.__qualname__}".encode())
+            hasher.update(_source_fingerprint(cls).encode())
+    tensors = list(module.named_parameters(remove_duplicate=False))
+    tensors += list(module.named_buffers(remove_duplicate=False))
+    for name, tensor in tensors:
+        hasher.update(name.encode())
+        _update_with_tensor(hasher, tensor)
+    return hasher.hexdigest()
+
+
+def _container_repr(obj: Any, depth: int) -> str:
+    if isinstance(obj, (list, tuple)):
+        items = ", ".join(stable_repr(item, depth) for item in obj)
+        return f"{type(obj).__name__}[{items}]"
+    if isinstance(obj, (set, frozenset)):
+        items = ", ".join(sorted(stable_repr(item, depth) for item in obj))
+        return "set{" + items + "}"
+    items = ", ".join(
+        sorted(
+            f"{stable_repr(key, depth)}: {stable_repr(value, depth)}"
+            for key, value in obj.items()
+        )
+    )
+    return "{" + items + "}"
+
+
+def _function_repr(obj: Any, depth: int) -> str:
+    if isinstance(obj, functools.partial):
+        return (
+            f"partial({stable_repr(obj.func, depth)}, "
+            + f"{stable_repr(obj.args, depth)}, {stable_repr(obj.keywords, depth)})"
+        )
+    if inspect.ismethod(obj):
+        return f"{stable_repr(obj.__self__, depth)}.{obj.__func__.__name__}"
+    closure = [cell.cell_contents for cell in obj.__closure__ or ()]
+    return (
+        f"{obj.__module__}.{obj.__qualname__}"
+        + f"({stable_repr(obj.__defaults__, depth)}, "
+        + f"{stable_repr(closure, depth)})"
+    )
+
+
+def _type_repr(obj: type, depth: int) -> str:
+    # E.g. torch.export.Dim, whose bounds are class attributes. Private
+    # attributes and descriptors, like methods and properties, are part of the
+    # implementation rather than the configuration.
+    attributes = {
+        key: value
+        for key, value in vars(obj).items()
+        if not key.startswith("_") and not hasattr(value, "__get__")
+    }
+    return f"{obj.__module__}.{obj.__qualname__}{stable_repr(attributes, depth)}"
+
+
+def _object_repr(obj: Any, depth: int) -> str:
+    cls = type(obj)
+    name = f"{cls.__module__}.{cls.__qualname__}"
+    if hasattr(obj, "__dict__"):
+        return f"{name}({stable_repr(vars(obj), depth)})"
+    if hasattr(obj, "__slots__"):
+        slots = {
+            slot: getattr(obj, slot) for slot in obj.__slots__ if hasattr(obj, slot)
+        }
+        return f"{name}({stable_repr(slots, depth)})"
+    description = repr(obj)
+    if " at 0x" in description:
+        raise UncacheableError(f"Cannot describe {name} by its contents")
+    return f"{name}:{description}"
+
+
+def stable_repr(obj: Any, _depth: int = 0) -> str:
+    """
+    Like repr(), but the same across processes for objects that are
+    configured the same way: objects are described by their type and
+    attributes instead of their memory address, and functions by their
+    qualified name, defaults and closure. Used to key the cache on configs such
+    as quantizers.
+
+    Raises UncacheableError for objects that would only be described by their
+    memory address, or that are nested too deeply to describe completely.
+    """
+    if _depth > _MAX_REPR_DEPTH:
+        raise UncacheableError(
+            f"{type(obj).__qualname__} is nested more than {_MAX_REPR_DEPTH} "
+            + "levels deep"
+        )
+    depth = _depth + 1
+    if obj is None or isinstance(obj, (bool, int, float, str, bytes, enum.Enum)):
+        return repr(obj)
+    if isinstance(obj, torch.Tensor):
+        return f"Tensor({tensor_fingerprint(obj)})"
+    if isinstance(obj, _TORCH_LEAF_TYPES):
+        return str(obj)
+    if isinstance(obj, (list, tuple, set, frozenset, dict)):
+        return _container_repr(obj, depth)
+    if (
+        isinstance(obj, functools.partial)
+        or inspect.isfunction(obj)
+        or inspect.ismethod(obj)
+    ):
+        return _function_repr(obj, depth)
+    if isinstance(obj, type):
+        return _type_repr(obj, depth)
+    return _object_repr(obj, depth)
+
+
+def combine_keys(*parts: Any) -> str:
+    """
+    Returns a cache key for a sequence of keys and configs. Raises
+    UncacheableError if a config cannot be described reliably.
+    """
+    hasher = hashlib.sha256()
+    for part in parts:
+        hasher.update(stable_repr(part).encode())
+        hasher.update(b"\0")
+    return hasher.hexdigest()
+
+
+class ExportCache:
+    """
+    Stores ExportedPrograms in `cache_dir`, as `<stage>-<key>.pt2` files
+    written with exir/serde, so they can hold edge dialect ops and lowered
+    backend modules.
+    """
+
+    def __init__(self, cache_dir: str) -> None:
+        self.cache_dir = cache_dir
+
+    def path(self, stage: str, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{stage}-{key}.pt2")
+
+    def load(self, stage: str, key: str) -> Optional[ExportedProgram]:
+        """Returns the cached program, or None if there is no valid entry."""
+        path = self.path(stage, key)
+        if not os.path.exists(path):
+            return None
+        try:
+            program = serialize.load(path)
+        except Exception as e:
+            # E.g. an entry written by an incompatible version. It gets
+            # overwritten by the next save().
+            logging.warning(f"Ignoring unreadable export cache entry {path}: {e}")
+            return None
+        logging.info(f"Loaded {stage} program from export cache: {path}")
+        return program
+
+    def save(self, stage: str, key: str, program: ExportedProgram) -> None:
+        path = self.path(stage, key)
+        try:
+            atomic_write(path, functools.partial(serialize.save, program))
+        except Exception as e:
+            # Caching is an optimization; failing to write an entry must not
+            # fail the export.
+            logging.warning(f"Could not save {stage} program to export cache: {e}")
+            return
+        logging.info(f"Saved {stage} program to export cache: {path}")
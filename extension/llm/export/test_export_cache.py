@@ -0,0 +1,192 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+# All rights reserved.
+#
+# This source code is licensed under the BSD-style license found in the
+# LICENSE file in the root directory of this source tree.
+
+import dataclasses
+import functools
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import torch
+from executorch.extension.llm.export import builder
+from executorch.extension.llm.export.builder import DType, LLMEdgeManager
+from executorch.extension.llm.export.export_cache import (
+    combine_keys,
+    ExportCache,
+    module_fingerprint,
+    stable_repr,
+    UncacheableError,
+)
+from torch.ao.quantization.observer import MinMaxObserver
+from torch.ao.quantization.quantizer.xnnpack_quantizer import (
+    get_symmetric_quantization_config,
+    XNNPACKQuantizer,
+)
+
+
+class Config:
+    def __init__(self, bits: int) -> None:
+        self.bits = bits
+        self.observer = functools.partial(max, default=bits)
+
+
+class TinyModel(torch.nn.Module):
+    def __init__(self, config: Config) -> None:
+        super().__init__()
+        self.config = config
+        self.embedding = torch.nn.Embedding(16, 8)
+        self.linear = torch.nn.Linear(8, 16)
+
+    def forward(self, tokens: torch.Tensor) -> torch.Tensor:
+        return self.linear(self.embedding(tokens))
+
+
+class TestExportCache(unittest.TestCase):
+    def test_stable_repr(self) -> None:
+        self.assertEqual(stable_repr(Config(4)), stable_repr(Config(4)))
+        self.assertNotEqual(stable_repr(Config(4)), stable_repr(Config(8)))
+        self.assertNotIn(" at 0x", stable_repr(Config(4)))
+
+        def make_transform(bits):
+            return lambda module: module.to(torch.float32 if bits else None)
+
+        self.assertEqual(stable_repr(make_transform(4)), stable_repr(make_transform(4)))
+        self.assertNotEqual(
+            stable_repr(make_transform(4)), stable_repr(make_transform(8))
+        )
+
+        dim = torch.export.Dim("token_dim", max=127)
+        self.assertIn("'max': 127", stable_repr(dim))
+        self.assertEqual(
+            combine_keys({1: dim}, torch.ones(2)), combine_keys({1: dim}, torch.ones(2))
+        )
+        self.assertNotEqual(combine_keys(torch.ones(2)), combine_keys(torch.zeros(2)))
+
+    def test_quantizer_configs(self) -> None:
+        def quantizer(**spec_changes) -> XNNPACKQuantizer:
+            config = get_symmetric_quantization_config()
+            config = dataclasses.replace(
+                config,
+                input_activation=dataclasses.replace(
+                    config.input_activation, **spec_changes
+                ),
+            )
+            return XNNPACKQuantizer().set_global(config)
+
+        eps = MinMaxObserver.with_args(eps=2**-10)
+        self.assertEqual(
+            combine_keys(quantizer(observer_or_fake_quant_ctr=eps)),
+            combine_keys(
+                quantizer(
+                    observer_or_fake_quant_ctr=MinMaxObserver.with_args(eps=2**-10)
+                )
+            ),
+        )
+        self.assertNotEqual(
+            combine_keys(quantizer(observer_or_fake_quant_ctr=eps)),
+            combine_keys(
+                quantizer(
+                    observer_or_fake_quant_ctr=MinMaxObserver.with_args(eps=2**-12)
+                )
+            ),
+        )
+        self.assertNotEqual(
+            combine_keys(quantizer(qscheme=torch.per_tensor_affine)),
+            combine_keys(quantizer(qscheme=torch.per_tensor_symmetric)),
+        )
+
+    def test_uncacheable_configs(self) -> None:
+        # Only described by its memory address.
+        with self.assertRaises(UncacheableError):
+            stable_repr(object())
+        nested = []
+        for _ in range(64):
+            nested = [nested]
+        with self.assertRaises(UncacheableError):
+            stable_repr(nested)
+
+    def test_module_fingerprint(self) -> None:
+        torch.manual_seed(0)
+        model = torch.nn.Sequential(torch.nn.Linear(4, 4), torch.nn.ReLU())
+        fingerprint = module_fingerprint(model)
+        self.assertEqual(module_fingerprint(model), fingerprint)
+
+        with torch.no_grad():
+            model[0].weight[0, 0] += 1
+        modified_fingerprint = module_fingerprint(model)
+        self.assertNotEqual(modified_fingerprint, fingerprint)
+        model.to(torch.float16)
+        self.assertNotEqual(module_fingerprint(model), modified_fingerprint)
+
+        # Plain attributes of submodules, which don't show in the repr().
+        model = TinyModel(Config(4))
+        fingerprint = module_fingerprint(model)
+        model.config.bits = 8
+        self.assertNotEqual(module_fingerprint(model), fingerprint)
+
+    def test_missing_and_corrupt_entries(self) -> None:
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = ExportCache(cache_dir)
+            self.assertIsNone(cache.load("edge", "key"))
+            with open(cache.path("edge", "key"), "wb") as f:
+                f.write(b"not a zip file")
+            self.assertIsNone(cache.load("edge", "key"))
+            self.assertEqual(os.listdir(cache_dir), ["edge-key.pt2"])
+
+    def test_llm_edge_manager(self) -> None:
+        def export(cache_dir: str) -> LLMEdgeManager:
+            torch.manual_seed(0)
+            manager = LLMEdgeManager(
+                model=TinyModel(Config(4)),
+                modelname="tiny",
+                max_seq_len=8,
+                dtype=DType.fp32,
+                use_kv_cache=False,
+                example_inputs=(torch.tensor([[1, 2, 3]]),),
+                cache_dir=cache_dir,
+            )
+            quantizer = XNNPACKQuantizer().set_global(
+                get_symmetric_quantization_config()
+            )
+            return (
+                manager.capture_pre_autograd_graph()
+                .pt2e_quantize([quantizer])
+                .export_to_edge()
+            )
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            first = export(cache_dir).edge_manager.exported_program()
+            self.assertEqual(len(os.listdir(cache_dir)), 2)
+
+            with mock.patch.object(
+                builder,
+                "capture_pre_autograd_graph",
+                wraps=builder.capture_pre_autograd_graph,
+            ) as capture, mock.patch.object(
+                builder, "prepare_pt2e", wraps=builder.prepare_pt2e
+            ) as prepare:
+                second = export(cache_dir).edge_manager.exported_program()
+            capture.assert_not_called()
+            prepare.assert_not_called()
+
+            # Entries written by another version of ExecuTorch are not reused.
+            with mock.patch.object(
+                builder, "executorch_fingerprint", return_value="other"
+            ):
+                export(cache_dir)
+            self.assertEqual(len(os.listdir(cache_dir)), 4)
+
+        # Deserialized programs may name their nodes differently.
+        def ops(program):
+            return [(node.op, str(node.target)) for node in program.graph.nodes]
+
+        self.assertEqual(ops(second), ops(first))
+        self.assertEqual(second.state_dict.keys(), first.state_dict.keys())
+        for name, tensor in first.state_dict.items():
+            self.assertTrue(torch.equal(second.state_dict[name], tensor), name)
+        tokens = torch.tensor([[4, 5, 6, 7]])
+        self.assertTrue(torch.equal(second.module()(tokens), first.module()(tokens)))
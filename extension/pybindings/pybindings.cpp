@@ -7,9 +7,13 @@
  */
 
 #include <algorithm>
+#include <condition_variable>
 #include <cstdio>
+#include <future>
 #include <iostream>
 #include <memory>
+#include <mutex>
+#include <optional>
 #include <stdexcept>
 #include <unordered_map>
 
@@ -37,6 +41,7 @@
 #include <ATen/Tensor.h>
 #include <ATen/core/functional.h>
 #include <c10/core/ScalarTypeToTypeMeta.h>
+#include <torch/csrc/autograd/python_variable.h>
 #include <torch/csrc/utils/pybind.h>
 #include <torch/python.h>
 
@@ -68,6 +73,13 @@ void et_pal_emit_log_message(
     size_t line,
     const char* message,
     __ET_UNUSED size_t length) {
+  // Methods may run on several threads with the GIL released. Hold the GIL
+  // while logging so that their messages do not interleave, and because
+  // std::cerr may be redirected to a python stream.
+  std::optional<pybind11::gil_scoped_acquire> gil;
+  if (Py_IsInitialized()) {
+    gil.emplace();
+  }
   std::cerr << "[" << filename << ":" << line << "] " << message << std::endl;
 }
 
@@ -101,13 +113,54 @@ using util::MmapDataLoader;
 
 class Module final {
  public:
+  /// Marks a replica of the methods as in use by the current thread until it
+  /// goes out of scope.
+  class ReplicaLease final {
+   public:
+    ReplicaLease(Module* module, size_t index)
+        : module_(module), index_(index) {}
+
+    ReplicaLease(const ReplicaLease&) = delete;
+    ReplicaLease& operator=(const ReplicaLease&) = delete;
+    ReplicaLease(ReplicaLease&& other) noexcept
+        : module_(other.module_), index_(other.index_) {
+      other.module_ = nullptr;
+    }
+    ReplicaLease& operator=(ReplicaLease&&) = delete;
+
+    ~ReplicaLease() {
+      if (module_ != nullptr) {
+        module_->release_replica(index_);
+      }
+    }
+
+    size_t index() const {
+      return index_;
+    }
+
+   private:
+    Module* module_;
+    size_t index_;
+  };
+
+  /// Loads `num_replicas` independent instances of every method, each with
+  /// its own planned memory, so that up to `num_replicas` threads can execute
+  /// the program at the same time. See acquire_replica().
   explicit Module(
       std::unique_ptr<DataLoader> loader,
       std::unique_ptr<ETDumpGen> tracer = nullptr,
-      size_t debug_buffer_size = 0)
+      size_t debug_buffer_size = 0,
+      size_t num_replicas = 1)
       : loader_(std::move(loader)),
         event_tracer_(std::move(tracer)),
         debug_buffer_size_(debug_buffer_size) {
+    if (num_replicas == 0) {
+      throw std::runtime_error("num_replicas must be at least 1");
+    }
+    if (event_tracer_ && num_replicas > 1) {
+      // An ETDumpGen records the events of a single thread.
+      throw std::runtime_error("etdump is not supported with num_replicas > 1");
+    }
     runtime_init();
     Result<Program> program = Program::load(
         loader_.get(), Program::Verification::InternalConsistency);
@@ -135,16 +188,6 @@ class Module final {
       }
     }
 
-    // Allocate the arenas. Using vector because we need to remember the size as
-    // well, so vector is easier then unique_ptr.
-    std::vector<std::vector<uint8_t>> non_const_buffers_;
-    for (std::map<size_t, int64_t>::iterator i = non_const_buffer_sizes.begin();
-         i != non_const_buffer_sizes.end();
-         i++) {
-      non_const_buffers_.push_back(std::vector<uint8_t>(i->second));
-    }
-
-    memory_ = std::make_unique<Memory>(std::move(non_const_buffers_));
     if (event_tracer_ && debug_buffer_size > 0) {
       // If a debug buffer was requested for the ETDump, allocate it and make
       // sure its lifetime is as long as the event_tracer.
@@ -155,37 +198,90 @@ class Module final {
     }
 
     // Load methods
-    for (size_t i = 0; i < program_->num_methods(); ++i) {
-      auto name = program_->get_method_name(i).get();
-      // It's safe to use the same memory manager for all modules because
-      // we can guarantee that only one will be executing at a time.
-      // Everything in this module runs on a single thread.
-      Result<Method> method = program_->load_method(
-          name, memory_->mem_manager(), event_tracer_.get());
-      THROW_IF_ERROR(
-          method.error(),
-          "loading method %s failed with error 0x%" PRIx32,
-          name,
-          static_cast<uint32_t>(method.error()));
-      methods_.insert(
-          {std::string(name),
-           std::make_unique<Method>(std::move(method.get()))});
+    for (size_t r = 0; r < num_replicas; ++r) {
+      // Allocate the arenas. Using vector because we need to remember the size
+      // as well, so vector is easier then unique_ptr.
+      std::vector<std::vector<uint8_t>> non_const_buffers;
+      for (std::map<size_t, int64_t>::iterator i =
+               non_const_buffer_sizes.begin();
+           i != non_const_buffer_sizes.end();
+           i++) {
+        non_const_buffers.push_back(std::vector<uint8_t>(i->second));
+      }
+      auto replica = std::make_unique<Replica>();
+      replica->memory = std::make_unique<Memory>(std::move(non_const_buffers));
+
+      for (size_t i = 0; i < program_->num_methods(); ++i) {
+        auto name = program_->get_method_name(i).get();
+        // It's safe to use the same memory manager for all methods of a
+        // replica because only one thread at a time holds its lease.
+        Result<Method> method = program_->load_method(
+            name, replica->memory->mem_manager(), event_tracer_.get());
+        THROW_IF_ERROR(
+            method.error(),
+            "loading method %s failed with error 0x%" PRIx32,
+            name,
+            static_cast<uint32_t>(method.error()));
+        replica->methods.insert(
+            {std::string(name),
+             std::make_unique<Method>(std::move(method.get()))});
+      }
+      replicas_.push_back(std::move(replica));
+      free_replicas_.push_back(r);
     }
   }
 
   Module(const Module&) = delete;
   Module& operator=(const Module&) = delete;
-  Module(Module&&) = default;
-  Module& operator=(Module&&) = default;
+  Module(Module&&) = delete;
+  Module& operator=(Module&&) = delete;
+
+  size_t num_replicas() const {
+    return replicas_.size();
+  }
+
+  /// Blocks until a replica is free and reserves it for the calling thread.
+  /// Call this without holding the GIL, since the thread using the replica
+  /// may need the GIL to finish.
+  ReplicaLease acquire_replica() {
+    std::unique_lock<std::mutex> lock(replicas_mutex_);
+    replica_released_.wait(lock, [this] { return !free_replicas_.empty(); });
+    size_t index = free_replicas_.back();
+    free_replicas_.pop_back();
+    return ReplicaLease(this, index);
+  }
+
+  /// Like acquire_replica(), but waits for the replica `index`.
+  ReplicaLease acquire_replica(size_t index) {
+    std::unique_lock<std::mutex> lock(replicas_mutex_);
+    auto it = free_replicas_.end();
+    replica_released_.wait(lock, [this, index, &it] {
+      it = std::find(free_replicas_.begin(), free_replicas_.end(), index);
+      return it != free_replicas_.end();
+    });
+    free_replicas_.erase(it);
+    return ReplicaLease(this, index);
+  }
+
+  /// Returns the metadata of a method, which is the same for all replicas.
+  MethodMeta method_meta(const std::string& method_name) {
+    Result<MethodMeta> method_meta = program_->method_meta(method_name.c_str());
+    THROW_IF_ERROR(
+        method_meta.error(),
+        "no such method in program: %s",
+        method_name.c_str());
+    return method_meta.get();
+  }
 
-  /// Executes the specified method on the provided inputs and returns its
-  /// outputs.
+  /// Executes the specified method of the leased replica on the provided
+  /// inputs and returns its outputs. Does not use the GIL.
   std::vector<EValue> run_method(
+      const ReplicaLease& replica,
       const std::string& method_name,
       const std::vector<EValue>& args,
       const std::optional<std::vector<Span<uint8_t>>>& output_storages =
           std::nullopt) {
-    auto& method = methods_[method_name];
+    Method* method = &get_method(method_name, replica.index());
     exec_aten::ArrayRef<EValue> input_evalue_list(args.data(), args.size());
 
     Error set_inputs_status = method->set_inputs(input_evalue_list);
@@ -249,12 +345,13 @@ class Module final {
     return result;
   }
 
-  Method& get_method(const std::string& method_name) {
-    if (methods_.count(method_name) == 0) {
+  Method& get_method(const std::string& method_name, size_t replica = 0) {
+    auto& methods = replicas_[replica]->methods;
+    if (methods.count(method_name) == 0) {
       THROW_IF_ERROR(
           Error(), "no such method in program: %s", method_name.c_str());
     }
-    return *methods_[method_name].get();
+    return *methods[method_name].get();
   }
 
   bool has_etdump() {
@@ -323,10 +420,26 @@ class Module final {
     }
   };
 
-  std::unique_ptr<Memory> memory_;
+  /// An instance of every method of the program, and the memory they use.
+  struct Replica {
+    std::unique_ptr<Memory> memory;
+    std::unordered_map<std::string, std::unique_ptr<Method>> methods;
+  };
+
+  void release_replica(size_t index) {
+    {
+      std::lock_guard<std::mutex> lock(replicas_mutex_);
+      free_replicas_.push_back(index);
+    }
+    replica_released_.notify_all();
+  }
+
   std::unique_ptr<DataLoader> loader_; // program_ points to this.
-  std::unique_ptr<const Program> program_; // methods_ entries points to this.
-  std::unordered_map<std::string, std::unique_ptr<Method>> methods_;
+  std::unique_ptr<const Program> program_; // methods entries points to this.
+  std::vector<std::unique_ptr<Replica>> replicas_;
+  std::mutex replicas_mutex_;
+  std::condition_variable replica_released_;
+  std::vector<size_t> free_replicas_; // Guarded by replicas_mutex_.
   std::unique_ptr<ETDumpGen> event_tracer_;
   std::unique_ptr<uint8_t[]> debug_buffer_;
   size_t debug_buffer_size_;
@@ -336,19 +449,22 @@ inline std::unique_ptr<Module> load_from_buffer(
     const void* ptr,
     size_t ptr_len,
     bool enable_etdump,
-    size_t debug_buffer_size) {
+    size_t debug_buffer_size,
+    size_t num_replicas = 1) {
   EXECUTORCH_SCOPE_PROF("load_from_buffer");
   auto loader = std::make_unique<BufferDataLoader>(ptr, ptr_len);
   return std::make_unique<Module>(
       std::move(loader),
       enable_etdump ? std::make_unique<torch::executor::ETDumpGen>() : nullptr,
-      debug_buffer_size);
+      debug_buffer_size,
+      num_replicas);
 }
 
 inline std::unique_ptr<Module> load_from_file(
     const std::string& path,
     bool enable_etdump,
-    size_t debug_buffer_size) {
+    size_t debug_buffer_size,
+    size_t num_replicas = 1) {
   EXECUTORCH_SCOPE_PROF("load_from_file");
 
   Result<MmapDataLoader> res = MmapDataLoader::from(
@@ -363,7 +479,8 @@ inline std::unique_ptr<Module> load_from_file(
   return std::make_unique<Module>(
       std::move(loader),
       enable_etdump ? std::make_unique<torch::executor::ETDumpGen>() : nullptr,
-      debug_buffer_size);
+      debug_buffer_size,
+      num_replicas);
 }
 
 static constexpr size_t kDEFAULT_BUNDLED_INPUT_POOL_SIZE = 16 * 1024U;
@@ -409,16 +526,180 @@ struct PyBundledModule final {
   size_t program_len_;
 };
 
+/// The EValues of the inputs of a method, and the ETensors and metadata they
+/// point to, which must stay alive until the method has run.
+struct InputEValues final {
+  std::vector<EValue> evalues;
+#ifndef USE_ATEN_LIB // Portable mode
+  std::vector<torch::executor::TensorImpl> tensors;
+  std::vector<std::vector<torch::executor::Tensor::SizesType>> sizes;
+  std::vector<std::vector<torch::executor::Tensor::StridesType>> strides;
+  std::vector<std::vector<torch::executor::Tensor::DimOrderType>> dim_order;
+#endif
+};
+
+/// Converts python inputs into EValues. Tensors are aliased, not copied.
+std::unique_ptr<InputEValues> convert_inputs(
+    const std::string& method_name,
+    const py::sequence& inputs) {
+  const auto inputs_size = py::len(inputs);
+  auto result = std::make_unique<InputEValues>();
+  auto& cpp_inputs = result->evalues;
+  cpp_inputs.reserve(inputs_size);
+
+#ifndef USE_ATEN_LIB // Portable mode
+  auto& input_tensors = result->tensors;
+  auto& input_sizes = result->sizes;
+  auto& input_strides = result->strides;
+  auto& input_dim_order = result->dim_order;
+  // We store pointers to these vector elements so important to reserve so
+  // that we don't lose those on a vector resize. Don't need to do this for
+  // the others since they are vectors of vectors, and we don't store a
+  // pointer to the root level vector data.
+  input_tensors.reserve(inputs_size);
+#endif
+
+  for (size_t i = 0; i < inputs_size; ++i) {
+    auto python_input = inputs[i];
+    if (THPVariable_CheckExact(python_input.ptr())) {
+      auto at_tensor = python_input.cast<at::Tensor>();
+      // alias_etensor_to_attensor will assert on this later, so to better
+      // propogate up to python we check early and throw an exception.
+      if (!at_tensor.is_contiguous()) {
+        auto error_msg = "Input " + std::to_string(i) + "for method " +
+            method_name + " is not contiguous.";
+        throw std::runtime_error(error_msg);
+      }
+
+#ifdef USE_ATEN_LIB
+      EValue evalue(at_tensor);
+#else
+      // convert at::Tensor to torch::executor::Tensor
+      auto type =
+          torch::util::torchToExecuTorchScalarType(at_tensor.options().dtype());
+      size_t dim = at_tensor.dim();
+      // cant directly alias at::Tensor sizes and strides due to int64 vs
+      // int32 typing conflict
+      input_sizes.emplace_back(
+          at_tensor.sizes().begin(), at_tensor.sizes().end());
+      input_strides.emplace_back(
+          at_tensor.strides().begin(), at_tensor.strides().end());
+
+      // Only works for MemoryFormat::Contiguous inputs
+      std::vector<torch::executor::Tensor::DimOrderType> dim_order;
+      for (size_t cur_dim = 0; cur_dim < dim; cur_dim++) {
+        dim_order.push_back(cur_dim);
+      }
+      input_dim_order.push_back(std::move(dim_order));
+      input_tensors.emplace_back(
+          type,
+          dim,
+          input_sizes.back().data(),
+          nullptr,
+          input_dim_order.back().data(),
+          input_strides.back().data());
+
+      torch::executor::Tensor temp =
+          torch::executor::Tensor(&input_tensors.back());
+      torch::util::alias_etensor_to_attensor(at_tensor, temp);
+      EValue evalue(temp);
+#endif
+
+      cpp_inputs.push_back(evalue);
+    } else if (py::isinstance<py::none>(python_input)) {
+      cpp_inputs.push_back(EValue());
+    } else if (py::isinstance<py::bool_>(python_input)) {
+      cpp_inputs.push_back(EValue(py::cast<bool>(python_input)));
+    } else if (py::isinstance<py::int_>(python_input)) {
+      cpp_inputs.push_back(EValue(py::cast<int64_t>(python_input)));
+    } else {
+      // Unsupported pytype
+      const std::string& type_str = py::str(python_input.get_type());
+      ET_ASSERT_UNREACHABLE_MSG(type_str.c_str());
+    }
+  }
+  return result;
+}
+
+/// Returns the buffers to pass to Method::set_output_data_ptr(): the
+/// storage of the corresponding tensor in `output_tensors` if there is one,
+/// or otherwise new memory, owned by `output_storages`.
+std::vector<Span<uint8_t>> make_output_storages(
+    const MethodMeta& method_meta,
+    const std::vector<at::Tensor>& output_tensors,
+    std::vector<std::unique_ptr<uint8_t[]>>& output_storages) {
+  const auto num_outputs = method_meta.num_outputs();
+  // These output storages will not be used if the ExecuTorch program already
+  // pre-allocated output space. That is represented by an error from
+  // set_output_data_ptr.
+  output_storages.resize(num_outputs);
+  std::vector<Span<uint8_t>> output_storage_spans(num_outputs);
+  for (size_t i = 0; i < num_outputs; ++i) {
+    if (!output_tensors.empty() && output_tensors[i].defined()) {
+      // The method writes straight into the provided tensor.
+      output_storage_spans[i] = Span<uint8_t>(
+          static_cast<uint8_t*>(output_tensors[i].data_ptr()),
+          output_tensors[i].nbytes());
+      continue;
+    }
+    const auto& output_tensor_meta = method_meta.output_tensor_meta(i);
+    if (!output_tensor_meta.ok()) {
+      // If the output isn't a tensor it won't have a tensor meta.
+      ET_LOG(
+          Info,
+          "Tensor meta doesn't exist for output %zu, error is 0x%" PRIx32
+          ", skipping allocating storage",
+          i,
+          static_cast<uint32_t>(output_tensor_meta.error()));
+      output_storage_spans[i] = Span<uint8_t>();
+      continue;
+    }
+    const size_t output_size = output_tensor_meta.get().nbytes();
+    std::unique_ptr<uint8_t[]> output(new uint8_t[output_size]);
+    output_storage_spans[i] = Span<uint8_t>(output.get(), output_size);
+    output_storages[i] = std::move(output);
+  }
+  return output_storage_spans;
+}
+
+/// Converts an output of a method into a python object. Tensors are copied.
+py::object output_to_python(const EValue& v) {
+  if (Tag::None == v.tag) {
+    return py::none();
+  } else if (Tag::Int == v.tag) {
+    return py::cast(v.toInt());
+  } else if (Tag::Double == v.tag) {
+    return py::cast(v.toDouble());
+  } else if (Tag::Bool == v.tag) {
+    return py::cast(v.toBool());
+  } else if (Tag::String == v.tag) {
+    return py::cast(std::string(v.toString().data()));
+  } else if (Tag::Tensor == v.tag) {
+#ifdef USE_ATEN_LIB
+    // Clone so the outputs in python do not share a lifetime with the
+    // module object
+    return py::cast(v.toTensor().clone());
+#else
+    return py::cast(
+        torch::util::alias_attensor_to_etensor(v.toTensor()).clone());
+#endif
+  } else {
+    ET_ASSERT_UNREACHABLE_MSG("Invalid model output type");
+  }
+}
+
 struct PyModule final {
   explicit PyModule(
       const py::bytes& buffer,
       bool enable_etdump,
-      size_t debug_buffer_size = 0)
+      size_t debug_buffer_size = 0,
+      size_t num_replicas = 1)
       : module_(torch::executor::load_from_buffer(
             buffer.cast<std::string_view>().data(),
             py::len(buffer),
             enable_etdump,
-            debug_buffer_size)) {}
+            debug_buffer_size,
+            num_replicas)) {}
 
   explicit PyModule(
       const void* ptr,
@@ -434,11 +715,13 @@ struct PyModule final {
   explicit PyModule(
       const std::string& path,
       bool enable_etdump,
-      size_t debug_buffer_size = 0)
+      size_t debug_buffer_size = 0,
+      size_t num_replicas = 1)
       : module_(torch::executor::load_from_file(
             path,
             enable_etdump,
-            debug_buffer_size)) {}
+            debug_buffer_size,
+            num_replicas)) {}
 
   PyModule(const PyModule&) = delete;
   PyModule& operator=(const PyModule&) = delete;
@@ -449,14 +732,18 @@ struct PyModule final {
   static std::unique_ptr<PyModule> load_from_buffer(
       const py::bytes& buffer,
       bool enable_etdump,
-      size_t debug_buffer_size = 0) {
-    return std::make_unique<PyModule>(buffer, enable_etdump, debug_buffer_size);
+      size_t debug_buffer_size = 0,
+      size_t num_replicas = 1) {
+    return std::make_unique<PyModule>(
+        buffer, enable_etdump, debug_buffer_size, num_replicas);
   }
   static std::unique_ptr<PyModule> load_from_file(
       const std::string& path,
       bool enable_etdump,
-      size_t debug_buffer_size = 0) {
-    return std::make_unique<PyModule>(path, enable_etdump, debug_buffer_size);
+      size_t debug_buffer_size = 0,
+      size_t num_replicas = 1) {
+    return std::make_unique<PyModule>(
+        path, enable_etdump, debug_buffer_size, num_replicas);
   }
 
   static std::unique_ptr<PyModule> load_from_bundled_program(
@@ -472,150 +759,168 @@ struct PyModule final {
 
   py::list run_method(
       const std::string& method_name,
-      const py::sequence& inputs) {
-    const auto inputs_size = py::len(inputs);
-    std::vector<EValue> cpp_inputs;
-    cpp_inputs.reserve(inputs_size);
+      const py::sequence& inputs,
+      const py::object& preallocated_outputs = py::none()) {
+    const auto cpp_inputs = convert_inputs(method_name, inputs);
+
+    const auto method_meta = module_->method_meta(method_name);
+    std::vector<at::Tensor> output_tensors =
+        get_output_tensors(method_name, method_meta, preallocated_outputs);
+    std::vector<std::unique_ptr<uint8_t[]>> output_storages;
+    const auto output_storage_spans =
+        make_output_storages(method_meta, output_tensors, output_storages);
+    // Execute without the GIL, so that other python threads can run, including
+    // other calls on replicas of this module. The outputs may point into the
+    // memory of the replica, so hold on to it until they are copied.
+    std::optional<Module::ReplicaLease> replica;
+    std::vector<EValue> outputs;
+    {
+      py::gil_scoped_release release;
+      replica.emplace(module_->acquire_replica());
+      outputs = module_->run_method(
+          *replica, method_name, cpp_inputs->evalues, output_storage_spans);
+    }
 
-#ifndef USE_ATEN_LIB // Portable mode
-    // So the ETensors and their metadata stay in scope for
-    // Module->run_method.
-    std::vector<torch::executor::TensorImpl> input_tensors;
-    std::vector<std::vector<torch::executor::Tensor::SizesType>> input_sizes;
-    std::vector<std::vector<torch::executor::Tensor::StridesType>>
-        input_strides;
-    std::vector<std::vector<torch::executor::Tensor::DimOrderType>>
-        input_dim_order;
-    // We store pointers to these vector elements so important to reserve so
-    // that we don't lose those on a vector resize. Don't need to do this for
-    // the others since they are vectors of vectors, and we don't store a
-    // pointer to the root level vector data.
-    input_tensors.reserve(inputs_size);
-#endif
+    // Retrieve outputs
+    const auto outputs_size = outputs.size();
+    py::list list(outputs_size);
+    for (size_t i = 0; i < outputs_size; ++i) {
+      auto& v = outputs[i];
+      if (Tag::Tensor == v.tag && !output_tensors.empty() &&
+          output_tensors[i].defined()) {
+        list[i] = py::cast(fill_output_tensor(output_tensors[i], v.toTensor()));
+      } else {
+        list[i] = output_to_python(v);
+      }
+    }
+    return list;
+  }
 
-    // Convert python objects into EValues.
-    for (size_t i = 0; i < inputs_size; ++i) {
-      auto python_input = inputs[i];
-      const std::string& type_str = py::str(python_input.get_type());
-      if (type_str == "<class 'torch.Tensor'>") {
-        auto at_tensor = python_input.cast<at::Tensor>();
-        // alias_etensor_to_attensor will assert on this later, so to better
-        // propogate up to python we check early and throw an exception.
-        if (!at_tensor.is_contiguous()) {
-          auto error_msg = "Input " + std::to_string(i) + "for method " +
-              method_name + " is not contiguous.";
-          throw std::runtime_error(error_msg);
+  /// Runs a method on each of the input sequences in `inputs_list`, in a
+  /// single call. Returns one entry per output of the method: the tensor
+  /// outputs of all the runs stacked along a new first dimension, or a list
+  /// of the values of the other outputs. With `pipeline_inputs`, the inputs
+  /// of the next run are converted while the current one executes on another
+  /// thread, which pays off when executing takes longer than starting it.
+  py::list run_method_batch(
+      const std::string& method_name,
+      const py::sequence& inputs_list,
+      bool pipeline_inputs = false) {
+    const size_t batch_size = py::len(inputs_list);
+    if (batch_size == 0) {
+      return py::list();
+    }
+    const auto method_meta = module_->method_meta(method_name);
+    const size_t num_outputs = method_meta.num_outputs();
+    // The tensor outputs of each run are written into a slice of the stacked
+    // tensors, which are allocated after the first run, once the shapes are
+    // known.
+    std::vector<at::Tensor> stacked_tensors(num_outputs);
+    std::vector<py::list> output_values(num_outputs);
+    std::vector<std::unique_ptr<uint8_t[]>> first_output_storages;
+
+    std::optional<Module::ReplicaLease> replica;
+    {
+      py::gil_scoped_release release;
+      replica.emplace(module_->acquire_replica());
+    }
+    auto cpp_inputs = convert_inputs(method_name, inputs_list[0]);
+    for (size_t b = 0; b < batch_size; ++b) {
+      std::vector<Span<uint8_t>> output_storage_spans;
+      if (b == 0) {
+        output_storage_spans = make_output_storages(
+            method_meta, /*output_tensors=*/{}, first_output_storages);
+      } else {
+        output_storage_spans.resize(num_outputs);
+        for (size_t i = 0; i < num_outputs; ++i) {
+          if (stacked_tensors[i].defined()) {
+            auto slice = stacked_tensors[i][b];
+            output_storage_spans[i] = Span<uint8_t>(
+                static_cast<uint8_t*>(slice.data_ptr()), slice.nbytes());
+          }
         }
+      }
 
-#ifdef USE_ATEN_LIB
-        EValue evalue(at_tensor);
-#else
-        // convert at::Tensor to torch::executor::Tensor
-        auto type = torch::util::torchToExecuTorchScalarType(
-            at_tensor.options().dtype());
-        size_t dim = at_tensor.dim();
-        // cant directly alias at::Tensor sizes and strides due to int64 vs
-        // int32 typing conflict
-        input_sizes.emplace_back(
-            at_tensor.sizes().begin(), at_tensor.sizes().end());
-        input_strides.emplace_back(
-            at_tensor.strides().begin(), at_tensor.strides().end());
-
-        // Only works for MemoryFormat::Contiguous inputs
-        std::vector<torch::executor::Tensor::DimOrderType> dim_order;
-        for (size_t cur_dim = 0; cur_dim < dim; cur_dim++) {
-          dim_order.push_back(cur_dim);
+      const bool convert_next = b + 1 < batch_size;
+      std::unique_ptr<InputEValues> next_cpp_inputs;
+      std::vector<EValue> outputs;
+      if (pipeline_inputs && convert_next) {
+        auto running = std::async(std::launch::async, [&]() {
+          return module_->run_method(
+              *replica, method_name, cpp_inputs->evalues, output_storage_spans);
+        });
+        try {
+          next_cpp_inputs = convert_inputs(method_name, inputs_list[b + 1]);
+        } catch (...) {
+          // The running method may need the GIL to log.
+          py::gil_scoped_release release;
+          running.wait();
+          throw;
         }
-        input_dim_order.push_back(std::move(dim_order));
-        input_tensors.emplace_back(
-            type,
-            dim,
-            input_sizes.back().data(),
-            nullptr,
-            input_dim_order.back().data(),
-            input_strides.back().data());
-
-        torch::executor::Tensor temp =
-            torch::executor::Tensor(&input_tensors.back());
-        torch::util::alias_etensor_to_attensor(at_tensor, temp);
-        EValue evalue(temp);
-#endif
-
-        cpp_inputs.push_back(evalue);
-      } else if (py::isinstance<py::none>(python_input)) {
-        cpp_inputs.push_back(EValue());
-      } else if (py::isinstance<py::bool_>(python_input)) {
-        cpp_inputs.push_back(EValue(py::cast<bool>(python_input)));
-      } else if (py::isinstance<py::int_>(python_input)) {
-        cpp_inputs.push_back(EValue(py::cast<int64_t>(python_input)));
+        py::gil_scoped_release release;
+        outputs = running.get();
       } else {
-        // Unsupported pytype
-        ET_ASSERT_UNREACHABLE_MSG(type_str.c_str());
-      }
-    }
-
-    const auto& method = module_->get_method(method_name);
-    const auto num_outputs = method.outputs_size();
-    // These output storages will not be used if the ExecuTorch program already
-    // pre-allocated output space. That is represented by an error from
-    // set_output_data_ptr.
-    std::vector<std::unique_ptr<uint8_t[]>> output_storages(num_outputs);
-    std::vector<Span<uint8_t>> output_storage_spans(num_outputs);
-    for (size_t i = 0; i < num_outputs; ++i) {
-      const auto& output_tensor_meta =
-          method.method_meta().output_tensor_meta(i);
-      if (!output_tensor_meta.ok()) {
-        // If the output isn't a tensor it won't have a tensor meta.
-        ET_LOG(
-            Info,
-            "Tensor meta doesn't exist for output %zu, error is 0x%" PRIx32
-            ", skipping allocating storage",
-            i,
-            static_cast<uint32_t>(output_tensor_meta.error()));
-        output_storage_spans[i] = Span<uint8_t>();
-        continue;
+        {
+          py::gil_scoped_release release;
+          outputs = module_->run_method(
+              *replica, method_name, cpp_inputs->evalues, output_storage_spans);
+        }
+        if (convert_next) {
+          next_cpp_inputs = convert_inputs(method_name, inputs_list[b + 1]);
+        }
       }
-      const size_t output_size = output_tensor_meta.get().nbytes();
-      std::unique_ptr<uint8_t[]> output(new uint8_t[output_size]);
-      output_storage_spans[i] = Span<uint8_t>(output.get(), output_size);
-      output_storages[i] = std::move(output);
-    }
-    auto outputs =
-        module_->run_method(method_name, cpp_inputs, output_storage_spans);
 
-    // Retrieve outputs
-    const auto outputs_size = outputs.size();
-    py::list list(outputs_size);
-    for (size_t i = 0; i < outputs_size; ++i) {
-      auto& v = outputs[i];
-      if (Tag::None == v.tag) {
-        list[i] = py::none();
-      } else if (Tag::Int == v.tag) {
-        list[i] = py::cast(v.toInt());
-      } else if (Tag::Double == v.tag) {
-        list[i] = py::cast(v.toDouble());
-      } else if (Tag::Bool == v.tag) {
-        list[i] = py::cast(v.toBool());
-      } else if (Tag::String == v.tag) {
-        list[i] = py::cast(std::string(v.toString().data()));
-      } else if (Tag::Tensor == v.tag) {
+      for (size_t i = 0; i < num_outputs; ++i) {
+        auto& v = outputs[i];
+        if (Tag::Tensor != v.tag) {
+          output_values[i].append(output_to_python(v));
+          continue;
+        }
 #ifdef USE_ATEN_LIB
-        // Clone so the outputs in python do not share a lifetime with the
-        // module object
-        list[i] = py::cast(v.toTensor().clone());
+        const at::Tensor& result = v.toTensor();
 #else
-        list[i] = py::cast(
-            torch::util::alias_attensor_to_etensor(v.toTensor()).clone());
+        const at::Tensor result =
+            torch::util::alias_attensor_to_etensor(v.toTensor());
 #endif
+        if (b == 0) {
+          std::vector<int64_t> stacked_sizes = {
+              static_cast<int64_t>(batch_size)};
+          stacked_sizes.insert(
+              stacked_sizes.end(), result.sizes().begin(), result.sizes().end());
+          stacked_tensors[i] = at::empty(stacked_sizes, result.options());
+          stacked_tensors[i][0].copy_(result);
+          continue;
+        }
+        auto slice = stacked_tensors[i][b];
+        if (slice.sizes() != result.sizes()) {
+          throw std::runtime_error(
+              "Output " + std::to_string(i) + " of run " + std::to_string(b) +
+              " of method " + method_name +
+              " has a different shape than in the first run.");
+        }
+        if (slice.data_ptr() != result.data_ptr()) {
+          // The program memory planned the output.
+          slice.copy_(result);
+        }
+      }
+      cpp_inputs = std::move(next_cpp_inputs);
+    }
+
+    py::list list(num_outputs);
+    for (size_t i = 0; i < num_outputs; ++i) {
+      if (stacked_tensors[i].defined()) {
+        list[i] = py::cast(stacked_tensors[i]);
       } else {
-        ET_ASSERT_UNREACHABLE_MSG("Invalid model output type");
+        list[i] = output_values[i];
       }
     }
     return list;
   }
 
-  py::list forward(const py::sequence& inputs) {
-    return run_method("forward", inputs);
+  py::list forward(
+      const py::sequence& inputs,
+      const py::object& preallocated_outputs = py::none()) {
+    return run_method("forward", inputs, preallocated_outputs);
   }
 
   py::list forward_single_input(const torch::Tensor& inputTensor) {
@@ -657,11 +962,14 @@ struct PyModule final {
     }
   }
 
+  // The bundled program methods and plan_execute() use the first replica.
   void load_bundled_input(
       PyBundledModule& m,
       const string method_name,
       size_t testset_idx) {
     const void* bundled_program_ptr = m.get_bundled_program_ptr();
+    py::gil_scoped_release release;
+    auto replica = module_->acquire_replica(0);
     Error status = bundled_program::LoadBundledInput(
         module_->get_method(method_name), bundled_program_ptr, testset_idx);
     THROW_IF_ERROR(
@@ -677,6 +985,8 @@ struct PyModule final {
       double rtol = 1e-5,
       double atol = 1e-8) {
     const void* bundled_program_ptr = m.get_bundled_program_ptr();
+    py::gil_scoped_release release;
+    auto replica = module_->acquire_replica(0);
     Error status = bundled_program::VerifyResultWithBundledExpectedOutput(
         module_->get_method(method_name),
         bundled_program_ptr,
@@ -690,6 +1000,8 @@ struct PyModule final {
   }
 
   void plan_execute(const string method_name) {
+    py::gil_scoped_release release;
+    auto replica = module_->acquire_replica(0);
     auto status = module_->get_method(method_name).execute();
     THROW_IF_ERROR(
         status,
@@ -698,9 +1010,122 @@ struct PyModule final {
   }
 
  private:
+  /// Checks the tensors that the user passed to receive the outputs of a
+  /// method, if any. Returns one tensor per output, undefined for the outputs
+  /// that the user passed None for, or an empty vector if `outputs` is None.
+  static std::vector<at::Tensor> get_output_tensors(
+      const std::string& method_name,
+      const MethodMeta& method_meta,
+      const py::object& outputs) {
+    std::vector<at::Tensor> output_tensors;
+    if (outputs.is_none()) {
+      return output_tensors;
+    }
+    const auto outputs_sequence = outputs.cast<py::sequence>();
+    const size_t num_outputs = method_meta.num_outputs();
+    if (py::len(outputs_sequence) != num_outputs) {
+      throw std::runtime_error(
+          "Expected " + std::to_string(num_outputs) + " outputs for method " +
+          method_name + ", got " +
+          std::to_string(py::len(outputs_sequence)));
+    }
+    output_tensors.reserve(num_outputs);
+    for (size_t i = 0; i < num_outputs; ++i) {
+      auto python_output = outputs_sequence[i];
+      if (python_output.is_none()) {
+        output_tensors.emplace_back();
+        continue;
+      }
+      auto output = python_output.cast<at::Tensor>();
+      const auto output_tensor_meta = method_meta.output_tensor_meta(i);
+      const auto error_prefix =
+          "Output " + std::to_string(i) + " for method " + method_name;
+      if (!output_tensor_meta.ok()) {
+        throw std::runtime_error(error_prefix + " is not a tensor.");
+      }
+#ifdef USE_ATEN_LIB
+      const auto output_type = output.scalar_type();
+#else
+      const auto output_type =
+          torch::util::torchToExecuTorchScalarType(output.options().dtype());
+#endif
+      if (output_type != output_tensor_meta.get().scalar_type()) {
+        throw std::runtime_error(error_prefix + " has the wrong dtype.");
+      }
+      if (!output.is_contiguous() ||
+          output.nbytes() < output_tensor_meta.get().nbytes()) {
+        throw std::runtime_error(
+            error_prefix + " must be contiguous and have at least " +
+            std::to_string(output_tensor_meta.get().nbytes()) + " bytes.");
+      }
+      output_tensors.push_back(std::move(output));
+    }
+    return output_tensors;
+  }
+
+  /// Makes `output` hold the result of the method, which is normally already
+  /// stored in it. Only outputs that the program memory planned are copied.
+  static at::Tensor fill_output_tensor(
+      at::Tensor& output,
+      const exec_aten::Tensor& result) {
+#ifdef USE_ATEN_LIB
+    const at::Tensor& at_result = result;
+#else
+    const at::Tensor at_result = torch::util::alias_attensor_to_etensor(result);
+#endif
+    if (output.sizes() != at_result.sizes()) {
+      // E.g. an output with a dynamic shape, which fits in the storage.
+      output.resize_(at_result.sizes());
+    }
+    if (output.data_ptr() != at_result.data_ptr()) {
+      output.copy_(at_result);
+    }
+    return output;
+  }
+
   std::unique_ptr<Module> module_;
 };
 
+/// Redirects std::cout and std::cerr to sys.stdout and sys.stderr while any
+/// guarded call is in progress. Nested py::scoped_ostream_redirect guards
+/// restore the wrong stream buffers when calls that released the GIL finish
+/// in a different order than they started, so the redirect is installed by
+/// the first of the concurrent calls and removed by the last one. Constructed
+/// and destroyed with the GIL held.
+class SharedOutputRedirect final {
+ public:
+  SharedOutputRedirect() {
+    if (active_calls_++ == 0) {
+      stdout_redirect().emplace();
+      stderr_redirect().emplace();
+    }
+  }
+
+  ~SharedOutputRedirect() {
+    if (--active_calls_ == 0) {
+      stderr_redirect().reset();
+      stdout_redirect().reset();
+    }
+  }
+
+  SharedOutputRedirect(const SharedOutputRedirect&) = delete;
+  SharedOutputRedirect& operator=(const SharedOutputRedirect&) = delete;
+
+ private:
+  static std::optional<py::scoped_ostream_redirect>& stdout_redirect() {
+    // Never destroyed, so that it outlives any call at exit.
+    static auto* redirect = new std::optional<py::scoped_ostream_redirect>();
+    return *redirect;
+  }
+
+  static std::optional<py::scoped_estream_redirect>& stderr_redirect() {
+    static auto* redirect = new std::optional<py::scoped_estream_redirect>();
+    return *redirect;
+  }
+
+  static inline size_t active_calls_ = 0;
+};
+
 void create_profile_block(const std::string& name) {
   EXECUTORCH_PROFILE_CREATE_BLOCK(name.c_str());
 }
@@ -720,14 +1145,14 @@ py::list get_operator_names() {
 
 PYBIND11_MODULE(EXECUTORCH_PYTHON_MODULE_NAME, m) {
   // Redirects cout and cerr for function calls this guards to the python env.
-  auto call_guard = py::
-      call_guard<py::scoped_ostream_redirect, py::scoped_estream_redirect>();
+  auto call_guard = py::call_guard<SharedOutputRedirect>();
   m.def(
       "_load_for_executorch",
       PyModule::load_from_file,
       py::arg("path"),
       py::arg("enable_etdump") = false,
       py::arg("debug_buffer_size") = 0,
+      py::arg("num_replicas") = 1,
       call_guard);
   m.def(
       "_load_for_executorch_from_buffer",
@@ -735,6 +1160,7 @@ PYBIND11_MODULE(EXECUTORCH_PYTHON_MODULE_NAME, m) {
       py::arg("buffer"),
       py::arg("enable_etdump") = false,
       py::arg("debug_buffer_size") = 0,
+      py::arg("num_replicas") = 1,
       call_guard);
   m.def(
       "_load_for_executorch_from_bundled_program",
@@ -783,8 +1209,21 @@ PYBIND11_MODULE(EXECUTORCH_PYTHON_MODULE_NAME, m) {
           &PyModule::run_method,
           py::arg("method_name"),
           py::arg("inputs") = py::list(),
+          py::arg("outputs") = py::none(),
+          call_guard)
+      .def(
+          "run_method_batch",
+          &PyModule::run_method_batch,
+          py::arg("method_name"),
+          py::arg("inputs_list"),
+          py::arg("pipeline_inputs") = false,
+          call_guard)
+      .def(
+          "forward",
+          &PyModule::forward,
+          py::arg("inputs"),
+          py::arg("outputs") = py::none(),
           call_guard)
-      .def("forward", &PyModule::forward, call_guard)
       .def("has_etdump", &PyModule::has_etdump, call_guard)
       .def(
           "write_etdump_result_to_file",
@@ -792,7 +1231,12 @@ PYBIND11_MODULE(EXECUTORCH_PYTHON_MODULE_NAME, m) {
           py::arg("path"),
           py::arg("debug_buffer_path") = py::none(),
           call_guard)
-      .def("__call__", &PyModule::forward, call_guard)
+      .def(
+          "__call__",
+          &PyModule::forward,
+          py::arg("inputs"),
+          py::arg("outputs") = py::none(),
+          call_guard)
       .def("__call__", &PyModule::forward_single_input, call_guard);
 
   py::class_<PyBundledModule>(m, "BundledModule");
@@ -9,11 +9,54 @@ from typing import Any, Dict, List, Optional, Sequence, Tuple
 
 class ExecuTorchModule:
     # pyre-ignore[2, 3]: "Any" in parameter and return type annotations.
-    def __call__(self, inputs: Any) -> List[Any]: ...
+    def __call__(
+        self, inputs: Any, outputs: Optional[Sequence[Any]] = None
+    ) -> List[Any]: ...
     # pyre-ignore[2, 3]: "Any" in parameter and return type annotations.
-    def run_method(self, method_name: str, inputs: Sequence[Any]) -> List[Any]: ...
+    def run_method(
+        self,
+        method_name: str,
+        inputs: Sequence[Any],
+        outputs: Optional[Sequence[Any]] = None,
+    ) -> List[Any]:
+        """Runs a method and returns its outputs.
+
+        Tensor inputs are aliased, not copied, and must be contiguous.
+
+        Args:
+            method_name: The name of the method to run.
+            inputs: The inputs of the method.
+            outputs: If given, one contiguous tensor or None per output of the
+                method. The method writes its tensor outputs into the given
+                tensors, which are returned instead of new tensors; outputs
+                that the program memory planned are copied into them. Each
+                tensor must have the dtype of the output and at least as many
+                bytes, and is resized to the shape of the output.
+        """
+        ...
+    # pyre-ignore[2, 3]: "Any" in parameter and return type annotations.
+    def run_method_batch(
+        self,
+        method_name: str,
+        inputs_list: Sequence[Sequence[Any]],
+        pipeline_inputs: bool = False,
+    ) -> List[Any]:
+        """Runs a method on each of the input sequences in a single call.
+
+        Returns one entry per output of the method: for a tensor output, the
+        outputs of all the runs stacked along a new first dimension, which must
+        have the same shape in every run; for other outputs, a list of their
+        values. Returns an empty list if `inputs_list` is empty.
+
+        With `pipeline_inputs`, the inputs of the next run are converted while
+        the current run executes on another thread. This helps when a run
+        takes longer than starting a thread.
+        """
+        ...
     # pyre-ignore[2, 3]: "Any" in parameter and return type annotations.
-    def forward(self, inputs: Sequence[Any]) -> List[Any]: ...
+    def forward(
+        self, inputs: Sequence[Any], outputs: Optional[Sequence[Any]] = None
+    ) -> List[Any]: ...
     # Bundled program methods.
     def load_bundled_input(
         self, bundle: BundledModule, method_name: str, testset_idx: int
@@ -34,7 +77,10 @@ class ExecuTorchModule:
 class BundledModule: ...
 
 def _load_for_executorch(
-    path: str, enable_etdump: bool = False, debug_buffer_size: int = 0
+    path: str,
+    enable_etdump: bool = False,
+    debug_buffer_size: int = 0,
+    num_replicas: int = 1,
 ) -> ExecuTorchModule:
     """Load an ExecuTorch Program from a file.
     Args:
@@ -47,11 +93,18 @@ def _load_for_executorch(
             This is the fixed size of the buffer, if you have more intermediate
             result bytes than this allows, the execution will abort with a failed
             runtime check.
+        num_replicas: The number of independent instances of every method to
+            load, each with its own memory. Running a method releases the GIL,
+            so up to this many python threads can run the module concurrently;
+            further calls wait for a free replica. Must be 1 with enable_etdump.
     """
     ...
 
 def _load_for_executorch_from_buffer(
-    buffer: bytes, enable_etdump: bool = False, debug_buffer_size: int = 0
+    buffer: bytes,
+    enable_etdump: bool = False,
+    debug_buffer_size: int = 0,
+    num_replicas: int = 1,
 ) -> ExecuTorchModule:
     """Same as _load_for_executorch, but takes a byte buffer instead of a file path."""
     ...
@@ -211,11 +211,81 @@ def make_test(  # noqa: C901
                 except Exception:
                     tester.assertTrue(str(out).find("The length of given input array"))
 
+        def test_preallocated_outputs(tester):
+            program, inputs = create_program(ModuleMulti())
+            executorch_module = load_fn(program.buffer)
+
+            outputs = [torch.empty(2, 2)]
+            for method, expected in (("forward", 2.0), ("forward2", 3.0)):
+                results = executorch_module.run_method(method, inputs, outputs)
+                tester.assertIs(results[0], outputs[0])
+                tester.assertTrue(
+                    torch.allclose(outputs[0], torch.full((2, 2), expected))
+                )
+
+            with tester.assertRaises(RuntimeError):
+                # The output has 16 bytes.
+                executorch_module.forward(inputs, outputs=[torch.empty(2)])
+
+        def test_run_method_batch(tester):
+            program, _ = create_program(ModuleMulti())
+            executorch_module = load_fn(program.buffer)
+
+            inputs_list = [(torch.full((2, 2), float(i)),) * 2 for i in range(3)]
+            expected = torch.stack([x + y + 1 for x, y in inputs_list])
+            for pipeline_inputs in (False, True):
+                outputs = executorch_module.run_method_batch(
+                    "forward2", inputs_list, pipeline_inputs=pipeline_inputs
+                )
+                tester.assertEqual(len(outputs), 1)
+                tester.assertTrue(torch.allclose(outputs[0], expected))
+
+                # Converting the second inputs fails while the first run may
+                # still be executing.
+                x = torch.ones(2, 2)
+                with tester.assertRaises(RuntimeError):
+                    executorch_module.run_method_batch(
+                        "forward2",
+                        [(x, x), (x.t(), x)],
+                        pipeline_inputs=pipeline_inputs,
+                    )
+
+            tester.assertEqual(executorch_module.run_method_batch("forward", []), [])
+
+        def test_concurrent_replicas(tester):
+            from concurrent.futures import ThreadPoolExecutor
+
+            program, inputs = create_program(ModuleMulti())
+            executorch_module = load_fn(program.buffer, num_replicas=2)
+
+            def run(i):
+                x = torch.full((2, 2), float(i))
+                if i % 4 == 3:
+                    # Fails and logs while other threads are executing.
+                    with tester.assertRaises(RuntimeError):
+                        executorch_module.run_method("forward", (x, x, x))
+                    return None
+                method = "forward" if i % 2 == 0 else "forward2"
+                return executorch_module.run_method(method, (x, x))[0]
+
+            # More threads than replicas, so that some calls wait for a replica.
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                outputs = list(executor.map(run, range(32)))
+
+            for i, output in enumerate(outputs):
+                if i % 4 == 3:
+                    continue
+                expected = torch.full((2, 2), 2.0 * i + (i % 2))
+                tester.assertTrue(torch.allclose(output, expected))
+
         test_e2e(tester)
         test_multiple_entry(tester)
         test_output_lifespan(tester)
         test_module_callable(tester)
         test_module_single_input(tester)
         test_stderr_redirect(tester)
+        test_preallocated_outputs(tester)
+        test_run_method_batch(tester)
+        test_concurrent_replicas(tester)
 
     return wrapper
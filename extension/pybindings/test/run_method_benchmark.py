@@ -0,0 +1,93 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+# All rights reserved.
+#
+# This source code is licensed under the BSD-style license found in the
+# LICENSE file in the root directory of this source tree.
+
+"""Times the per-call overhead of ExecuTorchModule.run_method on tiny models.
+
+Compares returning newly allocated output tensors with writing the outputs
+into preallocated tensors passed as `outputs`, and with running all the
+inputs in one run_method_batch call.
+
+Example:
+    python -m executorch.extension.pybindings.test.run_method_benchmark \\
+        --iterations 10000
+"""
+
+import argparse
+import time
+from typing import Callable
+
+import torch
+from executorch.exir import to_edge
+from executorch.exir.tests.models import ElementwiseAdd, Mul
+from executorch.extension.pybindings.portable_lib import (
+    _load_for_executorch_from_buffer,
+)
+from torch.export import export
+
+
+def time_per_call(fn: Callable[[], object], iterations: int, repeats: int) -> float:
+    """Returns the fastest time per call of `repeats` runs of `iterations` calls."""
+    for _ in range(min(iterations, 100)):
+        fn()
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        best = min(best, (time.perf_counter() - start) / iterations)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=10000)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    for model in (ElementwiseAdd(), Mul()):
+        inputs = model.get_random_inputs()
+        program = to_edge(export(model, inputs)).to_executorch()
+        module = _load_for_executorch_from_buffer(program.buffer)
+
+        outputs = [torch.empty_like(model(*inputs))]
+        expected = module.run_method("forward", inputs)
+        module.run_method("forward", inputs, outputs)
+        assert torch.equal(outputs[0], expected[0])
+
+        allocating = time_per_call(
+            lambda module=module, inputs=inputs: module.run_method("forward", inputs),
+            args.iterations,
+            args.repeats,
+        )
+        preallocated = time_per_call(
+            lambda module=module, inputs=inputs, outputs=outputs: module.run_method(
+                "forward", inputs, outputs
+            ),
+            args.iterations,
+            args.repeats,
+        )
+        inputs_list = [inputs] * args.iterations
+        batched = (
+            time_per_call(
+                lambda module=module, inputs_list=inputs_list: module.run_method_batch(
+                    "forward", inputs_list
+                ),
+                1,
+                args.repeats,
+            )
+            / args.iterations
+        )
+        print(
+            f"{type(model).__name__}: {allocating * 1e6:.2f}us per call, "
+            + f"{preallocated * 1e6:.2f}us with preallocated outputs "
+            + f"({allocating / preallocated:.2f}x), "
+            + f"{batched * 1e6:.2f}us per input with run_method_batch "
+            + f"({allocating / batched:.2f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()  # pragma: no cover
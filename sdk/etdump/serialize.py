@@ -6,16 +6,35 @@
 
 # pyre-strict
 
+import functools
 import json
 import os
 import tempfile
+from typing import Any, Iterator, Tuple
 
 import pkg_resources
 
-from executorch.exir._serialize._dataclass import _DataclassEncoder, _json_to_dataclass
-
-from executorch.exir._serialize._flatbuffer import _flatc_compile, _flatc_decompile
-from executorch.sdk.etdump.schema_flatcc import ETDumpFlatCC
+from executorch.exir._serialize._dataclass import _DataclassEncoder
+
+from executorch.exir._serialize._flatbuffer import _flatc_compile
+from executorch.exir._serialize._flatbuffer_builder import _parse_schema, _Schema
+from executorch.exir._serialize._flatbuffer_reader import (
+    _read_uoffset,
+    _root_table_view,
+    _TableView,
+    _view_to_dataclass,
+)
+from executorch.sdk.etdump.schema_flatcc import (
+    AllocationEvent,
+    Allocator,
+    Bool,
+    DebugEvent,
+    ETDumpFlatCC,
+    Event,
+    ProfileEvent,
+    RunData,
+    Value,
+)
 
 # The prefix of schema files used for etdump
 ETDUMP_FLATCC_SCHEMA_NAME = "etdump_schema_flatcc"
@@ -39,12 +58,6 @@ ETDump FlatCC Schema Implementations
 """
 
 
-# from json to etdump
-def _deserialize_from_json_to_etdump_flatcc(etdump_json: bytes) -> ETDumpFlatCC:
-    etdump_json = json.loads(etdump_json)
-    return _json_to_dataclass(etdump_json, ETDumpFlatCC)
-
-
 def _convert_to_flatcc(etdump_json: str) -> bytes:
     with tempfile.TemporaryDirectory() as d:
         # load given and common schema
@@ -62,22 +75,97 @@ def _convert_to_flatcc(etdump_json: str) -> bytes:
             return output_file.read()
 
 
-def _convert_from_flatcc(etdump_flatbuffer: bytes, size_prefixed: bool = True) -> bytes:
-    with tempfile.TemporaryDirectory() as d:
-        _write_schema(d, ETDUMP_FLATCC_SCHEMA_NAME)
-        _write_schema(d, SCALAR_TYPE_SCHEMA_NAME)
+@functools.lru_cache(maxsize=1)
+def _get_etdump_schema() -> _Schema:
+    """Returns the parsed etdump schema. Cached, since the schema files don't
+    change during the lifetime of the process.
+    """
+    files = {
+        f"{name}.fbs": pkg_resources.resource_string(__name__, f"{name}.fbs")
+        for name in (ETDUMP_FLATCC_SCHEMA_NAME, SCALAR_TYPE_SCHEMA_NAME)
+    }
+    return _parse_schema(files, f"{ETDUMP_FLATCC_SCHEMA_NAME}.fbs")
+
+
+def _etdump_view(data: Any, size_prefixed: bool) -> _TableView:  # pyre-ignore[2]
+    buf = memoryview(data).cast("B")
+    if size_prefixed:
+        size = _read_uoffset(buf, 0)
+        if size + 4 > len(buf):
+            raise ValueError(
+                f"ETDump size prefix {size} exceeds data length {len(buf) - 4}"
+            )
+        buf = buf[4 : 4 + size]
+    return _root_table_view(_get_etdump_schema(), buf)
+
+
+def _value_without_data(view: _TableView) -> Value:
+    """Decodes the type and output flag of a Value, but none of its data."""
+    output = view.output
+    return Value(
+        val=view.enum_name("val"),
+        tensor=None,
+        tensor_list=None,
+        int_value=None,
+        float_value=None,
+        double_value=None,
+        bool_value=None,
+        output=None if output is None else Bool(bool_val=output.bool_val),
+    )
 
-        schema_path = os.path.join(d, "{}.fbs".format(ETDUMP_FLATCC_SCHEMA_NAME))
-        bin_path = os.path.join(d, "schema.bin")
-        with open(bin_path, "wb") as bin_file:
-            bin_file.write(etdump_flatbuffer)
-        additional_args = []
-        if size_prefixed:
-            additional_args = ["--size-prefixed"]
-        _flatc_decompile(d, schema_path, bin_path, additional_args)
-        output_path = os.path.join(d, "schema.json")
-        with open(output_path, "rb") as output_file:
-            return output_file.read()
+
+def _event_from_view(view: _TableView, skip_debug_values: bool) -> Event:
+    debug_view = view.debug_event
+    if not skip_debug_values or debug_view is None:
+        return _view_to_dataclass(view, Event)
+    profile_view = view.profile_event
+    allocation_view = view.allocation_event
+    return Event(
+        profile_event=(
+            None
+            if profile_view is None
+            else _view_to_dataclass(profile_view, ProfileEvent)
+        ),
+        allocation_event=(
+            None
+            if allocation_view is None
+            else _view_to_dataclass(allocation_view, AllocationEvent)
+        ),
+        debug_event=DebugEvent(
+            chain_index=debug_view.chain_index,
+            instruction_id=debug_view.instruction_id,
+            delegate_debug_id_int=debug_view.delegate_debug_id_int,
+            delegate_debug_id_str=debug_view.delegate_debug_id_str,
+            debug_entry=_value_without_data(debug_view.debug_entry),
+        ),
+    )
+
+
+def _run_data_from_view(view: _TableView, skip_debug_values: bool) -> RunData:
+    allocators = view.allocators
+    events = view.events
+    return RunData(
+        name=view.name,
+        bundled_input_index=view.bundled_input_index,
+        allocators=(
+            None
+            if allocators is None
+            else [_view_to_dataclass(a, Allocator) for a in allocators]
+        ),
+        events=(
+            None
+            if events is None
+            else [_event_from_view(e, skip_debug_values) for e in events]
+        ),
+    )
+
+
+def _iter_run_data(view: _TableView, skip_debug_values: bool) -> Iterator[RunData]:
+    run_data = view.run_data
+    if run_data is None:
+        return
+    for run_view in run_data:
+        yield _run_data_from_view(run_view, skip_debug_values)
 
 
 def serialize_to_etdump_flatcc(
@@ -94,17 +182,71 @@ def serialize_to_etdump_flatcc(
     return _convert_to_flatcc(_serialize_from_etdump_to_json(etdump))
 
 
+def iter_etdump_run_data(
+    data: Any,  # pyre-ignore[2]
+    size_prefixed: bool = True,
+    skip_debug_values: bool = False,
+) -> Iterator[RunData]:
+    """
+    Reads the runs of an etdump binary blob one at a time, so that only the
+    run being processed needs to be decoded and held in memory.
+    Args:
+        data: Serialized etdump binary blob, or any object that supports the
+            buffer protocol such as an mmap of an etdump file.
+        size_prefixed: Whether the blob starts with its size, as written by
+            the runtime.
+        skip_debug_values: If True, the values of debug events are not
+            decoded; only their type and output flag are kept. Use this when
+            only profiling data is needed.
+    Returns:
+        An iterator over the RunData of each run.
+    """
+    return _iter_run_data(_etdump_view(data, size_prefixed), skip_debug_values)
+
+
+def iter_etdump_events(
+    data: Any,  # pyre-ignore[2]
+    size_prefixed: bool = True,
+    skip_debug_values: bool = False,
+) -> Iterator[Tuple[int, Event]]:
+    """
+    Reads the events of an etdump binary blob one at a time. See
+    iter_etdump_run_data() for the arguments.
+    Returns:
+        An iterator over (index of the run, event) pairs, in the order they
+        were recorded.
+    """
+    run_data = _etdump_view(data, size_prefixed).run_data
+    if run_data is None:
+        return
+    for run_index, run_view in enumerate(run_data):
+        events = run_view.events
+        if events is None:
+            continue
+        for event_view in events:
+            yield run_index, _event_from_view(event_view, skip_debug_values)
+
+
 def deserialize_from_etdump_flatcc(
-    data: bytes, size_prefixed: bool = True
+    data: Any,  # pyre-ignore[2]
+    size_prefixed: bool = True,
+    skip_debug_values: bool = False,
 ) -> ETDumpFlatCC:
     """
     Given an etdump binary blob (constructed using the FlatCC schema) this function will deserialize
     it and return the FlatCC python object representation of etdump.
     Args:
-        data: Serialized etdump binary blob.
+        data: Serialized etdump binary blob, or any object that supports the
+            buffer protocol.
+        size_prefixed: Whether the blob starts with its size, as written by
+            the runtime.
+        skip_debug_values: If True, the values of debug events are not
+            decoded; only their type and output flag are kept.
     Returns:
         Deserialized ETDump python object.
     """
-    return _deserialize_from_json_to_etdump_flatcc(
-        _convert_from_flatcc(data, size_prefixed)
+    view = _etdump_view(data, size_prefixed)
+    return ETDumpFlatCC(
+        version=view.version,
+        run_data=list(_iter_run_data(view, skip_debug_values)),
     )
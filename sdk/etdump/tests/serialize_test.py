@@ -8,6 +8,7 @@
 
 import difflib
 import json
+import struct
 import unittest
 from pprint import pformat
 from typing import List
@@ -17,6 +18,8 @@ from executorch.exir._serialize._dataclass import _DataclassEncoder
 
 from executorch.sdk.etdump.serialize import (
     deserialize_from_etdump_flatcc,
+    iter_etdump_events,
+    iter_etdump_run_data,
     serialize_to_etdump_flatcc,
 )
 
@@ -139,3 +142,52 @@ class TestSerializeFlatCC(unittest.TestCase):
                 )
             ),
         )
+
+    def test_deserialize_size_prefixed(self) -> None:
+        program = get_sample_etdump_flatcc()
+        data = serialize_to_etdump_flatcc(program)
+        # The runtime writes the size of the flatbuffer before it, and may pad
+        # the end of the buffer.
+        prefixed = struct.pack("<I", len(data)) + data + b"\0" * 4
+        self.assertEqual(deserialize_from_etdump_flatcc(prefixed), program)
+        self.assertEqual(deserialize_from_etdump_flatcc(memoryview(prefixed)), program)
+        with self.assertRaises(ValueError):
+            deserialize_from_etdump_flatcc(prefixed[:-8])
+
+    def test_iter_etdump(self) -> None:
+        program = get_sample_etdump_flatcc()
+        data = serialize_to_etdump_flatcc(program)
+        self.assertEqual(
+            list(iter_etdump_run_data(data, size_prefixed=False)), program.run_data
+        )
+        events = list(iter_etdump_events(data, size_prefixed=False))
+        self.assertEqual([run_index for run_index, _ in events], [0, 0, 0, 0])
+        self.assertEqual([e for _, e in events], program.run_data[0].events)
+
+    def test_skip_debug_values(self) -> None:
+        program = get_sample_etdump_flatcc()
+        data = serialize_to_etdump_flatcc(program)
+        deserialized = deserialize_from_etdump_flatcc(
+            data, size_prefixed=False, skip_debug_values=True
+        )
+
+        expected_events = program.run_data[0].events
+        events = deserialized.run_data[0].events
+        self.assertEqual(events[:3], expected_events[:3])
+        debug_event = events[3].debug_event
+        expected_debug_event = expected_events[3].debug_event
+        self.assertEqual(debug_event.instruction_id, 0)
+        self.assertEqual(debug_event.delegate_debug_id_str, "56")
+        self.assertEqual(
+            debug_event.debug_entry,
+            flatcc.Value(
+                val=flatcc.ValueType.TENSOR.value,
+                tensor=None,
+                tensor_list=None,
+                int_value=None,
+                float_value=None,
+                double_value=None,
+                bool_value=None,
+                output=expected_debug_event.debug_entry.output,
+            ),
+        )
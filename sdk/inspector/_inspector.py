@@ -8,7 +8,7 @@ import dataclasses
 import logging
 import sys
 import warnings
-from collections import defaultdict, OrderedDict
+from collections import OrderedDict
 from dataclasses import dataclass
 from functools import cached_property
 from typing import (
@@ -18,6 +18,7 @@ from typing import (
     IO,
     List,
     Mapping,
+    NamedTuple,
     Optional,
     Sequence,
     Tuple,
@@ -253,34 +254,62 @@ DelegateMetadata = TypedDict(
 )
 
 
+class _PerfStats(NamedTuple):
+    p10: float
+    p50: float
+    p90: float
+    avg: float
+    min: float
+    max: float
+
+
 @dataclass
 class PerfData:
-    def __init__(self, raw: List[float]):
-        self.raw: List[float] = raw
+    def __init__(self, raw: Union[List[float], np.ndarray]):
+        self._values: np.ndarray = np.asarray(raw, dtype=np.float64)
+        # Statistics that were computed ahead of time, together with those of
+        # the other events of an EventBlock.
+        self._stats: Optional[_PerfStats] = None
+
+    @property
+    def raw(self) -> List[float]:
+        return self._values.tolist()
 
     @property
     def p10(self) -> float:
-        return np.percentile(self.raw, 10)
+        if self._stats is not None:
+            return self._stats.p10
+        return np.percentile(self._values, 10)
 
     @property
     def p50(self) -> float:
-        return np.percentile(self.raw, 50)
+        if self._stats is not None:
+            return self._stats.p50
+        return np.percentile(self._values, 50)
 
     @property
     def p90(self) -> float:
-        return np.percentile(self.raw, 90)
+        if self._stats is not None:
+            return self._stats.p90
+        return np.percentile(self._values, 90)
 
     @property
     def avg(self) -> float:
-        return np.mean(self.raw)
+        if self._stats is not None:
+            return self._stats.avg
+        return np.mean(self._values)
 
     @property
     def min(self) -> float:
-        return min(self.raw)
+        if self._stats is not None:
+            return self._stats.min
+        return self._values.min()
 
     @property
     def max(self) -> float:
-        return max(self.raw)
+        if self._stats is not None:
+            return self._stats.max
+        return self._values.max()
 
 
 @dataclass
@@ -369,32 +398,48 @@ class Event:
         Returns:
             A dict with the Event data
         """
+        row = self._asrow(_units)
+        # Wrap the non-scalar values so that they fill a single row
+        for key in (
+            "raw",
+            "op_types",
+            "stack_traces",
+            "module_hierarchy",
+            "debug_data",
+        ):
+            row[key] = [row[key]]
+        return row
+
+    def _asrow(self, _units="", include_perf_data: bool = True) -> dict:
+        """
+        Convert the Event into a dict holding a single row of a DataFrame.
+        Without include_perf_data, the profiling columns are left empty.
+        """
 
         def truncated_list(long_list: List[str]) -> str:
             return f"['{long_list[0]}', '{long_list[1]}' ... '{long_list[-1]}'] ({len(long_list)} total)"
 
+        perf_data = self.perf_data if include_perf_data else None
         return {
             "event_name": self.name,
-            "raw": [self.perf_data.raw if self.perf_data else None],
-            "p10" + _units: self.perf_data.p10 if self.perf_data else None,
-            "p50" + _units: self.perf_data.p50 if self.perf_data else None,
-            "p90" + _units: self.perf_data.p90 if self.perf_data else None,
-            "avg" + _units: self.perf_data.avg if self.perf_data else None,
-            "min" + _units: self.perf_data.min if self.perf_data else None,
-            "max" + _units: self.perf_data.max if self.perf_data else None,
-            "op_types": [
-                (
-                    self.op_types
-                    if len(self.op_types) < 5
-                    else truncated_list(self.op_types)
-                )
-            ],
+            "raw": perf_data.raw if perf_data else None,
+            "p10" + _units: perf_data.p10 if perf_data else None,
+            "p50" + _units: perf_data.p50 if perf_data else None,
+            "p90" + _units: perf_data.p90 if perf_data else None,
+            "avg" + _units: perf_data.avg if perf_data else None,
+            "min" + _units: perf_data.min if perf_data else None,
+            "max" + _units: perf_data.max if perf_data else None,
+            "op_types": (
+                self.op_types
+                if len(self.op_types) < 5
+                else truncated_list(self.op_types)
+            ),
             "delegate_debug_identifier": self.delegate_debug_identifier,
-            "stack_traces": [self.stack_traces],
-            "module_hierarchy": [self.module_hierarchy],
+            "stack_traces": self.stack_traces,
+            "module_hierarchy": self.module_hierarchy,
             "is_delegated_op": self.is_delegated_op,
             "delegate_backend_name": self.delegate_backend_name,
-            "debug_data": [self.debug_data],
+            "debug_data": self.debug_data,
         }
 
     @staticmethod
@@ -628,6 +673,215 @@ class Event:
                     self.op_types += [node.op]
 
 
+def _elapsed_times(start_times: np.ndarray, end_times: np.ndarray) -> np.ndarray:
+    """
+    Vectorized Event._calculate_elapsed_time() for arrays of uint64 times
+    """
+    max_uint32 = np.uint64(2**32 - 1)
+    wrapped = start_times > end_times
+    if wrapped.any():
+        too_large = wrapped & ((start_times > max_uint32) | (end_times > max_uint32))
+        if too_large.any():
+            index = np.argmax(too_large)
+            start_time = start_times.flat[index]
+            end_time = end_times.flat[index]
+            raise ValueError(
+                f"Expected start_time ({start_time}) and end_time ({end_time}) to be less than {max_uint32} for cases where there is wrap-around of time values."
+            )
+    # Unsigned arithmetic wraps around in the lanes that np.where() discards.
+    return np.where(
+        wrapped, (max_uint32 - start_times) + end_times, end_times - start_times
+    ).astype(np.float64)
+
+
+@dataclass
+class _ProfileColumns:
+    """
+    The profiling data of an EventBlock, with one row per ProfileEvent.
+
+    Every run of an EventBlock logs the same events, so the rows are ordered by
+    run and then by event, and each column can be reshaped to
+    (num_runs, num_profiled_events).
+    """
+
+    # Index of the run within the EventBlock.
+    run_index: np.ndarray
+    # Index of the Event in EventBlock.events.
+    event_index: np.ndarray
+    instruction_id: np.ndarray
+    # -1 when the event is not delegated or has a string identifier.
+    delegate_debug_id: np.ndarray
+    start_time: np.ndarray
+    end_time: np.ndarray
+    # Elapsed time, in the target time scale of the EventBlock.
+    duration: np.ndarray
+
+    def durations_by_event(self) -> np.ndarray:
+        """
+        Returns the durations as an array of shape (num_runs, num_profiled_events)
+        """
+        if len(self.run_index) == 0:
+            return self.duration.reshape(0, 0)
+        return self.duration.reshape(int(self.run_index[-1]) + 1, -1)
+
+    def stat_columns(self) -> Dict[str, np.ndarray]:
+        """
+        Returns each statistic of _PerfStats as an array with one value per
+        profiled event, computed for all events at once
+        """
+        durations = self.durations_by_event()
+        if durations.size == 0:
+            return {field: np.empty(0) for field in _PerfStats._fields}
+        p10, p50, p90 = np.percentile(durations, [10, 50, 90], axis=0)
+        return {
+            "p10": p10,
+            "p50": p50,
+            "p90": p90,
+            "avg": durations.mean(axis=0),
+            "min": durations.min(axis=0),
+            "max": durations.max(axis=0),
+        }
+
+    def stats(self) -> List[_PerfStats]:
+        """
+        Returns the statistics of each profiled event
+        """
+        return [_PerfStats(*stats) for stats in zip(*self.stat_columns().values())]
+
+
+def _event_layout_key(event: flatcc.Event) -> Tuple[Any, ...]:
+    """
+    Returns the fields of an ETDump Event that determine where it goes in
+    the EventBlocks, and none of its data
+    """
+    debug_event = event.debug_event
+    is_output = (
+        debug_event is not None
+        and debug_event.debug_entry is not None
+        and is_debug_output(debug_event.debug_entry)
+    )
+    populated_event = find_populated_event(event)
+    return (
+        isinstance(populated_event, ProfileEvent),
+        getattr(populated_event, "name", None),
+        populated_event.chain_index,
+        populated_event.instruction_id,
+        populated_event.delegate_debug_id_int,
+        populated_event.delegate_debug_id_str,
+        is_output,
+    )
+
+
+@dataclass
+class _RunLayout:
+    """
+    Maps the events of a run to the Events of its EventBlock. Runs that log
+    the same sequence of events share a layout.
+    """
+
+    signature: RunSignature
+    # For each EventSignature of the run that has a ProfileEvent, the index of
+    # the ProfileEvent in the run's events.
+    profile_indices: List[int]
+    # For each EventSignature of the run that has DebugEvents, the signature's
+    # index in signature.events and the indices of the DebugEvents in the
+    # run's events.
+    debug_indices: List[Tuple[int, InstructionEventSignature, List[int]]]
+    # Indices of the DebugEvents in the run's events that hold run outputs.
+    output_indices: List[int]
+
+    @staticmethod
+    def _gen_from_run(run: flatcc.RunData) -> "_RunLayout":
+        run_events = run.events
+        assert run_events is not None
+
+        # Collate the run_events into InstructionEvents
+        instruction_events: List[InstructionEvent] = InstructionEvent.gen_from_events(
+            run_events
+        )
+
+        # Map EventSignatures to the InstructionEvents
+        event_signatures: Dict[EventSignature, InstructionEvent] = OrderedDict()
+        for instruction_event in instruction_events:
+            if (
+                instruction_event.debug_events is None
+                and instruction_event.profile_events is None
+            ):
+                # Currently corresponds to run output
+                continue
+
+            generated_event_signatures: List[
+                Tuple[EventSignature, InstructionEvent]
+            ] = EventSignature.gen_from_instruction_event(instruction_event)
+            for (
+                event_signature,
+                filtered_instruction_event,
+            ) in generated_event_signatures:
+                event_signatures[event_signature] = filtered_instruction_event
+
+        # Find the events collated into each EventSignature.
+        index_of = {
+            id(find_populated_event(event)): index
+            for index, event in enumerate(run_events)
+        }
+        profile_indices = []
+        debug_indices = []
+        for signature_index, instruction_event in enumerate(event_signatures.values()):
+            if (profile_events := instruction_event.profile_events) is not None:
+                profile_indices.append(index_of[id(profile_events[0])])
+            if (debug_events := instruction_event.debug_events) is not None:
+                debug_indices.append(
+                    (
+                        signature_index,
+                        instruction_event.signature,
+                        [index_of[id(debug_event)] for debug_event in debug_events],
+                    )
+                )
+
+        output_indices = []
+        for index, event in enumerate(run_events):
+            if event.debug_event is None:
+                continue
+            if event.debug_event.debug_entry is None:
+                raise RuntimeError(
+                    "Debug entry inside debug event should not be empty!"
+                )
+            if is_debug_output(event.debug_event.debug_entry):
+                output_indices.append(index)
+
+        return _RunLayout(
+            signature=RunSignature(
+                name=run.name,
+                events=tuple(event_signatures.keys()),
+                bundled_input_index=run.bundled_input_index,
+            ),
+            profile_indices=profile_indices,
+            debug_indices=debug_indices,
+            output_indices=output_indices,
+        )
+
+
+@dataclass
+class _RunGroup:
+    """
+    The data of all runs with the same RunSignature
+    """
+
+    # For each run, the start and end times and the delegate debug metadata of
+    # each profiled EventSignature.
+    start_times: List[List[int]] = dataclasses.field(default_factory=list)
+    end_times: List[List[int]] = dataclasses.field(default_factory=list)
+    delegate_debug_metadatas: List[List[Optional[bytes]]] = dataclasses.field(
+        default_factory=list
+    )
+    # Maps the index of each EventSignature with DebugEvents to the
+    # InstructionEvents holding its DebugEvents in each run.
+    debug_events: Dict[int, List[InstructionEvent]] = dataclasses.field(
+        default_factory=dict
+    )
+    run_output: ProgramOutput = dataclasses.field(default_factory=list)
+
+
 @dataclass
 class EventBlock:
     r"""
@@ -650,6 +904,9 @@ class EventBlock:
     bundled_input_index: Optional[int] = None
     run_output: Optional[ProgramOutput] = None
     reference_output: Optional[ProgramOutput] = None
+    _profile_columns: Optional[_ProfileColumns] = dataclasses.field(
+        default=None, repr=False, compare=False
+    )
 
     def to_dataframe(
         self, include_units: bool = False, include_delegate_debug_data: bool = False
@@ -670,7 +927,27 @@ class EventBlock:
 
         units = " (" + self.target_time_scale.value + ")" if include_units else ""
 
-        df = pd.concat([e.to_dataframe(units) for e in self.events], ignore_index=True)
+        profile_columns = self._profile_columns
+        df = pd.DataFrame.from_records(
+            [
+                e._asrow(units, include_perf_data=profile_columns is None)
+                for e in self.events
+            ]
+        )
+        if profile_columns is not None and self.events:
+            # Fill in the profiling data of all events at once
+            by_event = profile_columns.durations_by_event()
+            event_indices = profile_columns.event_index[: by_event.shape[1]].tolist()
+
+            def to_column(values: List[Any]) -> pd.Series:
+                column = np.full(len(self.events), None, dtype=object)
+                for index, value in zip(event_indices, values):
+                    column[index] = value
+                return pd.Series(column, dtype=object).infer_objects()
+
+            df["raw"] = to_column(by_event.T.tolist())
+            for name, values in profile_columns.stat_columns().items():
+                df[name + units] = to_column(values.tolist())
         df.insert(
             0,
             "event_block_name",
@@ -728,108 +1005,198 @@ class EventBlock:
         An optional delegate metadata parser function to parse delegate profiling metadata
         """
 
-        # Map each RunSignatures to instances of its constituent events.
-        #   The value of the map is a GroupedRunInstance which contains:
-        #   (1) a map from each EventSignature to InstructionEvents with the signature
-        #   (2) the run output for this RunSignature
-        @dataclass
-        class GroupedRunInstances:
-            events: OrderedDict[EventSignature, List[InstructionEvent]]
-            run_output: ProgramOutput
-
-        run_groups: Mapping[RunSignature, GroupedRunInstances] = defaultdict(
-            lambda: GroupedRunInstances(OrderedDict(), [])
+        scale_factor = (
+            TIME_SCALE_DICT[source_time_scale] / TIME_SCALE_DICT[target_time_scale]
         )
 
+        # Collating the events of a run into EventSignatures is slow, so do it
+        # once for each distinct sequence of events, and only collect the
+        # times and debug data of the other runs with the same sequence.
+        layouts: Dict[Tuple[Any, ...], _RunLayout] = {}
+        run_groups: Dict[RunSignature, _RunGroup] = {}
+
         # Collect all the run data
         for run in etdump.run_data:
             if (run_events := run.events) is None:
                 continue
 
-            # Collate the run_events into InstructionEvents
-            instruction_events: List[InstructionEvent] = (
-                InstructionEvent.gen_from_events(run_events)
+            layout_key = (
+                run.name,
+                run.bundled_input_index,
+                tuple(_event_layout_key(event) for event in run_events),
             )
+            if (layout := layouts.get(layout_key)) is None:
+                layout = _RunLayout._gen_from_run(run)
+                layouts[layout_key] = layout
 
-            # Map EventSignatures to the InstructionEvents
-            event_signatures: Dict[EventSignature, InstructionEvent] = OrderedDict()
-            for instruction_event in instruction_events:
-                if (
-                    instruction_event.debug_events is None
-                    and instruction_event.profile_events is None
-                ):
-                    # Currently corresponds to run output
-                    continue
-
-                generated_event_signatures: List[
-                    Tuple[EventSignature, InstructionEvent]
-                ] = EventSignature.gen_from_instruction_event(instruction_event)
-                for (
-                    event_signature,
-                    filtered_instruction_event,
-                ) in generated_event_signatures:
-                    event_signatures[event_signature] = filtered_instruction_event
-
-            # Create a RunSignature from the EventSignatures
-            run_signature = RunSignature(
-                name=run.name,
-                events=tuple(event_signatures.keys()),
-                bundled_input_index=run.bundled_input_index,
-            )
+            if (run_group := run_groups.get(layout.signature)) is None:
+                run_group = _RunGroup()
+                run_groups[layout.signature] = run_group
 
-            # Update the Run Groups, indexed on the RunSignature
-            run_signature_events: OrderedDict[
-                EventSignature, List[InstructionEvent]
-            ] = run_groups[run_signature].events
-            for event_signature, event in event_signatures.items():
-                run_signature_events.setdefault(event_signature, []).append(event)
+            profile_events = [
+                run_events[index].profile_event for index in layout.profile_indices
+            ]
+            run_group.start_times.append([e.start_time for e in profile_events])
+            run_group.end_times.append([e.end_time for e in profile_events])
+            run_group.delegate_debug_metadatas.append(
+                [e.delegate_debug_metadata for e in profile_events]
+            )
+            for signature_index, signature, indices in layout.debug_indices:
+                run_group.debug_events.setdefault(signature_index, []).append(
+                    InstructionEvent(
+                        signature=signature,
+                        debug_events=[run_events[i].debug_event for i in indices],
+                    )
+                )
 
             # Populate (or Verify if already populated) Run Outputs
             run_outputs: ProgramOutput = EventBlock._collect_run_outputs(
-                run_events, output_buffer
+                [run_events[index] for index in layout.output_indices], output_buffer
             )
-            if len(existing_run_outputs := run_groups[run_signature].run_output) == 0:
+            if len(existing_run_outputs := run_group.run_output) == 0:
                 existing_run_outputs.extend(run_outputs)
             else:
                 verify_debug_data_equivalence(existing_run_outputs, run_outputs)
 
         # Construct the EventBlocks
-        event_blocks = []
-        scale_factor = (
-            TIME_SCALE_DICT[source_time_scale] / TIME_SCALE_DICT[target_time_scale]
-        )
-        for run_signature, grouped_run_instance in run_groups.items():
-            run_group: OrderedDict[EventSignature, List[InstructionEvent]] = (
-                grouped_run_instance.events
+        return [
+            EventBlock._gen_from_run_group(
+                run_signature,
+                run_group,
+                source_time_scale,
+                target_time_scale,
+                scale_factor,
+                output_buffer,
+                delegate_metadata_parser,
+                delegate_time_scale_converter,
             )
-            run_outputs: ProgramOutput = grouped_run_instance.run_output
-
-            # Construct the Events
-            events: List[Event] = [
-                Event._gen_from_inference_events(
-                    signature,
-                    instruction_events,
-                    scale_factor,
-                    output_buffer,
-                    delegate_metadata_parser,
-                    delegate_time_scale_converter,
-                )
-                for signature, instruction_events in run_group.items()
-            ]
+            for run_signature, run_group in run_groups.items()
+        ]
 
-            # Add the EventBlock to the return list
-            event_blocks.append(
-                EventBlock(
-                    name=run_signature.name,
-                    events=events,
-                    source_time_scale=source_time_scale,
-                    target_time_scale=target_time_scale,
-                    bundled_input_index=run_signature.bundled_input_index,
-                    run_output=run_outputs,
-                )
+    @staticmethod
+    def _gen_from_run_group(
+        run_signature: RunSignature,
+        run_group: _RunGroup,
+        source_time_scale: TimeScale,
+        target_time_scale: TimeScale,
+        scale_factor: float,
+        output_buffer: Optional[bytes],
+        delegate_metadata_parser: Optional[Callable[[List[str]], Dict[str, Any]]],
+        delegate_time_scale_converter: Optional[
+            Callable[[Union[int, str], Union[int, float]], Union[int, float]]
+        ],
+    ) -> "EventBlock":
+        """
+        Given the data of all runs with the same RunSignature, generate their
+        EventBlock, with the profiling data stored as _ProfileColumns
+        """
+        signatures = run_signature.events or ()
+        events: List[Event] = []
+        for signature_index, signature in enumerate(signatures):
+            event = Event(
+                name="",
+                _instruction_id=signature.instruction_id,
+                _delegate_metadata_parser=delegate_metadata_parser,
+                _delegate_time_scale_converter=delegate_time_scale_converter,
             )
+            # Populate the fields that only depend on the signature
+            Event._populate_profiling_related_fields(
+                event, signature.profile_event_signature, [], scale_factor
+            )
+            Event._populate_debugging_related_fields(
+                event,
+                signature.debug_event_signature,
+                run_group.debug_events.get(signature_index, []),
+                output_buffer,
+            )
+            events.append(event)
+
+        profiled_events = [
+            (index, event)
+            for index, (event, signature) in enumerate(zip(events, signatures))
+            if signature.profile_event_signature is not None
+        ]
+        num_runs = len(run_group.start_times)
+        num_profiled_events = len(profiled_events)
+        start_times = np.array(run_group.start_times, dtype=np.uint64).reshape(
+            num_runs, num_profiled_events
+        )
+        end_times = np.array(run_group.end_times, dtype=np.uint64).reshape(
+            num_runs, num_profiled_events
+        )
+        durations = _elapsed_times(start_times, end_times)
+
+        for column, (_, event) in enumerate(profiled_events):
+            # Scale factor should only be applied to non-delegated ops
+            if not event.is_delegated_op:
+                durations[:, column] /= scale_factor
+            elif (convert_time_scale := delegate_time_scale_converter) is not None:
+                durations[:, column] = [
+                    Event._calculate_elapsed_time(
+                        convert_time_scale(event.name, start_time),
+                        convert_time_scale(event.name, end_time),
+                    )
+                    for start_time, end_time in zip(
+                        start_times[:, column].tolist(), end_times[:, column].tolist()
+                    )
+                ]
+
+            delegate_debug_metadatas = [
+                metadatas[column] or ""
+                for metadatas in run_group.delegate_debug_metadatas
+            ]
+            if any(delegate_debug_metadatas):
+                event._delegate_debug_metadatas = delegate_debug_metadatas
 
-        return event_blocks
+        event_indices = np.array(
+            [index for index, _ in profiled_events], dtype=np.int64
+        )
+        columns = _ProfileColumns(
+            run_index=np.repeat(np.arange(num_runs), num_profiled_events),
+            event_index=np.tile(event_indices, num_runs),
+            instruction_id=np.tile(
+                np.array(
+                    [signatures[i].instruction_id for i in event_indices],
+                    dtype=np.int64,
+                ),
+                num_runs,
+            ),
+            delegate_debug_id=np.tile(
+                np.array(
+                    [
+                        (
+                            event.delegate_debug_identifier
+                            if isinstance(event.delegate_debug_identifier, int)
+                            else -1
+                        )
+                        for _, event in profiled_events
+                    ],
+                    dtype=np.int64,
+                ),
+                num_runs,
+            ),
+            start_time=start_times.reshape(-1),
+            end_time=end_times.reshape(-1),
+            duration=durations.reshape(-1),
+        )
+
+        if num_runs > 0 and num_profiled_events > 0:
+            by_event = columns.durations_by_event()
+            for column, ((_, event), stats) in enumerate(
+                zip(profiled_events, columns.stats())
+            ):
+                event.perf_data = PerfData(by_event[:, column])
+                event.perf_data._stats = stats
+
+        return EventBlock(
+            name=run_signature.name,
+            events=events,
+            source_time_scale=source_time_scale,
+            target_time_scale=target_time_scale,
+            bundled_input_index=run_signature.bundled_input_index,
+            run_output=run_group.run_output,
+            _profile_columns=columns,
+        )
 
     @staticmethod
     def _collect_run_outputs(
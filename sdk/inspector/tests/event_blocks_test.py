@@ -5,10 +5,12 @@
 # LICENSE file in the root directory of this source tree.
 
 # pyre-strict
+import dataclasses
 import unittest
 from typing import List, Optional, Tuple, Union
 
 import executorch.sdk.etdump.schema_flatcc as flatcc
+import pandas as pd
 from executorch.sdk.etdump.schema_flatcc import ETDumpFlatCC, ProfileEvent
 from executorch.sdk.inspector import Event, EventBlock, PerfData
 from executorch.sdk.inspector._inspector import (
@@ -18,6 +20,7 @@ from executorch.sdk.inspector._inspector import (
     InstructionEventSignature,
     ProfileEventSignature,
 )
+from executorch.sdk.inspector._inspector_utils import TimeScale
 
 
 class TestEventBlock(unittest.TestCase):
@@ -324,6 +327,132 @@ class TestEventBlock(unittest.TestCase):
                 run_counts.add((len(block.events), len(perf_data.raw)))
         self.assertSetEqual(run_counts, {(1, 2), (2, 1)})
 
+    def test_gen_from_etdump_profile_columns(self) -> None:
+        """
+        Test that the profiling data of the generated EventBlocks is stored
+        as columns, and that the per-Event statistics are read from them
+        """
+        etdump: ETDumpFlatCC = TestEventBlock._get_sample_etdump_flatcc()
+        blocks: List[EventBlock] = EventBlock._gen_from_etdump(
+            etdump,
+            source_time_scale=TimeScale.NS,
+            target_time_scale=TimeScale.NS,
+        )
+
+        block = blocks[0]
+        self.assertEqual(block.name, "signature_a")
+        columns = block._profile_columns
+        self.assertIsNotNone(columns)
+        self.assertEqual(columns.run_index.tolist(), [0, 1])
+        self.assertEqual(columns.event_index.tolist(), [0, 0])
+        self.assertEqual(columns.instruction_id.tolist(), [1, 1])
+        self.assertEqual(columns.delegate_debug_id.tolist(), [100, 100])
+        self.assertEqual(columns.start_time.tolist(), [0, 2])
+        self.assertEqual(columns.end_time.tolist(), [1, 4])
+        self.assertEqual(columns.duration.tolist(), [1.0, 2.0])
+
+        perf_data = block.events[0].perf_data
+        self.assertIsNotNone(perf_data)
+        self.assertEqual(perf_data.raw, [1.0, 2.0])
+        self.assertEqual(perf_data.p50, 1.5)
+        self.assertEqual(perf_data.min, 1.0)
+        self.assertEqual(perf_data.max, 2.0)
+
+        df = block.to_dataframe()
+        self.assertEqual(df["event_name"].tolist(), ["100"])
+        self.assertEqual(df["raw"].tolist(), [[1.0, 2.0]])
+        self.assertEqual(df["avg"].tolist(), [1.5])
+
+        columns = blocks[1]._profile_columns
+        self.assertEqual(columns.durations_by_event().tolist(), [[1.0, 1.0]])
+
+    def test_to_dataframe_from_profile_columns(self) -> None:
+        """
+        Test that the profiling columns of the DataFrame, which are read from
+        the _ProfileColumns, match those of the individual Events, including
+        for Events that weren't profiled
+        """
+        debug_event = TestEventBlock._gen_sample_debug_event(instruction_id=1)
+        run_data = [
+            flatcc.RunData(
+                name="signature_a",
+                bundled_input_index=-1,
+                allocators=[],
+                events=[
+                    flatcc.Event(
+                        allocation_event=None,
+                        debug_event=debug_event,
+                        profile_event=None,
+                    ),
+                    flatcc.Event(
+                        allocation_event=None,
+                        debug_event=None,
+                        profile_event=TestEventBlock._gen_sample_profile_event(
+                            name="profile_2", instruction_id=2, time=time
+                        ),
+                    ),
+                ],
+            )
+            for time in [(0, 10), (10, 30), (30, 60)]
+        ]
+        blocks: List[EventBlock] = EventBlock._gen_from_etdump(
+            ETDumpFlatCC(version=0, run_data=run_data),
+            source_time_scale=TimeScale.NS,
+            target_time_scale=TimeScale.US,
+        )
+
+        self.assertEqual(len(blocks), 1)
+        block = blocks[0]
+        self.assertIsNone(block.events[0].perf_data)
+        for include_units in (False, True):
+            df = block.to_dataframe(include_units=include_units)
+            self.assertEqual(df["raw"].tolist(), [None, [0.01, 0.02, 0.03]])
+            pd.testing.assert_frame_equal(
+                df,
+                dataclasses.replace(block, _profile_columns=None).to_dataframe(
+                    include_units=include_units
+                ),
+            )
+
+    def test_gen_from_etdump_time_wraparound(self) -> None:
+        """
+        Test that 32 bit timestamps that wrap around give the elapsed time,
+        and that larger timestamps raise an error
+        """
+        max_uint32 = 2**32 - 1
+
+        def gen_etdump(time: Tuple[int, int]) -> ETDumpFlatCC:
+            profile_event = TestEventBlock._gen_sample_profile_event(
+                name="profile_1", instruction_id=1, time=time
+            )
+            return ETDumpFlatCC(
+                version=0,
+                run_data=[
+                    flatcc.RunData(
+                        name="signature_a",
+                        bundled_input_index=-1,
+                        allocators=[],
+                        events=[
+                            flatcc.Event(
+                                allocation_event=None,
+                                debug_event=None,
+                                profile_event=profile_event,
+                            )
+                        ],
+                    )
+                ],
+            )
+
+        blocks = EventBlock._gen_from_etdump(
+            gen_etdump((max_uint32 - 10, 5)),
+            source_time_scale=TimeScale.NS,
+            target_time_scale=TimeScale.NS,
+        )
+        self.assertEqual(blocks[0].events[0].perf_data.raw, [15.0])
+
+        with self.assertRaises(ValueError):
+            EventBlock._gen_from_etdump(gen_etdump((max_uint32 + 10, 5)))
+
     def test_gen_from_etdump_profiling_and_debugging(self) -> None:
         """
         Test "e2e" generation of EventBlocks given an ETDump with both profiling and debugging events